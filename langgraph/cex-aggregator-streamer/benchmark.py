@@ -0,0 +1,110 @@
+"""
+Throughput benchmark for the agent's tools, run against recorded exchange responses.
+
+Record a cassette once on a machine with network access:
+
+    python benchmark.py --cassette cassettes/benchmark.jsonl.gz --record
+
+then benchmark offline, as often as needed:
+
+    python benchmark.py --cassette cassettes/benchmark.jsonl.gz --latency 0.05 --requests 50 --concurrency 16
+
+Every tool is called through its real code path (symbol index, request scheduler, caches);
+only the exchange clients are replaced by the cassette.
+"""
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+def scenarios(args) -> dict:
+    """Tool name -> arguments used for every call of that tool."""
+    exchange, symbol = args.exchange, args.symbol
+    cases = {
+        'get_exchange_list': {},
+        'get_markets': {'exchange_name': exchange, 'limit': 10},
+        'search_symbols': {'query': symbol.split('/')[0]},
+        'get_ticker': {'exchange_name': exchange, 'symbol': symbol},
+        'get_tickers': {'exchange_name': exchange, 'symbols': [symbol, 'ETH', 'SOL', 'XRP']},
+        'get_order_book': {'exchange_name': exchange, 'symbol': symbol, 'limit': 5},
+        'compare_prices': {'symbol': symbol, 'exchange_list': args.exchanges},
+        'get_vwap_quote': {'symbol': symbol, 'amount': 1.0, 'exchange_list': args.exchanges},
+        'scan_arbitrage': {'exchange_list': args.exchanges, 'limit': 5},
+        'scan_triangular_arbitrage': {'exchange_name': exchange},
+        'run_backtest': {'exchange_name': exchange, 'symbol': symbol, 'strategy': 'mean_reversion', 'days': 30},
+        'optimize_backtest': {'exchange_name': exchange, 'symbol': symbol, 'strategy': 'mean_reversion', 'days': 30,
+                              'lookback_days': [1, 3], 'threshold_pct': [1, 2]},
+    }
+    if args.private:
+        cases['get_balance'] = {'exchange_name': exchange}
+        cases['get_portfolio'] = {'exchange_list': args.exchanges}
+    return cases
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)] if ordered else 0.0
+
+def is_error(response: str) -> bool:
+    return response.startswith(("Error", "Network error", "Could not", "No valid"))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the CEX aggregator tools against a recorded cassette.")
+    parser.add_argument("--cassette", required=True, help="Cassette file (.jsonl or .jsonl.gz)")
+    parser.add_argument("--record", action="store_true", help="Call the live exchanges once per tool and record the responses")
+    parser.add_argument("--latency", default="recorded", help="Replay delay per exchange call in seconds, or 'recorded'")
+    parser.add_argument("--requests", type=int, default=20, help="Calls per tool")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent callers, like simultaneous chat sessions")
+    parser.add_argument("--exchange", default="binance", help="Exchange used by single-exchange tools")
+    parser.add_argument("--exchanges", nargs="+", default=["binance", "kraken", "bybit", "okx"], help="Exchanges used by multi-exchange tools")
+    parser.add_argument("--symbol", default="BTC/USDT", help="Symbol used by every tool")
+    parser.add_argument("--tools", nargs="+", help="Only benchmark these tools")
+    parser.add_argument("--private", action="store_true", help="Include tools that need API keys")
+    args = parser.parse_args()
+
+    # Configure before the graph modules read their settings. A fresh cache directory makes every
+    # run start cold, so market metadata and candles are recorded and replayed too.
+    os.environ["CEX_CASSETTE"] = args.cassette
+    os.environ["CEX_CASSETTE_MODE"] = "record" if args.record else "replay"
+    os.environ["CEX_CASSETTE_LATENCY"] = args.latency
+    os.environ["CEX_CACHE_DIR"] = tempfile.mkdtemp(prefix="cex-benchmark-")
+    os.environ["CEX_MARKET_DATA"] = "0"
+    # The tools never call the model; the agent module only needs a key to import
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+    import graph.cex_aggregator as agent
+    from graph.async_exchanges import close_async_exchanges
+    from graph.cassette import active_cassette
+
+    cases = scenarios(args)
+    if args.tools:
+        cases = {name: cases[name] for name in args.tools if name in cases}
+    calls = 1 if args.record else args.requests
+
+    print(f"{'Tool':<20} {'Calls':>6} {'Errors':>6} {'Req/s':>9} {'p50 ms':>9} {'p95 ms':>9}")
+    for name, tool_args in cases.items():
+        tool = getattr(agent, name)
+        latencies, errors = [], 0
+
+        def _call(_):
+            started = time.perf_counter()
+            response = tool.invoke(tool_args)
+            return time.perf_counter() - started, response
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=1 if args.record else args.concurrency) as pool:
+            for latency, response in pool.map(_call, range(calls)):
+                latencies.append(latency)
+                errors += is_error(response)
+        elapsed = time.perf_counter() - started
+        print(f"{name:<20} {calls:>6} {errors:>6} {calls / elapsed:>9.1f} "
+              f"{percentile(latencies, 0.5) * 1000:>9.1f} {percentile(latencies, 0.95) * 1000:>9.1f}")
+
+    cassette = active_cassette()
+    if args.record:
+        cassette.close()
+        print(f"\nRecorded {len(cassette)} exchange calls to {args.cassette}")
+    close_async_exchanges()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from graph.async_exchanges import fetch_tickers_bulk
+from graph.exchange_factory import exchanges, pairs_black_list
+from graph.fee_model import effective_buy_prices, effective_sell_prices, fee_model
+from graph.market_cache import get_markets
+from graph.symbol_index import USD_EQUIVALENTS
+
+def spot_symbols(exchange_name: str, markets: List[dict]) -> Dict[str, str]:
+    """
+    Map normalized symbols to exchange symbols for active spot markets.
+
+    USD-equivalent quotes are normalized to 'USD' so that e.g. BTC/USDT on one exchange
+    lines up with BTC/USD on another; the exchange's own symbol is kept as the value,
+    preferring USDT, then USD, then USDC when an exchange lists several.
+    """
+    blacklist = set(pairs_black_list.get(exchange_name, []))
+    preference = {quote: rank for rank, quote in enumerate(('USDT', 'USD', 'USDC'))}
+    symbols = {}
+    for market in markets:
+        symbol = market.get('symbol')
+        if not symbol or symbol in blacklist or market.get('active') is False:
+            continue
+        if market.get('type', 'spot') != 'spot' and not market.get('spot'):
+            continue
+        base, quote = market.get('base'), market.get('quote')
+        if not base or not quote:
+            continue
+        key = f"{base}/USD" if quote in USD_EQUIVALENTS else f"{base}/{quote}"
+        current = symbols.get(key)
+        if current is None or preference.get(quote, 99) < preference.get(current.split('/')[-1], 99):
+            symbols[key] = symbol
+    return symbols
+
+def normalize_symbol(symbol: str) -> str:
+    """Normalize a user symbol the way spot_symbols keys markets (e.g., 'btc/usdt' or 'BTC' -> 'BTC/USD')."""
+    symbol = symbol.upper()
+    base, _, quote = symbol.partition('/')
+    if not quote or quote in USD_EQUIVALENTS:
+        return f"{base}/USD"
+    return symbol
+
+def cross_spread_matrix(bids: np.ndarray, asks: np.ndarray, fees: np.ndarray) -> np.ndarray:
+    """
+    Net return of buying on one exchange and selling on another, for every symbol at once.
+
+    Args:
+        bids (np.ndarray): (symbols, exchanges) best bid prices, NaN where unavailable
+        asks (np.ndarray): (symbols, exchanges) best ask prices, NaN where unavailable
+        fees (np.ndarray): (exchanges,) or (symbols, exchanges) taker fee rates
+
+    Returns:
+        np.ndarray: (symbols, buy exchange, sell exchange) net return as a fraction,
+                    NaN where either side is missing or buy and sell exchange are the same
+    """
+    fees = fees if fees.ndim == 2 else fees[None, :]
+    effective_ask = effective_buy_prices(asks, fees)
+    effective_bid = effective_sell_prices(bids, fees)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = effective_bid[:, None, :] / effective_ask[:, :, None] - 1
+    diagonal = np.arange(bids.shape[1])
+    returns[:, diagonal, diagonal] = np.nan
+    returns[~np.isfinite(returns)] = np.nan
+    return returns
+
+def rank_opportunities(returns: np.ndarray, min_return: float = 0.0, limit: int = 10) -> List[Tuple[int, int, int, float]]:
+    """
+    Pick the best (symbol, buy exchange, sell exchange) cells above a threshold.
+
+    Returns:
+        list: (symbol index, buy index, sell index, net return) sorted by return, best first
+    """
+    flat = np.where(np.isnan(returns), -np.inf, returns).ravel()
+    candidates = np.flatnonzero(flat > min_return)
+    if not len(candidates):
+        return []
+    if len(candidates) > limit:
+        candidates = candidates[np.argpartition(-flat[candidates], limit - 1)[:limit]]
+    candidates = candidates[np.argsort(-flat[candidates])]
+    symbol_idx, buy_idx, sell_idx = np.unravel_index(candidates, returns.shape)
+    return [(int(s), int(b), int(a), float(flat[c])) for s, b, a, c in zip(symbol_idx, buy_idx, sell_idx, candidates)]
+
+def _load_symbols(exchange_list: List[str]) -> Tuple[Dict[str, Dict[str, str]], Dict[str, str]]:
+    """
+    Spot symbols of several exchanges, with market metadata loaded concurrently.
+
+    Returns:
+        tuple: (exchange name -> spot_symbols map, exchange name -> reason for exchanges whose markets failed)
+    """
+    def _load(exchange_name):
+        try:
+            return spot_symbols(exchange_name, get_markets(exchange_name, exchanges[exchange_name]))
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=max(len(exchange_list), 1)) as pool:
+        results = dict(zip(exchange_list, pool.map(_load, exchange_list)))
+    venue_symbols = {name: result for name, result in results.items() if not isinstance(result, Exception)}
+    failed = {name: f"markets unavailable ({str(result) or type(result).__name__})"
+              for name, result in results.items() if isinstance(result, Exception)}
+    return venue_symbols, failed
+
+def _fetch_all_tickers(venue_symbols: Dict[str, Dict[str, str]]) -> Dict[str, dict]:
+    """
+    Tickers of every exchange with a bulk endpoint, keyed by exchange symbol, within the fan-out deadline.
+
+    Exchanges that reject a bulk request fall back to single fetches; exchanges without any
+    ticker are left out.
+    """
+    wanted = {name: list(symbols.values()) for name, symbols in venue_symbols.items()
+              if exchanges[name].has.get('fetchTickers')}
+    results = fetch_tickers_bulk(wanted) if wanted else {}
+    tickers = {}
+    for name, by_symbol in results.items():
+        found = {symbol: ticker for symbol, ticker in by_symbol.items() if not isinstance(ticker, BaseException)}
+        if found:
+            tickers[name] = found
+    return tickers
+
+def scan(exchange_list: List[str], symbols: Optional[List[str]] = None, min_return: float = 0.0,
+         limit: int = 10) -> dict:
+    """
+    Scan every symbol listed on at least two exchanges for cross-exchange arbitrage.
+
+    Args:
+        exchange_list (list): Exchanges to scan
+        symbols (list): Optional normalized symbols (e.g., 'BTC/USD') to restrict the scan to
+        min_return (float): Minimum net return (fraction) to report
+        limit (int): Maximum number of opportunities to return
+
+    Returns:
+        dict: opportunities (list of dicts), closest (best pairs below the threshold, only when there
+              are no opportunities), symbols_scanned, exchanges (scanned), skipped (exchange name -> reason)
+    """
+    venue_symbols, skipped = _load_symbols(exchange_list)
+    exchange_list = [name for name in exchange_list if name in venue_symbols]
+    schedules = fee_model.get_many(exchange_list)
+
+    # Symbols listed on at least two exchanges
+    counts = {}
+    for symbol_map in venue_symbols.values():
+        for key in symbol_map:
+            counts[key] = counts.get(key, 0) + 1
+    universe = sorted(key for key, count in counts.items() if count >= 2)
+    if symbols:
+        wanted = {normalize_symbol(s) for s in symbols}
+        universe = [key for key in universe if key in wanted]
+
+    universe_set = set(universe)
+    for exchange_name in exchange_list:
+        venue_symbols[exchange_name] = {key: sym for key, sym in venue_symbols[exchange_name].items() if key in universe_set}
+
+    tickers = _fetch_all_tickers({name: syms for name, syms in venue_symbols.items() if syms})
+    scanned = [name for name in exchange_list if name in tickers]
+    skipped.update({name: "no ticker data" for name in exchange_list if name not in tickers})
+
+    bids = np.full((len(universe), len(scanned)), np.nan)
+    asks = np.full((len(universe), len(scanned)), np.nan)
+    row = {key: i for i, key in enumerate(universe)}
+    for j, exchange_name in enumerate(scanned):
+        exchange_tickers = tickers[exchange_name]
+        for key, exchange_symbol in venue_symbols[exchange_name].items():
+            ticker = exchange_tickers.get(exchange_symbol)
+            if ticker:
+                bids[row[key], j] = ticker.get('bid') or np.nan
+                asks[row[key], j] = ticker.get('ask') or np.nan
+
+    # Each market's own taker fee (the account's tier where API keys are configured)
+    fee_matrix = np.full((len(universe), len(scanned)), np.nan)
+    for j, exchange_name in enumerate(scanned):
+        schedule = schedules[exchange_name]
+        fee_matrix[:, j] = schedule.default_taker
+        for key, exchange_symbol in venue_symbols[exchange_name].items():
+            fee_matrix[row[key], j] = schedule.taker_fee(exchange_symbol)
+    returns = cross_spread_matrix(bids, asks, fee_matrix)
+
+    def _describe(ranked):
+        described = []
+        for s, b, a, net in ranked:
+            key = universe[s]
+            described.append({
+                'symbol': key,
+                'buy_exchange': scanned[b],
+                'buy_symbol': venue_symbols[scanned[b]][key],
+                'buy_price': float(asks[s, b]),
+                'sell_exchange': scanned[a],
+                'sell_symbol': venue_symbols[scanned[a]][key],
+                'sell_price': float(bids[s, a]),
+                'gross_return': float(bids[s, a] / asks[s, b] - 1),
+                'net_return': net,
+                # Moving the bought coins to the selling exchange costs this much of them, where published
+                'withdraw_fee': schedules[scanned[b]].withdraw_fee(key.split('/')[0])
+            })
+        return described
+
+    opportunities = _describe(rank_opportunities(returns, min_return, limit))
+    # When nothing clears the threshold, report the closest pairs so the answer is still informative
+    closest = [] if opportunities else _describe(rank_opportunities(returns, -np.inf, min(limit, 3)))
+
+    return {
+        'opportunities': opportunities,
+        'closest': closest,
+        'symbols_scanned': len(universe),
+        'exchanges': scanned,
+        'skipped': skipped
+    }
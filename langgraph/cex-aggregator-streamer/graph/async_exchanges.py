@@ -0,0 +1,354 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import ccxt
+from dotenv import load_dotenv
+from graph.exchange_factory import create_async_exchange
+from graph.exchange_health import CircuitOpen, health
+from graph.market_cache import prime_from_cache, store_markets
+from graph.request_scheduler import INTERACTIVE, is_coalescable, scheduler
+
+# Load environment variables
+load_dotenv()
+
+# Per-exchange timeout (seconds) applied to every concurrent call
+DEFAULT_TIMEOUT = float(os.getenv("CEX_FETCH_TIMEOUT", "5"))
+
+# Overall deadline (seconds) for interactive fan-outs such as compare_prices; late exchanges are left out
+FANOUT_DEADLINE = float(os.getenv("CEX_FANOUT_DEADLINE", "3"))
+
+# Send a duplicate of an interactive read that is slower than the exchange's recent p95 latency (0 to disable)
+HEDGE_READS = os.getenv("CEX_HEDGE_READS", "1") == "1"
+
+# A single background event loop owns all async clients. ccxt async clients keep an
+# aiohttp session bound to the loop they were first used on, so they cannot be
+# shared across short-lived asyncio.run() loops.
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+# Async clients, created on the background loop the first time an exchange is used
+async_exchanges = {}
+
+# Exchanges whose markets are already in the shared market cache
+_markets_cached = set()
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """An exchange did not answer before a fan-out's overall deadline."""
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Return the shared background event loop, starting it on first use."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=_loop.run_forever, name="cex-async-loop", daemon=True)
+            thread.start()
+    return _loop
+
+def run_async(coro, timeout: Optional[float] = None) -> Any:
+    """
+    Run a coroutine on the background event loop and wait for its result.
+
+    Args:
+        coro: The coroutine to run
+        timeout (float): Optional maximum number of seconds to wait
+
+    Returns:
+        The coroutine's result
+    """
+    future = asyncio.run_coroutine_threadsafe(coro, get_event_loop())
+    return future.result(timeout)
+
+def get_async_exchange(exchange_name: str):
+    """Return the async client for an exchange. Must be called on the background loop."""
+    exchange = async_exchanges.get(exchange_name)
+    if exchange is None:
+        exchange = create_async_exchange(exchange_name)
+        # ccxt keeps pricing each endpoint, but the cost is charged to the request scheduler's bucket,
+        # which paces calls across all sessions, instead of queueing them again in a per-client throttle
+        exchange.throttle = scheduler.throttler(exchange_name, getattr(exchange, 'rateLimit', None))
+        if prime_from_cache(exchange_name, exchange):
+            _markets_cached.add(exchange_name)
+        async_exchanges[exchange_name] = exchange
+    return exchange
+
+def warm_async_exchange(exchange_name: str):
+    """Create the async client for an exchange on the background loop, primed from the market cache."""
+    async def _create():
+        return get_async_exchange(exchange_name)
+    return run_async(_create())
+
+async def call_exchange(exchange_name: str, method: str, args: Tuple = (), timeout: float = DEFAULT_TIMEOUT,
+                        priority: int = INTERACTIVE, hedge: bool = False) -> Any:
+    """
+    Call a single async exchange method through the request scheduler, giving up once the timeout expires.
+
+    Identical read calls made concurrently (from any session) share one upstream request. Calls
+    to an exchange whose circuit is open fail at once with CircuitOpen. With `hedge`, a read
+    still running after the exchange's recent p95 latency is sent a second time and the first
+    answer wins.
+    """
+    health.check(exchange_name)
+    exchange = get_async_exchange(exchange_name)
+
+    async def _call():
+        started = time.monotonic()
+        try:
+            result = await getattr(exchange, method)(*args)
+        except asyncio.CancelledError:
+            # Every caller stopped waiting, so the exchange did not answer in time
+            health.record(exchange_name, time.monotonic() - started, asyncio.TimeoutError())
+            raise
+        except Exception as e:
+            health.record(exchange_name, time.monotonic() - started, e)
+            raise
+        health.record(exchange_name, time.monotonic() - started)
+        return result
+
+    def _submit(call_timeout: float, coalesce: bool = True):
+        return scheduler.submit(
+            exchange_name, method, args, _call, priority, call_timeout,
+            rate_limit_ms=getattr(exchange, 'rateLimit', None), coalesce=coalesce
+        )
+
+    if hedge and is_coalescable(method):
+        result = await _hedged(exchange_name, _submit, timeout)
+    else:
+        result = await _submit(timeout)
+    if exchange_name not in _markets_cached and exchange.markets:
+        # The client loaded its own markets; share them with other clients and processes
+        _markets_cached.add(exchange_name)
+        markets = list(exchange.markets.values())
+        asyncio.get_running_loop().run_in_executor(None, store_markets, exchange_name, markets)
+    return result
+
+def _consume(task: asyncio.Task):
+    if not task.cancelled():
+        task.exception()
+
+async def _hedged(exchange_name: str, submit: Callable[..., Awaitable[Any]], timeout: float) -> Any:
+    """Run a read, and a second copy of it if the first is slow; return whichever succeeds first."""
+    monitor = health.get(exchange_name)
+    delay = monitor.hedge_delay()
+    loop = asyncio.get_running_loop()
+    tasks = [loop.create_task(submit(timeout))]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if not done and timeout > delay:
+            # A separate upstream request: joining the slow one would not help
+            monitor.hedges += 1
+            tasks.append(loop.create_task(submit(timeout - delay, coalesce=False)))
+        pending, error = set(tasks), None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    # The slower copy finishes in the background; its outcome still feeds the health stats
+                    for other in pending:
+                        other.add_done_callback(_consume)
+                    return task.result()
+                error = error or task.exception()
+        raise error
+    except asyncio.CancelledError:
+        for task in tasks:
+            task.cancel()
+        raise
+
+def request(exchange_name: str, method: str, args: Tuple = (), timeout: Optional[float] = None,
+            priority: int = INTERACTIVE) -> Any:
+    """
+    Make one scheduled exchange call from synchronous code.
+
+    Args:
+        exchange_name (str): The exchange to call
+        method (str): ccxt method name (e.g., 'fetch_ticker')
+        args (tuple): Positional arguments for the method
+        timeout (float): Seconds to wait, queueing included (default: CEX_FETCH_TIMEOUT)
+        priority (int): INTERACTIVE or BACKGROUND
+
+    Returns:
+        The call result; raises what the exchange raised
+    """
+    if timeout is None:
+        timeout = DEFAULT_TIMEOUT
+    return run_async(call_exchange(exchange_name, method, args, timeout, priority))
+
+class ScheduledClient:
+    """Stand-in for a sync ccxt client whose methods are routed through the request scheduler."""
+
+    def __init__(self, exchange_name: str, priority: int = INTERACTIVE, timeout: Optional[float] = None):
+        self.exchange_name = exchange_name
+        self.priority = priority
+        self.timeout = timeout
+
+    def __getattr__(self, method: str):
+        return lambda *args: request(self.exchange_name, method, args, self.timeout, self.priority)
+
+async def _gather(coros: List[Awaitable[Any]], names: List[str], deadline: Optional[float]) -> List[Any]:
+    """Await coroutines concurrently; with a deadline, the ones still running then are cancelled."""
+    tasks = [asyncio.ensure_future(coro) for coro in coros]
+    if deadline is None:
+        return await asyncio.gather(*tasks, return_exceptions=True)
+    if tasks:
+        _, pending = await asyncio.wait(tasks, timeout=deadline)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+    return [
+        DeadlineExceeded(f"{name} did not answer within {deadline:g}s") if task.cancelled()
+        else task.exception() or task.result()
+        for name, task in zip(names, tasks)
+    ]
+
+async def gather_calls(calls: Dict[str, Tuple[str, Tuple]], timeout: float = DEFAULT_TIMEOUT,
+                       priority: int = INTERACTIVE, deadline: Optional[float] = None,
+                       hedge: bool = False) -> Dict[str, Any]:
+    """Run one call per exchange concurrently. Failed, timed out or late calls map to their exception."""
+    names = list(calls)
+    results = await _gather(
+        [call_exchange(name, calls[name][0], calls[name][1], timeout, priority, hedge) for name in names],
+        names, deadline
+    )
+    return dict(zip(names, results))
+
+def fan_out(calls: Dict[str, Tuple[str, Tuple]], timeout: Optional[float] = None,
+            priority: int = INTERACTIVE, deadline: Optional[float] = None, hedge: bool = False) -> Dict[str, Any]:
+    """
+    Call every exchange at once, so total latency is bounded by the slowest exchange (or the deadline).
+
+    Args:
+        calls (dict): Maps exchange name to a (method name, positional args) tuple
+        timeout (float): Per-exchange timeout in seconds (default: CEX_FETCH_TIMEOUT)
+        priority (int): INTERACTIVE or BACKGROUND
+        deadline (float): Seconds after which exchanges that have not answered map to DeadlineExceeded
+        hedge (bool): Duplicate reads that are slower than their exchange's recent p95 latency
+
+    Returns:
+        dict: Maps exchange name to the call result, or to the exception it raised
+    """
+    if timeout is None:
+        timeout = DEFAULT_TIMEOUT
+    return run_async(gather_calls(calls, timeout, priority, deadline, hedge))
+
+async def gather_many(calls: List[Tuple[str, str, Tuple]], timeout: float = DEFAULT_TIMEOUT,
+                      priority: int = INTERACTIVE, deadline: Optional[float] = None,
+                      hedge: bool = False) -> List[Any]:
+    """Run several calls, possibly several per exchange, concurrently. Failures map to their exception."""
+    return await _gather(
+        [call_exchange(name, method, args, timeout, priority, hedge) for name, method, args in calls],
+        [name for name, _, _ in calls], deadline
+    )
+
+def fan_out_many(calls: List[Tuple[str, str, Tuple]], timeout: Optional[float] = None,
+                 priority: int = INTERACTIVE, deadline: Optional[float] = None, hedge: bool = False) -> List[Any]:
+    """
+    Run a list of exchange calls concurrently.
+
+    Args:
+        calls (list): (exchange name, method name, positional args) tuples
+        timeout (float): Per-call timeout in seconds (default: CEX_FETCH_TIMEOUT)
+        priority (int): INTERACTIVE or BACKGROUND
+        deadline (float): Seconds after which unfinished calls map to DeadlineExceeded
+        hedge (bool): Duplicate reads that are slower than their exchange's recent p95 latency
+
+    Returns:
+        list: Results in the same order as calls; failed calls hold the exception they raised
+    """
+    if timeout is None:
+        timeout = DEFAULT_TIMEOUT
+    return run_async(gather_many(calls, timeout, priority, deadline, hedge))
+
+def fetch_tickers_concurrently(symbols: Dict[str, str], timeout: Optional[float] = None,
+                               deadline: Optional[float] = FANOUT_DEADLINE) -> Dict[str, Any]:
+    """
+    Fetch one ticker per exchange concurrently, hedging slow requests when CEX_HEDGE_READS is on.
+
+    Args:
+        symbols (dict): Maps exchange name to the symbol to fetch on that exchange
+        timeout (float): Per-exchange timeout in seconds
+        deadline (float): Seconds to wait overall; exchanges that have not answered are left out (default: CEX_FANOUT_DEADLINE)
+
+    Returns:
+        dict: Maps exchange name to the ticker, or to the exception it raised (DeadlineExceeded if late)
+    """
+    return fan_out({name: ('fetch_ticker', (symbol,)) for name, symbol in symbols.items()}, timeout,
+                   deadline=deadline, hedge=HEDGE_READS)
+
+async def gather_tickers(symbols: Dict[str, List[str]], timeout: float = DEFAULT_TIMEOUT,
+                         deadline: Optional[float] = FANOUT_DEADLINE, hedge: bool = HEDGE_READS) -> Dict[str, Dict[str, Any]]:
+    """
+    Fetch many tickers on several exchanges with as few requests as possible.
+
+    Each exchange with a bulk tickers endpoint is asked once for all of its symbols; the others,
+    and symbols a bulk answer left out, are fetched one by one, all concurrently. A bulk request
+    the exchange rejects as unsupported is retried one symbol at a time; any other failure (rate
+    limits, network errors, timeouts) applies to all of its symbols rather than multiplying requests.
+
+    Returns:
+        dict: exchange name -> {symbol: ticker, or the exception raised for it}
+    """
+    started = time.monotonic()
+    bulk, single = [], []
+    for name, wanted in symbols.items():
+        if len(wanted) > 1 and get_async_exchange(name).has.get('fetchTickers'):
+            bulk.append((name, 'fetch_tickers', (list(wanted),)))
+        else:
+            single.extend((name, 'fetch_ticker', (symbol,)) for symbol in wanted)
+    results = await gather_many(bulk + single, timeout, INTERACTIVE, deadline, hedge)
+
+    tickers: Dict[str, Dict[str, Any]] = {name: {} for name in symbols}
+    retry = []
+    for (name, method, args), result in zip(bulk + single, results):
+        if method == 'fetch_ticker':
+            tickers[name][args[0]] = result
+        elif isinstance(result, BaseException):
+            if isinstance(result, (ccxt.BadRequest, ccxt.NotSupported, ccxt.ArgumentsRequired)):
+                # Some bulk endpoints reject symbol lists or cap their length
+                retry.extend((name, 'fetch_ticker', (symbol,)) for symbol in args[0])
+            else:
+                tickers[name].update({symbol: result for symbol in args[0]})
+        else:
+            for symbol in args[0]:
+                if symbol in result:
+                    tickers[name][symbol] = result[symbol]
+                else:
+                    retry.append((name, 'fetch_ticker', (symbol,)))
+
+    if retry:
+        remaining = None if deadline is None else deadline - (time.monotonic() - started)
+        if remaining is not None and remaining <= 0:
+            results = [DeadlineExceeded(f"{name} did not answer within {deadline:g}s") for name, _, _ in retry]
+        else:
+            results = await gather_many(retry, timeout, INTERACTIVE, remaining, hedge)
+        for (name, _, args), result in zip(retry, results):
+            tickers[name][args[0]] = result
+    return tickers
+
+def fetch_tickers_bulk(symbols: Dict[str, List[str]], timeout: Optional[float] = None,
+                       deadline: Optional[float] = FANOUT_DEADLINE) -> Dict[str, Dict[str, Any]]:
+    """
+    Fetch several symbols' tickers per exchange, using bulk endpoints where exchanges have them.
+
+    Args:
+        symbols (dict): Maps exchange name to the exchange symbols to fetch
+        timeout (float): Per-request timeout in seconds (default: CEX_FETCH_TIMEOUT)
+        deadline (float): Seconds to wait overall (default: CEX_FANOUT_DEADLINE)
+
+    Returns:
+        dict: exchange name -> {symbol: ticker, or the exception raised for it}
+    """
+    if timeout is None:
+        timeout = DEFAULT_TIMEOUT
+    return run_async(gather_tickers(symbols, timeout, deadline))
+
+async def _close_all():
+    for exchange in list(async_exchanges.values()):
+        await exchange.close()
+    async_exchanges.clear()
+
+def close_async_exchanges():
+    """Close the HTTP sessions of all async clients that were created."""
+    if _loop is not None:
+        run_async(_close_all())
@@ -0,0 +1,211 @@
+import itertools
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+import ccxt
+from dotenv import load_dotenv
+from graph.candle_store import candle_store
+
+# Load environment variables
+load_dotenv()
+
+# Worker processes used for parameter sweeps (default: one per CPU)
+BACKTEST_WORKERS = int(os.getenv("CEX_BACKTEST_WORKERS", "0")) or os.cpu_count() or 1
+
+# Sweeps smaller than this run in-process; process start-up would cost more than it saves
+MIN_PARALLEL_GRID = 8
+
+STRATEGIES = ('mean_reversion', 'trend_following')
+
+# Stats a sweep can rank by; higher is better for each, including max_drawdown which is negative
+SORT_STATS = ('sharpe', 'total_return', 'annual_return', 'max_drawdown', 'win_rate')
+
+def timeframe_seconds(timeframe: str) -> int:
+    """Length of one candle in seconds (e.g., '1h' -> 3600)."""
+    return ccxt.Exchange.parse_timeframe(timeframe)
+
+def fetch_ohlcv(exchange_name: str, symbol: str, timeframe: str = '1h', days: float = 90) -> pd.DataFrame:
+    """
+    Load OHLCV candles for the last `days` days from the local candle store, downloading only
+    candles newer than the last stored one.
+
+    Returns:
+        pd.DataFrame: Columns open, high, low, close, volume indexed by UTC timestamp
+    """
+    return candle_store.load_frame(exchange_name, symbol, timeframe, days)
+
+def rsi(close: pd.Series, period: int = 14) -> pd.Series:
+    """Wilder's relative strength index."""
+    delta = close.diff()
+    gain = delta.clip(lower=0).ewm(alpha=1 / period, adjust=False, min_periods=period).mean()
+    loss = (-delta.clip(upper=0)).ewm(alpha=1 / period, adjust=False, min_periods=period).mean()
+    return 100 - 100 / (1 + gain / loss)
+
+def mean_reversion_positions(close: pd.Series, lookback: int, threshold: float, allow_short: bool = False) -> pd.Series:
+    """
+    Go long when price falls `threshold` below its rolling mean and exit when it returns to the mean.
+
+    Args:
+        close (pd.Series): Close prices
+        lookback (int): Rolling mean window in candles
+        threshold (float): Entry deviation as a fraction (0.015 for 1.5%)
+        allow_short (bool): Also go short when price rises `threshold` above the mean
+
+    Returns:
+        pd.Series: Target position per candle (1 long, 0 flat, -1 short)
+    """
+    deviation = close / close.rolling(lookback, min_periods=lookback).mean() - 1
+    signal = pd.Series(np.nan, index=close.index)
+    if allow_short:
+        # Flatten whenever price crosses its mean, then open on a deviation in either direction
+        crossed = np.sign(deviation) != np.sign(deviation.shift())
+        signal[crossed & deviation.shift().notna()] = 0
+        signal[deviation >= threshold] = -1
+    else:
+        signal[deviation >= 0] = 0
+    signal[deviation <= -threshold] = 1
+    return signal.ffill().fillna(0)
+
+def trend_following_positions(close: pd.Series, ma_period: int = 50, rsi_period: int = 14,
+                              overbought: float = 75, oversold: float = 25) -> pd.Series:
+    """
+    Go long while price is above its moving average and RSI is between oversold and overbought;
+    exit when price drops below the average or RSI becomes overbought.
+
+    Returns:
+        pd.Series: Target position per candle (1 long, 0 flat)
+    """
+    moving_average = close.rolling(ma_period, min_periods=ma_period).mean()
+    strength = rsi(close, rsi_period)
+    signal = pd.Series(np.nan, index=close.index)
+    signal[(close > moving_average) & (strength > oversold) & (strength < overbought)] = 1
+    signal[(close < moving_average) | (strength >= overbought)] = 0
+    return signal.ffill().fillna(0)
+
+def simulate(close: pd.Series, positions: pd.Series, fee: float = 0.001, periods_per_year: float = 8760) -> Dict[str, float]:
+    """
+    Run a vectorized simulation where each position is taken at the close after its signal.
+
+    Args:
+        close (pd.Series): Close prices
+        positions (pd.Series): Target position per candle
+        fee (float): Cost per unit of position change as a fraction (0.001 for 0.1%)
+        periods_per_year (float): Candles per year, used to annualize
+
+    Returns:
+        dict: total_return, annual_return, volatility, sharpe, max_drawdown, trades, win_rate,
+              exposure, buy_and_hold, final_equity
+    """
+    held = positions.shift(1).fillna(0).to_numpy()
+    returns = close.pct_change().fillna(0).to_numpy()
+    turnover = np.abs(np.diff(held, prepend=0.0))
+    strategy_returns = held * returns - turnover * fee
+    equity = np.cumprod(1 + strategy_returns)
+
+    drawdown = equity / np.maximum.accumulate(equity) - 1
+    periods = max(len(equity), 1)
+    total_return = float(equity[-1] - 1) if len(equity) else 0.0
+    volatility = float(np.std(strategy_returns) * np.sqrt(periods_per_year)) if periods > 1 else 0.0
+    mean_return = float(np.mean(strategy_returns) * periods_per_year) if periods else 0.0
+
+    # Trades: runs of consecutive candles holding the same non-zero position
+    entries = (held != 0) & (np.diff(held, prepend=0.0) != 0)
+    trade_ids = np.cumsum(entries) * (held != 0)
+    trade_returns = np.bincount(trade_ids, weights=np.log1p(strategy_returns))[1:] if trade_ids.any() else np.array([])
+
+    return {
+        'total_return': total_return,
+        'annual_return': float((1 + total_return) ** (periods_per_year / periods) - 1) if total_return > -1 else -1.0,
+        'volatility': volatility,
+        'sharpe': mean_return / volatility if volatility else 0.0,
+        'max_drawdown': float(drawdown.min()) if len(drawdown) else 0.0,
+        'trades': int(entries.sum()),
+        'win_rate': float((trade_returns > 0).mean()) if len(trade_returns) else 0.0,
+        'exposure': float((held != 0).mean()) if periods else 0.0,
+        'buy_and_hold': float(close.iloc[-1] / close.iloc[0] - 1) if len(close) > 1 else 0.0,
+        'final_equity': float(equity[-1]) if len(equity) else 1.0
+    }
+
+def run_strategy(close: pd.Series, strategy: str, params: dict, fee: float = 0.001, periods_per_year: float = 8760) -> Dict[str, float]:
+    """Compute positions for a strategy and simulate them."""
+    if strategy == 'mean_reversion':
+        positions = mean_reversion_positions(
+            close, int(params['lookback']), params['threshold'], params.get('allow_short', False)
+        )
+    elif strategy == 'trend_following':
+        positions = trend_following_positions(
+            close, int(params['ma_period']), int(params['rsi_period']), params['overbought'], params['oversold']
+        )
+    else:
+        raise ValueError(f"Unknown strategy '{strategy}'. Choose one of: {', '.join(STRATEGIES)}")
+    return simulate(close, positions, fee, periods_per_year)
+
+# Worker pool reused across sweeps. Workers are spawned rather than forked because the
+# server process runs background threads (event loop, pre-warming) that fork would copy mid-flight.
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=BACKTEST_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+def _run_chunk(args) -> List[dict]:
+    """Process-pool entry point: run a chunk of parameter sets against one price series."""
+    index, values, strategy, chunk, fee, periods_per_year = args
+    close = pd.Series(values, index=pd.DatetimeIndex(index))
+    return [{'params': params, 'stats': run_strategy(close, strategy, params, fee, periods_per_year)} for params in chunk]
+
+def sweep(close: pd.Series, strategy: str, grid: Dict[str, List], fee: float = 0.001,
+          periods_per_year: float = 8760, sort_by: str = 'sharpe', workers: Optional[int] = None) -> List[dict]:
+    """
+    Evaluate every combination of a parameter grid, in parallel on a process pool for larger grids.
+
+    Args:
+        close (pd.Series): Close prices
+        strategy (str): 'mean_reversion' or 'trend_following'
+        grid (dict): Maps parameter name to the list of values to try
+        fee (float): Cost per unit of position change as a fraction
+        periods_per_year (float): Candles per year, used to annualize
+        sort_by (str): Stat to rank the results by, best first; one of SORT_STATS
+        workers (int): Parallelism (default: CEX_BACKTEST_WORKERS); 1 runs in-process
+
+    Returns:
+        list: {'params': dict, 'stats': dict} for every combination, best first
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy '{strategy}'. Choose one of: {', '.join(STRATEGIES)}")
+    if sort_by not in SORT_STATS:
+        raise ValueError(f"Cannot rank by '{sort_by}'. Choose one of: {', '.join(SORT_STATS)}")
+    names = list(grid)
+    combos = [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+    workers = workers or BACKTEST_WORKERS
+    if len(combos) < MIN_PARALLEL_GRID or workers <= 1:
+        results = [{'params': params, 'stats': run_strategy(close, strategy, params, fee, periods_per_year)} for params in combos]
+    else:
+        # A few chunks per worker: the series is sent once per chunk, not once per combination
+        chunk_count = min(len(combos), workers * 2)
+        chunks = [combos[i::chunk_count] for i in range(chunk_count)]
+        index, values = close.index.asi8, close.to_numpy()
+        tasks = [(index, values, strategy, chunk, fee, periods_per_year) for chunk in chunks]
+        results = [result for chunk_results in _get_pool().map(_run_chunk, tasks) for result in chunk_results]
+
+    return sorted(results, key=lambda r: r['stats'][sort_by], reverse=True)
+
+def format_stats(stats: Dict[str, float]) -> str:
+    """Render backtest stats as a bullet list."""
+    return (
+        f"- Total Return: {stats['total_return'] * 100:.2f}% (Buy & Hold: {stats['buy_and_hold'] * 100:.2f}%)\n"
+        f"- Annualized Return: {stats['annual_return'] * 100:.2f}%\n"
+        f"- Sharpe Ratio: {stats['sharpe']:.2f}\n"
+        f"- Max Drawdown: {stats['max_drawdown'] * 100:.2f}%\n"
+        f"- Trades: {stats['trades']} (Win Rate: {stats['win_rate'] * 100:.1f}%)\n"
+        f"- Time in Market: {stats['exposure'] * 100:.1f}%\n"
+    )
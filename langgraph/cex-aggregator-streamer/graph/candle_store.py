@@ -0,0 +1,266 @@
+import fcntl
+import json
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+import ccxt
+from dotenv import load_dotenv
+from graph.async_exchanges import ScheduledClient
+from graph.market_cache import CACHE_DIR
+from graph.request_scheduler import BACKGROUND
+
+# Load environment variables
+load_dotenv()
+
+# Root directory of the candle store
+CANDLE_DIR = os.getenv("CEX_CANDLE_DIR", os.path.join(CACHE_DIR, "candles"))
+
+# Seconds a history page may wait for, queueing behind interactive requests included
+BACKGROUND_TIMEOUT = 30
+
+# One file per column; each file is a flat little-endian array appended to in place
+COLUMNS = {
+    'timestamp': np.dtype('<i8'),
+    'open': np.dtype('<f8'),
+    'high': np.dtype('<f8'),
+    'low': np.dtype('<f8'),
+    'close': np.dtype('<f8'),
+    'volume': np.dtype('<f8'),
+}
+
+# Names the generation of column files a series currently uses; absent means generation 0
+MANIFEST = "columns.json"
+
+def timeframe_ms(timeframe: str) -> int:
+    """Length of one candle in milliseconds (e.g., '1m' -> 60000)."""
+    return ccxt.Exchange.parse_timeframe(timeframe) * 1000
+
+class CandleStore:
+    """
+    Append-only columnar OHLCV store keyed by exchange, symbol and timeframe.
+
+    Each series is a directory of raw column files read through np.memmap, so reads do not
+    copy or parse anything. Only closed candles newer than the last stored one are appended.
+    Extending history backwards writes a new generation of column files and switches to it by
+    replacing the manifest, so an interrupted rewrite never mixes old and new columns.
+    """
+
+    def __init__(self, root: str = CANDLE_DIR):
+        self.root = root
+
+    def series_dir(self, exchange_name: str, symbol: str, timeframe: str) -> str:
+        """Directory holding one series; symbol separators are made filesystem-safe."""
+        safe_symbol = symbol.replace('/', '-').replace(':', '_')
+        return os.path.join(self.root, exchange_name, safe_symbol, timeframe)
+
+    @contextmanager
+    def _locked(self, directory: str):
+        """Exclusive lock so concurrent workers never interleave appends to one series."""
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, ".lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _generation(self, directory: str) -> int:
+        """Generation of column files named by the manifest."""
+        try:
+            with open(os.path.join(directory, MANIFEST)) as f:
+                return int(json.load(f).get("generation", 0))
+        except (OSError, ValueError):
+            return 0
+
+    def _set_generation(self, directory: str, generation: int):
+        """Switch the series to another generation of column files in one atomic rename."""
+        path = os.path.join(directory, MANIFEST)
+        with open(f"{path}.tmp", "w") as f:
+            json.dump({"generation": generation}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(f"{path}.tmp", path)
+
+    def _column_path(self, directory: str, name: str, generation: int) -> str:
+        return os.path.join(directory, f"{name}.bin" if generation == 0 else f"{name}.{generation}.bin")
+
+    def _length(self, directory: str, generation: int) -> int:
+        """Number of complete rows; a torn append leaves some columns longer than others."""
+        lengths = []
+        for name, dtype in COLUMNS.items():
+            path = self._column_path(directory, name, generation)
+            lengths.append(os.path.getsize(path) // dtype.itemsize if os.path.exists(path) else 0)
+        return min(lengths)
+
+    def _backfill_floor(self, directory: str) -> Optional[int]:
+        """Earliest `since` already requested; the exchange had nothing older than the first stored candle."""
+        try:
+            with open(os.path.join(directory, "meta.json")) as f:
+                return json.load(f).get("backfilled_from")
+        except (OSError, ValueError):
+            return None
+
+    def _set_backfill_floor(self, directory: str, since: int):
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, "meta.json"), "w") as f:
+            json.dump({"backfilled_from": since}, f)
+
+    def read(self, exchange_name: str, symbol: str, timeframe: str,
+             since: Optional[int] = None, until: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """
+        Memory-map a series, optionally restricted to [since, until) in milliseconds.
+
+        Returns:
+            dict: Column name -> read-only array view (empty arrays if nothing is stored)
+        """
+        directory = self.series_dir(exchange_name, symbol, timeframe)
+        generation = self._generation(directory)
+        length = self._length(directory, generation) if os.path.isdir(directory) else 0
+        if length == 0:
+            return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+        columns = {
+            name: np.memmap(self._column_path(directory, name, generation), dtype=dtype, mode='r', shape=(length,))
+            for name, dtype in COLUMNS.items()
+        }
+        timestamps = columns['timestamp']
+        start = int(np.searchsorted(timestamps, since, side='left')) if since is not None else 0
+        end = int(np.searchsorted(timestamps, until, side='left')) if until is not None else length
+        return {name: column[start:end] for name, column in columns.items()}
+
+    def last_timestamp(self, exchange_name: str, symbol: str, timeframe: str) -> Optional[int]:
+        """Open time of the newest stored candle, or None for an empty series."""
+        timestamps = self.read(exchange_name, symbol, timeframe)['timestamp']
+        return int(timestamps[-1]) if len(timestamps) else None
+
+    def first_timestamp(self, exchange_name: str, symbol: str, timeframe: str) -> Optional[int]:
+        """Open time of the oldest stored candle, or None for an empty series."""
+        timestamps = self.read(exchange_name, symbol, timeframe)['timestamp']
+        return int(timestamps[0]) if len(timestamps) else None
+
+    def append(self, exchange_name: str, symbol: str, timeframe: str, rows: List[List[float]]) -> int:
+        """
+        Append ccxt OHLCV rows that are newer than the last stored candle.
+
+        Returns:
+            int: Number of candles appended
+        """
+        if not rows:
+            return 0
+        directory = self.series_dir(exchange_name, symbol, timeframe)
+        with self._locked(directory):
+            data = np.asarray(rows, dtype=np.float64)[:, :6]
+            data = data[np.unique(data[:, 0], return_index=True)[1]]
+            generation = self._generation(directory)
+            length = self._length(directory, generation)
+            if length:
+                last = self.read(exchange_name, symbol, timeframe)['timestamp'][-1]
+                data = data[data[:, 0] > last]
+            if not len(data):
+                return 0
+            for i, (name, dtype) in enumerate(COLUMNS.items()):
+                path = self._column_path(directory, name, generation)
+                with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+                    # Drop any bytes past the last complete row left by an interrupted append
+                    f.truncate(length * dtype.itemsize)
+                    f.seek(0, os.SEEK_END)
+                    f.write(data[:, i].astype(dtype).tobytes())
+            return len(data)
+
+    def _prepend(self, exchange_name: str, symbol: str, timeframe: str, rows: List[List[float]]) -> int:
+        """Rewrite a series with older candles in front; only needed when history is extended backwards."""
+        if not rows:
+            return 0
+        directory = self.series_dir(exchange_name, symbol, timeframe)
+        with self._locked(directory):
+            existing = {name: np.array(column) for name, column in self.read(exchange_name, symbol, timeframe).items()}
+            data = np.asarray(rows, dtype=np.float64)[:, :6]
+            if len(existing['timestamp']):
+                data = data[data[:, 0] < existing['timestamp'][0]]
+            data = data[np.unique(data[:, 0], return_index=True)[1]]
+            if not len(data):
+                return 0
+            # Readers keep using the current generation until the manifest names the complete new one
+            generation = self._generation(directory)
+            for i, (name, dtype) in enumerate(COLUMNS.items()):
+                with open(self._column_path(directory, name, generation + 1), "wb") as f:
+                    f.write(data[:, i].astype(dtype).tobytes())
+                    f.write(existing[name].astype(dtype).tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+            self._set_generation(directory, generation + 1)
+            for name in COLUMNS:
+                try:
+                    os.remove(self._column_path(directory, name, generation))
+                except OSError:
+                    pass
+            return len(data)
+
+    def update(self, exchange_name: str, symbol: str, timeframe: str, since: int, exchange=None) -> int:
+        """
+        Bring a series up to date from `since` (milliseconds), downloading only what is missing.
+
+        Candles older than the oldest stored one are back-filled; afterwards only candles after the
+        newest stored one are requested. The still-forming current candle is never stored.
+
+        Returns:
+            int: Number of candles added
+        """
+        # Paging through history can take many requests; let interactive lookups go first
+        exchange = exchange or ScheduledClient(exchange_name, BACKGROUND, BACKGROUND_TIMEOUT)
+        step = timeframe_ms(timeframe)
+        closed_before = (int(time.time() * 1000) // step) * step
+        added = 0
+
+        directory = self.series_dir(exchange_name, symbol, timeframe)
+        first = self.first_timestamp(exchange_name, symbol, timeframe)
+        floor = self._backfill_floor(directory)
+        if first is not None and since < first and (floor is None or since < floor):
+            older = download_ohlcv(exchange, symbol, timeframe, since, first)
+            added += self._prepend(exchange_name, symbol, timeframe, older)
+            self._set_backfill_floor(directory, since)
+
+        last = self.last_timestamp(exchange_name, symbol, timeframe)
+        start = since if last is None else last + step
+        if start < closed_before:
+            newer = download_ohlcv(exchange, symbol, timeframe, start, closed_before)
+            added += self.append(exchange_name, symbol, timeframe, newer)
+            if last is None:
+                self._set_backfill_floor(directory, since)
+        return added
+
+    def load_frame(self, exchange_name: str, symbol: str, timeframe: str = '1h', days: float = 90,
+                   refresh: bool = True) -> pd.DataFrame:
+        """
+        Update a series and return the last `days` days as a DataFrame.
+
+        Returns:
+            pd.DataFrame: Columns open, high, low, close, volume indexed by UTC timestamp
+        """
+        since = int((time.time() - days * 86400) * 1000)
+        if refresh:
+            self.update(exchange_name, symbol, timeframe, since)
+        columns = self.read(exchange_name, symbol, timeframe, since=since)
+        frame = pd.DataFrame({name: columns[name] for name in ('open', 'high', 'low', 'close', 'volume')}, copy=False)
+        frame.index = pd.to_datetime(columns['timestamp'], unit='ms', utc=True)
+        return frame
+
+def download_ohlcv(exchange, symbol: str, timeframe: str, since: int, until: int) -> List[List[float]]:
+    """Page through fetch_ohlcv from `since` up to (not including) `until`, both in milliseconds."""
+    step = timeframe_ms(timeframe)
+    rows = []
+    while since < until:
+        batch = exchange.fetch_ohlcv(symbol, timeframe, since)
+        if not batch:
+            break
+        rows.extend(row for row in batch if row[0] < until)
+        next_since = batch[-1][0] + step
+        if next_since <= since:
+            break
+        since = next_since
+    return rows
+
+# Shared store used by the agent's tools
+candle_store = CandleStore()
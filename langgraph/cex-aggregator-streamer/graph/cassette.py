@@ -0,0 +1,231 @@
+import asyncio
+import gzip
+import inspect
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+import ccxt
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Cassette file to record exchange calls to or replay them from (JSON lines, optionally gzipped)
+CASSETTE_PATH = os.getenv("CEX_CASSETTE")
+
+# 'record' captures live responses, 'replay' serves them without touching the network
+CASSETTE_MODE = os.getenv("CEX_CASSETTE_MODE", "replay")
+
+# Replay latency: 'recorded' sleeps as long as the original call took, a number sleeps that many seconds
+CASSETTE_LATENCY = os.getenv("CEX_CASSETTE_LATENCY", "recorded")
+
+# Client methods that reach the exchange; everything else (has, rateLimit, markets, parsers) is the real client's
+NETWORK_PREFIXES = ('fetch', 'load_markets', 'create_', 'cancel_', 'edit_', 'watch')
+
+# One interaction per line:
+# {"exchange": "binance", "method": "fetch_ticker", "args": ["BTC/USDT"], "kwargs": {},
+#  "latency": 0.142, "result": {...}}  or  ..., "error": {"type": "BadSymbol", "message": "..."}}
+
+class CassetteMiss(ccxt.NetworkError):
+    """A replayed call that was never recorded; treated like an unreachable exchange."""
+
+def _open(path: str, mode: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+def _key(exchange_name: str, method: str, args: Tuple, kwargs: Dict) -> str:
+    return json.dumps([exchange_name, method, list(args), kwargs], sort_keys=True, default=str)
+
+class Cassette:
+    """
+    Recorded exchange interactions, looked up by exchange, method and arguments.
+
+    When a key was recorded several times the recordings are replayed in turn. A call whose
+    exact arguments were never recorded falls back to recordings of the same method and first
+    argument (usually the symbol), so time-dependent arguments such as an OHLCV `since` still
+    replay.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._exact: Dict[str, List[dict]] = defaultdict(list)
+        self._loose: Dict[str, List[dict]] = defaultdict(list)
+        self._cursors: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        self._out = None
+        if os.path.exists(path):
+            with _open(path, "r") as f:
+                for line in f:
+                    if line.strip():
+                        self._index(json.loads(line))
+
+    def _index(self, entry: dict):
+        args = entry.get('args') or []
+        self._exact[_key(entry['exchange'], entry['method'], tuple(args), entry.get('kwargs') or {})].append(entry)
+        self._loose[_key(entry['exchange'], entry['method'], tuple(args[:1]), {})].append(entry)
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._exact.values())
+
+    def lookup(self, exchange_name: str, method: str, args: Tuple, kwargs: Dict) -> Optional[dict]:
+        """Next recording for a call, or None if nothing matches."""
+        with self._lock:
+            for key, table in ((_key(exchange_name, method, args, kwargs), self._exact),
+                               (_key(exchange_name, method, tuple(args[:1]), {}), self._loose)):
+                entries = table.get(key)
+                if entries:
+                    position = self._cursors[key]
+                    self._cursors[key] = position + 1
+                    return entries[position % len(entries)]
+        return None
+
+    def add(self, exchange_name: str, method: str, args: Tuple, kwargs: Dict, latency: float,
+            result: Any = None, error: Optional[BaseException] = None):
+        """Append one interaction to the cassette file."""
+        entry = {'exchange': exchange_name, 'method': method, 'args': list(args), 'kwargs': kwargs, 'latency': round(latency, 4)}
+        if error is not None:
+            entry['error'] = {'type': type(error).__name__, 'message': str(error)}
+        else:
+            entry['result'] = result
+        line = json.dumps(entry, default=str)
+        with self._lock:
+            # Round-trip through JSON so replayed and recorded entries look the same
+            self._index(json.loads(line))
+            if self._out is None:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                self._out = _open(self.path, "a")
+            self._out.write(line + "\n")
+            self._out.flush()
+
+    def close(self):
+        with self._lock:
+            if self._out is not None:
+                self._out.close()
+                self._out = None
+
+class CassetteClient:
+    """
+    Wraps a sync or async ccxt client, recording its network calls or replaying them.
+
+    Attribute access other than network calls goes to the wrapped client, so market metadata,
+    `has`, `rateLimit` and the parsing helpers behave exactly as on a live client.
+    """
+
+    def __init__(self, client, exchange_name: str, cassette: Cassette, mode: str = "replay",
+                 latency: Optional[float] = None):
+        """
+        Args:
+            client: The ccxt client to wrap; in replay mode it never sends a request
+            exchange_name (str): Exchange the recordings belong to
+            cassette (Cassette): Where interactions are recorded or replayed from
+            mode (str): 'record' or 'replay'
+            latency (float): Replay delay per call in seconds; None uses each call's recorded latency
+        """
+        self.__dict__.update(_client=client, _exchange_name=exchange_name, _cassette=cassette, _mode=mode, _latency=latency)
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self._client, name)
+        if not callable(attribute) or not name.startswith(NETWORK_PREFIXES):
+            return attribute
+        asynchronous = inspect.iscoroutinefunction(attribute)
+        if self._mode == "record":
+            # WebSocket streams are captured by graph.recorded_feed instead
+            return attribute if name.startswith('watch') else self._recorder(name, attribute, asynchronous)
+        return self._replayer(name, asynchronous)
+
+    def __setattr__(self, name: str, value):
+        setattr(self._client, name, value)
+
+    def _recorder(self, name: str, method, asynchronous: bool):
+        exchange_name = self._exchange_name
+
+        def _add(args, kwargs, started, result=None, error=None):
+            if name == 'load_markets':
+                # Stored as the market list fetch_markets returns, which is what load_markets replays from
+                args, kwargs, result = (), {}, list(result.values()) if result is not None else None
+            self._cassette.add(exchange_name, 'fetch_markets' if name == 'load_markets' else name, args, kwargs,
+                               time.perf_counter() - started, result, error)
+
+        if asynchronous:
+            async def record_async(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    result = await method(*args, **kwargs)
+                except ccxt.BaseError as e:
+                    _add(args, kwargs, started, error=e)
+                    raise
+                _add(args, kwargs, started, result)
+                return result
+            return record_async
+
+        def record(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = method(*args, **kwargs)
+            except ccxt.BaseError as e:
+                _add(args, kwargs, started, error=e)
+                raise
+            _add(args, kwargs, started, result)
+            return result
+        return record
+
+    def _replay_entry(self, name: str, args: Tuple, kwargs: Dict) -> Tuple[float, dict]:
+        if name.startswith('watch'):
+            # Streams are replayed by RecordedFeed; report them unsupported so callers fall back to REST
+            raise ccxt.NotSupported(f"{self._exchange_name} {name} is not available while replaying a cassette")
+        lookup_name = 'fetch_markets' if name == 'load_markets' else name
+        entry = self._cassette.lookup(self._exchange_name, lookup_name, args, kwargs)
+        if entry is None:
+            raise CassetteMiss(f"No recorded {self._exchange_name}.{lookup_name} call for {list(args)}")
+        delay = self._latency if self._latency is not None else entry.get('latency', 0.0)
+        return delay, entry
+
+    def _resolve(self, name: str, entry: dict) -> Any:
+        error = entry.get('error')
+        if error:
+            raise getattr(ccxt, error['type'], ccxt.ExchangeError)(error['message'])
+        result = entry.get('result')
+        if name == 'load_markets':
+            self._client.set_markets(result)
+            return self._client.markets
+        return result
+
+    def _replayer(self, name: str, asynchronous: bool):
+        if asynchronous:
+            async def replay_async(*args, **kwargs):
+                delay, entry = self._replay_entry(name, args, kwargs)
+                await asyncio.sleep(delay)
+                return self._resolve(name, entry)
+            return replay_async
+
+        def replay(*args, **kwargs):
+            delay, entry = self._replay_entry(name, args, kwargs)
+            time.sleep(delay)
+            return self._resolve(name, entry)
+        return replay
+
+# Cassette shared by every client created while CEX_CASSETTE is set
+_cassette: Optional[Cassette] = None
+_cassette_lock = threading.Lock()
+
+def active_cassette() -> Optional[Cassette]:
+    """The cassette configured through CEX_CASSETTE, loaded on first use."""
+    global _cassette
+    if not CASSETTE_PATH:
+        return None
+    with _cassette_lock:
+        if _cassette is None:
+            _cassette = Cassette(CASSETTE_PATH)
+    return _cassette
+
+def wrap_client(client, exchange_name: str):
+    """Wrap a new ccxt client for recording or replay when a cassette is configured; otherwise return it as is."""
+    cassette = active_cassette()
+    if cassette is None:
+        return client
+    latency = None if CASSETTE_LATENCY == "recorded" else float(CASSETTE_LATENCY)
+    return CassetteClient(client, exchange_name, cassette, CASSETTE_MODE, latency)
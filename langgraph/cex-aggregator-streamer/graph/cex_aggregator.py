@@ -1,14 +1,32 @@
 from typing import Literal, Optional, TypedDict, Annotated, List
 from langchain_openai import ChatOpenAI
 from langchain_core.tools import tool
+from langchain_core.runnables import RunnableConfig
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import END, START, StateGraph, MessagesState
 from langgraph.prebuilt import ToolNode
 from langgraph.graph.message import add_messages
 from dotenv import load_dotenv
 import os
+import time
 import ccxt
-from graph.exchange_factory import exchanges, exchange_base_currencies, pairs_black_list
+import numpy as np
+from graph.exchange_factory import exchanges, pairs_black_list
+from graph.market_cache import get_markets as get_cached_markets
+from graph.symbol_index import UnknownSymbol, symbol_index
+from graph.async_exchanges import DeadlineExceeded, fetch_tickers_bulk, fetch_tickers_concurrently, request as request_exchange
+from graph.exchange_health import CircuitOpen
+from graph.market_data import stream_ticker, stream_order_book, keep_streaming
+from graph.consolidated_book import get_consolidated_book
+from graph.order_router import execute_paper, route_order
+from graph.arbitrage import scan as scan_for_arbitrage
+from graph.fee_model import effective_buy_prices, effective_sell_prices, fee_model
+from graph.triangular import triangular_scanner
+from graph.tick_recorder import TickStore, spread_history
+from graph.indicators import indicator_tracker
+from graph.portfolio import aggregate as aggregate_portfolio, fetch_balances
+from graph.watchlist import CONDITIONS as ALERT_CONDITIONS, describe as describe_alert, watchlist
+from graph.backtest import SORT_STATS, STRATEGIES as BACKTEST_STRATEGIES, fetch_ohlcv, format_stats, run_strategy, sweep, timeframe_seconds
 
 #https://github.com/langchain-ai/langgraph/blob/main/docs/docs/concepts/low_level.md
 # Load environment variables
@@ -24,7 +42,11 @@ def get_exchange_list() -> str:
     """Get a list of all available exchanges."""
     try:
         exchange_list = list(exchanges.keys())
-        return f"Available exchanges: {', '.join(exchange_list)}"
+        response = f"Available exchanges: {', '.join(exchange_list)}"
+        loaded = exchanges.loaded()
+        if loaded:
+            response += f"\nConnected so far: {', '.join(loaded)}"
+        return response
     except Exception as e:
         return f"Error getting exchange list: {str(e)}"
 
@@ -41,10 +63,11 @@ def get_balance(exchange_name: str) -> str:
         if exchange_name not in exchanges:
             return f"Exchange '{exchange_name}' not found. Available exchanges: {', '.join(exchanges.keys())}"
         
-        exchange = exchanges[exchange_name]
-        
-        # Fetch balance
-        balance = exchange.fetch_balance()
+        # Fetch balance (reused for a short time so follow-up questions cost no API calls)
+        balances, errors = fetch_balances([exchange_name])
+        if exchange_name in errors:
+            raise errors[exchange_name]
+        balance = balances[exchange_name]
         
         # Format the response
         response = f"Balance on {exchange_name.capitalize()}:\n"
@@ -97,17 +120,14 @@ def get_ticker(exchange_name: str, symbol: str) -> str:
         if exchange_name not in exchanges:
             return f"Exchange '{exchange_name}' not found. Available exchanges: {', '.join(exchanges.keys())}"
         
-        exchange = exchanges[exchange_name]
-        
-        # Format symbol if needed
-        if '/' not in symbol:
-            # Try to guess the format based on common patterns
-            if exchange_name in exchange_base_currencies:
-                base_currency = exchange_base_currencies[exchange_name]
-                symbol = f"{symbol}/{base_currency}"
+        # Resolve the symbol locally; unlisted symbols never reach the exchange
+        symbol = symbol_index.resolve(exchange_name, symbol)
         
-        # Fetch ticker
-        ticker = exchange.fetch_ticker(symbol)
+        # Read the streamed ticker, falling back to REST
+        ticker = stream_ticker(exchange_name, symbol)
+        if ticker is None:
+            ticker = request_exchange(exchange_name, 'fetch_ticker', (symbol,))
+            keep_streaming(exchange_name, symbol, "ticker")
         
         # Format the response
         response = f"Ticker for {symbol} on {exchange_name.capitalize()}:\n"
@@ -121,6 +141,8 @@ def get_ticker(exchange_name: str, symbol: str) -> str:
         response += f"- Last Updated: {ticker['datetime']}\n"
         
         return response
+    except UnknownSymbol as e:
+        return str(e)
     except ccxt.BadSymbol:
         return f"Invalid symbol '{symbol}' for {exchange_name}. Please check the symbol format."
     except ccxt.NetworkError:
@@ -128,6 +150,67 @@ def get_ticker(exchange_name: str, symbol: str) -> str:
     except Exception as e:
         return f"Error getting ticker for {symbol} on {exchange_name}: {str(e)}"
 
+@tool
+def get_tickers(exchange_name: str, symbols: List[str]) -> str:
+    """
+    Get current prices for several trading pairs on one exchange in a single call, as one table.
+    Use this instead of calling get_ticker once per symbol.
+    
+    Parameters:
+        exchange_name: The name of the exchange (e.g., 'binance', 'kraken')
+        symbols: Trading pairs or bare coins (e.g., ['BTC/USDT', 'ETH', 'SOL'])
+    """
+    try:
+        exchange_name = exchange_name.lower()
+        if exchange_name not in exchanges:
+            return f"Exchange '{exchange_name}' not found. Available exchanges: {', '.join(exchanges.keys())}"
+        if not symbols:
+            return "No symbols specified."
+        
+        # Resolve every symbol locally; unlisted ones are reported without a request
+        resolved, not_listed = {}, []
+        for requested in symbols:
+            try:
+                resolved.setdefault(symbol_index.resolve(exchange_name, requested), requested)
+            except UnknownSymbol:
+                not_listed.append(requested)
+        
+        # Use streamed tickers where available and fetch the rest in as few requests as possible
+        tickers = {}
+        for symbol in resolved:
+            ticker = stream_ticker(exchange_name, symbol)
+            if ticker is not None:
+                tickers[symbol] = ticker
+        missing = [symbol for symbol in resolved if symbol not in tickers]
+        if missing:
+            fetched = fetch_tickers_bulk({exchange_name: missing})[exchange_name]
+            for symbol, ticker in fetched.items():
+                if not isinstance(ticker, BaseException):
+                    keep_streaming(exchange_name, symbol, "ticker")
+            tickers.update(fetched)
+        
+        failed = [symbol for symbol in resolved if isinstance(tickers.get(symbol), BaseException) or tickers.get(symbol) is None]
+        rows = [symbol for symbol in resolved if symbol not in failed]
+        if not rows:
+            response = f"Could not get prices on {exchange_name.capitalize()} for: {', '.join(symbols)}\n"
+        else:
+            response = f"Tickers on {exchange_name.capitalize()}:\n\n"
+            response += "| Symbol | Last | Bid | Ask | 24h Change | 24h Volume |\n"
+            response += "|--------|------|-----|-----|------------|------------|\n"
+            for symbol in rows:
+                ticker = tickers[symbol]
+                change = f"{ticker['percentage']:+.2f}%" if ticker.get('percentage') is not None else "n/a"
+                response += (f"| {symbol} | {ticker.get('last')} | {ticker.get('bid')} | {ticker.get('ask')} | "
+                             f"{change} | {ticker.get('baseVolume')} |\n")
+            if failed:
+                response += f"\nCould not get prices for: {', '.join(failed)}\n"
+        if not_listed:
+            response += f"Not listed on {exchange_name.capitalize()}: {', '.join(not_listed)}\n"
+        
+        return response
+    except Exception as e:
+        return f"Error getting tickers on {exchange_name}: {str(e)}"
+
 @tool
 def get_markets(exchange_name: str, limit: int = 10) -> str:
     """
@@ -144,8 +227,8 @@ def get_markets(exchange_name: str, limit: int = 10) -> str:
         
         exchange = exchanges[exchange_name]
         
-        # Fetch markets
-        markets = exchange.fetch_markets()
+        # Fetch markets (served from the market cache when warm)
+        markets = get_cached_markets(exchange_name, exchange)
         
         # Format the response
         response = f"Available Markets on {exchange_name.capitalize()}:\n"
@@ -184,17 +267,14 @@ def get_order_book(exchange_name: str, symbol: str, limit: int = 5) -> str:
         if exchange_name not in exchanges:
             return f"Exchange '{exchange_name}' not found. Available exchanges: {', '.join(exchanges.keys())}"
         
-        exchange = exchanges[exchange_name]
-        
-        # Format symbol if needed
-        if '/' not in symbol:
-            # Try to guess the format based on common patterns
-            if exchange_name in exchange_base_currencies:
-                base_currency = exchange_base_currencies[exchange_name]
-                symbol = f"{symbol}/{base_currency}"
+        # Resolve the symbol locally; unlisted symbols never reach the exchange
+        symbol = symbol_index.resolve(exchange_name, symbol)
         
-        # Fetch order book
-        order_book = exchange.fetch_order_book(symbol, limit)
+        # Read the streamed order book, falling back to REST
+        order_book = stream_order_book(exchange_name, symbol, limit)
+        if order_book is None:
+            order_book = request_exchange(exchange_name, 'fetch_order_book', (symbol, limit))
+            keep_streaming(exchange_name, symbol, "book")
         
         # Format the response
         response = f"Order Book for {symbol} on {exchange_name.capitalize()}:\n"
@@ -210,6 +290,8 @@ def get_order_book(exchange_name: str, symbol: str, limit: int = 5) -> str:
             response += f"- Price: {price}, Amount: {amount}\n"
         
         return response
+    except UnknownSymbol as e:
+        return str(e)
     except ccxt.BadSymbol:
         return f"Invalid symbol '{symbol}' for {exchange_name}. Please check the symbol format."
     except ccxt.NetworkError:
@@ -218,13 +300,14 @@ def get_order_book(exchange_name: str, symbol: str, limit: int = 5) -> str:
         return f"Error getting order book for {symbol} on {exchange_name}: {str(e)}"
 
 @tool
-def compare_prices(symbol: str, exchange_list: Optional[List[str]] = None) -> str:
+def compare_prices(symbol: str, exchange_list: Optional[List[str]] = None, amount: Optional[float] = None) -> str:
     """
-    Compare prices for a specific symbol across multiple exchanges.
+    Compare prices for a specific symbol across multiple exchanges, including all-in prices after fees.
     
     Parameters:
         symbol: The trading pair symbol (e.g., 'BTC/USDT')
         exchange_list: Optional list of exchanges to compare (if None, uses all available exchanges)
+        amount: Optional amount of the base currency to buy; spreads each exchange's withdrawal fee over it
     """
     try:
         if exchange_list is None:
@@ -236,34 +319,48 @@ def compare_prices(symbol: str, exchange_list: Optional[List[str]] = None) -> st
         if not exchange_list:
             return "No valid exchanges specified for comparison."
         
-        results = []
+        # Resolve the symbol on each exchange; exchanges that do not list it are skipped without a request
+        symbols, not_listed = symbol_index.resolve_many(exchange_list, symbol)
+        if not symbols:
+            if len(not_listed) == 1:
+                return str(next(iter(not_listed.values())))
+            return f"{symbol} is not listed on any of the specified exchanges."
         
-        # Format symbol if needed for each exchange
+        # Use streamed tickers where available and fetch the rest all at once
+        tickers = {}
+        for exchange_name, current_symbol in symbols.items():
+            ticker = stream_ticker(exchange_name, current_symbol)
+            if ticker is not None:
+                tickers[exchange_name] = ticker
+        missing = {name: sym for name, sym in symbols.items() if name not in tickers}
+        if missing:
+            fetched = fetch_tickers_concurrently(missing)
+            for exchange_name, ticker in fetched.items():
+                if not isinstance(ticker, BaseException):
+                    keep_streaming(exchange_name, missing[exchange_name], "ticker")
+            tickers.update(fetched)
+        
+        results = []
+        late, failing = [], []
         for exchange_name in exchange_list:
-            try:
-                exchange = exchanges[exchange_name]
-                
-                # Adjust symbol format if needed
-                current_symbol = symbol
-                if '/' not in current_symbol and exchange_name in exchange_base_currencies:
-                    base_currency = exchange_base_currencies[exchange_name]
-                    current_symbol = f"{current_symbol}/{base_currency}"
-                
-                # Fetch ticker
-                ticker = exchange.fetch_ticker(current_symbol)
-                
-                # Store result
-                results.append({
-                    'exchange': exchange_name,
-                    'symbol': current_symbol,
-                    'price': ticker['last'],
-                    'bid': ticker['bid'],
-                    'ask': ticker['ask'],
-                    'spread': ticker['ask'] - ticker['bid'] if ticker['ask'] and ticker['bid'] else None
-                })
-            except Exception as e:
-                # Skip exchanges with errors
+            ticker = tickers.get(exchange_name)
+            if isinstance(ticker, BaseException) or ticker is None:
+                # Skip exchanges with errors or timeouts, noting the ones that were slow or are known to be failing
+                if isinstance(ticker, DeadlineExceeded):
+                    late.append(exchange_name)
+                elif isinstance(ticker, CircuitOpen):
+                    failing.append(exchange_name)
                 continue
+            
+            # Store result
+            results.append({
+                'exchange': exchange_name,
+                'symbol': symbols[exchange_name],
+                'price': ticker['last'],
+                'bid': ticker['bid'],
+                'ask': ticker['ask'],
+                'spread': ticker['ask'] - ticker['bid'] if ticker['ask'] and ticker['bid'] else None
+            })
         
         if not results:
             return f"Could not find price information for {symbol} on any of the specified exchanges."
@@ -271,16 +368,34 @@ def compare_prices(symbol: str, exchange_list: Optional[List[str]] = None) -> st
         # Sort by price
         results.sort(key=lambda x: x['price'] if x['price'] else float('inf'))
         
+        # All-in prices: taker fee on both sides, plus the withdrawal fee of the bought coins when an amount is given
+        schedules = fee_model.get_many([result['exchange'] for result in results])
+        base = symbol.split('/')[0].upper()
+        asks = np.array([result['ask'] or np.nan for result in results], dtype=float)
+        bids = np.array([result['bid'] or np.nan for result in results], dtype=float)
+        taker = np.array([schedules[result['exchange']].taker_fee(result['symbol']) for result in results])
+        withdraw = np.array([schedules[result['exchange']].withdraw_fee(base) for result in results], dtype=float)
+        effective_buy = effective_buy_prices(asks, taker, withdraw, amount)
+        effective_sell = effective_sell_prices(bids, taker)
+        
         # Format the response
         response = f"Price Comparison for {symbol}:\n"
         
-        for result in results:
+        for i, result in enumerate(results):
             response += f"\n{result['exchange'].capitalize()} ({result['symbol']}):\n"
             response += f"- Last Price: {result['price']}\n"
             response += f"- Bid: {result['bid']}\n"
             response += f"- Ask: {result['ask']}\n"
             if result['spread'] is not None:
                 response += f"- Spread: {result['spread']}\n"
+            if np.isfinite(effective_buy[i]):
+                response += f"- Effective Buy (incl. {taker[i] * 100:.3g}% fee"
+                response += f", {withdraw[i]:g} {base} withdrawal): " if amount and not np.isnan(withdraw[i]) else "): "
+                response += f"{effective_buy[i]:.8g}\n"
+            elif amount and np.isfinite(asks[i]):
+                response += f"- Effective Buy: withdrawal fee of {withdraw[i]:g} {base} exceeds the amount\n"
+            if np.isfinite(effective_sell[i]):
+                response += f"- Effective Sell (after fee): {effective_sell[i]:.8g}\n"
         
         # Add price difference information
         if len(results) > 1:
@@ -292,19 +407,681 @@ def compare_prices(symbol: str, exchange_list: Optional[List[str]] = None) -> st
                 response += f"\nPrice Difference: {diff} ({diff_percent:.2f}%)\n"
                 response += f"Lowest: {lowest['exchange'].capitalize()} at {lowest['price']}\n"
                 response += f"Highest: {highest['exchange'].capitalize()} at {highest['price']}\n"
+        if np.isfinite(effective_buy).any():
+            cheapest = int(np.nanargmin(np.where(np.isfinite(effective_buy), effective_buy, np.nan)))
+            response += f"Cheapest to buy (all-in): {results[cheapest]['exchange'].capitalize()} at {effective_buy[cheapest]:.8g}\n"
+        if np.isfinite(effective_sell).any():
+            best = int(np.nanargmax(effective_sell))
+            response += f"Best to sell (all-in): {results[best]['exchange'].capitalize()} at {effective_sell[best]:.8g}\n"
+        if not_listed:
+            response += f"\nNot listed on: {', '.join(name.capitalize() for name in not_listed)}\n"
+        if late:
+            response += f"No answer in time from: {', '.join(name.capitalize() for name in late)}\n"
+        if failing:
+            response += f"Skipped (failing recently): {', '.join(name.capitalize() for name in failing)}\n"
         
         return response
     except Exception as e:
         return f"Error comparing prices: {str(e)}"
 
+@tool
+def get_vwap_quote(symbol: str, amount: float, side: str = "buy", exchange_list: Optional[List[str]] = None) -> str:
+    """
+    Quote the volume-weighted average price to buy or sell an amount across the merged order books of all exchanges.
+    
+    Parameters:
+        symbol: The trading pair symbol (e.g., 'BTC/USDT' or 'BTC')
+        amount: Amount of the base currency to trade (e.g., 2.5 for 2.5 BTC)
+        side: 'buy' or 'sell' (default: 'buy')
+        exchange_list: Optional list of exchanges to include (if None, uses all available exchanges)
+    """
+    try:
+        side = side.lower()
+        if side not in ('buy', 'sell'):
+            return "Side must be 'buy' or 'sell'."
+        if amount <= 0:
+            return "Amount must be greater than zero."
+        
+        if exchange_list is None:
+            exchange_list = list(exchanges.keys())
+        else:
+            exchange_list = [e.lower() for e in exchange_list if e.lower() in exchanges]
+        
+        if not exchange_list:
+            return "No valid exchanges specified."
+        
+        venue_symbols, not_listed = symbol_index.resolve_many(exchange_list, symbol)
+        if not venue_symbols:
+            return f"{symbol} is not listed on any of the specified exchanges."
+        book, errors = get_consolidated_book(symbol, venue_symbols)
+        quote = book.fill(side, amount)
+        
+        if not quote['filled']:
+            return f"No order book liquidity found for {symbol} on the specified exchanges."
+        
+        base = symbol.split('/')[0]
+        response = f"VWAP to {side} {amount} {base} across {len(book.venues)} exchange(s):\n"
+        response += f"- VWAP: {quote['vwap']:.8g}\n"
+        response += f"- Best Price: {quote['best_price']:.8g}\n"
+        response += f"- Worst Price Reached: {quote['worst_price']:.8g}\n"
+        response += f"- Slippage vs Best: {quote['slippage'] * 100:.3f}%\n"
+        response += f"- Total {'Cost' if side == 'buy' else 'Proceeds'}: {quote['cost']:.8g}\n"
+        if quote['unfilled'] > 0:
+            response += f"- Unfilled: {quote['unfilled']:.8g} {base} (not enough depth in the fetched books)\n"
+        
+        response += "\nFill Split:\n"
+        for venue, fill in sorted(quote['per_venue'].items(), key=lambda item: -item[1]['amount']):
+            share = fill['amount'] / quote['filled'] * 100
+            response += f"- {venue.capitalize()} ({book.venue_symbols[venue]}): {fill['amount']:.8g} {base} ({share:.1f}%) at avg {fill['vwap']:.8g}\n"
+        
+        if errors:
+            response += f"\nSkipped (no order book): {', '.join(name.capitalize() for name in errors)}\n"
+        if not_listed:
+            response += f"Not listed on: {', '.join(name.capitalize() for name in not_listed)}\n"
+        response += "\nNote: USD, USDT and USDC quoted books are merged as equivalent.\n"
+        
+        return response
+    except Exception as e:
+        return f"Error computing VWAP for {symbol}: {str(e)}"
+
+@tool
+def plan_order(symbol: str, amount: float, side: str = "buy", exchange_list: Optional[List[str]] = None,
+               use_account_balances: bool = False, paper_execute: bool = False) -> str:
+    """
+    Plan the cheapest way to buy or sell an amount by splitting it across exchanges, using their merged order
+    books, taker fees and available balances. Runs against simulated paper exchanges; no real orders are placed.
+    
+    Parameters:
+        symbol: The trading pair symbol (e.g., 'BTC/USDT' or 'BTC')
+        amount: Amount of the base currency to trade (e.g., 2.5 for 2.5 BTC)
+        side: 'buy' or 'sell' (default: 'buy')
+        exchange_list: Optional list of exchanges to route over (if None, uses all available exchanges)
+        use_account_balances: Cap each exchange by the account's real balance instead of the paper balance (default: False)
+        paper_execute: Fill the plan on the paper exchanges and update their balances (default: False)
+    """
+    try:
+        side = side.lower()
+        if side not in ('buy', 'sell'):
+            return "Side must be 'buy' or 'sell'."
+        if amount <= 0:
+            return "Amount must be greater than zero."
+        
+        if exchange_list is None:
+            exchange_list = list(exchanges.keys())
+        else:
+            exchange_list = [e.lower() for e in exchange_list if e.lower() in exchanges]
+        
+        if not exchange_list:
+            return "No valid exchanges specified."
+        
+        venue_symbols, not_listed = symbol_index.resolve_many(exchange_list, symbol)
+        if not venue_symbols:
+            return f"{symbol} is not listed on any of the specified exchanges."
+        route, book, errors = route_order(symbol, side, amount, venue_symbols, use_account_balances)
+        
+        base = symbol.split('/')[0].upper()
+        if not route.filled:
+            response = f"Could not route any of the {amount} {base} to {side}: no usable liquidity or balance.\n"
+        else:
+            response = f"Routing plan to {side} {amount} {base} ({'account' if use_account_balances else 'paper'} balances):\n"
+            response += f"- Average Price (incl. fees): {route.average_price:.8g}\n"
+            response += f"- Total {'Cost' if side == 'buy' else 'Proceeds'}: {route.total:.8g} (fees {route.fees:.8g})\n"
+            if route.single_venue:
+                venue, price = route.single_venue
+                saving = (price - route.average_price if side == 'buy' else route.average_price - price) * route.filled
+                response += f"- Best Single Exchange: {venue.capitalize()} at {price:.8g}; splitting saves {saving:.8g}\n"
+            if route.unfilled > 0:
+                response += f"- Unfilled: {route.unfilled:.8g} {base} (not enough depth or balance)\n"
+            
+            response += "\nChild Orders:\n"
+            for venue, child in sorted(route.per_venue.items(), key=lambda item: -item[1]['amount']):
+                response += (f"- {venue.capitalize()}: {side} {child['amount']:.8g} {child['symbol']} at avg {child['vwap']:.8g}, "
+                             f"worst {child['worst_price']:.8g}, fee {child['fee_rate'] * 100:.3g}%\n")
+        
+        if paper_execute and route.filled:
+            response += "\nPaper Fills:\n"
+            for venue, order in execute_paper(route, book).items():
+                if isinstance(order, Exception):
+                    response += f"- {venue.capitalize()}: rejected ({str(order)})\n"
+                else:
+                    response += f"- {venue.capitalize()}: filled {order['filled']:.8g} at avg {order['average']:.8g} (order {order['id']})\n"
+        
+        if route.excluded:
+            response += "\nLeft out: " + "; ".join(f"{venue.capitalize()} ({reason})" for venue, reason in route.excluded.items()) + "\n"
+        if errors:
+            response += f"Skipped (no order book or balance): {', '.join(name.capitalize() for name in errors)}\n"
+        if not_listed:
+            response += f"Not listed on: {', '.join(name.capitalize() for name in not_listed)}\n"
+        
+        return response
+    except Exception as e:
+        return f"Error planning order for {symbol}: {str(e)}"
+
+@tool
+def scan_arbitrage(symbol: Optional[str] = None, exchange_list: Optional[List[str]] = None, min_profit_pct: float = 0.0, limit: int = 10) -> str:
+    """
+    Scan all trading pairs listed on two or more exchanges for cross-exchange arbitrage, net of taker fees.
+    
+    Parameters:
+        symbol: Optional trading pair to restrict the scan to (e.g., 'BTC/USDC'); USD, USDT and USDC quotes are treated as equivalent
+        exchange_list: Optional list of exchanges to scan (if None, uses all available exchanges)
+        min_profit_pct: Minimum net profit in percent to report (default: 0.0)
+        limit: Maximum number of opportunities to return (default: 10)
+    """
+    try:
+        if exchange_list is None:
+            exchange_list = list(exchanges.keys())
+        else:
+            exchange_list = [e.lower() for e in exchange_list if e.lower() in exchanges]
+        
+        if len(exchange_list) < 2:
+            return "At least two valid exchanges are needed to scan for arbitrage."
+        
+        result = scan_for_arbitrage(
+            exchange_list,
+            symbols=[symbol] if symbol else None,
+            min_return=min_profit_pct / 100,
+            limit=limit
+        )
+        
+        if not result['exchanges']:
+            return "Could not fetch tickers from any of the specified exchanges."
+        
+        response = f"Arbitrage scan over {result['symbols_scanned']} pair(s) on {', '.join(e.capitalize() for e in result['exchanges'])}:\n"
+        
+        def _format(opportunity):
+            return (
+                f"\n{opportunity['symbol']}: buy on {opportunity['buy_exchange'].capitalize()} ({opportunity['buy_symbol']}) "
+                f"at {opportunity['buy_price']}, sell on {opportunity['sell_exchange'].capitalize()} ({opportunity['sell_symbol']}) "
+                f"at {opportunity['sell_price']}\n"
+                f"- Gross: {opportunity['gross_return'] * 100:.3f}%, Net of taker fees: {opportunity['net_return'] * 100:.3f}%\n"
+                + (f"- Withdrawal fee on {opportunity['buy_exchange'].capitalize()}: {opportunity['withdraw_fee']:g} "
+                   f"{opportunity['symbol'].split('/')[0]}\n" if opportunity['withdraw_fee'] is not None else "")
+            )
+        
+        if result['opportunities']:
+            for opportunity in result['opportunities']:
+                response += _format(opportunity)
+        else:
+            response += f"\nNo opportunities above {min_profit_pct}% net of fees.\n"
+            if result['closest']:
+                response += "\nClosest pairs:\n"
+                for opportunity in result['closest']:
+                    response += _format(opportunity)
+        
+        if result['skipped']:
+            response += "\nSkipped: " + ', '.join(f"{name.capitalize()} ({reason})" for name, reason in result['skipped'].items()) + "\n"
+        
+        return response
+    except Exception as e:
+        return f"Error scanning for arbitrage: {str(e)}"
+
+@tool
+def scan_triangular_arbitrage(exchange_name: str, min_profit_pct: float = 0.0, max_legs: int = 3, limit: int = 5) -> str:
+    """
+    Find trade cycles within one exchange (e.g., USDT -> BTC -> ETH -> USDT) that end with more than they started, net of taker fees.
+    
+    Parameters:
+        exchange_name: The name of the exchange to scan (e.g., 'binance', 'kraken')
+        min_profit_pct: Minimum net profit in percent to report (default: 0.0)
+        max_legs: Longest cycle to report; 3 for triangular arbitrage (default: 3)
+        limit: Maximum number of cycles to return (default: 5)
+    """
+    try:
+        exchange_name = exchange_name.lower()
+        if exchange_name not in exchanges:
+            return f"Exchange '{exchange_name}' not found. Available exchanges: {', '.join(exchanges.keys())}"
+        if not exchanges[exchange_name].has.get('fetchTickers'):
+            return f"{exchange_name.capitalize()} does not offer bulk tickers, which the cycle scan needs."
+        
+        result = triangular_scanner.scan(exchange_name, min_profit_pct / 100, max(max_legs, 2), limit)
+        
+        response = (f"Cycle scan on {exchange_name.capitalize()} over {result['priced']} priced market(s) "
+                    f"and {result['currencies']} currencies:\n")
+        if not result['cycles']:
+            response += f"\nNo cycles of up to {max_legs} trades above {min_profit_pct}% net of taker fees.\n"
+            return response
+        
+        for cycle in result['cycles']:
+            response += f"\n{' -> '.join(cycle['currencies'])}: {cycle['net_return'] * 100:.3f}% net of taker fees\n"
+            for leg in cycle['legs']:
+                response += f"- {leg['side'].capitalize()} {leg['symbol']} at {leg['price']:.8g} ({leg['from']} -> {leg['to']})\n"
+        response += "\nNote: top-of-book prices only; thin books may not fill the full size at these prices.\n"
+        
+        return response
+    except ccxt.NetworkError as e:
+        return f"Network error fetching tickers from {exchange_name}: {str(e)}"
+    except Exception as e:
+        return f"Error scanning {exchange_name} for cycles: {str(e)}"
+
+@tool
+def run_backtest(
+    exchange_name: str,
+    symbol: str,
+    strategy: str,
+    timeframe: str = "1h",
+    days: int = 90,
+    lookback_days: float = 7,
+    threshold_pct: float = 1.5,
+    ma_period: int = 50,
+    rsi_period: int = 14,
+    overbought: float = 75,
+    oversold: float = 25,
+    fee_pct: float = 0.1
+) -> str:
+    """
+    Backtest a trading strategy on historical candles from an exchange.
+    
+    Parameters:
+        exchange_name: The name of the exchange (e.g., 'binance', 'bybit')
+        symbol: The trading pair symbol (e.g., 'BTC/USDT')
+        strategy: 'mean_reversion' (buy when price is threshold_pct below its lookback_days average, exit at the average) or 'trend_following' (long while price is above its ma_period moving average and RSI is between oversold and overbought)
+        timeframe: Candle timeframe (e.g., '1h', '4h', '1d'); use '1d' for day-based moving averages like a 50-day MA
+        days: How many days of history to test (default: 90)
+        lookback_days: Mean reversion averaging window in days (default: 7)
+        threshold_pct: Mean reversion entry threshold in percent (default: 1.5)
+        ma_period: Trend following moving average length in candles (default: 50)
+        rsi_period: Trend following RSI length in candles (default: 14)
+        overbought: RSI level treated as overbought (default: 75)
+        oversold: RSI level treated as oversold (default: 25)
+        fee_pct: Trading fee per trade in percent (default: 0.1)
+    """
+    try:
+        exchange_name = exchange_name.lower()
+        if exchange_name not in exchanges:
+            return f"Exchange '{exchange_name}' not found. Available exchanges: {', '.join(exchanges.keys())}"
+        strategy = strategy.lower().replace(' ', '_').replace('-', '_')
+        if strategy not in BACKTEST_STRATEGIES:
+            return f"Unknown strategy '{strategy}'. Available strategies: {', '.join(BACKTEST_STRATEGIES)}"
+        
+        symbol = symbol_index.resolve(exchange_name, symbol)
+        candle_seconds = timeframe_seconds(timeframe)
+        if strategy == 'trend_following':
+            # Make sure the indicators have enough history to warm up
+            days = max(days, int(ma_period * candle_seconds / 86400 * 2) + 1)
+        candles = fetch_ohlcv(exchange_name, symbol, timeframe, days)
+        if len(candles) < 2:
+            return f"Not enough historical data for {symbol} on {exchange_name}."
+        
+        if strategy == 'mean_reversion':
+            params = {'lookback': max(2, round(lookback_days * 86400 / candle_seconds)), 'threshold': threshold_pct / 100}
+            description = f"Mean reversion ({lookback_days}-day average, {threshold_pct}% threshold)"
+        else:
+            params = {'ma_period': ma_period, 'rsi_period': rsi_period, 'overbought': overbought, 'oversold': oversold}
+            description = f"Trend following (MA({ma_period}), RSI({rsi_period}) {oversold}/{overbought})"
+        
+        stats = run_strategy(candles['close'], strategy, params, fee_pct / 100, 365 * 86400 / candle_seconds)
+        
+        response = f"Backtest: {description} on {symbol} ({exchange_name.capitalize()}, {timeframe} candles)\n"
+        response += f"Period: {candles.index[0]:%Y-%m-%d} to {candles.index[-1]:%Y-%m-%d} ({len(candles)} candles)\n\n"
+        response += format_stats(stats)
+        return response
+    except UnknownSymbol as e:
+        return str(e)
+    except ccxt.BadSymbol:
+        return f"Invalid symbol '{symbol}' for {exchange_name}. Please check the symbol format."
+    except ccxt.NetworkError:
+        return f"Network error when connecting to {exchange_name}. Please try again later."
+    except Exception as e:
+        return f"Error running backtest for {symbol} on {exchange_name}: {str(e)}"
+
+@tool
+def optimize_backtest(
+    exchange_name: str,
+    symbol: str,
+    strategy: str,
+    timeframe: str = "1h",
+    days: int = 90,
+    lookback_days: Optional[List[float]] = None,
+    threshold_pct: Optional[List[float]] = None,
+    ma_period: Optional[List[int]] = None,
+    rsi_period: Optional[List[int]] = None,
+    overbought: Optional[List[float]] = None,
+    oversold: Optional[List[float]] = None,
+    fee_pct: float = 0.1,
+    sort_by: str = "sharpe",
+    top: int = 5
+) -> str:
+    """
+    Sweep a grid of strategy parameters in parallel and report the best combinations.
+    
+    Parameters:
+        exchange_name: The name of the exchange (e.g., 'binance', 'bybit')
+        symbol: The trading pair symbol (e.g., 'BTC/USDT')
+        strategy: 'mean_reversion' or 'trend_following'
+        timeframe: Candle timeframe (e.g., '1h', '4h', '1d')
+        days: How many days of history to test (default: 90)
+        lookback_days: Mean reversion averaging windows in days to try (default: [1, 3, 7, 14])
+        threshold_pct: Mean reversion entry thresholds in percent to try (default: [0.5, 1, 1.5, 2, 3])
+        ma_period: Trend following moving average lengths to try (default: [20, 50, 100])
+        rsi_period: Trend following RSI lengths to try (default: [14])
+        overbought: RSI overbought levels to try (default: [70, 75, 80])
+        oversold: RSI oversold levels to try (default: [20, 25, 30])
+        fee_pct: Trading fee per trade in percent (default: 0.1)
+        sort_by: Stat to rank by: 'sharpe', 'total_return', 'annual_return', 'max_drawdown' or 'win_rate' (default: 'sharpe')
+        top: Number of best combinations to show (default: 5)
+    """
+    try:
+        exchange_name = exchange_name.lower()
+        if exchange_name not in exchanges:
+            return f"Exchange '{exchange_name}' not found. Available exchanges: {', '.join(exchanges.keys())}"
+        strategy = strategy.lower().replace(' ', '_').replace('-', '_')
+        if strategy not in BACKTEST_STRATEGIES:
+            return f"Unknown strategy '{strategy}'. Available strategies: {', '.join(BACKTEST_STRATEGIES)}"
+        if sort_by not in SORT_STATS:
+            return f"Cannot rank by '{sort_by}'. Available stats: {', '.join(SORT_STATS)}"
+        
+        symbol = symbol_index.resolve(exchange_name, symbol)
+        candle_seconds = timeframe_seconds(timeframe)
+        if strategy == 'mean_reversion':
+            grid = {
+                'lookback': sorted({max(2, round(d * 86400 / candle_seconds)) for d in (lookback_days or [1, 3, 7, 14])}),
+                'threshold': [t / 100 for t in (threshold_pct or [0.5, 1, 1.5, 2, 3])]
+            }
+        else:
+            grid = {
+                'ma_period': ma_period or [20, 50, 100],
+                'rsi_period': rsi_period or [14],
+                'overbought': overbought or [70, 75, 80],
+                'oversold': oversold or [20, 25, 30]
+            }
+            days = max(days, int(max(grid['ma_period']) * candle_seconds / 86400 * 2) + 1)
+        
+        candles = fetch_ohlcv(exchange_name, symbol, timeframe, days)
+        if len(candles) < 2:
+            return f"Not enough historical data for {symbol} on {exchange_name}."
+        
+        results = sweep(candles['close'], strategy, grid, fee_pct / 100, 365 * 86400 / candle_seconds, sort_by)
+        
+        response = f"Parameter sweep: {strategy.replace('_', ' ')} on {symbol} ({exchange_name.capitalize()}, {timeframe} candles)\n"
+        response += f"Tested {len(results)} combinations over {len(candles)} candles, ranked by {sort_by}.\n"
+        for rank, result in enumerate(results[:top], 1):
+            params = dict(result['params'])
+            if 'lookback' in params:
+                params['lookback_days'] = round(params.pop('lookback') * candle_seconds / 86400, 2)
+            if 'threshold' in params:
+                params['threshold_pct'] = round(params.pop('threshold') * 100, 4)
+            response += f"\n{rank}. {', '.join(f'{k}={v}' for k, v in params.items())}\n"
+            response += format_stats(result['stats'])
+        return response
+    except UnknownSymbol as e:
+        return str(e)
+    except ccxt.BadSymbol:
+        return f"Invalid symbol '{symbol}' for {exchange_name}. Please check the symbol format."
+    except ccxt.NetworkError:
+        return f"Network error when connecting to {exchange_name}. Please try again later."
+    except Exception as e:
+        return f"Error optimizing backtest for {symbol} on {exchange_name}: {str(e)}"
+
+@tool
+def get_indicators(
+    exchange_name: str,
+    symbol: str,
+    timeframe: str = "1d",
+    ma_period: int = 50,
+    ema_period: int = 20,
+    rsi_period: int = 14,
+    bb_period: int = 20,
+    atr_period: int = 14
+) -> str:
+    """
+    Get current technical indicators for a trading pair from its latest closed candles.
+    
+    Parameters:
+        exchange_name: The name of the exchange (e.g., 'binance', 'bybit')
+        symbol: The trading pair symbol (e.g., 'BTC/USDT')
+        timeframe: Candle timeframe (e.g., '1h', '4h', '1d'); use '1d' for day-based indicators like a 50-day MA
+        ma_period: Simple moving average length in candles (default: 50)
+        ema_period: Exponential moving average length in candles (default: 20)
+        rsi_period: RSI length in candles (default: 14)
+        bb_period: Bollinger band length in candles, at 2 standard deviations (default: 20)
+        atr_period: Average true range length in candles (default: 14)
+    """
+    try:
+        exchange_name = exchange_name.lower()
+        if exchange_name not in exchanges:
+            return f"Exchange '{exchange_name}' not found. Available exchanges: {', '.join(exchanges.keys())}"
+        
+        symbol = symbol_index.resolve(exchange_name, symbol)
+        candle_seconds = timeframe_seconds(timeframe)
+        indicators = indicator_tracker.get(exchange_name, symbol, timeframe, ma_period=ma_period, ema_period=ema_period,
+                                           rsi_period=rsi_period, bb_period=bb_period, atr_period=atr_period)
+        values = indicators.values()
+        if values['close'] is None:
+            return f"No historical data for {symbol} on {exchange_name}."
+        
+        def _fmt(value):
+            return f"{value:.8g}" if value is not None else f"n/a (only {values['candles']} candles of history)"
+        
+        closed_at = time.strftime('%Y-%m-%d %H:%M UTC', time.gmtime(values['timestamp'] / 1000 + candle_seconds))
+        response = f"Indicators for {symbol} on {exchange_name.capitalize()} ({timeframe} candles, last closed {closed_at}):\n"
+        response += f"- Close: {values['close']:.8g}\n"
+        response += f"- SMA({ma_period}): {_fmt(values['sma'])}"
+        if values['sma'] is not None:
+            response += f" (price {'above' if values['close'] > values['sma'] else 'below'})"
+        response += f"\n- EMA({ema_period}): {_fmt(values['ema'])}\n"
+        response += f"- RSI({rsi_period}): {_fmt(values['rsi'])}\n"
+        if values['bollinger'] is not None:
+            lower, middle, upper = values['bollinger']
+            response += f"- Bollinger({bb_period}, 2): lower {lower:.8g}, middle {middle:.8g}, upper {upper:.8g}\n"
+        else:
+            response += f"- Bollinger({bb_period}, 2): {_fmt(None)}\n"
+        response += f"- ATR({atr_period}): {_fmt(values['atr'])}\n"
+        
+        return response
+    except UnknownSymbol as e:
+        return str(e)
+    except ccxt.BadSymbol:
+        return f"Invalid symbol '{symbol}' for {exchange_name}. Please check the symbol format."
+    except ccxt.NetworkError:
+        return f"Network error when connecting to {exchange_name}. Please try again later."
+    except Exception as e:
+        return f"Error computing indicators for {symbol} on {exchange_name}: {str(e)}"
+
+@tool
+def get_portfolio(quote_currency: str = "USD", exchange_list: Optional[List[str]] = None) -> str:
+    """
+    Get total holdings across all exchanges with API keys, valued in one currency, as a single consolidated table.
+    
+    Parameters:
+        quote_currency: Currency to value holdings in (e.g., 'USD', 'USDT', 'EUR', 'BTC'; default: 'USD')
+        exchange_list: Optional list of exchanges to include (if None, uses all available exchanges)
+    """
+    try:
+        if exchange_list is None:
+            exchange_list = list(exchanges.keys())
+        else:
+            exchange_list = [e.lower() for e in exchange_list if e.lower() in exchanges]
+        
+        if not exchange_list:
+            return "No valid exchanges specified."
+        
+        result = aggregate_portfolio(exchange_list, quote_currency)
+        quote = result['quote']
+        
+        if not result['holdings']:
+            response = "No assets found on the specified exchanges.\n"
+        else:
+            response = f"Portfolio across {len(exchange_list) - len(result['skipped']) - len(result['errors'])} exchange(s), valued in {quote}:\n\n"
+            response += f"| Asset | Amount | Price ({quote}) | Value ({quote}) | Share | Exchanges |\n"
+            response += "|-------|--------|-------|-------|-------|-----------|\n"
+            for row in result['holdings']:
+                price = f"{row['price']:.8g}" if row['price'] is not None else "n/a"
+                value = f"{row['value']:,.2f}" if row['value'] is not None else "n/a"
+                share = f"{row['value'] / result['total_value'] * 100:.1f}%" if row['value'] is not None and result['total_value'] else "n/a"
+                venues = ', '.join(f"{name.capitalize()} {amount:.8g}" for name, amount in row['exchanges'].items())
+                response += f"| {row['currency']} | {row['amount']:.8g} | {price} | {value} | {share} | {venues} |\n"
+            response += f"\nTotal Value: {result['total_value']:,.2f} {quote}\n"
+            if result['unpriced']:
+                response += f"No price found for: {', '.join(result['unpriced'])} (excluded from the total)\n"
+            if not result['quote_priced']:
+                response += f"Could not price {quote}; try USD, USDT or a major coin.\n"
+        
+        if result['errors']:
+            response += f"\nCould not fetch balances from: {', '.join(name.capitalize() for name in result['errors'])}\n"
+        if result['skipped']:
+            response += f"Skipped (no API keys configured): {', '.join(name.capitalize() for name in result['skipped'])}\n"
+        if quote in ('USD', 'USDT', 'USDC'):
+            response += "Note: USD, USDT and USDC are valued 1:1.\n"
+        
+        return response
+    except Exception as e:
+        return f"Error aggregating portfolio: {str(e)}"
+
+@tool
+def search_symbols(query: str, exchange_name: Optional[str] = None, limit: int = 20) -> str:
+    """
+    Find trading pairs whose symbol starts with a query, and which exchanges list them. Use this when unsure of a symbol.
+    
+    Parameters:
+        query: Symbol prefix to search for (e.g., 'SOL', 'ETH/B', 'XBT')
+        exchange_name: Optional exchange to restrict the search to (if None, searches all available exchanges)
+        limit: Maximum number of symbols to return (default: 20)
+    """
+    try:
+        exchange_list = list(exchanges.keys())
+        if exchange_name:
+            exchange_name = exchange_name.lower()
+            if exchange_name not in exchanges:
+                return f"Exchange '{exchange_name}' not found. Available exchanges: {', '.join(exchanges.keys())}"
+            exchange_list = [exchange_name]
+        
+        matches = symbol_index.search(query, exchange_list, limit)
+        if not matches:
+            return f"No symbols starting with '{query}' found."
+        
+        response = f"Symbols starting with '{query}':\n"
+        for symbol, listed in matches:
+            response += f"- {symbol}: {', '.join(name.capitalize() for name in listed)}\n"
+        if len(matches) == limit:
+            response += f"\nShowing the first {limit} matches; refine the query to narrow them down.\n"
+        
+        return response
+    except Exception as e:
+        return f"Error searching symbols: {str(e)}"
+
+@tool
+def set_price_alert(exchange_name: str, symbol: str, condition: str, value: float, repeat: bool = False,
+                    config: RunnableConfig = None) -> str:
+    """
+    Set a background price alert. Triggered alerts are delivered to this conversation through the /alerts/stream endpoint.
+    
+    Parameters:
+        exchange_name: Name of the exchange to watch (e.g., 'binance', 'kraken')
+        symbol: Trading pair to watch (e.g., 'BTC/USDT')
+        condition: 'above' or 'below' (last price vs value), 'change_pct' (move of value percent from now, negative for a fall)
+                   or 'spread_pct' (bid/ask spread at or above value percent)
+        value: Threshold for the condition
+        repeat: Fire every time the condition becomes true again, instead of once (default: False)
+    """
+    try:
+        exchange_name = exchange_name.lower()
+        if exchange_name not in exchanges:
+            return f"Exchange '{exchange_name}' not found. Available exchanges: {', '.join(exchanges.keys())}"
+        if condition not in ALERT_CONDITIONS:
+            return f"Unknown condition '{condition}'. Choose one of: " + "; ".join(f"{k} ({v})" for k, v in ALERT_CONDITIONS.items())
+        
+        symbol = symbol_index.resolve(exchange_name, symbol)
+        owner = ((config or {}).get("configurable") or {}).get("thread_id")
+        alert = watchlist.add(exchange_name, symbol, condition, value, owner=owner, repeat=repeat)
+        
+        response = f"Alert set: {describe_alert(alert)}"
+        response += " (repeating)\n" if repeat else "\n"
+        return response
+    except UnknownSymbol as e:
+        return str(e)
+    except ccxt.BadSymbol:
+        return f"Invalid symbol: {symbol}. Please check the symbol format."
+    except ccxt.NetworkError as e:
+        return f"Network error setting alert: {str(e)}"
+    except Exception as e:
+        return f"Error setting price alert: {str(e)}"
+
+@tool
+def list_price_alerts(config: RunnableConfig = None) -> str:
+    """
+    List the price alerts set in this conversation and whether they have triggered.
+    """
+    try:
+        owner = ((config or {}).get("configurable") or {}).get("thread_id")
+        alerts = watchlist.list(owner)
+        if not alerts:
+            return "No price alerts set."
+        
+        response = "Price alerts:\n"
+        for alert in alerts:
+            status = "active" if alert['active'] else "triggered"
+            if alert['active'] and alert['triggered_at']:
+                status = "active, triggered before"
+            response += f"- {describe_alert(alert)} ({status})\n"
+        return response
+    except Exception as e:
+        return f"Error listing price alerts: {str(e)}"
+
+@tool
+def get_spread_history(exchange_name: str, symbol: str, hours: float = 24, interval: str = "1h") -> str:
+    """
+    Show how the bid/ask spread of a trading pair has moved over time, from locally recorded tickers.
+    Only symbols configured for recording (CEX_RECORDER_SYMBOLS) have history.
+    
+    Parameters:
+        exchange_name: The name of the exchange (e.g., 'binance', 'kraken')
+        symbol: The trading pair symbol (e.g., 'BTC/USDT')
+        hours: How far back to look (default: 24)
+        interval: Aggregation interval, e.g. '5min', '15min', '1h', '1D' (default: '1h')
+    """
+    try:
+        exchange_name = exchange_name.lower()
+        if exchange_name not in exchanges:
+            return f"Exchange '{exchange_name}' not found. Available exchanges: {', '.join(exchanges.keys())}"
+        
+        symbol = symbol_index.resolve(exchange_name, symbol)
+        end = time.time()
+        stats = spread_history(exchange_name, symbol, end - hours * 3600, end, interval)
+        if stats.empty:
+            recorded = [f"{e}:{s}" for e, s, channel in TickStore().recorded_streams() if channel == "ticker"]
+            response = f"No recorded tickers for {symbol} on {exchange_name.capitalize()} in the last {hours:g} hours.\n"
+            if recorded:
+                response += f"Recorded symbols: {', '.join(recorded)}\n"
+            return response
+        
+        response = f"Spread history for {symbol} on {exchange_name.capitalize()} (last {hours:g} hours, per {interval}):\n\n"
+        response += "| Time (UTC) | Mid | Avg Spread | Min | Max | Samples |\n"
+        response += "|------------|-----|------------|-----|-----|---------|\n"
+        for ts, row in stats.iterrows():
+            response += (f"| {ts.strftime('%Y-%m-%d %H:%M')} | {row['mid']:.8g} | {row['spread_mean']:.4f}% | "
+                         f"{row['spread_min']:.4f}% | {row['spread_max']:.4f}% | {int(row['samples'])} |\n")
+        response += f"\nOverall average spread: {stats['spread_mean'].mean():.4f}%\n"
+        
+        return response
+    except UnknownSymbol as e:
+        return str(e)
+    except ValueError as e:
+        return f"Invalid interval '{interval}': {str(e)}"
+    except Exception as e:
+        return f"Error reading spread history for {symbol} on {exchange_name}: {str(e)}"
+
 # Initialize tools
 tools = [
     get_exchange_list,
     get_balance,
     get_ticker,
+    get_tickers,
     get_markets,
     get_order_book,
-    compare_prices
+    compare_prices,
+    get_vwap_quote,
+    plan_order,
+    scan_arbitrage,
+    scan_triangular_arbitrage,
+    run_backtest,
+    optimize_backtest,
+    get_indicators,
+    get_portfolio,
+    search_symbols,
+    set_price_alert,
+    list_price_alerts,
+    get_spread_history
 ]
 
 # Initialize the model with a specific prompt
@@ -315,9 +1092,22 @@ You have access to the following tools:
 1. get_exchange_list: List all available exchanges
 2. get_balance: Check account balance on a specific exchange
 3. get_ticker: Get current price and information for a trading pair
-4. get_markets: View available markets/trading pairs on an exchange
-5. get_order_book: View current buy and sell orders for a trading pair
-6. compare_prices: Compare prices for a trading pair across multiple exchanges
+4. get_tickers: Get prices for several trading pairs on one exchange in one call (use this for multi-symbol questions)
+5. get_markets: View available markets/trading pairs on an exchange
+6. get_order_book: View current buy and sell orders for a trading pair
+7. compare_prices: Compare prices for a trading pair across multiple exchanges
+8. get_vwap_quote: Quote the average price and per-exchange fill split to buy or sell a size across all exchanges' merged order books
+9. plan_order: Plan (and optionally paper-trade) the cheapest split of an order across exchanges, after fees and within balances
+10. scan_arbitrage: Scan all pairs (or one pair) across exchanges for arbitrage opportunities net of fees
+11. scan_triangular_arbitrage: Find profitable trade cycles (e.g., USDT -> BTC -> ETH -> USDT) within one exchange
+12. run_backtest: Backtest a mean reversion or trend following strategy on historical candles
+13. optimize_backtest: Sweep a grid of strategy parameters and report the best combinations
+14. get_indicators: Current SMA, EMA, RSI, Bollinger bands and ATR for a pair (use this for questions about the current trend or RSI)
+15. get_portfolio: Total holdings across all exchanges valued in one currency (use this for net worth questions instead of calling get_balance per exchange)
+16. search_symbols: Find trading pairs by symbol prefix and the exchanges listing them
+17. set_price_alert: Watch a pair in the background and notify the user when a price, move or spread condition is met
+18. list_price_alerts: List the price alerts set in this conversation
+19. get_spread_history: Recorded bid/ask spread statistics over time for a pair
 
 When helping users:
 1. Always confirm which exchange they want to use if not specified
@@ -0,0 +1,182 @@
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from dotenv import load_dotenv
+from graph.async_exchanges import FANOUT_DEADLINE, HEDGE_READS, fan_out
+from graph.market_data import BOOK_DEPTH, keep_streaming, stream_order_book
+
+# Load environment variables
+load_dotenv()
+
+# How long (seconds) a merged book is reused before venues are read again
+CONSOLIDATED_BOOK_TTL = float(os.getenv("CEX_CONSOLIDATED_BOOK_TTL", "2"))
+
+class ConsolidatedBook:
+    """
+    L2 order book merged across venues.
+
+    Each side is stored as three parallel arrays sorted best price first: prices and sizes
+    as float64 and the venue of every level as an int16 index into `venues`.
+    """
+
+    def __init__(self, symbol: str, venues: List[str], bids: Tuple[np.ndarray, np.ndarray, np.ndarray],
+                 asks: Tuple[np.ndarray, np.ndarray, np.ndarray], venue_symbols: Optional[Dict[str, str]] = None):
+        self.symbol = symbol
+        self.venues = venues
+        self.venue_symbols = venue_symbols or {venue: symbol for venue in venues}
+        self.bid_prices, self.bid_sizes, self.bid_venues = bids
+        self.ask_prices, self.ask_sizes, self.ask_venues = asks
+        self.built_at = time.time()
+
+    @classmethod
+    def from_books(cls, symbol: str, books: Dict[str, dict], venue_symbols: Optional[Dict[str, str]] = None) -> "ConsolidatedBook":
+        """
+        Merge per-venue ccxt order books.
+
+        Args:
+            symbol (str): The symbol the merged book represents
+            books (dict): Maps venue name to a ccxt order book ({'bids': [[price, size], ...], 'asks': ...})
+            venue_symbols (dict): Optional venue name to venue-specific symbol mapping
+
+        Returns:
+            ConsolidatedBook: The merged book
+        """
+        venues = list(books)
+
+        def _merge(side: str, descending: bool):
+            arrays = [_levels(books[venue].get(side) or []) for venue in venues]
+            lengths = [len(a) for a in arrays]
+            levels = np.concatenate(arrays) if arrays else np.empty((0, 2))
+            venue_ids = np.repeat(np.arange(len(venues), dtype=np.int16), lengths)
+            keys = -levels[:, 0] if descending else levels[:, 0]
+            order = np.argsort(keys, kind="stable")
+            return levels[order, 0].copy(), levels[order, 1].copy(), venue_ids[order]
+
+        return cls(symbol, venues, _merge("bids", True), _merge("asks", False), venue_symbols)
+
+    def best_bid(self) -> Optional[Tuple[float, str]]:
+        """Highest bid across venues as (price, venue), or None if there are no bids."""
+        if not len(self.bid_prices):
+            return None
+        return float(self.bid_prices[0]), self.venues[self.bid_venues[0]]
+
+    def best_ask(self) -> Optional[Tuple[float, str]]:
+        """Lowest ask across venues as (price, venue), or None if there are no asks."""
+        if not len(self.ask_prices):
+            return None
+        return float(self.ask_prices[0]), self.venues[self.ask_venues[0]]
+
+    def fill(self, side: str, amount: float) -> dict:
+        """
+        Simulate sweeping the merged book with a market order.
+
+        Args:
+            side (str): 'buy' walks the asks, 'sell' walks the bids
+            amount (float): Base currency amount to trade
+
+        Returns:
+            dict: filled, unfilled, vwap, best_price, worst_price, slippage (fraction of best price),
+                  and per_venue mapping venue -> {'amount', 'cost', 'vwap'}
+        """
+        if side == "buy":
+            prices, sizes, venue_ids = self.ask_prices, self.ask_sizes, self.ask_venues
+        elif side == "sell":
+            prices, sizes, venue_ids = self.bid_prices, self.bid_sizes, self.bid_venues
+        else:
+            raise ValueError(f"side must be 'buy' or 'sell', got '{side}'")
+
+        if amount <= 0 or not len(prices):
+            return {'filled': 0.0, 'unfilled': max(amount, 0.0), 'vwap': None, 'best_price': None,
+                    'worst_price': None, 'slippage': None, 'cost': 0.0, 'per_venue': {}}
+
+        # Amount taken at each level: everything up to the level where the cumulative size reaches the order
+        cumulative = np.cumsum(sizes)
+        last = min(int(np.searchsorted(cumulative, amount, side="left")), len(prices) - 1)
+        taken = sizes[:last + 1].copy()
+        taken[-1] -= max(cumulative[last] - amount, 0.0)
+        level_cost = taken * prices[:last + 1]
+
+        filled = float(taken.sum())
+        cost = float(level_cost.sum())
+        vwap = cost / filled if filled else None
+        best_price = float(prices[0])
+
+        venue_amounts = np.bincount(venue_ids[:last + 1], weights=taken, minlength=len(self.venues))
+        venue_costs = np.bincount(venue_ids[:last + 1], weights=level_cost, minlength=len(self.venues))
+        per_venue = {
+            self.venues[i]: {
+                'amount': float(venue_amounts[i]),
+                'cost': float(venue_costs[i]),
+                'vwap': float(venue_costs[i] / venue_amounts[i])
+            }
+            for i in np.flatnonzero(venue_amounts > 0)
+        }
+
+        return {
+            'filled': filled,
+            'unfilled': max(amount - filled, 0.0),
+            'vwap': vwap,
+            'best_price': best_price,
+            'worst_price': float(prices[last]),
+            'slippage': abs(vwap - best_price) / best_price if vwap else None,
+            'cost': cost,
+            'per_venue': per_venue
+        }
+
+def _levels(side_levels) -> np.ndarray:
+    """Convert ccxt levels ([price, size] or [price, size, count]) to an (n, 2) float array."""
+    if not len(side_levels):
+        return np.empty((0, 2))
+    return np.asarray([level[:2] for level in side_levels], dtype=np.float64).reshape(-1, 2)
+
+# Merged books keyed by (symbol, venues), with the venues that failed while building them
+_cache: Dict[Tuple[str, Tuple[str, ...]], Tuple[ConsolidatedBook, Dict[str, Exception]]] = {}
+_cache_lock = threading.Lock()
+
+def get_consolidated_book(symbol: str, venue_symbols: Dict[str, str], depth: int = BOOK_DEPTH,
+                          max_age: float = CONSOLIDATED_BOOK_TTL) -> Tuple[ConsolidatedBook, Dict[str, Exception]]:
+    """
+    Build (or reuse) a merged book for a symbol across venues.
+
+    Streamed books are used where available; the remaining venues are fetched over REST
+    concurrently.
+
+    Args:
+        symbol (str): The symbol as requested by the user
+        venue_symbols (dict): Maps venue name to the venue-specific symbol
+        depth (int): Levels to request per side from each venue
+        max_age (float): Reuse a cached merged book younger than this many seconds
+
+    Returns:
+        tuple: (ConsolidatedBook, dict of venue -> exception for venues that failed)
+    """
+    key = (symbol, tuple(sorted(venue_symbols.items())))
+    with _cache_lock:
+        cached = _cache.get(key)
+    if cached is not None and time.time() - cached[0].built_at <= max_age:
+        return cached[0], dict(cached[1])
+
+    books = {}
+    for venue, venue_symbol in venue_symbols.items():
+        book = stream_order_book(venue, venue_symbol, depth)
+        if book is not None:
+            books[venue] = book
+
+    errors = {}
+    missing = {venue: venue_symbol for venue, venue_symbol in venue_symbols.items() if venue not in books}
+    if missing:
+        fetched = fan_out({venue: ('fetch_order_book', (venue_symbol, depth)) for venue, venue_symbol in missing.items()},
+                          deadline=FANOUT_DEADLINE, hedge=HEDGE_READS)
+        for venue, book in fetched.items():
+            if isinstance(book, BaseException):
+                errors[venue] = book
+                continue
+            books[venue] = book
+            keep_streaming(venue, missing[venue], "book")
+
+    merged = ConsolidatedBook.from_books(symbol, books, {venue: venue_symbols[venue] for venue in books})
+    with _cache_lock:
+        _cache[key] = (merged, errors)
+    return merged, dict(errors)
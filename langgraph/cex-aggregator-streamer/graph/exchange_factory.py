@@ -1,41 +1,154 @@
 from dotenv import load_dotenv
+from collections.abc import Mapping
+from typing import List, Optional
 import os
+import threading
 import ccxt
+from graph.cassette import wrap_client
+from graph.market_cache import prime_from_cache, prime_markets
 # Load environment variables from .env file
 load_dotenv()
 
-# Initialize exchange clients using environment variables
-exchanges = {
-    'bitstamp': ccxt.bitstamp({
+# Credentials for each supported exchange, read from environment variables
+exchange_configs = {
+    'bitstamp': {
         'apiKey': os.getenv('BITSTAMP_API_KEY'),
         'secret': os.getenv('BITSTAMP_SECRET'),
         'uid': os.getenv('BITSTAMP_UID')
-    }),
-    'binance': ccxt.binance({
+    },
+    'binance': {
         'apiKey': os.getenv('BINANCE_API_KEY'),
         'secret': os.getenv('BINANCE_SECRET')
-    }),
-    'kraken': ccxt.kraken({
+    },
+    'kraken': {
         'apiKey': os.getenv('KRAKEN_API_KEY'),
         'secret': os.getenv('KRAKEN_SECRET')
-    }),
-    'poloniex': ccxt.poloniex({
+    },
+    'poloniex': {
         'apiKey': os.getenv('POLONIEX_API_KEY'),
         'secret': os.getenv('POLONIEX_SECRET')
-    }),
+    },
     # Bybit
-    'bybit': ccxt.bybit({
+    'bybit': {
         'apiKey': os.getenv('BYBIT_API_KEY'),
         'secret': os.getenv('BYBIT_SECRET')
-    }),
+    },
     # OKX
-    'okx': ccxt.okx({
+    'okx': {
         'apiKey': os.getenv('OKX_API_KEY'),
         'secret': os.getenv('OKX_SECRET'),
         'password': os.getenv('OKX_PASSWORD')
-    }),
+    },
 }
 
+class ExchangeRegistry(Mapping):
+    """
+    Read-only mapping of exchange name to ccxt client that constructs each client on first use.
+
+    A new client is warmed from the market cache (memory or disk, never the network) when the
+    cache has its exchange; `warm` also downloads on a miss. Iterating, len() and membership
+    tests only look at the configured names, so listing exchanges never instantiates a client.
+    """
+
+    def __init__(self, configs: dict):
+        self._configs = configs
+        self._clients = {}
+        self._warmed = set()
+        self._locks = {name: threading.Lock() for name in configs}
+
+    def __getitem__(self, exchange_name: str):
+        client = self._clients.get(exchange_name)
+        if client is not None:
+            return client
+        if exchange_name not in self._configs:
+            raise KeyError(exchange_name)
+        with self._locks[exchange_name]:
+            client = self._clients.get(exchange_name)
+            if client is None:
+                client = wrap_client(getattr(ccxt, exchange_name)(dict(self._configs[exchange_name])), exchange_name)
+                if prime_from_cache(exchange_name, client):
+                    self._warmed.add(exchange_name)
+                self._clients[exchange_name] = client
+        return client
+
+    def __iter__(self):
+        return iter(self._configs)
+
+    def __len__(self) -> int:
+        return len(self._configs)
+
+    def __contains__(self, exchange_name) -> bool:
+        return exchange_name in self._configs
+
+    def warm(self, exchange_name: str):
+        """Return the client for an exchange with its market metadata installed from the market cache."""
+        client = self[exchange_name]
+        prime_markets(exchange_name, client)
+        self._warmed.add(exchange_name)
+        return client
+
+    def prewarm(self, exchange_names: List[str], background: bool = True) -> Optional[threading.Thread]:
+        """
+        Construct and warm several clients, sync and async, ahead of the first request.
+
+        Args:
+            exchange_names (list): Names of the exchanges to warm; unknown names are ignored
+            background (bool): Warm on a daemon thread instead of blocking the caller
+
+        Returns:
+            threading.Thread: The warming thread if background is True, otherwise None
+        """
+        names = [name for name in exchange_names if name in self._configs]
+
+        def _warm_all():
+            # Imported here: graph.async_exchanges builds its clients with this module's factories
+            from graph.async_exchanges import warm_async_exchange
+            for name in names:
+                try:
+                    self.warm(name)
+                    # Most tools go through the async clients, which prime from the cache just filled
+                    warm_async_exchange(name)
+                except Exception as e:
+                    print(f"Error pre-warming {name}: {str(e)}")
+
+        if not background:
+            _warm_all()
+            return None
+        thread = threading.Thread(target=_warm_all, name="cex-prewarm", daemon=True)
+        thread.start()
+        return thread
+
+    def loaded(self) -> List[str]:
+        """Names of the exchanges whose clients have been constructed."""
+        return [name for name in self._configs if name in self._clients]
+
+    def warmed(self) -> List[str]:
+        """Names of the exchanges whose clients have market metadata installed."""
+        return [name for name in self._configs if name in self._warmed]
+
+# Exchange clients, constructed lazily from the credentials above
+exchanges = ExchangeRegistry(exchange_configs)
+
+# Comma-separated exchanges to construct and warm in the background at startup
+PREWARM_EXCHANGES = [name.strip().lower() for name in os.getenv("CEX_PREWARM_EXCHANGES", "").split(",") if name.strip()]
+
+def create_async_exchange(exchange_name: str):
+    """Create a ccxt async_support client for an exchange with the same credentials as the sync client."""
+    # Imported here so processes that never use the async path skip loading it
+    import ccxt.async_support as ccxt_async
+    return wrap_client(getattr(ccxt_async, exchange_name)(dict(exchange_configs[exchange_name])), exchange_name)
+
+def create_pro_exchange(exchange_name: str):
+    """Create a ccxt.pro client for an exchange, used for WebSocket market data feeds."""
+    import ccxt.pro as ccxt_pro
+    return wrap_client(getattr(ccxt_pro, exchange_name)(dict(exchange_configs[exchange_name])), exchange_name)
+
 exchange_base_currencies = {'kraken': 'USD', 'binance': 'USDT', 'bitstamp': 'USD', 'poloniex': 'USDT', 'bybit': 'USDT', 'okx': 'USDC'}
 
-pairs_black_list = {'okx': ['USDT/UDSC'], 'binance': ['USDT/UDSC']}
\ No newline at end of file
+pairs_black_list = {'okx': ['USDT/UDSC'], 'binance': ['USDT/UDSC']}
+
+def format_symbol(exchange_name: str, symbol: str) -> str:
+    """Append the exchange's default quote currency to a bare base symbol (e.g., 'BTC' -> 'BTC/USDT')."""
+    if '/' not in symbol and exchange_name in exchange_base_currencies:
+        return f"{symbol}/{exchange_base_currencies[exchange_name]}"
+    return symbol
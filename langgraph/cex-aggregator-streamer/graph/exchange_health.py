@@ -0,0 +1,191 @@
+import asyncio
+import bisect
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+import ccxt
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Consecutive failures (network errors, timeouts) after which an exchange's circuit opens
+CIRCUIT_FAILURES = int(os.getenv("CEX_CIRCUIT_FAILURES", "5"))
+
+# Error rate over the health window that also opens the circuit, once enough calls were made
+CIRCUIT_ERROR_RATE = float(os.getenv("CEX_CIRCUIT_ERROR_RATE", "0.5"))
+CIRCUIT_MIN_CALLS = 10
+
+# Seconds an open circuit rejects calls before a single probe call is let through
+CIRCUIT_COOLDOWN = float(os.getenv("CEX_CIRCUIT_COOLDOWN", "30"))
+
+# Seconds of history behind latency percentiles and error rates
+HEALTH_WINDOW = float(os.getenv("CEX_HEALTH_WINDOW", "60"))
+
+# Bounds on how long a read waits before a hedge request is sent (seconds)
+HEDGE_MIN_DELAY = float(os.getenv("CEX_HEDGE_MIN_DELAY", "0.25"))
+HEDGE_DEFAULT_DELAY = 1.0
+
+# Upper bounds (milliseconds) of the latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS_MS = [10, 25, 50, 100, 200, 350, 500, 750, 1000, 1500, 2500, 5000, 10000]
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+class CircuitOpen(ccxt.ExchangeNotAvailable):
+    """An exchange is skipped without a request because its recent calls kept failing."""
+
+class _Window:
+    """Latency histogram and outcome counts for one time slice."""
+
+    def __init__(self, started_at: float):
+        self.started_at = started_at
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.calls = 0
+        self.failures = 0
+
+class ExchangeHealth:
+    """
+    Latency and error tracking with a circuit breaker for one exchange.
+
+    Statistics cover the current and the previous window of HEALTH_WINDOW seconds, so they
+    follow the exchange's recent behaviour without storing individual samples.
+    """
+
+    def __init__(self, exchange_name: str):
+        self.exchange_name = exchange_name
+        now = time.monotonic()
+        self._current = _Window(now)
+        self._previous = _Window(now - HEALTH_WINDOW)
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.consecutive_failures = 0
+        self.last_error: Optional[str] = None
+        self.hedges = 0
+        self._probe_at: Optional[float] = None
+
+    def _rotate(self, now: float):
+        if now - self._current.started_at >= HEALTH_WINDOW:
+            stale = now - self._current.started_at >= 2 * HEALTH_WINDOW
+            self._previous = _Window(now - HEALTH_WINDOW) if stale else self._current
+            self._current = _Window(now)
+
+    def _windows(self) -> List[_Window]:
+        self._rotate(time.monotonic())
+        return [self._previous, self._current]
+
+    def allow(self) -> bool:
+        """Whether a call may be sent now. An open circuit lets one probe through after the cooldown."""
+        if self.state == CLOSED:
+            return True
+        now = time.monotonic()
+        if self.state == OPEN and now - self.opened_at >= CIRCUIT_COOLDOWN:
+            self.state = HALF_OPEN
+            self._probe_at = None
+        # A probe that never reported back (e.g. cancelled while queued) is replaced after a cooldown
+        if self.state == HALF_OPEN and (self._probe_at is None or now - self._probe_at >= CIRCUIT_COOLDOWN):
+            self._probe_at = now
+            return True
+        return False
+
+    def record(self, latency: float, error: Optional[BaseException] = None):
+        """Record one upstream call; `error` is set when the exchange failed to answer."""
+        now = time.monotonic()
+        self._rotate(now)
+        window = self._current
+        window.calls += 1
+        window.buckets[bisect.bisect_left(LATENCY_BUCKETS_MS, latency * 1000)] += 1
+        if error is None:
+            self.consecutive_failures = 0
+            self.state = CLOSED
+            return
+
+        window.failures += 1
+        self.consecutive_failures += 1
+        self.last_error = f"{type(error).__name__}: {error}" if str(error) else type(error).__name__
+        if self.state == HALF_OPEN or self.consecutive_failures >= CIRCUIT_FAILURES or self._failing():
+            self.state = OPEN
+            self.opened_at = now
+
+    def _failing(self) -> bool:
+        calls = self._previous.calls + self._current.calls
+        failures = self._previous.failures + self._current.failures
+        return calls >= CIRCUIT_MIN_CALLS and failures / calls >= CIRCUIT_ERROR_RATE
+
+    def latency_percentile(self, fraction: float) -> Optional[float]:
+        """Approximate latency percentile in seconds (the upper bound of its bucket), or None without samples."""
+        windows = self._windows()
+        counts = [sum(column) for column in zip(*(w.buckets for w in windows))]
+        total = sum(counts)
+        if not total:
+            return None
+        target, seen = fraction * total, 0
+        for position, count in enumerate(counts):
+            seen += count
+            if seen >= target:
+                break
+        bound = LATENCY_BUCKETS_MS[min(position, len(LATENCY_BUCKETS_MS) - 1)]
+        return bound / 1000
+
+    def hedge_delay(self) -> float:
+        """How long a read waits before a duplicate is sent: the exchange's recent p95 latency."""
+        p95 = self.latency_percentile(0.95)
+        return max(p95 if p95 is not None else HEDGE_DEFAULT_DELAY, HEDGE_MIN_DELAY)
+
+    def error_rate(self) -> float:
+        windows = self._windows()
+        calls = sum(w.calls for w in windows)
+        return sum(w.failures for w in windows) / calls if calls else 0.0
+
+    def stats(self) -> Dict[str, object]:
+        windows = self._windows()
+        p50, p95 = self.latency_percentile(0.5), self.latency_percentile(0.95)
+        return {
+            'state': self.state,
+            'calls': sum(w.calls for w in windows),
+            'error_rate': round(self.error_rate(), 3),
+            'p50_ms': p50 * 1000 if p50 is not None else None,
+            'p95_ms': p95 * 1000 if p95 is not None else None,
+            'consecutive_failures': self.consecutive_failures,
+            'hedges': self.hedges,
+            'last_error': self.last_error,
+        }
+
+def is_failure(error: BaseException) -> bool:
+    """Errors that say the exchange is unhealthy, as opposed to a bad request (unknown symbol, missing keys)."""
+    return isinstance(error, (ccxt.NetworkError, asyncio.TimeoutError)) and not isinstance(error, CircuitOpen)
+
+class HealthRegistry:
+    """Health of every exchange called through graph.async_exchanges."""
+
+    def __init__(self):
+        self._health: Dict[str, ExchangeHealth] = {}
+        self._lock = threading.Lock()
+
+    def get(self, exchange_name: str) -> ExchangeHealth:
+        health = self._health.get(exchange_name)
+        if health is None:
+            with self._lock:
+                health = self._health.setdefault(exchange_name, ExchangeHealth(exchange_name))
+        return health
+
+    def check(self, exchange_name: str):
+        """
+        Raises:
+            CircuitOpen: The exchange's circuit is open; no request should be sent
+        """
+        health = self.get(exchange_name)
+        if not health.allow():
+            retry_in = max(CIRCUIT_COOLDOWN - (time.monotonic() - health.opened_at), 0)
+            raise CircuitOpen(f"{exchange_name} is failing ({health.last_error}); "
+                              f"skipped without a request, retrying in {retry_in:.0f}s")
+
+    def record(self, exchange_name: str, latency: float, error: Optional[BaseException] = None):
+        self.get(exchange_name).record(latency, error if error is not None and is_failure(error) else None)
+
+    def stats(self) -> Dict[str, Dict[str, object]]:
+        """Per exchange: circuit state, recent call count, error rate and latency percentiles."""
+        return {name: health.stats() for name, health in list(self._health.items())}
+
+# Health shared by every async exchange call; only updated on the background event loop
+health = HealthRegistry()
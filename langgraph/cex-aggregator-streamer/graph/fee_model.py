@@ -0,0 +1,280 @@
+import gzip
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Set
+import numpy as np
+from dotenv import load_dotenv
+from graph.async_exchanges import fan_out_many
+from graph.exchange_factory import exchanges
+from graph.market_cache import CACHE_DIR, get_markets
+from graph.portfolio import has_credentials
+from graph.request_scheduler import BACKGROUND
+
+# Load environment variables
+load_dotenv()
+
+# Taker fee assumed when an exchange's markets do not report one
+DEFAULT_TAKER_FEE = float(os.getenv("CEX_DEFAULT_TAKER_FEE", "0.001"))
+
+# How long (seconds) a fee schedule is used before it is rebuilt; fees change rarely
+FEES_TTL = float(os.getenv("CEX_FEES_TTL", "86400"))
+
+# Seconds the account fee and withdrawal fee requests may take, queueing included
+FEES_TIMEOUT = 15
+
+def _withdraw_fee(entry: dict) -> Optional[float]:
+    """Withdrawal fee from a ccxt currency or deposit/withdraw fee entry; the cheapest network if several."""
+    withdraw = entry.get('withdraw')
+    fee = withdraw.get('fee') if isinstance(withdraw, dict) else entry.get('fee')
+    if isinstance(fee, (int, float)):
+        return float(fee)
+    fees = []
+    for network in (entry.get('networks') or {}).values():
+        network_withdraw = network.get('withdraw')
+        fee = network_withdraw.get('fee') if isinstance(network_withdraw, dict) else network.get('fee')
+        if isinstance(fee, (int, float)):
+            fees.append(float(fee))
+    return min(fees) if fees else None
+
+class FeeSchedule:
+    """
+    Trading and withdrawal fees of one exchange.
+
+    Taker and maker fees come from the account's fee tier when API keys are configured and the
+    exchange reports it, otherwise from market metadata. Withdrawal fees are in units of the
+    withdrawn currency and missing where the exchange does not publish them.
+    """
+
+    def __init__(self, exchange_name: str, fetched_at: float, default_taker: float, default_maker: float,
+                 taker: Dict[str, float], maker: Dict[str, float], withdraw: Dict[str, float], sources: Dict[str, str]):
+        self.exchange_name = exchange_name
+        self.fetched_at = fetched_at
+        self.default_taker = default_taker
+        self.default_maker = default_maker
+        self.taker = taker
+        self.maker = maker
+        self.withdraw = withdraw
+        self.sources = sources
+
+    def taker_fee(self, symbol: str) -> float:
+        return self.taker.get(symbol, self.default_taker)
+
+    def maker_fee(self, symbol: str) -> float:
+        return self.maker.get(symbol, self.default_maker)
+
+    def withdraw_fee(self, currency: str) -> Optional[float]:
+        return self.withdraw.get(currency)
+
+    def to_dict(self) -> dict:
+        return {
+            'exchange': self.exchange_name, 'fetched_at': self.fetched_at,
+            'default_taker': self.default_taker, 'default_maker': self.default_maker,
+            'taker': self.taker, 'maker': self.maker, 'withdraw': self.withdraw, 'sources': self.sources
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "FeeSchedule":
+        return cls(data['exchange'], data['fetched_at'], data['default_taker'], data['default_maker'],
+                   data['taker'], data['maker'], data['withdraw'], data.get('sources', {}))
+
+    @classmethod
+    def fallback(cls, exchange_name: str) -> "FeeSchedule":
+        """DEFAULT_TAKER_FEE everywhere, for exchanges whose market metadata cannot be loaded."""
+        return cls(exchange_name, time.time(), DEFAULT_TAKER_FEE, DEFAULT_TAKER_FEE, {}, {}, {},
+                   {'trading': 'default', 'withdraw': 'none'})
+
+    def copy(self) -> "FeeSchedule":
+        return FeeSchedule(self.exchange_name, self.fetched_at, self.default_taker, self.default_maker,
+                           dict(self.taker), dict(self.maker), dict(self.withdraw), dict(self.sources))
+
+    @classmethod
+    def from_markets(cls, exchange_name: str, markets: List[dict], client_fees: Optional[dict] = None) -> "FeeSchedule":
+        """Public schedule: per-market fees from market metadata, the exchange's base tier elsewhere."""
+        trading = (client_fees or {}).get('trading', {})
+        taker = {m['symbol']: float(m['taker']) for m in markets if m.get('symbol') and isinstance(m.get('taker'), (int, float))}
+        maker = {m['symbol']: float(m['maker']) for m in markets if m.get('symbol') and isinstance(m.get('maker'), (int, float))}
+        default_taker = trading.get('taker')
+        if not isinstance(default_taker, (int, float)):
+            default_taker = float(np.median(list(taker.values()))) if taker else DEFAULT_TAKER_FEE
+        default_maker = trading.get('maker')
+        if not isinstance(default_maker, (int, float)):
+            default_maker = float(np.median(list(maker.values()))) if maker else default_taker
+        return cls(exchange_name, time.time(), float(default_taker), float(default_maker), taker, maker, {},
+                   {'trading': 'markets', 'withdraw': 'none'})
+
+def snapshot_path(exchange_name: str) -> str:
+    """Path of the on-disk fee schedule for an exchange."""
+    return os.path.join(CACHE_DIR, "fees", f"{exchange_name}.json.gz")
+
+class FeeModel:
+    """
+    Fee schedules per exchange, cached in memory and on disk for FEES_TTL.
+
+    A schedule is built from the cached market metadata, so pricing a query never waits on a fee
+    request. The account trading fees and withdrawal fees (at most two background-priority
+    requests per exchange and day) are then merged in by a background refresh.
+    """
+
+    def __init__(self, ttl: float = FEES_TTL):
+        self.ttl = ttl
+        self._schedules: Dict[str, FeeSchedule] = {}
+        self._lock = threading.Lock()
+        self._refreshing: Set[str] = set()
+        self._refresher: Optional[threading.Thread] = None
+
+    def _fresh(self, schedule: Optional[FeeSchedule]) -> bool:
+        return schedule is not None and time.time() - schedule.fetched_at <= self.ttl
+
+    def _read_snapshot(self, exchange_name: str) -> Optional[FeeSchedule]:
+        try:
+            with gzip.open(snapshot_path(exchange_name), "rt", encoding="utf-8") as f:
+                return FeeSchedule.from_dict(json.load(f))
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write_snapshot(self, schedule: FeeSchedule):
+        path = snapshot_path(schedule.exchange_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file and rename so readers never see a partial snapshot
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                json.dump(schedule.to_dict(), f)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Error writing fee schedule for {schedule.exchange_name}: {str(e)}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def cached(self, exchange_name: str) -> Optional[FeeSchedule]:
+        """A fresh schedule from memory or disk, without building one."""
+        schedule = self._schedules.get(exchange_name)
+        if self._fresh(schedule):
+            return schedule
+        schedule = self._read_snapshot(exchange_name)
+        if self._fresh(schedule):
+            with self._lock:
+                self._schedules[exchange_name] = schedule
+            return schedule
+        return None
+
+    def get(self, exchange_name: str) -> FeeSchedule:
+        """The fee schedule for one exchange."""
+        return self.get_many([exchange_name])[exchange_name]
+
+    def _market_schedule(self, exchange_name: str) -> FeeSchedule:
+        try:
+            client = exchanges[exchange_name]
+            return FeeSchedule.from_markets(exchange_name, get_markets(exchange_name, client), client.fees)
+        except Exception as e:
+            print(f"Error loading fee metadata for {exchange_name}: {str(e)}")
+            return FeeSchedule.fallback(exchange_name)
+
+    def get_many(self, exchange_list: List[str]) -> Dict[str, FeeSchedule]:
+        """
+        Fee schedules for several exchanges; cold ones are built from market metadata loaded concurrently.
+
+        An exchange whose metadata cannot be loaded gets DEFAULT_TAKER_FEE for this call and is
+        retried on the next. Account and withdrawal fees are fetched by a background refresh and
+        apply to later calls.
+        """
+        schedules = {name: self.cached(name) for name in exchange_list}
+        cold = [name for name, schedule in schedules.items() if schedule is None]
+        if not cold:
+            return schedules
+
+        with ThreadPoolExecutor(max_workers=len(cold)) as pool:
+            built = dict(zip(cold, pool.map(self._market_schedule, cold)))
+        loaded = [schedule for schedule in built.values() if schedule.sources['trading'] != 'default']
+        with self._lock:
+            self._schedules.update({schedule.exchange_name: schedule for schedule in loaded})
+        self._refresh_in_background(loaded)
+        schedules.update(built)
+        return schedules
+
+    def _refresh_in_background(self, schedules: List[FeeSchedule]):
+        with self._lock:
+            schedules = [schedule for schedule in schedules if schedule.exchange_name not in self._refreshing]
+            self._refreshing.update(schedule.exchange_name for schedule in schedules)
+        if not schedules:
+            return
+        self._refresher = threading.Thread(target=self._refresh, args=(schedules,), name="cex-fee-refresh", daemon=True)
+        self._refresher.start()
+
+    def _refresh(self, schedules: List[FeeSchedule]):
+        """Merge account trading fees and withdrawal fees into market-based schedules, then persist them."""
+        try:
+            updated = {schedule.exchange_name: schedule.copy() for schedule in schedules}
+            calls = []
+            for exchange_name in updated:
+                has = exchanges[exchange_name].has
+                private = has_credentials(exchange_name)
+                if private and has.get('fetchTradingFees'):
+                    calls.append((exchange_name, 'fetch_trading_fees', ()))
+                if private and has.get('fetchDepositWithdrawFees'):
+                    calls.append((exchange_name, 'fetch_deposit_withdraw_fees', ()))
+                elif has.get('fetchCurrencies'):
+                    # Public on many exchanges and includes withdrawal fees where the exchange publishes them
+                    calls.append((exchange_name, 'fetch_currencies', ()))
+            results = fan_out_many(calls, FEES_TIMEOUT, BACKGROUND) if calls else []
+
+            for (exchange_name, method, _), result in zip(calls, results):
+                if isinstance(result, BaseException) or not isinstance(result, dict):
+                    continue
+                schedule = updated[exchange_name]
+                if method == 'fetch_trading_fees':
+                    for symbol, fees in result.items():
+                        if isinstance(fees, dict) and isinstance(fees.get('taker'), (int, float)):
+                            schedule.taker[symbol] = float(fees['taker'])
+                            if isinstance(fees.get('maker'), (int, float)):
+                                schedule.maker[symbol] = float(fees['maker'])
+                    schedule.sources['trading'] = 'account'
+                else:
+                    for code, entry in result.items():
+                        fee = _withdraw_fee(entry) if isinstance(entry, dict) else None
+                        if fee is not None:
+                            schedule.withdraw[code] = fee
+                    if schedule.withdraw:
+                        schedule.sources['withdraw'] = 'account' if method == 'fetch_deposit_withdraw_fees' else 'currencies'
+
+            # Swap whole schedules so readers never see a half-merged one
+            with self._lock:
+                self._schedules.update(updated)
+            for schedule in updated.values():
+                self._write_snapshot(schedule)
+        except Exception as e:
+            print(f"Error refreshing fee schedules: {str(e)}")
+        finally:
+            with self._lock:
+                self._refreshing.difference_update(schedule.exchange_name for schedule in schedules)
+
+def effective_buy_prices(asks: np.ndarray, taker_fees: np.ndarray, withdraw_fees: Optional[np.ndarray] = None,
+                         amount: Optional[float] = None) -> np.ndarray:
+    """
+    All-in cost per unit received when buying, for many venues at once.
+
+    Args:
+        asks (np.ndarray): Ask prices
+        taker_fees (np.ndarray): Taker fee rates, broadcastable to asks
+        withdraw_fees (np.ndarray): Withdrawal fees in the bought currency (NaN where unknown, counted as 0)
+        amount (float): Units bought; with withdraw_fees, the cost of moving them off the exchange is spread over them
+
+    Returns:
+        np.ndarray: Effective prices; inf where the withdrawal fee eats the whole amount
+    """
+    cost = asks * (1 + taker_fees)
+    if withdraw_fees is None or not amount:
+        return cost
+    received = amount - np.nan_to_num(withdraw_fees, nan=0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(received > 0, cost * amount / received, np.inf)
+
+def effective_sell_prices(bids: np.ndarray, taker_fees: np.ndarray) -> np.ndarray:
+    """Proceeds per unit sold after taker fees, for many venues at once."""
+    return bids * (1 - taker_fees)
+
+# Shared fee model used by price comparisons and the arbitrage scanner
+fee_model = FeeModel()
@@ -0,0 +1,315 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import numpy as np
+from dotenv import load_dotenv
+from graph.candle_store import candle_store, timeframe_ms
+
+# Load environment variables
+load_dotenv()
+
+# Series whose indicator state is kept in memory; the least recently used ones are dropped beyond this
+INDICATORS_MAX_SERIES = int(os.getenv("CEX_INDICATORS_MAX_SERIES", "500"))
+
+# Candles per smoothing period loaded to seed exponential indicators; older candles weigh less than 1e-4
+WARMUP_PERIODS = 10
+
+def _ewm_last(values: np.ndarray, alpha: float) -> float:
+    """
+    Last value of an exponentially weighted mean (pandas `ewm(alpha=..., adjust=False)`), in one dot product.
+
+    The recursion e[i] = (1 - alpha) * e[i-1] + alpha * x[i] starting from e[0] = x[0] unrolls to a
+    weighted sum of the inputs, so seeding from history needs no Python loop.
+    """
+    n = len(values)
+    weights = alpha * (1 - alpha) ** np.arange(n - 1, -1, -1, dtype=np.float64)
+    weights[0] = (1 - alpha) ** (n - 1)
+    return float(np.dot(weights, values))
+
+class SMA:
+    """Simple moving average over a ring buffer with a running sum."""
+
+    def __init__(self, period: int):
+        self.period = period
+        self._window = np.zeros(period)
+        self._count = 0
+        self._sum = 0.0
+
+    def seed(self, values: np.ndarray):
+        tail = np.asarray(values, dtype=np.float64)[-self.period:]
+        self._count = len(values)
+        self._window[:] = 0
+        # Place each value in the slot `update` would have written it to
+        self._window[np.arange(self._count - len(tail), self._count) % self.period] = tail
+        self._sum = float(tail.sum())
+
+    def update(self, value: float) -> Optional[float]:
+        slot = self._count % self.period
+        self._sum += value - self._window[slot]
+        self._window[slot] = value
+        self._count += 1
+        if self._count % self.period == 0:
+            # Re-sum once per window so rounding errors of the running sum cannot accumulate
+            self._sum = float(self._window.sum())
+        return self.value
+
+    @property
+    def value(self) -> Optional[float]:
+        return self._sum / self.period if self._count >= self.period else None
+
+class EMA:
+    """Exponential moving average with alpha = 2 / (period + 1), defined once `period` values were seen."""
+
+    def __init__(self, period: int, alpha: Optional[float] = None):
+        self.period = period
+        self.alpha = alpha if alpha is not None else 2 / (period + 1)
+        self._count = 0
+        self._ema = 0.0
+
+    def seed(self, values: np.ndarray):
+        values = np.asarray(values, dtype=np.float64)
+        self._count = len(values)
+        self._ema = _ewm_last(values, self.alpha) if len(values) else 0.0
+
+    def update(self, value: float) -> Optional[float]:
+        self._ema = value if self._count == 0 else self._ema + self.alpha * (value - self._ema)
+        self._count += 1
+        return self.value
+
+    @property
+    def value(self) -> Optional[float]:
+        return self._ema if self._count >= self.period else None
+
+class RSI:
+    """Wilder's relative strength index, matching graph.backtest.rsi on the same closes."""
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self._gain = EMA(period, alpha=1 / period)
+        self._loss = EMA(period, alpha=1 / period)
+        self._last: Optional[float] = None
+
+    def seed(self, closes: np.ndarray):
+        closes = np.asarray(closes, dtype=np.float64)
+        delta = np.diff(closes)
+        self._gain.seed(np.clip(delta, 0, None))
+        self._loss.seed(np.clip(-delta, 0, None))
+        self._last = float(closes[-1]) if len(closes) else None
+
+    def update(self, close: float) -> Optional[float]:
+        if self._last is not None:
+            delta = close - self._last
+            self._gain.update(max(delta, 0.0))
+            self._loss.update(max(-delta, 0.0))
+        self._last = close
+        return self.value
+
+    @property
+    def value(self) -> Optional[float]:
+        gain, loss = self._gain.value, self._loss.value
+        if gain is None:
+            return None
+        if loss == 0:
+            return 100.0 if gain > 0 else 50.0
+        return 100 - 100 / (1 + gain / loss)
+
+class Bollinger:
+    """
+    Bollinger bands: the `period` moving average plus and minus `width` population standard deviations.
+
+    Mean and variance are updated with a windowed Welford step (swap the oldest value for the newest),
+    which stays accurate where a running sum of squares would cancel out at high prices.
+    """
+
+    def __init__(self, period: int = 20, width: float = 2.0):
+        self.period = period
+        self.width = width
+        self._window = np.zeros(period)
+        self._count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def seed(self, values: np.ndarray):
+        tail = np.asarray(values, dtype=np.float64)[-self.period:]
+        self._count = len(values)
+        self._window[:] = 0
+        self._window[np.arange(self._count - len(tail), self._count) % self.period] = tail
+        self._mean = float(tail.mean()) if len(tail) else 0.0
+        self._m2 = float(((tail - self._mean) ** 2).sum())
+
+    def update(self, value: float) -> Optional[Tuple[float, float, float]]:
+        slot = self._count % self.period
+        if self._count < self.period:
+            # Still filling the window: plain Welford
+            delta = value - self._mean
+            self._mean += delta / (self._count + 1)
+            self._m2 += delta * (value - self._mean)
+        else:
+            old = self._window[slot]
+            mean = self._mean + (value - old) / self.period
+            self._m2 = max(self._m2 + (value - old) * (value - mean + old - self._mean), 0.0)
+            self._mean = mean
+        self._window[slot] = value
+        self._count += 1
+        return self.value
+
+    @property
+    def value(self) -> Optional[Tuple[float, float, float]]:
+        """(lower, middle, upper) once the window is full."""
+        if self._count < self.period:
+            return None
+        deviation = self.width * (self._m2 / self.period) ** 0.5
+        return self._mean - deviation, self._mean, self._mean + deviation
+
+class ATR:
+    """Average true range with Wilder's smoothing; the first candle's true range is its high-low range."""
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self._average = EMA(period, alpha=1 / period)
+        self._last_close: Optional[float] = None
+
+    def seed(self, high: np.ndarray, low: np.ndarray, close: np.ndarray):
+        high, low, close = (np.asarray(column, dtype=np.float64) for column in (high, low, close))
+        if not len(close):
+            return
+        previous = np.concatenate(([np.nan], close[:-1]))
+        true_range = np.fmax(high - low, np.fmax(np.abs(high - previous), np.abs(low - previous)))
+        self._average.seed(true_range)
+        self._last_close = float(close[-1])
+
+    def update(self, high: float, low: float, close: float) -> Optional[float]:
+        true_range = high - low
+        if self._last_close is not None:
+            true_range = max(true_range, abs(high - self._last_close), abs(low - self._last_close))
+        self._average.update(true_range)
+        self._last_close = close
+        return self.value
+
+    @property
+    def value(self) -> Optional[float]:
+        return self._average.value
+
+class CandleIndicators:
+    """
+    Indicator state of one candle series: SMA, EMA, RSI, Bollinger bands and ATR.
+
+    `seed` initializes every indicator from historical OHLCV arrays with NumPy; afterwards each
+    closed candle costs one O(1) `update`, whatever the window lengths.
+    """
+
+    def __init__(self, ma_period: int = 50, ema_period: int = 20, rsi_period: int = 14,
+                 bb_period: int = 20, bb_width: float = 2.0, atr_period: int = 14):
+        self.sma = SMA(ma_period)
+        self.ema = EMA(ema_period)
+        self.rsi = RSI(rsi_period)
+        self.bollinger = Bollinger(bb_period, bb_width)
+        self.atr = ATR(atr_period)
+        self.last_timestamp: Optional[int] = None
+        self.close: Optional[float] = None
+        self.candles = 0
+
+    def warmup(self) -> int:
+        """Candles of history needed for the values to be ready and the exponential ones to converge."""
+        return max(self.sma.period, self.bollinger.period,
+                   WARMUP_PERIODS * max(self.ema.period, self.rsi.period + 1, self.atr.period))
+
+    def seed(self, columns: Dict[str, np.ndarray]):
+        """Initialize from candle columns (timestamp, high, low, close) as returned by CandleStore.read."""
+        close = np.asarray(columns['close'], dtype=np.float64)
+        self.sma.seed(close)
+        self.ema.seed(close)
+        self.rsi.seed(close)
+        self.bollinger.seed(close)
+        self.atr.seed(columns['high'], columns['low'], close)
+        self.candles = len(close)
+        if len(close):
+            self.last_timestamp = int(columns['timestamp'][-1])
+            self.close = float(close[-1])
+
+    def update(self, timestamp: int, high: float, low: float, close: float):
+        """Apply one closed candle."""
+        self.sma.update(close)
+        self.ema.update(close)
+        self.rsi.update(close)
+        self.bollinger.update(close)
+        self.atr.update(high, low, close)
+        self.last_timestamp = int(timestamp)
+        self.close = float(close)
+        self.candles += 1
+
+    def values(self) -> Dict[str, object]:
+        bands = self.bollinger.value
+        return {
+            'timestamp': self.last_timestamp,
+            'close': self.close,
+            'sma': self.sma.value,
+            'ema': self.ema.value,
+            'rsi': self.rsi.value,
+            'bollinger': bands,
+            'atr': self.atr.value,
+            'candles': self.candles,
+        }
+
+class IndicatorTracker:
+    """
+    Live indicators for many series, kept current from the candle store.
+
+    A series is seeded from history the first time it is requested; later requests only download
+    and apply the candles that closed since, so tracking costs O(1) per new candle per series.
+    """
+
+    def __init__(self, store=candle_store, max_series: int = INDICATORS_MAX_SERIES):
+        self.store = store
+        self.max_series = max_series
+        self._series: "OrderedDict[tuple, CandleIndicators]" = OrderedDict()
+        self._locks: Dict[tuple, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _series_lock(self, key: tuple) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def get(self, exchange_name: str, symbol: str, timeframe: str = '1d', refresh: bool = True,
+            **params) -> CandleIndicators:
+        """
+        Indicators of one series, brought up to the newest closed candle.
+
+        Args:
+            exchange_name (str): Exchange name
+            symbol (str): Exchange symbol
+            timeframe (str): Candle timeframe (e.g., '1h', '1d')
+            refresh (bool): Download candles that closed since the last call first
+            **params: CandleIndicators periods (ma_period, ema_period, rsi_period, bb_period, bb_width, atr_period)
+
+        Returns:
+            CandleIndicators: The series' indicator state
+        """
+        key = (exchange_name, symbol, timeframe, tuple(sorted(params.items())))
+        with self._series_lock(key):
+            indicators = self._series.get(key)
+            if indicators is None or indicators.last_timestamp is None:
+                indicators = CandleIndicators(**params)
+                since = int(time.time() * 1000) - indicators.warmup() * timeframe_ms(timeframe)
+                if refresh:
+                    self.store.update(exchange_name, symbol, timeframe, since)
+                indicators.seed(self.store.read(exchange_name, symbol, timeframe, since=since))
+            else:
+                if refresh:
+                    self.store.update(exchange_name, symbol, timeframe, indicators.last_timestamp)
+                columns = self.store.read(exchange_name, symbol, timeframe, since=indicators.last_timestamp + 1)
+                for timestamp, high, low, close in zip(columns['timestamp'], columns['high'], columns['low'], columns['close']):
+                    indicators.update(timestamp, high, low, close)
+
+            with self._lock:
+                self._series[key] = indicators
+                self._series.move_to_end(key)
+                while len(self._series) > self.max_series:
+                    evicted, _ = self._series.popitem(last=False)
+                    self._locks.pop(evicted, None)
+            return indicators
+
+# Shared tracker used by the agent's tools
+indicator_tracker = IndicatorTracker()
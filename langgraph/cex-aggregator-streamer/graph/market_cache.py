@@ -0,0 +1,153 @@
+import gzip
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# How long (seconds) market metadata is served from memory before it is refreshed
+MARKETS_TTL = float(os.getenv("CEX_MARKETS_TTL", "3600"))
+
+# How old (seconds) an on-disk snapshot may be and still warm-start a new process
+MARKETS_DISK_TTL = float(os.getenv("CEX_MARKETS_DISK_TTL", "86400"))
+
+# Directory holding on-disk snapshots, shared by every worker on the host
+CACHE_DIR = os.getenv(
+    "CEX_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache")
+)
+
+# In-memory tier: exchange name -> (fetched_at, markets)
+_memory: Dict[str, Tuple[float, List[dict]]] = {}
+
+# Time each client was last primed, keyed by id(client)
+_primed_at: Dict[int, float] = {}
+
+_locks: Dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+def _lock_for(exchange_name: str) -> threading.Lock:
+    """Per-exchange lock so concurrent cold requests download the catalog only once."""
+    with _locks_guard:
+        return _locks.setdefault(exchange_name, threading.Lock())
+
+def snapshot_path(exchange_name: str) -> str:
+    """Path of the on-disk market snapshot for an exchange."""
+    return os.path.join(CACHE_DIR, "markets", f"{exchange_name}.json.gz")
+
+def _read_snapshot(exchange_name: str) -> Optional[Tuple[float, List[dict]]]:
+    path = snapshot_path(exchange_name)
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError):
+        return None
+    fetched_at = snapshot.get("fetched_at", 0)
+    if time.time() - fetched_at > MARKETS_DISK_TTL:
+        return None
+    return fetched_at, snapshot.get("markets", [])
+
+def _write_snapshot(exchange_name: str, fetched_at: float, markets: List[dict]):
+    path = snapshot_path(exchange_name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write to a temporary file and rename so readers never see a partial snapshot
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as f:
+            json.dump({"exchange": exchange_name, "fetched_at": fetched_at, "markets": markets}, f)
+        os.replace(tmp_path, path)
+    except (OSError, TypeError, ValueError) as e:
+        print(f"Error writing market snapshot for {exchange_name}: {str(e)}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def cached_markets(exchange_name: str) -> Optional[Tuple[float, List[dict]]]:
+    """
+    Look up market metadata without touching the network.
+
+    Args:
+        exchange_name (str): The name of the exchange
+
+    Returns:
+        tuple: (fetched_at, markets) from memory or disk, or None on a miss
+    """
+    entry = _memory.get(exchange_name)
+    if entry and time.time() - entry[0] <= MARKETS_TTL:
+        return entry
+    snapshot = _read_snapshot(exchange_name)
+    if snapshot is None or (entry and snapshot[0] <= entry[0]):
+        return None
+    # A cold process warm-starts from any snapshot within MARKETS_DISK_TTL; a process
+    # whose own copy expired only adopts a snapshot another worker refreshed recently
+    if entry is None or time.time() - snapshot[0] <= MARKETS_TTL:
+        _memory[exchange_name] = snapshot
+        return snapshot
+    return None
+
+def store_markets(exchange_name: str, markets: List[dict], fetched_at: Optional[float] = None) -> Tuple[float, List[dict]]:
+    """Store freshly downloaded markets in memory and on disk."""
+    entry = (fetched_at or time.time(), markets)
+    _memory[exchange_name] = entry
+    _write_snapshot(exchange_name, entry[0], markets)
+    return entry
+
+def get_markets(exchange_name: str, exchange, reload: bool = False) -> List[dict]:
+    """
+    Get the market list for an exchange, downloading it only when the cache is cold or stale.
+
+    Args:
+        exchange_name (str): The name of the exchange
+        exchange: The sync ccxt client used on a cache miss
+        reload (bool): Bypass both cache tiers and re-download
+
+    Returns:
+        list: Market dictionaries as returned by ccxt's fetch_markets
+    """
+    return _get_entry(exchange_name, exchange, reload)[1]
+
+def _get_entry(exchange_name: str, exchange, reload: bool = False) -> Tuple[float, List[dict]]:
+    if not reload:
+        entry = cached_markets(exchange_name)
+        if entry:
+            return entry
+    with _lock_for(exchange_name):
+        # Another thread may have refreshed the cache while we waited
+        if not reload:
+            entry = cached_markets(exchange_name)
+            if entry:
+                return entry
+        return store_markets(exchange_name, exchange.fetch_markets())
+
+def prime_markets(exchange_name: str, exchange, reload: bool = False):
+    """
+    Install cached markets on a client so its first fetch_ticker/fetch_order_book does not
+    trigger a full load_markets download.
+
+    Currencies are derived from the markets rather than fetched, which is enough for
+    market data and balance calls.
+    """
+    fetched_at, markets = _get_entry(exchange_name, exchange, reload)
+    if _primed_at.get(id(exchange)) == fetched_at and exchange.markets:
+        return
+    exchange.set_markets(markets)
+    _primed_at[id(exchange)] = fetched_at
+
+def prime_from_cache(exchange_name: str, exchange) -> bool:
+    """Prime a client from memory or disk only, never downloading. Returns True on a hit."""
+    entry = cached_markets(exchange_name)
+    if not entry:
+        return False
+    exchange.set_markets(entry[1])
+    _primed_at[id(exchange)] = entry[0]
+    return True
+
+def clear_cache(exchange_name: Optional[str] = None):
+    """Drop the in-memory tier for one exchange, or for all of them."""
+    if exchange_name is None:
+        _memory.clear()
+    else:
+        _memory.pop(exchange_name, None)
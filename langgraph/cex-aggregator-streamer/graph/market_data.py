@@ -0,0 +1,234 @@
+import asyncio
+import os
+import time
+import ccxt
+from typing import Callable, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+from graph.async_exchanges import get_event_loop, run_async
+from graph.exchange_factory import create_pro_exchange
+from graph.market_cache import prime_from_cache
+from graph.recorded_feed import RecordedFeed, book_snapshot
+
+# Load environment variables
+load_dotenv()
+
+# Set to 0 to disable streaming and always poll REST
+MARKET_DATA_ENABLED = os.getenv("CEX_MARKET_DATA", "1") == "1"
+
+# Streamed data older than this (seconds) is considered stale and tools fall back to REST
+MARKET_DATA_MAX_AGE = float(os.getenv("CEX_MARKET_DATA_MAX_AGE", "10"))
+
+# A subscription nobody has read for this long (seconds) is stopped
+MARKET_DATA_IDLE_TIMEOUT = float(os.getenv("CEX_MARKET_DATA_IDLE_TIMEOUT", "300"))
+
+# Number of levels kept per side of each local order book
+BOOK_DEPTH = int(os.getenv("CEX_MARKET_DATA_BOOK_DEPTH", "50"))
+
+# Optional recorded feed file to replay instead of connecting to exchanges
+MARKET_DATA_REPLAY = os.getenv("CEX_MARKET_DATA_REPLAY")
+
+# Consecutive feed errors after which a subscription gives up
+MAX_FEED_ERRORS = 5
+
+class MarketDataService:
+    """
+    Keeps top-of-book tickers and local L2 order books up to date from exchange WebSocket feeds.
+
+    Subscriptions run as tasks on the shared background event loop. Readers get the latest
+    in-memory state without any network call, or None when nothing fresh is available.
+    """
+
+    def __init__(self, client_factory: Callable = create_pro_exchange, book_depth: int = BOOK_DEPTH,
+                 max_age: float = MARKET_DATA_MAX_AGE, idle_timeout: float = MARKET_DATA_IDLE_TIMEOUT):
+        """
+        Args:
+            client_factory (callable): Creates a watch-capable client (ccxt.pro interface) for an exchange name
+            book_depth (int): Levels kept per side of each order book
+            max_age (float): Seconds after which streamed data is treated as stale
+            idle_timeout (float): Seconds without reads after which a subscription stops
+        """
+        self._client_factory = client_factory
+        self.book_depth = book_depth
+        self.max_age = max_age
+        self.idle_timeout = idle_timeout
+        self._clients = {}
+        # (exchange, symbol) -> (received_at, data)
+        self.tickers: Dict[Tuple[str, str], Tuple[float, dict]] = {}
+        self.books: Dict[Tuple[str, str], Tuple[float, dict]] = {}
+        # (channel, exchange, symbol) -> task / last read time
+        self._tasks: Dict[Tuple[str, str, str], asyncio.Task] = {}
+        self._last_read: Dict[Tuple[str, str, str], float] = {}
+        self._listeners: List[Callable] = []
+        # Feeds the exchange does not offer over WebSocket; never retried
+        self._unsupported = set()
+
+    def _client(self, exchange_name: str):
+        client = self._clients.get(exchange_name)
+        if client is None:
+            client = self._client_factory(exchange_name)
+            prime_from_cache(exchange_name, client)
+            self._clients[exchange_name] = client
+        return client
+
+    def add_listener(self, callback: Callable):
+        """
+        Register a callback invoked on the event loop for every update.
+
+        The callback receives (channel, exchange_name, symbol, data) where channel is
+        'ticker' or 'book'. It must not block.
+        """
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable):
+        """Unregister a callback added with add_listener."""
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _publish(self, channel: str, exchange_name: str, symbol: str, data: dict):
+        for callback in list(self._listeners):
+            try:
+                callback(channel, exchange_name, symbol, data)
+            except Exception as e:
+                print(f"Error in market data listener: {str(e)}")
+
+    def subscribe(self, exchange_name: str, symbol: str, channel: str = "ticker"):
+        """
+        Start streaming a ticker or order book if it is not streaming already. Thread-safe.
+
+        Args:
+            exchange_name (str): The name of the exchange
+            symbol (str): The trading pair symbol (e.g., 'BTC/USDT')
+            channel (str): 'ticker' or 'book'
+        """
+        key = (channel, exchange_name, symbol)
+        if (channel, exchange_name) in self._unsupported:
+            return
+        self._last_read[key] = time.time()
+        if key in self._tasks:
+            return
+        loop = get_event_loop()
+        loop.call_soon_threadsafe(self._start, key)
+
+    def _start(self, key: Tuple[str, str, str]):
+        if key in self._tasks:
+            return
+        self._tasks[key] = asyncio.get_running_loop().create_task(self._watch(*key))
+
+    async def _watch(self, channel: str, exchange_name: str, symbol: str):
+        key = (channel, exchange_name, symbol)
+        errors = 0
+        try:
+            client = self._client(exchange_name)
+            while time.time() - self._last_read.get(key, 0) < self.idle_timeout:
+                try:
+                    if channel == "book":
+                        book = await client.watch_order_book(symbol, self.book_depth)
+                        data = book_snapshot(book, self.book_depth)
+                        self.books[(exchange_name, symbol)] = (time.time(), data)
+                    else:
+                        data = await client.watch_ticker(symbol)
+                        self.tickers[(exchange_name, symbol)] = (time.time(), data)
+                    errors = 0
+                    self._publish(channel, exchange_name, symbol, data)
+                except asyncio.CancelledError:
+                    raise
+                except ccxt.NotSupported:
+                    self._unsupported.add((channel, exchange_name))
+                    break
+                except Exception as e:
+                    errors += 1
+                    if errors >= MAX_FEED_ERRORS:
+                        print(f"Stopping {channel} feed for {symbol} on {exchange_name}: {str(e)}")
+                        break
+                    await asyncio.sleep(min(2 ** errors, 30))
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            print(f"Error starting {channel} feed for {symbol} on {exchange_name}: {str(e)}")
+        finally:
+            self._tasks.pop(key, None)
+            self._last_read.pop(key, None)
+
+    def _read(self, store: dict, channel: str, exchange_name: str, symbol: str, max_age: Optional[float]) -> Optional[dict]:
+        key = (channel, exchange_name, symbol)
+        if key in self._last_read:
+            self._last_read[key] = time.time()
+        entry = store.get((exchange_name, symbol))
+        if entry is None:
+            return None
+        received_at, data = entry
+        if time.time() - received_at > (self.max_age if max_age is None else max_age):
+            return None
+        return data
+
+    def get_ticker(self, exchange_name: str, symbol: str, max_age: Optional[float] = None) -> Optional[dict]:
+        """Latest streamed ticker, or None if there is none or it is older than max_age seconds."""
+        return self._read(self.tickers, "ticker", exchange_name, symbol, max_age)
+
+    def get_order_book(self, exchange_name: str, symbol: str, limit: Optional[int] = None,
+                       max_age: Optional[float] = None) -> Optional[dict]:
+        """
+        Latest streamed order book, or None if there is none, it is stale, or it holds
+        fewer than limit levels per side while the venue may have more.
+        """
+        book = self._read(self.books, "book", exchange_name, symbol, max_age)
+        if book is None or limit is None:
+            return book
+        if limit > self.book_depth:
+            return None
+        return {**book, 'bids': book['bids'][:limit], 'asks': book['asks'][:limit]}
+
+    def subscriptions(self) -> List[Tuple[str, str, str]]:
+        """Active (channel, exchange, symbol) subscriptions."""
+        return list(self._tasks)
+
+    async def _close(self):
+        for task in list(self._tasks.values()):
+            task.cancel()
+        for client in list(self._clients.values()):
+            try:
+                await client.close()
+            except Exception:
+                pass
+        self._clients.clear()
+
+    def close(self):
+        """Stop all subscriptions and close the WebSocket clients."""
+        run_async(self._close())
+
+def create_market_data_service() -> MarketDataService:
+    """Create the service from environment settings, replaying a recorded feed if one is configured."""
+    if MARKET_DATA_REPLAY:
+        feed = RecordedFeed.load(MARKET_DATA_REPLAY)
+        return MarketDataService(client_factory=feed.client)
+    return MarketDataService()
+
+# Shared service used by the agent's tools
+market_data = create_market_data_service()
+
+def stream_ticker(exchange_name: str, symbol: str) -> Optional[dict]:
+    """
+    Read a streamed ticker from memory.
+
+    Returns:
+        dict: The fresh ticker, or None when the caller should fall back to REST
+    """
+    if not MARKET_DATA_ENABLED:
+        return None
+    return market_data.get_ticker(exchange_name, symbol)
+
+def stream_order_book(exchange_name: str, symbol: str, limit: Optional[int] = None) -> Optional[dict]:
+    """
+    Read a streamed order book from memory.
+
+    Returns:
+        dict: The fresh order book, or None when the caller should fall back to REST
+    """
+    if not MARKET_DATA_ENABLED:
+        return None
+    return market_data.get_order_book(exchange_name, symbol, limit)
+
+def keep_streaming(exchange_name: str, symbol: str, channel: str = "ticker"):
+    """Subscribe to a feed after a successful REST call so later reads are served from memory."""
+    if MARKET_DATA_ENABLED:
+        market_data.subscribe(exchange_name, symbol, channel)
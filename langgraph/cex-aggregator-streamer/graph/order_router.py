@@ -0,0 +1,365 @@
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import ccxt
+from dotenv import load_dotenv
+from graph.consolidated_book import ConsolidatedBook, get_consolidated_book
+from graph.exchange_factory import exchanges
+from graph.fee_model import DEFAULT_TAKER_FEE, fee_model
+from graph.market_cache import get_markets
+from graph.portfolio import fetch_balances, has_credentials
+
+# Load environment variables
+load_dotenv()
+
+# Starting balances of every paper exchange, as 'CURRENCY:amount' pairs
+PAPER_BALANCES = os.getenv("CEX_PAPER_BALANCES", "USDT:100000,USDC:100000,USD:100000")
+
+def parse_balances(spec: str) -> Dict[str, float]:
+    """Parse 'USDT:100000,BTC:1' into {'USDT': 100000.0, 'BTC': 1.0}."""
+    balances = {}
+    for item in spec.split(','):
+        currency, _, amount = item.strip().partition(':')
+        if currency and amount:
+            balances[currency.strip().upper()] = float(amount)
+    return balances
+
+def allocate(prices: np.ndarray, sizes: np.ndarray, venue_ids: np.ndarray, side: str, amount: float,
+             fees: np.ndarray, caps: np.ndarray) -> np.ndarray:
+    """
+    Cheapest split of an order over the levels of a merged book, net of fees and within venue balances.
+
+    Each venue can only spend what its balance allows (quote currency including fees when buying,
+    base currency when selling), which cuts its levels off at some depth. Filling the remaining
+    levels in order of fee-adjusted price is then optimal, because every level's cost is linear.
+
+    Args:
+        prices (np.ndarray): Level prices, best first within each venue
+        sizes (np.ndarray): Level sizes in base currency
+        venue_ids (np.ndarray): Venue index of each level
+        side (str): 'buy' or 'sell'
+        amount (float): Base currency amount to trade
+        fees (np.ndarray): Taker fee rate per venue
+        caps (np.ndarray): Spendable balance per venue (quote for buys, base for sells; inf for no limit)
+
+    Returns:
+        np.ndarray: Base amount taken at each level
+    """
+    if not len(prices) or amount <= 0:
+        return np.zeros(len(prices))
+    level_fees = fees[venue_ids]
+    # Balance used per unit taken at each level
+    unit_spend = prices * (1 + level_fees) if side == 'buy' else np.ones(len(prices))
+    spend = sizes * unit_spend
+
+    # Spend before each level within its own venue, walking each venue's levels best first
+    by_venue = np.argsort(venue_ids, kind='stable')
+    cumulative = np.cumsum(spend[by_venue])
+    grouped_ids = venue_ids[by_venue]
+    group_start = np.flatnonzero(np.r_[True, grouped_ids[1:] != grouped_ids[:-1]])
+    offsets = np.repeat(cumulative[group_start] - spend[by_venue][group_start], np.diff(np.r_[group_start, len(by_venue)]))
+    spent_before = np.empty(len(prices))
+    spent_before[by_venue] = cumulative - spend[by_venue] - offsets
+    with np.errstate(invalid='ignore'):
+        allowed = np.clip(caps[venue_ids] - spent_before, 0, spend) / unit_spend
+
+    # Take the cheapest (buy) or richest (sell) levels after fees until the amount is reached
+    effective = prices * (1 + level_fees) if side == 'buy' else -prices * (1 - level_fees)
+    order = np.argsort(effective, kind='stable')
+    filled_before = np.cumsum(allowed[order]) - allowed[order]
+    taken = np.empty(len(prices))
+    taken[order] = np.clip(amount - filled_before, 0, allowed[order])
+    return taken
+
+class RoutePlan:
+    """An order split across venues, with its cost net of fees."""
+
+    def __init__(self, symbol: str, side: str, amount: float, book: ConsolidatedBook, taken: np.ndarray,
+                 fees: np.ndarray, excluded: Dict[str, str]):
+        self.symbol = symbol
+        self.side = side
+        self.amount = amount
+        self.excluded = excluded
+        if side == 'buy':
+            prices, venue_ids = book.ask_prices, book.ask_venues
+        else:
+            prices, venue_ids = book.bid_prices, book.bid_venues
+        n = len(book.venues)
+        notional = taken * prices
+        venue_amounts = np.bincount(venue_ids, weights=taken, minlength=n)
+        venue_notional = np.bincount(venue_ids, weights=notional, minlength=n)
+        venue_fees = venue_notional * fees
+        worst = {}
+        for i in np.flatnonzero(taken > 0):
+            venue = book.venues[venue_ids[i]]
+            worst[venue] = max(worst.get(venue, -np.inf), prices[i]) if side == 'buy' else min(worst.get(venue, np.inf), prices[i])
+
+        self.filled = float(venue_amounts.sum())
+        self.unfilled = max(amount - self.filled, 0.0)
+        self.notional = float(venue_notional.sum())
+        self.fees = float(venue_fees.sum())
+        # Quote currency paid (buy) or received (sell), fees included
+        self.total = self.notional + self.fees if side == 'buy' else self.notional - self.fees
+        self.average_price = self.total / self.filled if self.filled else None
+        self.per_venue = {
+            book.venues[v]: {
+                'symbol': book.venue_symbols[book.venues[v]],
+                'amount': float(venue_amounts[v]),
+                'notional': float(venue_notional[v]),
+                'fee': float(venue_fees[v]),
+                'fee_rate': float(fees[v]),
+                'vwap': float(venue_notional[v] / venue_amounts[v]),
+                'worst_price': float(worst[book.venues[v]]),
+            }
+            for v in np.flatnonzero(venue_amounts > 0)
+        }
+        # Best all-in average achievable on one venue alone, for comparison
+        self.single_venue: Optional[Tuple[str, float]] = None
+
+def plan(book: ConsolidatedBook, side: str, amount: float, fees: Dict[str, float],
+         caps: Optional[Dict[str, float]] = None, min_amounts: Optional[Dict[str, float]] = None) -> RoutePlan:
+    """
+    Plan the cheapest split of an order across the venues of a merged book.
+
+    Args:
+        book (ConsolidatedBook): Merged order book
+        side (str): 'buy' or 'sell'
+        amount (float): Base currency amount to trade
+        fees (dict): Taker fee rate per venue (DEFAULT_TAKER_FEE where missing)
+        caps (dict): Spendable balance per venue (quote for buys, base for sells); venues left out are not capped
+        min_amounts (dict): Minimum order amount per venue; venues that would get less are dropped
+
+    Returns:
+        RoutePlan: The split, with venues left out and why in `excluded`
+    """
+    if side == 'buy':
+        prices, sizes, venue_ids = book.ask_prices, book.ask_sizes, book.ask_venues
+    elif side == 'sell':
+        prices, sizes, venue_ids = book.bid_prices, book.bid_sizes, book.bid_venues
+    else:
+        raise ValueError(f"side must be 'buy' or 'sell', got '{side}'")
+    fee_vector = np.array([fees.get(venue, DEFAULT_TAKER_FEE) for venue in book.venues], dtype=np.float64)
+    cap_vector = np.array([(caps or {}).get(venue, np.inf) for venue in book.venues], dtype=np.float64)
+    minimum = np.array([(min_amounts or {}).get(venue) or 0.0 for venue in book.venues], dtype=np.float64)
+
+    # A venue whose share falls below its minimum order size is dropped and the rest re-planned
+    excluded = {}
+    for _ in range(len(book.venues) + 1):
+        taken = allocate(prices, sizes, venue_ids, side, amount, fee_vector, cap_vector)
+        venue_amounts = np.bincount(venue_ids, weights=taken, minlength=len(book.venues))
+        too_small = (venue_amounts > 0) & (venue_amounts < minimum)
+        if not too_small.any():
+            break
+        for v in np.flatnonzero(too_small):
+            excluded[book.venues[v]] = f"share {venue_amounts[v]:.8g} below minimum order {minimum[v]:.8g}"
+            cap_vector[v] = 0.0
+    route = RoutePlan(book.symbol, side, amount, book, taken, fee_vector, excluded)
+
+    singles = []
+    for v, venue in enumerate(book.venues):
+        if cap_vector[v] == 0:
+            continue
+        alone = np.where(np.arange(len(book.venues)) == v, cap_vector, 0.0)
+        single = RoutePlan(book.symbol, side, amount, book, allocate(prices, sizes, venue_ids, side, amount, fee_vector, alone),
+                           fee_vector, {})
+        if single.filled >= amount * (1 - 1e-9):
+            singles.append((venue, single.average_price))
+    if singles:
+        route.single_venue = min(singles, key=lambda s: s[1]) if side == 'buy' else max(singles, key=lambda s: s[1])
+    return route
+
+class PaperExchange:
+    """
+    Local stand-in for an exchange that fills market orders against order book snapshots.
+
+    Balances start from CEX_PAPER_BALANCES; fills consume the snapshot's liquidity and charge the
+    exchange's taker fee, so several orders against one snapshot walk deeper into the book.
+    """
+
+    def __init__(self, exchange_name: str, balances: Optional[Dict[str, float]] = None, taker_fee: Optional[float] = None):
+        self.id = exchange_name
+        self.taker_fee = taker_fee
+        self.balances = dict(balances if balances is not None else parse_balances(PAPER_BALANCES))
+        self.books: Dict[str, dict] = {}
+        self.orders: List[dict] = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def set_order_book(self, symbol: str, book: dict):
+        self.books[symbol] = {'bids': [list(level[:2]) for level in book.get('bids', [])],
+                              'asks': [list(level[:2]) for level in book.get('asks', [])]}
+
+    def fetch_order_book(self, symbol: str, limit: Optional[int] = None) -> dict:
+        book = self.books.get(symbol)
+        if book is None:
+            raise ccxt.BadSymbol(f"paper {self.id} has no order book for {symbol}")
+        return {'symbol': symbol, 'bids': book['bids'][:limit], 'asks': book['asks'][:limit]}
+
+    def fetch_balance(self) -> dict:
+        free = {currency: amount for currency, amount in self.balances.items() if amount}
+        return {'free': dict(free), 'used': {c: 0.0 for c in free}, 'total': dict(free)}
+
+    def create_order(self, symbol: str, type: str, side: str, amount: float, price: Optional[float] = None,
+                     params: Optional[dict] = None) -> dict:
+        """
+        Fill a market order (or a limit order up to its price) immediately; the rest is cancelled.
+
+        Raises:
+            ccxt.InsufficientFunds: The balance does not cover the fill including the fee
+        """
+        fee_rate = self.taker_fee if self.taker_fee is not None else fee_model.get(self.id).taker_fee(symbol)
+        base, quote = symbol.split(':')[0].split('/')
+        with self._lock:
+            levels = self.fetch_order_book(symbol)['asks' if side == 'buy' else 'bids']
+            filled, cost, consumed = 0.0, 0.0, []
+            for level_price, size in levels:
+                if filled >= amount or (type == 'limit' and price is not None and
+                                        (level_price > price if side == 'buy' else level_price < price)):
+                    break
+                take = min(size, amount - filled)
+                filled += take
+                cost += take * level_price
+                consumed.append(take)
+            fee = cost * fee_rate
+            if side == 'buy' and cost + fee > self.balances.get(quote, 0.0) + 1e-9:
+                raise ccxt.InsufficientFunds(f"paper {self.id}: {cost + fee:.8g} {quote} needed, "
+                                             f"{self.balances.get(quote, 0.0):.8g} available")
+            if side == 'sell' and filled > self.balances.get(base, 0.0) + 1e-9:
+                raise ccxt.InsufficientFunds(f"paper {self.id}: {filled:.8g} {base} needed, "
+                                             f"{self.balances.get(base, 0.0):.8g} available")
+
+            for i, take in enumerate(consumed):
+                levels[i][1] -= take
+            self.books[symbol]['asks' if side == 'buy' else 'bids'] = [level for level in levels if level[1] > 1e-12]
+            if side == 'buy':
+                self.balances[quote] = self.balances.get(quote, 0.0) - cost - fee
+                self.balances[base] = self.balances.get(base, 0.0) + filled
+            else:
+                self.balances[base] = self.balances.get(base, 0.0) - filled
+                self.balances[quote] = self.balances.get(quote, 0.0) + cost - fee
+
+            order = {
+                'id': f"paper-{next(self._ids)}", 'timestamp': int(time.time() * 1000), 'symbol': symbol,
+                'type': type, 'side': side, 'amount': amount, 'price': price, 'filled': filled,
+                'remaining': amount - filled, 'cost': cost, 'average': cost / filled if filled else None,
+                'status': 'closed' if filled >= amount - 1e-12 else 'canceled',
+                'fee': {'cost': fee, 'currency': quote, 'rate': fee_rate},
+            }
+            self.orders.append(order)
+            return order
+
+class PaperRegistry:
+    """Paper exchanges by name, created on first use with the configured starting balances."""
+
+    def __init__(self):
+        self._exchanges: Dict[str, PaperExchange] = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, exchange_name: str) -> PaperExchange:
+        with self._lock:
+            if exchange_name not in self._exchanges:
+                self._exchanges[exchange_name] = PaperExchange(exchange_name)
+            return self._exchanges[exchange_name]
+
+    def reset(self):
+        with self._lock:
+            self._exchanges.clear()
+
+def venue_book(book: ConsolidatedBook, venue: str) -> dict:
+    """One venue's levels of a merged book, as a ccxt order book."""
+    v = book.venues.index(venue)
+    return {
+        'bids': np.column_stack((book.bid_prices, book.bid_sizes))[book.bid_venues == v].tolist(),
+        'asks': np.column_stack((book.ask_prices, book.ask_sizes))[book.ask_venues == v].tolist(),
+    }
+
+def _balance_caps(route_side: str, venue_symbols: Dict[str, str], balances: Dict[str, dict]) -> Dict[str, float]:
+    """Spendable balance per venue: the venue symbol's quote currency for buys, its base currency for sells."""
+    caps = {}
+    for venue, venue_symbol in venue_symbols.items():
+        base, quote = venue_symbol.split(':')[0].split('/')
+        free = (balances.get(venue) or {}).get('free') or {}
+        caps[venue] = float(free.get(quote if route_side == 'buy' else base) or 0.0)
+    return caps
+
+def _min_amounts(venue_symbols: Dict[str, str]) -> Dict[str, float]:
+    """
+    Minimum order amount per venue from market metadata, loaded concurrently.
+
+    A venue whose metadata cannot be loaded gets no minimum rather than failing the plan.
+    """
+    def _minimum(venue):
+        try:
+            markets = {m['symbol']: m for m in get_markets(venue, exchanges[venue])}
+        except Exception as e:
+            print(f"Error loading markets for {venue}: {str(e)}")
+            return None
+        limits = (markets.get(venue_symbols[venue]) or {}).get('limits') or {}
+        minimum = (limits.get('amount') or {}).get('min')
+        return float(minimum) if isinstance(minimum, (int, float)) else None
+
+    with ThreadPoolExecutor(max_workers=max(len(venue_symbols), 1)) as pool:
+        minimums = dict(zip(venue_symbols, pool.map(_minimum, venue_symbols)))
+    return {venue: minimum for venue, minimum in minimums.items() if minimum is not None}
+
+def route_order(symbol: str, side: str, amount: float, venue_symbols: Dict[str, str],
+                account_balances: bool = False) -> Tuple[RoutePlan, ConsolidatedBook, Dict[str, Exception]]:
+    """
+    Plan an order over the merged books of several venues, capped by balances and net of fees.
+
+    Args:
+        symbol (str): The symbol as requested
+        side (str): 'buy' or 'sell'
+        amount (float): Base currency amount
+        venue_symbols (dict): Venue name -> venue-specific symbol
+        account_balances (bool): Cap by the account's real balances (venues without API keys are left out)
+                                 instead of the paper exchanges' balances
+
+    Returns:
+        tuple: (RoutePlan, the merged book it was planned on, venue -> exception for venues without a book)
+    """
+    book, errors = get_consolidated_book(symbol, venue_symbols)
+    venues = book.venues
+    schedules = fee_model.get_many(venues)
+    fees = {venue: schedules[venue].taker_fee(book.venue_symbols[venue]) for venue in venues}
+
+    min_amounts = _min_amounts({venue: book.venue_symbols[venue] for venue in venues})
+
+    if account_balances:
+        keyed = [venue for venue in venues if has_credentials(venue)]
+        balances, balance_errors = fetch_balances(keyed)
+        errors.update(balance_errors)
+    else:
+        balances = {venue: paper_exchanges[venue].fetch_balance() for venue in venues}
+    caps = _balance_caps(side, {venue: book.venue_symbols[venue] for venue in venues}, balances)
+
+    route = plan(book, side, amount, fees, caps, min_amounts)
+    for venue in venues:
+        if venue not in route.per_venue and venue not in route.excluded and caps.get(venue, 0) <= 0:
+            base, quote = book.venue_symbols[venue].split(':')[0].split('/')
+            route.excluded[venue] = f"no {quote if side == 'buy' else base} balance"
+    return route, book, errors
+
+def execute_paper(route: RoutePlan, book: ConsolidatedBook) -> Dict[str, object]:
+    """
+    Send a plan's child orders to the paper exchanges, each filled against its venue's part of the merged book.
+
+    Returns:
+        dict: Venue -> ccxt-style order, or the exception raised for that venue
+    """
+    results = {}
+    for venue, child in route.per_venue.items():
+        paper = paper_exchanges[venue]
+        paper.set_order_book(child['symbol'], venue_book(book, venue))
+        try:
+            results[venue] = paper.create_order(child['symbol'], 'market', route.side, child['amount'])
+        except ccxt.BaseError as e:
+            results[venue] = e
+    return results
+
+# Paper exchanges shared by the agent's tools
+paper_exchanges = PaperRegistry()
@@ -0,0 +1,202 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+from graph.symbol_index import USD_EQUIVALENTS
+from graph.async_exchanges import fan_out, fan_out_many
+from graph.exchange_factory import exchange_configs, exchanges
+from graph.exchange_health import health
+from graph.market_cache import get_markets
+from graph.market_data import stream_ticker
+
+# Load environment variables
+load_dotenv()
+
+# How long (seconds) balances and valuation tickers are reused across tool calls
+PORTFOLIO_TTL = float(os.getenv("CEX_PORTFOLIO_TTL", "30"))
+
+# exchange name -> (fetched_at, ccxt balance)
+_balances: Dict[str, Tuple[float, dict]] = {}
+# (exchange name, symbol) -> (fetched_at, price)
+_prices: Dict[Tuple[str, str], Tuple[float, float]] = {}
+_lock = threading.Lock()
+
+def has_credentials(exchange_name: str) -> bool:
+    """Whether API keys are configured for an exchange; balances need them."""
+    config = exchange_configs.get(exchange_name, {})
+    return bool(config.get('apiKey') and config.get('secret'))
+
+def fetch_balances(exchange_list: List[str], max_age: float = PORTFOLIO_TTL) -> Tuple[Dict[str, dict], Dict[str, Exception]]:
+    """
+    Fetch balances from several exchanges concurrently, reusing balances younger than max_age.
+
+    Returns:
+        tuple: (exchange name -> ccxt balance, exchange name -> exception for failed exchanges)
+    """
+    now = time.time()
+    balances, errors = {}, {}
+    with _lock:
+        for exchange_name in exchange_list:
+            entry = _balances.get(exchange_name)
+            if entry and now - entry[0] <= max_age:
+                balances[exchange_name] = entry[1]
+    missing = [name for name in exchange_list if name not in balances]
+    if missing:
+        results = fan_out({name: ('fetch_balance', ()) for name in missing})
+        with _lock:
+            for exchange_name, result in results.items():
+                if isinstance(result, BaseException):
+                    errors[exchange_name] = result
+                else:
+                    balances[exchange_name] = result
+                    _balances[exchange_name] = (time.time(), result)
+    return balances, errors
+
+def _load_symbol_sets(exchange_list: List[str], symbol_sets: Dict[str, set]):
+    """
+    Add the active symbols of several exchanges to `symbol_sets`, with market metadata loaded concurrently.
+
+    An exchange whose markets fail to load, or whose circuit is open, gets an empty set, so it is
+    not tried again while pricing the same holdings.
+    """
+    def _load(exchange_name):
+        try:
+            health.check(exchange_name)
+            markets = get_markets(exchange_name, exchanges[exchange_name])
+            return {m['symbol'] for m in markets if m.get('active') is not False}
+        except Exception:
+            return set()
+
+    with ThreadPoolExecutor(max_workers=max(len(exchange_list), 1)) as pool:
+        symbol_sets.update(zip(exchange_list, pool.map(_load, exchange_list)))
+
+def _usd_symbol(currency: str, symbols: set) -> Optional[str]:
+    """A symbol pricing `currency` in a USD equivalent among an exchange's symbols, if it lists one."""
+    for quote in ('USDT', 'USD', 'USDC'):
+        symbol = f"{currency}/{quote}"
+        if symbol in symbols:
+            return symbol
+    return None
+
+def usd_prices(currencies: Dict[str, List[str]], max_age: float = PORTFOLIO_TTL) -> Dict[str, float]:
+    """
+    Price currencies in USD, treating USD, USDT and USDC as equal.
+
+    Prices come from streamed tickers or the short-lived price cache when possible; the rest
+    are fetched concurrently, one call per (exchange, symbol). Market lists are only loaded for
+    the exchanges a currency still needs, all of a round's at once.
+
+    Args:
+        currencies (dict): Maps currency code to the exchanges to try, in order of preference
+        max_age (float): Reuse cached prices younger than this many seconds
+
+    Returns:
+        dict: Currency code -> USD price, for every currency that could be priced
+    """
+    prices = {c: 1.0 for c in currencies if c in USD_EQUIVALENTS}
+    wanted: Dict[str, Tuple[str, str]] = {}
+    symbol_sets: Dict[str, set] = {}
+    now = time.time()
+    pending = [currency for currency in currencies if currency not in prices]
+    while pending:
+        needed = []
+        for currency in pending:
+            for exchange_name in currencies[currency]:
+                if exchange_name not in symbol_sets:
+                    # The first exchange whose markets are unknown; decide once they are loaded
+                    needed.append(exchange_name)
+                    break
+                symbol = _usd_symbol(currency, symbol_sets[exchange_name])
+                if symbol is None:
+                    continue
+                streamed = stream_ticker(exchange_name, symbol)
+                cached = _prices.get((exchange_name, symbol))
+                if streamed and streamed.get('last'):
+                    prices[currency] = float(streamed['last'])
+                elif cached and now - cached[0] <= max_age:
+                    prices[currency] = cached[1]
+                else:
+                    wanted[currency] = (exchange_name, symbol)
+                break
+        if not needed:
+            break
+        _load_symbol_sets(list(dict.fromkeys(needed)), symbol_sets)
+        pending = [currency for currency in pending if currency not in prices and currency not in wanted]
+
+    if wanted:
+        calls = [(exchange_name, 'fetch_ticker', (symbol,)) for exchange_name, symbol in wanted.values()]
+        for (currency, key), ticker in zip(wanted.items(), fan_out_many(calls)):
+            if isinstance(ticker, BaseException):
+                continue
+            price = ticker.get('last') or (
+                (ticker['bid'] + ticker['ask']) / 2 if ticker.get('bid') and ticker.get('ask') else None
+            )
+            if price:
+                prices[currency] = float(price)
+                _prices[key] = (time.time(), float(price))
+    return prices
+
+def aggregate(exchange_list: List[str], quote: str = 'USD', max_age: float = PORTFOLIO_TTL) -> dict:
+    """
+    Consolidate balances from several exchanges and value them in one currency.
+
+    Args:
+        exchange_list (list): Exchanges to include; exchanges without API keys are skipped
+        quote (str): Currency to value holdings in (e.g., 'USD', 'USDT', 'BTC')
+        max_age (float): Reuse balances and prices younger than this many seconds
+
+    Returns:
+        dict: holdings (list of per-currency dicts sorted by value), total_value, quote,
+              unpriced (currencies without a price), errors, skipped (no credentials)
+    """
+    quote = quote.upper()
+    skipped = [name for name in exchange_list if not has_credentials(name)]
+    balances, errors = fetch_balances([name for name in exchange_list if name not in skipped], max_age)
+
+    holdings: Dict[str, Dict[str, dict]] = {}
+    for exchange_name, balance in balances.items():
+        totals = balance.get('total') or {}
+        free = balance.get('free') or {}
+        used = balance.get('used') or {}
+        for currency, amount in totals.items():
+            if amount:
+                holdings.setdefault(currency, {})[exchange_name] = {
+                    'total': amount, 'free': free.get(currency) or 0, 'used': used.get(currency) or 0
+                }
+
+    # Price each currency where it is held first, then on any other exchange
+    venues = list(balances) + [name for name in exchanges if name not in balances]
+    currencies = {c: [name for name in holdings[c]] + [name for name in venues if name not in holdings[c]] for c in holdings}
+    if quote not in currencies:
+        currencies[quote] = venues
+    prices = usd_prices(currencies, max_age)
+
+    quote_price = prices.get(quote)
+    rows, unpriced = [], []
+    for currency, per_exchange in holdings.items():
+        amount = sum(entry['total'] for entry in per_exchange.values())
+        price = prices[currency] / quote_price if currency in prices and quote_price else None
+        if price is None:
+            unpriced.append(currency)
+        rows.append({
+            'currency': currency,
+            'amount': amount,
+            'free': sum(entry['free'] for entry in per_exchange.values()),
+            'used': sum(entry['used'] for entry in per_exchange.values()),
+            'exchanges': {name: entry['total'] for name, entry in per_exchange.items()},
+            'price': price,
+            'value': amount * price if price is not None else None
+        })
+    rows.sort(key=lambda row: row['value'] if row['value'] is not None else -1, reverse=True)
+
+    return {
+        'holdings': rows,
+        'total_value': sum(row['value'] for row in rows if row['value'] is not None),
+        'quote': quote,
+        'quote_priced': quote_price is not None,
+        'unpriced': unpriced,
+        'errors': errors,
+        'skipped': skipped
+    }
@@ -0,0 +1,149 @@
+import asyncio
+import gzip
+import json
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+import ccxt
+
+# Recorded feeds are JSON lines, optionally gzipped, one message per line:
+# {"ts": 1718000000.123, "channel": "ticker" | "book", "exchange": "binance", "symbol": "BTC/USDT", "data": {...}}
+# where data is what ccxt.pro's watch_ticker / watch_order_book returned.
+
+def book_snapshot(book: dict, depth: int) -> dict:
+    """Copy the top levels of a ccxt order book into a plain, JSON-serializable dict."""
+    return {
+        'bids': [level[:2] for level in book['bids'][:depth]],
+        'asks': [level[:2] for level in book['asks'][:depth]],
+        'timestamp': book.get('timestamp'),
+        'datetime': book.get('datetime'),
+        'nonce': book.get('nonce')
+    }
+
+def _open(path: str, mode: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+class RecordedFeed:
+    """Market data captured from exchange WebSocket feeds, replayable without a network connection."""
+
+    def __init__(self, messages: List[dict], speed: float = 1.0, loop: bool = True):
+        """
+        Args:
+            messages (list): Recorded messages in the format described above
+            speed (float): Replay speed multiplier; 0 replays as fast as possible
+            loop (bool): Restart each stream from the beginning when it runs out
+        """
+        self.speed = speed
+        self.loop = loop
+        self.streams: Dict[Tuple[str, str, str], List[Tuple[float, dict]]] = defaultdict(list)
+        for message in sorted(messages, key=lambda m: m["ts"]):
+            key = (message["channel"], message["exchange"], message["symbol"])
+            self.streams[key].append((message["ts"], message["data"]))
+
+    @classmethod
+    def load(cls, path: str, speed: float = 1.0, loop: bool = True) -> "RecordedFeed":
+        """Load a recorded feed file."""
+        with _open(path, "r") as f:
+            messages = [json.loads(line) for line in f if line.strip()]
+        return cls(messages, speed=speed, loop=loop)
+
+    def client(self, exchange_name: str) -> "RecordedFeedClient":
+        """Create a stand-in for a ccxt.pro client of one exchange."""
+        return RecordedFeedClient(self, exchange_name)
+
+class RecordedFeedClient:
+    """Implements the subset of the ccxt.pro client interface used by MarketDataService."""
+
+    def __init__(self, feed: RecordedFeed, exchange_name: str):
+        self.id = exchange_name
+        self.markets = {}
+        self._feed = feed
+        self._cursors: Dict[Tuple[str, str], int] = {}
+
+    def set_markets(self, markets, currencies=None):
+        self.markets = {m['symbol']: m for m in (markets.values() if isinstance(markets, dict) else markets)}
+
+    async def _next(self, channel: str, symbol: str) -> dict:
+        stream = self._feed.streams.get((channel, self.id, symbol))
+        if not stream:
+            raise ccxt.BadSymbol(f"{self.id} has no recorded {channel} messages for {symbol}")
+        position = self._cursors.get((channel, symbol), 0)
+        if position >= len(stream):
+            if not self._feed.loop:
+                # The recording is exhausted; behave like a feed that went quiet
+                await asyncio.Event().wait()
+            position = 0
+        if position > 0 and self._feed.speed > 0:
+            gap = stream[position][0] - stream[position - 1][0]
+            await asyncio.sleep(max(gap, 0) / self._feed.speed)
+        elif position == 0 and (channel, symbol) in self._cursors and self._feed.speed > 0:
+            # Looping back to the start; pause as long as the average gap
+            average_gap = (stream[-1][0] - stream[0][0]) / max(len(stream) - 1, 1)
+            await asyncio.sleep(average_gap / self._feed.speed)
+        else:
+            await asyncio.sleep(0)
+        self._cursors[(channel, symbol)] = position + 1
+        return stream[position][1]
+
+    async def watch_ticker(self, symbol: str, params: Optional[dict] = None) -> dict:
+        return await self._next("ticker", symbol)
+
+    async def watch_order_book(self, symbol: str, limit: Optional[int] = None, params: Optional[dict] = None) -> dict:
+        book = await self._next("book", symbol)
+        if limit is None:
+            return book
+        return {**book, 'bids': book['bids'][:limit], 'asks': book['asks'][:limit]}
+
+    async def close(self):
+        pass
+
+async def record(path: str, subscriptions: List[Tuple[str, str, str]], duration: float, book_depth: int = 50):
+    """
+    Record live WebSocket messages to a feed file.
+
+    Args:
+        path (str): Output file; a '.gz' suffix writes a gzipped file
+        subscriptions (list): (channel, exchange_name, symbol) tuples to record
+        duration (float): Number of seconds to record
+        book_depth (int): Order book levels kept per side
+    """
+    from graph.exchange_factory import create_pro_exchange
+
+    clients = {}
+    deadline = time.time() + duration
+
+    with _open(path, "w") as out:
+        async def _record_one(channel: str, exchange_name: str, symbol: str):
+            if exchange_name not in clients:
+                clients[exchange_name] = create_pro_exchange(exchange_name)
+            client = clients[exchange_name]
+            while time.time() < deadline:
+                if channel == "book":
+                    book = await client.watch_order_book(symbol, book_depth)
+                    data = book_snapshot(book, book_depth)
+                else:
+                    data = await client.watch_ticker(symbol)
+                message = {"ts": time.time(), "channel": channel, "exchange": exchange_name, "symbol": symbol, "data": data}
+                out.write(json.dumps(message, default=str) + "\n")
+
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(_record_one(*subscription) for subscription in subscriptions), return_exceptions=True),
+                duration + 5
+            )
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            for client in clients.values():
+                await client.close()
+
+if __name__ == "__main__":
+    # Usage: python -m graph.recorded_feed OUTPUT SECONDS channel:exchange:symbol [...]
+    # e.g.   python -m graph.recorded_feed feed.jsonl.gz 60 ticker:binance:BTC/USDT book:kraken:BTC/USD
+    output_path, seconds = sys.argv[1], float(sys.argv[2])
+    subs = [tuple(arg.split(":", 2)) for arg in sys.argv[3:]]
+    asyncio.run(record(output_path, subs, seconds))
+    print(f"Recorded {len(subs)} feed(s) for {seconds:.0f}s to {output_path}")
@@ -0,0 +1,226 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Request priorities; lower runs first
+INTERACTIVE = 0
+BACKGROUND = 10
+
+# Requests an exchange may send back to back before the steady rate applies
+RATE_LIMIT_BURST = float(os.getenv("CEX_RATE_LIMIT_BURST", "1"))
+
+# Used when a client does not report ccxt's rateLimit (milliseconds between requests)
+DEFAULT_RATE_LIMIT_MS = 1000
+
+def is_coalescable(method: str) -> bool:
+    """Only read calls are shared between callers; anything that changes state always runs."""
+    return method.startswith('fetch')
+
+class TokenBucket:
+    """
+    Token bucket with a priority queue of waiters.
+
+    Tokens refill at `rate` per second up to `capacity`. Waiters are served lowest priority
+    value first and in arrival order within a priority. A waiter is granted once a whole token
+    is available and then pays its full cost, which may leave the bucket in debt that later
+    waiters wait out. Must be used on a single event loop.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._waiters: List[Tuple[int, int, asyncio.Future, float]] = []
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def queued(self) -> int:
+        """Number of callers waiting for a token."""
+        return len({id(future) for _, _, future, _ in self._waiters if not future.done()})
+
+    def enqueue(self, priority: int, cost: float = 1.0) -> asyncio.Future:
+        """Queue a waiter; the returned future resolves when it is granted `cost` tokens."""
+        future = asyncio.get_running_loop().create_future()
+        self.promote(future, priority, cost)
+        return future
+
+    def promote(self, future: asyncio.Future, priority: int, cost: float = 1.0):
+        """(Re)queue a waiter at `priority`; an earlier entry at a lower priority is skipped once granted."""
+        heapq.heappush(self._waiters, (priority, next(self._seq), future, cost))
+        self._dispatch()
+
+    def _dispatch(self):
+        self._timer = None
+        self._refill()
+        while self._waiters:
+            future = self._waiters[0][2]
+            if future.done():
+                # Cancelled, or already granted through a higher-priority entry
+                heapq.heappop(self._waiters)
+                continue
+            if self.tokens < 1:
+                break
+            _, _, _, cost = heapq.heappop(self._waiters)
+            self.tokens -= cost
+            future.set_result(None)
+        if self._waiters and self._timer is None:
+            delay = (1 - self.tokens) / self.rate if self.rate > 0 else 1.0
+            self._timer = asyncio.get_running_loop().call_later(max(delay, 0.0), self._dispatch)
+
+    async def acquire(self, priority: int = INTERACTIVE, cost: float = 1.0):
+        """Wait for `cost` tokens."""
+        await self.enqueue(priority, cost)
+
+class _Flight:
+    """One upstream call shared by every caller that asked for the same thing while it ran."""
+
+    def __init__(self, priority: int):
+        self.priority = priority
+        self.ticket: Optional[asyncio.Future] = None
+        self.task: Optional[asyncio.Task] = None
+        self.waiters = 0
+        # Tokens already paid by the ticket, counted towards the cost of its first upstream request
+        self.prepaid = 0.0
+
+# The flight whose call is running in the current task, for pricing its upstream requests
+_current_flight: contextvars.ContextVar[Optional[_Flight]] = contextvars.ContextVar('current_flight', default=None)
+
+class RequestScheduler:
+    """
+    Shared gate in front of the exchange clients.
+
+    Every request takes a token from its exchange's bucket, sized from the client's ccxt
+    rateLimit, so concurrent sessions never exceed what the exchange allows. Clients hooked up
+    with `throttler` also pay ccxt's cost of each endpoint they call, so a bulk ticker request
+    is paced like the dozens of single ones it replaces. Interactive
+    requests are granted tokens before background ones. Identical read requests issued while
+    one is already queued or in flight join it instead of sending another upstream call.
+    """
+
+    def __init__(self, burst: float = RATE_LIMIT_BURST):
+        self.burst = burst
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._inflight: Dict[Tuple[str, str, str], _Flight] = {}
+        self._counts: Dict[str, Dict[str, int]] = {}
+
+    def bucket(self, exchange_name: str, rate_limit_ms: Optional[float] = None) -> TokenBucket:
+        """The token bucket for an exchange, created from its rateLimit on first use."""
+        bucket = self._buckets.get(exchange_name)
+        if bucket is None:
+            rate = 1000.0 / (rate_limit_ms or DEFAULT_RATE_LIMIT_MS)
+            bucket = self._buckets[exchange_name] = TokenBucket(rate, self.burst)
+        return bucket
+
+    def throttler(self, exchange_name: str, rate_limit_ms: Optional[float] = None) -> Callable[..., Awaitable[None]]:
+        """
+        A replacement for a ccxt client's `throttle`, charging each upstream request's cost to the exchange's bucket.
+
+        ccxt calls it with the endpoint's rate limit cost (in rateLimit units) before every HTTP
+        request. Requests made by a scheduled call wait at that call's priority, and its first one
+        is partly paid by the token that admitted the call.
+        """
+        async def throttle(cost: Optional[float] = None):
+            cost = 1.0 if cost is None else float(cost)
+            flight = _current_flight.get()
+            priority = INTERACTIVE
+            if flight is not None:
+                priority = flight.priority
+                paid = min(cost, flight.prepaid)
+                flight.prepaid -= paid
+                cost -= paid
+            if cost > 0:
+                await self.bucket(exchange_name, rate_limit_ms).acquire(priority, cost)
+        return throttle
+
+    def _count(self, exchange_name: str, field: str):
+        counts = self._counts.setdefault(exchange_name, {'requests': 0, 'coalesced': 0})
+        counts[field] += 1
+
+    async def submit(self, exchange_name: str, method: str, args: Tuple, call: Callable[[], Awaitable[Any]],
+                     priority: int = INTERACTIVE, timeout: Optional[float] = None,
+                     rate_limit_ms: Optional[float] = None, coalesce: bool = True) -> Any:
+        """
+        Run `call` once a token is available, sharing it with identical concurrent requests.
+
+        Args:
+            exchange_name (str): Exchange whose rate limit applies
+            method (str): ccxt method name; only fetch* calls are coalesced
+            args (tuple): Positional arguments, part of the coalescing key
+            call: Zero-argument coroutine function performing the upstream request
+            priority (int): INTERACTIVE or BACKGROUND
+            timeout (float): Seconds this caller waits, queueing included
+            rate_limit_ms (float): The client's rateLimit, used when the bucket is created
+            coalesce (bool): False always sends a separate request (e.g., a hedge for a slow one)
+
+        Returns:
+            The call's result; raises what the call raised, or asyncio.TimeoutError
+        """
+        bucket = self.bucket(exchange_name, rate_limit_ms)
+        key = (exchange_name, method, repr(args)) if coalesce and is_coalescable(method) else None
+        flight = self._inflight.get(key) if key else None
+        if flight is not None:
+            self._count(exchange_name, 'coalesced')
+            if priority < flight.priority:
+                # An interactive caller joined a queued background request: move it up
+                flight.priority = priority
+                if flight.ticket is not None and not flight.ticket.done():
+                    bucket.promote(flight.ticket, priority)
+        else:
+            self._count(exchange_name, 'requests')
+            flight = _Flight(priority)
+            flight.task = asyncio.get_running_loop().create_task(self._run(bucket, flight, call))
+            if key:
+                self._inflight[key] = flight
+                flight.task.add_done_callback(lambda _, key=key, flight=flight: self._land(key, flight))
+
+        flight.waiters += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(flight.task), timeout)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Every caller gave up; do not spend a token on a result nobody reads
+                flight.task.cancel()
+
+    async def _run(self, bucket: TokenBucket, flight: _Flight, call: Callable[[], Awaitable[Any]]) -> Any:
+        flight.ticket = bucket.enqueue(flight.priority)
+        try:
+            await flight.ticket
+        finally:
+            flight.ticket.cancel()
+        flight.prepaid = 1.0
+        _current_flight.set(flight)
+        return await call()
+
+    def _land(self, key: Tuple[str, str, str], flight: _Flight):
+        # Later identical requests go upstream again and see fresh data
+        if self._inflight.get(key) is flight:
+            del self._inflight[key]
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Per exchange: upstream requests sent, requests served by joining another, callers queued and the refill rate."""
+        return {
+            name: {
+                **self._counts.get(name, {'requests': 0, 'coalesced': 0}),
+                'queued': bucket.queued(),
+                'rate_per_second': bucket.rate
+            }
+            for name, bucket in list(self._buckets.items())
+        }
+
+# Scheduler shared by every async exchange call; only used on the background event loop
+scheduler = RequestScheduler()
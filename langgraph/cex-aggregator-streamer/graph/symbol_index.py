@@ -0,0 +1,217 @@
+import bisect
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import ccxt
+from graph.exchange_factory import exchange_base_currencies, exchanges, format_symbol, pairs_black_list
+from graph.market_cache import get_markets
+
+# Quote currencies treated as interchangeable when matching symbols across exchanges
+USD_EQUIVALENTS = ('USD', 'USDT', 'USDC')
+
+# Names users and exchanges use for a currency, mapped to the unified code
+CURRENCY_ALIASES = {
+    'XBT': 'BTC',
+    'BITCOIN': 'BTC',
+    'XDG': 'DOGE',
+    'ETHER': 'ETH',
+    'ETHEREUM': 'ETH',
+    'TETHER': 'USDT',
+    'DOLLAR': 'USD',
+    'DOLLARS': 'USD',
+}
+
+_SEPARATORS = re.compile(r'[\s\-_]+')
+
+class UnknownSymbol(ccxt.BadSymbol):
+    """A symbol that is not listed on an exchange; raised before any request is made."""
+
+def normalize(symbol: str) -> str:
+    """Upper-case a user symbol and turn '-', '_' and spaces into '/' (e.g., 'btc-usdt' -> 'BTC/USDT')."""
+    return _SEPARATORS.sub('/', symbol.strip().upper()).strip('/')
+
+def _canonical(symbol: str) -> str:
+    """Replace currency aliases in a normalized symbol (e.g., 'XBT/USD' -> 'BTC/USD')."""
+    pair, colon, settle = symbol.partition(':')
+    parts = [CURRENCY_ALIASES.get(part, part) for part in pair.split('/')]
+    return '/'.join(parts) + colon + CURRENCY_ALIASES.get(settle, settle)
+
+class ExchangeSymbols:
+    """
+    Resolution table for one exchange, built once from its market list.
+
+    Every accepted spelling of a market (unified symbol, exchange id, 'BTCUSDT', a bare base,
+    a USD-equivalent quote) is a key of one dict, so resolving a symbol is a constant number
+    of dictionary lookups.
+    """
+
+    def __init__(self, exchange_name: str, markets: List[dict]):
+        self.exchange_name = exchange_name
+        self.markets = markets
+        blacklist = set(pairs_black_list.get(exchange_name, []))
+        default_quote = exchange_base_currencies.get(exchange_name)
+        quote_rank = {quote: rank for rank, quote in enumerate(
+            ([default_quote] if default_quote else []) + [q for q in ('USDT', 'USD', 'USDC') if q != default_quote]
+        )}
+
+        ranked: Dict[str, Tuple[int, str]] = {}
+
+        def _add(key: str, rank: int, symbol: str):
+            current = ranked.get(key)
+            if current is None or rank < current[0]:
+                ranked[key] = (rank, symbol)
+
+        self.symbols: List[str] = []
+        self.by_base: Dict[str, List[str]] = {}
+        for market in markets:
+            symbol = market.get('symbol')
+            if not symbol or symbol in blacklist or market.get('active') is False:
+                continue
+            self.symbols.append(symbol)
+            spot = market.get('spot') or market.get('type', 'spot') == 'spot'
+            _add(symbol.upper(), 0 if spot else 1, symbol)
+            if market.get('id'):
+                _add(str(market['id']).upper(), 1 if spot else 2, symbol)
+            base, quote = market.get('base'), market.get('quote')
+            if not spot or not base or not quote:
+                continue
+            base, quote = base.upper(), quote.upper()
+            self.by_base.setdefault(base, []).append(symbol)
+            _add(f"{base}{quote}", 1, symbol)
+            if quote in USD_EQUIVALENTS:
+                # 'BTC/USD' finds BTC/USDT on an exchange without a USD book, and vice versa
+                for equivalent in USD_EQUIVALENTS:
+                    _add(f"{base}/{equivalent}", 3 + quote_rank.get(quote, 9), symbol)
+                    _add(f"{base}{equivalent}", 3 + quote_rank.get(quote, 9), symbol)
+            # A bare base resolves to the exchange's default quote, then USD equivalents, then anything
+            _add(base, 10 + quote_rank.get(quote, 9), symbol)
+
+        self.lookup: Dict[str, str] = {key: symbol for key, (_, symbol) in ranked.items()}
+        self.symbols.sort()
+
+    def resolve(self, symbol: str) -> Optional[str]:
+        """The exchange's unified symbol for a user symbol, or None if it is not listed."""
+        key = normalize(symbol)
+        found = self.lookup.get(key) or self.lookup.get(key.replace('/', ''))
+        if found is None:
+            canonical = _canonical(key)
+            if canonical != key:
+                found = self.lookup.get(canonical)
+        return found
+
+    def suggestions(self, symbol: str, limit: int = 5) -> List[str]:
+        """Listed symbols sharing the requested base, or starting with its first letters."""
+        base = _canonical(normalize(symbol)).split('/')[0]
+        candidates = self.by_base.get(base)
+        if candidates:
+            return sorted(candidates)[:limit]
+        return prefix_search(self.symbols, base[:3], limit) if base else []
+
+def prefix_search(sorted_symbols: List[str], prefix: str, limit: int = 20) -> List[str]:
+    """Symbols in a sorted list that start with `prefix`, found by binary search."""
+    start = bisect.bisect_left(sorted_symbols, prefix)
+    end = bisect.bisect_left(sorted_symbols, prefix + '\uffff', lo=start)
+    return sorted_symbols[start:min(end, start + limit)]
+
+class SymbolIndex:
+    """
+    Cross-exchange symbol index, built per exchange from the shared market cache.
+
+    An exchange's table is rebuilt only when the market cache hands out a new market list.
+    """
+
+    def __init__(self):
+        self._tables: Dict[str, ExchangeSymbols] = {}
+        self._lock = threading.Lock()
+        self._all_symbols: Optional[List[str]] = None
+        self._venues: Dict[str, List[str]] = {}
+
+    def table(self, exchange_name: str) -> ExchangeSymbols:
+        """The resolution table for an exchange; may download its markets on a cold cache."""
+        markets = get_markets(exchange_name, exchanges[exchange_name])
+        table = self._tables.get(exchange_name)
+        if table is None or table.markets is not markets:
+            table = ExchangeSymbols(exchange_name, markets)
+            with self._lock:
+                self._tables[exchange_name] = table
+                self._all_symbols = None
+        return table
+
+    def resolve(self, exchange_name: str, symbol: str) -> str:
+        """
+        Resolve a user symbol to the exchange's unified symbol without a network round-trip.
+
+        Raises:
+            UnknownSymbol: The exchange does not list the symbol (the message includes suggestions)
+        """
+        try:
+            table = self.table(exchange_name)
+        except ccxt.BaseError:
+            # Markets unavailable: fall back to guessing the quote and let the exchange decide
+            return format_symbol(exchange_name, normalize(symbol))
+        found = table.resolve(symbol)
+        if found is None:
+            message = f"'{symbol}' is not listed on {exchange_name.capitalize()}."
+            suggestions = table.suggestions(symbol)
+            if suggestions:
+                message += f" Did you mean: {', '.join(suggestions)}?"
+            raise UnknownSymbol(message)
+        return found
+
+    def resolve_many(self, exchange_list: List[str], symbol: str) -> Tuple[Dict[str, str], Dict[str, UnknownSymbol]]:
+        """
+        Resolve a symbol on several exchanges.
+
+        Returns:
+            tuple: (exchange name -> exchange symbol, exchange name -> UnknownSymbol for exchanges not listing it)
+        """
+        def _resolve(exchange_name):
+            try:
+                return self.resolve(exchange_name, symbol)
+            except UnknownSymbol as e:
+                return e
+
+        # Tables are built concurrently so exchanges with a cold market cache download in parallel
+        with ThreadPoolExecutor(max_workers=max(len(exchange_list), 1)) as pool:
+            results = dict(zip(exchange_list, pool.map(_resolve, exchange_list)))
+        resolved = {name: result for name, result in results.items() if not isinstance(result, UnknownSymbol)}
+        missing = {name: result for name, result in results.items() if isinstance(result, UnknownSymbol)}
+        return resolved, missing
+
+    def search(self, prefix: str, exchange_list: Optional[List[str]] = None, limit: int = 20) -> List[Tuple[str, List[str]]]:
+        """
+        Find listed symbols starting with `prefix` (e.g., 'ETH' or 'SOL/US').
+
+        Returns:
+            list: (symbol, exchanges listing it) sorted by symbol
+        """
+        exchange_list = list(exchanges.keys()) if exchange_list is None else exchange_list
+        for exchange_name in exchange_list:
+            try:
+                self.table(exchange_name)
+            except ccxt.BaseError:
+                continue
+        with self._lock:
+            if self._all_symbols is None:
+                venues: Dict[str, List[str]] = {}
+                for exchange_name, table in self._tables.items():
+                    for symbol in table.symbols:
+                        venues.setdefault(symbol, []).append(exchange_name)
+                self._venues = venues
+                self._all_symbols = sorted(venues)
+            all_symbols, venues = self._all_symbols, self._venues
+
+        prefix = _canonical(normalize(prefix))
+        wanted = set(exchange_list)
+        results = []
+        for symbol in prefix_search(all_symbols, prefix, len(all_symbols)):
+            listed = [name for name in venues[symbol] if name in wanted]
+            if listed:
+                results.append((symbol, listed))
+                if len(results) >= limit:
+                    break
+        return results
+
+# Shared index used by the agent's tools
+symbol_index = SymbolIndex()
@@ -0,0 +1,409 @@
+import asyncio
+import gzip
+import json
+import os
+import shutil
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import quote, unquote
+import pandas as pd
+from dotenv import load_dotenv
+from graph.async_exchanges import gather_many, get_event_loop, run_async
+from graph.market_cache import CACHE_DIR
+from graph.market_data import market_data
+from graph.request_scheduler import BACKGROUND
+
+# Load environment variables
+load_dotenv()
+
+# Root directory of recorded market data
+RECORDER_DIR = os.getenv("CEX_RECORDER_DIR", os.path.join(CACHE_DIR, "ticks"))
+
+# Streams recorded by the server, e.g. "binance:BTC/USDT,kraken:BTC/USD" (empty disables the recorder)
+RECORDER_SYMBOLS = os.getenv("CEX_RECORDER_SYMBOLS", "")
+
+# Channels recorded for each symbol
+RECORDER_CHANNELS = [c.strip() for c in os.getenv("CEX_RECORDER_CHANNELS", "ticker,book").split(",") if c.strip()]
+
+# Minimum seconds between two recorded snapshots of one stream
+RECORDER_SAMPLE_INTERVAL = float(os.getenv("CEX_RECORDER_SAMPLE_INTERVAL", "1"))
+
+# Seconds between writes of buffered snapshots to disk
+RECORDER_FLUSH_INTERVAL = float(os.getenv("CEX_RECORDER_FLUSH_INTERVAL", "10"))
+
+# Order book levels recorded per side
+RECORDER_BOOK_DEPTH = int(os.getenv("CEX_RECORDER_BOOK_DEPTH", "20"))
+
+# Full book snapshot after this many deltas (every partition file also starts with one)
+RECORDER_KEYFRAME_INTERVAL = int(os.getenv("CEX_RECORDER_KEYFRAME_INTERVAL", "300"))
+
+# Days of partitions kept; 0 keeps everything
+RECORDER_RETENTION_DAYS = float(os.getenv("CEX_RECORDER_RETENTION_DAYS", "30"))
+
+# Ticker fields kept in the recording
+TICKER_FIELDS = ('bid', 'ask', 'last', 'bidVolume', 'askVolume', 'baseVolume', 'quoteVolume')
+
+# Layout: RECORDER_DIR/<exchange>/<symbol>/<channel>/<YYYY-MM-DD>/<HH>.jsonl.gz, one JSON object per line:
+#   ticker: {"ts": 1718000000.1, "bid": ..., "ask": ..., "last": ..., ...}
+#   book:   {"ts": ..., "key": true, "bids": [[price, amount], ...], "asks": [...]}   full snapshot
+#           {"ts": ..., "bids": [[price, amount], ...], "asks": [...]}                changed levels; amount 0 removes a level
+# A partition is appended to as a series of gzip members and recompressed into one once its hour is over.
+
+def parse_streams(value: str) -> List[Tuple[str, str]]:
+    """Parse "exchange:SYMBOL,exchange:SYMBOL" into (exchange, symbol) pairs."""
+    streams = []
+    for item in value.split(","):
+        exchange_name, _, symbol = item.strip().partition(":")
+        if exchange_name and symbol:
+            streams.append((exchange_name.lower(), symbol.upper()))
+    return streams
+
+# First bytes of every gzip member (magic number and deflate method)
+GZIP_HEADER = b"\x1f\x8b\x08"
+
+def gzip_members(data: bytes) -> Iterator[bytes]:
+    """
+    Decompressed contents of each intact gzip member, in order.
+
+    A member that is torn or still being written is skipped by resyncing at the next gzip header,
+    so one interrupted append does not hide the ones after it.
+    """
+    view, position = memoryview(data), 0
+    while position < len(data):
+        decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+        try:
+            content = decompressor.decompress(view[position:])
+        except zlib.error:
+            content = None
+        if content is not None and decompressor.eof:
+            yield content
+            position = len(data) - len(decompressor.unused_data)
+            continue
+        position = data.find(GZIP_HEADER, position + 1)
+        if position < 0:
+            return
+
+def _hour(ts: float) -> datetime:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+def book_delta(previous: Dict[str, Dict[float, float]], book: dict, depth: int) -> Tuple[Dict[str, Dict[float, float]], dict]:
+    """
+    Levels that changed between two book snapshots.
+
+    Returns:
+        tuple: (the new book as {side: {price: amount}}, {side: [[price, amount], ...]} with 0 for removed levels)
+    """
+    current, delta = {}, {}
+    for side in ('bids', 'asks'):
+        levels = {float(level[0]): float(level[1]) for level in book.get(side, [])[:depth]}
+        before = previous.get(side, {})
+        changes = [[price, amount] for price, amount in levels.items() if before.get(price) != amount]
+        changes += [[price, 0.0] for price in before if price not in levels]
+        current[side], delta[side] = levels, changes
+    return current, delta
+
+def apply_delta(state: Dict[str, Dict[float, float]], record: dict) -> Dict[str, Dict[float, float]]:
+    """Apply a recorded keyframe or delta to a {side: {price: amount}} book in place."""
+    for side in ('bids', 'asks'):
+        levels = state.setdefault(side, {})
+        if record.get('key'):
+            levels.clear()
+        for price, amount in record.get(side, []):
+            if amount:
+                levels[price] = amount
+            else:
+                levels.pop(price, None)
+    return state
+
+def materialize(state: Dict[str, Dict[float, float]], depth: Optional[int] = None) -> dict:
+    """Sorted bid/ask level lists from a {side: {price: amount}} book."""
+    return {
+        'bids': sorted(([p, a] for p, a in state.get('bids', {}).items()), key=lambda level: -level[0])[:depth],
+        'asks': sorted(([p, a] for p, a in state.get('asks', {}).items()), key=lambda level: level[0])[:depth],
+    }
+
+class TickStore:
+    """Reads and writes the time-partitioned recording files."""
+
+    def __init__(self, root: str = RECORDER_DIR):
+        self.root = root
+
+    def stream_dir(self, exchange_name: str, symbol: str, channel: str) -> str:
+        return os.path.join(self.root, exchange_name, quote(symbol, safe=''), channel)
+
+    def partition_path(self, exchange_name: str, symbol: str, channel: str, hour: datetime) -> str:
+        return os.path.join(self.stream_dir(exchange_name, symbol, channel), hour.strftime("%Y-%m-%d"), hour.strftime("%H.jsonl.gz"))
+
+    def append(self, path: str, lines: List[str]):
+        """Append lines to a partition as one gzip member."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with gzip.open(path, "ab") as f:
+            f.write(("\n".join(lines) + "\n").encode("utf-8"))
+
+    def compact(self, path: str):
+        """Recompress a finished partition's intact gzip members into one, which compresses far better."""
+        if not os.path.exists(path):
+            return
+        temp_path = f"{path}.tmp"
+        with open(path, "rb") as source:
+            data = source.read()
+        with gzip.open(temp_path, "wb", compresslevel=9) as target:
+            for content in gzip_members(data):
+                target.write(content)
+        os.replace(temp_path, path)
+
+    def partitions(self, exchange_name: str, symbol: str, channel: str, start: float, end: float) -> List[str]:
+        """Existing partition files overlapping [start, end], oldest first; only those hours are opened."""
+        paths, hour = [], _hour(start)
+        while hour.timestamp() <= end:
+            path = self.partition_path(exchange_name, symbol, channel, hour)
+            if os.path.exists(path):
+                paths.append(path)
+            hour += timedelta(hours=1)
+        return paths
+
+    def _records(self, path: str) -> Iterator[dict]:
+        with open(path, "rb") as f:
+            data = f.read()
+        for content in gzip_members(data):
+            for line in content.decode("utf-8", errors="replace").splitlines():
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+    def read(self, exchange_name: str, symbol: str, channel: str, start: float, end: float,
+             depth: Optional[int] = None) -> Iterator[dict]:
+        """
+        Recorded snapshots of one stream between two Unix timestamps.
+
+        Book deltas are applied from the keyframe that opens each partition, so every yielded
+        book is complete: {'ts', 'bids', 'asks'}.
+        """
+        for path in self.partitions(exchange_name, symbol, channel, start, end):
+            state: Dict[str, Dict[float, float]] = {}
+            for record in self._records(path):
+                if channel == "book":
+                    apply_delta(state, record)
+                ts = record['ts']
+                if ts < start:
+                    continue
+                if ts > end:
+                    break
+                yield {'ts': ts, **materialize(state, depth)} if channel == "book" else record
+
+    def ticker_history(self, exchange_name: str, symbol: str, start: float, end: float) -> pd.DataFrame:
+        """Recorded tickers as a DataFrame indexed by UTC time, with a spread_pct column."""
+        df = pd.DataFrame(list(self.read(exchange_name, symbol, "ticker", start, end)))
+        if df.empty:
+            return df
+        df.index = pd.to_datetime(df.pop('ts'), unit='s', utc=True)
+        mid = (df['bid'] + df['ask']) / 2
+        df['spread_pct'] = (df['ask'] - df['bid']) / mid * 100
+        return df
+
+    def recorded_streams(self) -> List[Tuple[str, str, str]]:
+        """(exchange, symbol, channel) of every stream with data on disk."""
+        streams = []
+        if not os.path.isdir(self.root):
+            return streams
+        for exchange_name in sorted(os.listdir(self.root)):
+            exchange_dir = os.path.join(self.root, exchange_name)
+            for safe_symbol in sorted(os.listdir(exchange_dir)) if os.path.isdir(exchange_dir) else []:
+                for channel in sorted(os.listdir(os.path.join(exchange_dir, safe_symbol))):
+                    streams.append((exchange_name, unquote(safe_symbol), channel))
+        return streams
+
+    def prune(self, retention_days: float = RECORDER_RETENTION_DAYS):
+        """Delete day directories older than the retention period."""
+        if retention_days <= 0:
+            return
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=retention_days)).strftime("%Y-%m-%d")
+        for exchange_name, symbol, channel in self.recorded_streams():
+            stream_dir = self.stream_dir(exchange_name, symbol, channel)
+            for day in os.listdir(stream_dir):
+                if day < cutoff:
+                    shutil.rmtree(os.path.join(stream_dir, day), ignore_errors=True)
+
+class _StreamState:
+    """Encoder state of one recorded stream."""
+
+    def __init__(self):
+        self.last_recorded = 0.0
+        self.hour: Optional[datetime] = None
+        self.book: Dict[str, Dict[float, float]] = {}
+        self.deltas = 0
+
+class TickRecorder:
+    """
+    Records tickers and order books of configured symbols from the market data service.
+
+    Updates are sampled at most once per RECORDER_SAMPLE_INTERVAL per stream, encoded on the
+    background loop (books as deltas against the previous snapshot), buffered and written to
+    hourly partitions every RECORDER_FLUSH_INTERVAL seconds. Symbols that are not streaming
+    are polled over REST at background priority.
+    """
+
+    def __init__(self, store: Optional[TickStore] = None, service=market_data,
+                 sample_interval: float = RECORDER_SAMPLE_INTERVAL, flush_interval: float = RECORDER_FLUSH_INTERVAL,
+                 book_depth: int = RECORDER_BOOK_DEPTH, keyframe_interval: int = RECORDER_KEYFRAME_INTERVAL):
+        self.store = store or TickStore()
+        self.service = service
+        self.sample_interval = sample_interval
+        self.flush_interval = flush_interval
+        self.book_depth = book_depth
+        self.keyframe_interval = keyframe_interval
+        self.streams: List[Tuple[str, str, str]] = []
+        self._state: Dict[Tuple[str, str, str], _StreamState] = {}
+        self._buffer: Dict[str, List[str]] = {}
+        self._finished: List[str] = []
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.written = 0
+
+    def start(self, streams: List[Tuple[str, str]], channels: List[str] = RECORDER_CHANNELS):
+        """Start recording (exchange, symbol) pairs on the given channels."""
+        self.streams = [(channel, exchange_name, symbol) for exchange_name, symbol in streams for channel in channels]
+        self._state = {key: _StreamState() for key in self.streams}
+        self.service.add_listener(self._on_update)
+        for channel, exchange_name, symbol in self.streams:
+            self.service.subscribe(exchange_name, symbol, channel)
+        get_event_loop().call_soon_threadsafe(self._start_task)
+
+    def _start_task(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def _on_update(self, channel: str, exchange_name: str, symbol: str, data: dict):
+        """Market data listener; runs on the background loop."""
+        self.record(channel, exchange_name, symbol, data)
+
+    def record(self, channel: str, exchange_name: str, symbol: str, data: dict, ts: Optional[float] = None):
+        """Encode one snapshot into the write buffer if its stream is recorded and due for a sample."""
+        state = self._state.get((channel, exchange_name, symbol))
+        if state is None:
+            return
+        ts = time.time() if ts is None else ts
+        if ts - state.last_recorded < self.sample_interval:
+            return
+        state.last_recorded = ts
+        hour = _hour(ts)
+        path = self.store.partition_path(exchange_name, symbol, channel, hour)
+        if state.hour != hour:
+            if state.hour is not None:
+                self._finished.append(self.store.partition_path(exchange_name, symbol, channel, state.hour))
+            # Every partition opens with a full book so it can be read on its own
+            state.hour, state.book, state.deltas = hour, {}, self.keyframe_interval
+
+        if channel == "book":
+            keyframe = state.deltas >= self.keyframe_interval
+            book, delta = book_delta({} if keyframe else state.book, data, self.book_depth)
+            if not keyframe and not delta['bids'] and not delta['asks']:
+                return
+            state.book = book
+            state.deltas = 0 if keyframe else state.deltas + 1
+            record = {'ts': round(ts, 3), **({'key': True} if keyframe else {}), **delta}
+        else:
+            record = {'ts': round(ts, 3), **{field: data.get(field) for field in TICKER_FIELDS}}
+        self._buffer.setdefault(path, []).append(json.dumps(record, separators=(',', ':')))
+
+    async def _run(self):
+        last_prune = 0.0
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self._poll_stale()
+                await self._flush()
+                if time.time() - last_prune > 3600:
+                    last_prune = time.time()
+                    await asyncio.get_running_loop().run_in_executor(None, self.store.prune)
+            except Exception as e:
+                print(f"Error in tick recorder: {str(e)}")
+
+    async def _poll_stale(self):
+        """Keep recorded feeds alive and poll REST for streams the exchange is not pushing."""
+        stale = []
+        for channel, exchange_name, symbol in self.streams:
+            # Subscribing refreshes the feed's idle timer and restarts it if it stopped
+            self.service.subscribe(exchange_name, symbol, channel)
+            read = self.service.get_order_book if channel == "book" else self.service.get_ticker
+            if read(exchange_name, symbol) is None:
+                stale.append((channel, exchange_name, symbol))
+        if not stale:
+            return
+        calls = [
+            (exchange_name, 'fetch_order_book', (symbol, self.book_depth)) if channel == "book"
+            else (exchange_name, 'fetch_ticker', (symbol,))
+            for channel, exchange_name, symbol in stale
+        ]
+        for (channel, exchange_name, symbol), result in zip(stale, await gather_many(calls, priority=BACKGROUND)):
+            if not isinstance(result, BaseException):
+                self.record(channel, exchange_name, symbol, result)
+
+    async def _flush(self):
+        async with self._flush_lock:
+            buffer, self._buffer = self._buffer, {}
+            finished, self._finished = self._finished, []
+
+            def _write():
+                for path, lines in buffer.items():
+                    self.store.append(path, lines)
+                for path in finished:
+                    self.store.compact(path)
+
+            await asyncio.get_running_loop().run_in_executor(None, _write)
+            self.written += sum(len(lines) for lines in buffer.values())
+
+    def flush(self):
+        """Write buffered snapshots now. Thread-safe."""
+        run_async(self._flush())
+
+    def stop(self):
+        """Stop recording and write what is buffered."""
+        self.service.remove_listener(self._on_update)
+        if self._task is not None:
+            get_event_loop().call_soon_threadsafe(self._task.cancel)
+        self.flush()
+
+def spread_history(exchange_name: str, symbol: str, start: float, end: float, interval: str = "1h",
+                   store: Optional[TickStore] = None) -> pd.DataFrame:
+    """
+    Recorded bid/ask spread statistics per interval.
+
+    Returns:
+        pd.DataFrame: mid, mean/min/max spread_pct and samples per interval (empty if nothing was recorded)
+    """
+    df = (store or TickStore()).ticker_history(exchange_name, symbol, start, end)
+    if df.empty:
+        return df
+    grouped = df.resample(interval)
+    result = pd.DataFrame({
+        'mid': ((df['bid'] + df['ask']) / 2).resample(interval).mean(),
+        'spread_mean': grouped['spread_pct'].mean(),
+        'spread_min': grouped['spread_pct'].min(),
+        'spread_max': grouped['spread_pct'].max(),
+        'samples': grouped['spread_pct'].count(),
+    })
+    return result[result['samples'] > 0]
+
+# Recorder started by the server when CEX_RECORDER_SYMBOLS is set
+tick_recorder = TickRecorder()
+
+if __name__ == "__main__":
+    # Usage: python -m graph.tick_recorder [exchange:SYMBOL ...]   (defaults to CEX_RECORDER_SYMBOLS)
+    import sys
+    streams = parse_streams(",".join(sys.argv[1:]) or RECORDER_SYMBOLS)
+    if not streams:
+        sys.exit("Nothing to record: pass exchange:SYMBOL arguments or set CEX_RECORDER_SYMBOLS")
+    tick_recorder.start(streams)
+    print(f"Recording {', '.join(f'{e}:{s}' for e, s in streams)} to {tick_recorder.store.root}; Ctrl-C to stop")
+    try:
+        while True:
+            time.sleep(60)
+            print(f"{tick_recorder.written} snapshots written")
+    except KeyboardInterrupt:
+        tick_recorder.stop()
+        market_data.close()
@@ -0,0 +1,374 @@
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from dotenv import load_dotenv
+from graph.async_exchanges import request
+from graph.exchange_factory import exchanges, pairs_black_list
+from graph.fee_model import DEFAULT_TAKER_FEE, FeeSchedule, fee_model
+from graph.market_cache import get_markets
+from graph.market_data import market_data
+
+# Load environment variables
+load_dotenv()
+
+# Seconds a full bulk ticker snapshot is used before it is fetched again; streamed tickers update it in between
+TRIANGULAR_TICKERS_TTL = float(os.getenv("CEX_TRIANGULAR_TICKERS_TTL", "5"))
+
+# Relaxation rounds between checks of the predecessor graph for cycles
+CYCLE_CHECK_INTERVAL = 8
+
+# Currencies a reported cycle starts and ends in, when it passes through one of them
+START_CURRENCIES = ('USDT', 'USD', 'USDC', 'BTC', 'ETH')
+
+def _best_incoming(dst: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+    """For each node with incoming edges, the edge giving it the lowest candidate distance."""
+    order = np.lexsort((candidates, dst))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = dst[order][1:] != dst[order][:-1]
+    return order[first]
+
+def bellman_ford(n: int, src: np.ndarray, dst: np.ndarray, weights: np.ndarray) -> Tuple[np.ndarray, List[List[int]]]:
+    """
+    Vectorized Bellman-Ford from a virtual source connected to every node, stopping at the first negative cycles.
+
+    Every round relaxes all edges at once. Every few rounds the predecessor graph is checked
+    for cycles, which are negative, so cycles are usually found long before n rounds.
+
+    Args:
+        n (int): Number of nodes
+        src, dst (np.ndarray): Edge endpoints
+        weights (np.ndarray): Edge weights; edges with infinite weight are ignored
+
+    Returns:
+        tuple: (distances, list of negative cycles as lists of edge indices in path order)
+    """
+    edge_ids = np.flatnonzero(np.isfinite(weights))
+    src, dst, weights = src[edge_ids], dst[edge_ids], weights[edge_ids]
+    dist = np.zeros(n)
+    pred = np.full(n, -1, dtype=np.int64)
+    for round_number in range(1, n + 1):
+        candidates = dist[src] + weights
+        best = _best_incoming(dst, candidates)
+        improved = candidates[best] < dist[dst[best]] - 1e-12
+        if not improved.any():
+            return dist, []
+        nodes = dst[best][improved]
+        dist[nodes] = candidates[best][improved]
+        pred[nodes] = best[improved]
+        if round_number % CYCLE_CHECK_INTERVAL == 0 or round_number == n:
+            cycles = _predecessor_cycles(n, pred, src)
+            if cycles:
+                return dist, [[int(edge_ids[edge]) for edge in cycle] for cycle in cycles]
+    return dist, []
+
+def _predecessor_cycles(n: int, pred: np.ndarray, src: np.ndarray) -> List[List[int]]:
+    """Cycles of the predecessor graph, as lists of (filtered) edge indices in path order."""
+    parent = np.where(pred >= 0, src[np.maximum(pred, 0)], np.arange(n))
+    # Pointer doubling: after 2^k >= n steps every node whose chain ends in a cycle has landed on it
+    landing = parent.copy()
+    for _ in range(int(np.ceil(np.log2(max(n, 2)))) + 1):
+        landing = landing[landing]
+    candidates = np.unique(landing[(pred >= 0) & (parent[landing] != landing)])
+    cycles, seen = [], set()
+    for node in candidates:
+        node = int(node)
+        if node in seen:
+            continue
+        cycle_nodes, current = [], node
+        while current not in cycle_nodes:
+            cycle_nodes.append(current)
+            current = int(parent[current])
+        if current != node:
+            continue
+        seen.update(cycle_nodes)
+        # Walking parents visits the cycle backwards
+        cycles.append([int(pred[v]) for v in reversed(cycle_nodes)])
+    return cycles
+
+class MarketGraph:
+    """
+    Currency graph of one exchange's active spot markets, with log-price edge weights.
+
+    Each market is two edges: quote -> base at the ask (buying) and base -> quote at the bid
+    (selling), weighted -log(rate * (1 - taker fee)), so a cycle of trades that ends with more
+    than it started with is a negative cycle. Taker fees come from the exchange's fee schedule
+    (the account's tier when known), else from market metadata. The structure is built once;
+    price updates only rewrite the weights of the markets that changed.
+    """
+
+    def __init__(self, exchange_name: str, markets: List[dict], fees: Optional[FeeSchedule] = None):
+        self.exchange_name = exchange_name
+        self.markets = markets
+        blacklist = set(pairs_black_list.get(exchange_name, []))
+        currency_index: Dict[str, int] = {}
+        self.symbols: List[str] = []
+        bases, quotes, market_fees = [], [], []
+        for market in markets:
+            symbol = market.get('symbol')
+            if not symbol or symbol in blacklist or market.get('active') is False:
+                continue
+            if market.get('type', 'spot') != 'spot' and not market.get('spot'):
+                continue
+            base, quote = market.get('base'), market.get('quote')
+            if not base or not quote or base == quote:
+                continue
+            self.symbols.append(symbol)
+            bases.append(currency_index.setdefault(base, len(currency_index)))
+            quotes.append(currency_index.setdefault(quote, len(currency_index)))
+            taker = market.get('taker')
+            market_fees.append(taker if isinstance(taker, (int, float)) else DEFAULT_TAKER_FEE)
+
+        self.currencies = list(currency_index)
+        self.market_index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self._market_fees = market_fees
+        bases, quotes = np.array(bases, dtype=np.int64), np.array(quotes, dtype=np.int64)
+        # Edge 2i buys market i's base with its quote; edge 2i + 1 sells it
+        self.src = np.empty(2 * len(self.symbols), dtype=np.int64)
+        self.dst = np.empty(2 * len(self.symbols), dtype=np.int64)
+        self.src[0::2], self.dst[0::2] = quotes, bases
+        self.src[1::2], self.dst[1::2] = bases, quotes
+        self.bids = np.full(len(self.symbols), np.nan)
+        self.asks = np.full(len(self.symbols), np.nan)
+        self.weights = np.full(2 * len(self.symbols), np.inf)
+        self.version = 0
+        self.refreshed_at = 0.0
+        self._lock = threading.Lock()
+        self.fees: Optional[FeeSchedule] = None
+        self.set_fees(fees)
+
+    def set_fees(self, fees: Optional[FeeSchedule]):
+        """Apply a fee schedule; without one, or one built without market metadata, market taker fees are used."""
+        if fees is not None and fees.sources.get('trading') != 'default':
+            taker = [fees.taker_fee(symbol) for symbol in self.symbols]
+        else:
+            taker = self._market_fees
+        with self._lock:
+            self.fees = fees
+            self.fee_log = np.log1p(-np.array(taker, dtype=np.float64))
+            self._reweight(np.arange(len(self.symbols)))
+            self.version += 1
+
+    def _reweight(self, positions: np.ndarray):
+        """Recompute the edge weights of some markets from their prices and fees."""
+        bids, asks = self.bids[positions], self.asks[positions]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            buy = np.log(asks) - self.fee_log[positions]
+            sell = -np.log(bids) - self.fee_log[positions]
+        self.weights[2 * positions] = np.where(asks > 0, buy, np.inf)
+        self.weights[2 * positions + 1] = np.where(bids > 0, sell, np.inf)
+
+    def update(self, tickers: Dict[str, dict]) -> int:
+        """Apply ticker updates keyed by symbol; returns how many markets changed."""
+        positions, bids, asks = [], [], []
+        for symbol, ticker in tickers.items():
+            position = self.market_index.get(symbol)
+            if position is None or not isinstance(ticker, dict):
+                continue
+            positions.append(position)
+            bids.append(ticker.get('bid') or np.nan)
+            asks.append(ticker.get('ask') or np.nan)
+        if not positions:
+            return 0
+        positions = np.array(positions, dtype=np.int64)
+        bids, asks = np.array(bids, dtype=np.float64), np.array(asks, dtype=np.float64)
+        with self._lock:
+            old_bids, old_asks = self.bids[positions], self.asks[positions]
+            same_bid = (bids == old_bids) | (np.isnan(bids) & np.isnan(old_bids))
+            same_ask = (asks == old_asks) | (np.isnan(asks) & np.isnan(old_asks))
+            changed = ~(same_bid & same_ask)
+            if not changed.any():
+                return 0
+            positions = positions[changed]
+            self.bids[positions], self.asks[positions] = bids[changed], asks[changed]
+            self._reweight(positions)
+            self.version += 1
+        return int(changed.sum())
+
+    def priced_markets(self) -> int:
+        return int(np.isfinite(self.weights[0::2]).sum())
+
+    def find_cycles(self, min_return: float = 0.0, max_legs: int = 3, limit: int = 5, max_rounds: int = 10) -> List[dict]:
+        """
+        Profitable trade cycles, net of taker fees, best first.
+
+        Each Bellman-Ford pass finds some negative cycles; the most expensive leg of each is then
+        removed and the search repeated, so overlapping cycles are found in later passes. Removing
+        a leg of a cycle longer than max_legs could hide short cycles through it, so those legs are
+        searched for the best short cycle directly.
+
+        Args:
+            min_return (float): Minimum net return of a cycle (fraction)
+            max_legs (int): Longest cycle to report (3 for triangular)
+            limit (int): Maximum number of cycles to return
+            max_rounds (int): Maximum number of Bellman-Ford passes
+
+        Returns:
+            list: dicts with 'currencies', 'legs' and 'net_return'
+        """
+        with self._lock:
+            prices = self.weights.copy()
+            bids, asks = self.bids.copy(), self.asks.copy()
+        weights = prices.copy()
+        found: Dict[Tuple[int, ...], dict] = {}
+        broken = []
+
+        def add(cycle: List[int]):
+            net_return = float(np.expm1(-prices[cycle].sum()))
+            if net_return > min_return:
+                cycle = self._rotate(cycle)
+                found.setdefault(tuple(cycle), self._describe(cycle, net_return, bids, asks))
+
+        for _ in range(max_rounds):
+            _, cycles = bellman_ford(len(self.currencies), self.src, self.dst, weights)
+            if not cycles:
+                break
+            for cycle in cycles:
+                # Breaking the cycle at its most expensive leg lets the next pass find others
+                leg = cycle[int(np.argmax(weights[cycle]))]
+                weights[leg] = np.inf
+                if len(cycle) <= max_legs:
+                    add(cycle)
+                else:
+                    broken.append(leg)
+            if len(found) >= limit:
+                break
+        for leg in broken:
+            cycle = self._short_cycle(prices, leg, max_legs)
+            if cycle:
+                add(cycle)
+        return sorted(found.values(), key=lambda c: -c['net_return'])[:limit]
+
+    def _short_cycle(self, weights: np.ndarray, edge: int, max_legs: int) -> List[int]:
+        """
+        The cheapest cycle of at most max_legs legs through an edge, or [] if there is none.
+
+        A Bellman-Ford bounded to max_legs - 1 rounds finds the cheapest way back from the edge's
+        target to its source; each round keeps its predecessors so the path can be rebuilt.
+        """
+        start, end = int(self.dst[edge]), int(self.src[edge])
+        usable = np.flatnonzero(np.isfinite(weights))
+        src, dst, usable_weights = self.src[usable], self.dst[usable], weights[usable]
+        dist = np.full(len(self.currencies), np.inf)
+        dist[start] = 0.0
+        rounds, best, best_legs = [], np.inf, 0
+        for legs in range(1, max_legs):
+            candidates = dist[src] + usable_weights
+            reached = _best_incoming(dst, candidates)
+            reached = reached[np.isfinite(candidates[reached])]
+            pred = np.full(len(self.currencies), -1, dtype=np.int64)
+            pred[dst[reached]] = reached
+            dist = np.full(len(self.currencies), np.inf)
+            dist[dst[reached]] = candidates[reached]
+            rounds.append(pred)
+            if dist[end] < best:
+                best, best_legs = dist[end], legs
+        if not best_legs:
+            return []
+        path, node = [], end
+        for pred in reversed(rounds[:best_legs]):
+            path.append(int(usable[pred[node]]))
+            node = int(src[pred[node]])
+        cycle = [edge] + path[::-1]
+        # The cheapest walk can pass through a currency twice; that is not a cycle of trades
+        return cycle if len({int(self.src[leg]) for leg in cycle}) == len(cycle) else []
+
+    def _rotate(self, cycle: List[int]) -> List[int]:
+        """Start a cycle at a stablecoin or major currency when it contains one."""
+        starts = [self.currencies[self.src[edge]] for edge in cycle]
+        rank = [START_CURRENCIES.index(c) if c in START_CURRENCIES else len(START_CURRENCIES) for c in starts]
+        first = int(np.argmin(rank)) if min(rank) < len(START_CURRENCIES) else starts.index(min(starts))
+        return cycle[first:] + cycle[:first]
+
+    def _describe(self, cycle: List[int], net_return: float, bids: np.ndarray, asks: np.ndarray) -> dict:
+        legs = []
+        for edge in cycle:
+            market = edge // 2
+            buying = edge % 2 == 0
+            legs.append({
+                'symbol': self.symbols[market],
+                'side': 'buy' if buying else 'sell',
+                'price': float(asks[market] if buying else bids[market]),
+                'from': self.currencies[self.src[edge]],
+                'to': self.currencies[self.dst[edge]],
+            })
+        return {
+            'currencies': [leg['from'] for leg in legs] + [legs[0]['from']],
+            'legs': legs,
+            'net_return': net_return
+        }
+
+class TriangularScanner:
+    """
+    Market graphs per exchange, kept current from bulk ticker snapshots and streamed tickers.
+
+    A graph is rebuilt only when the market cache hands out a new market list, and re-weighted
+    when the fee model hands out a new schedule; cycle searches are cached until the graph's
+    prices or fees change.
+    """
+
+    def __init__(self, service=market_data):
+        self.service = service
+        self._graphs: Dict[str, MarketGraph] = {}
+        self._results: Dict[Tuple, Tuple[int, MarketGraph, List[dict]]] = {}
+        self._lock = threading.Lock()
+        self._listening = False
+
+    def graph(self, exchange_name: str) -> MarketGraph:
+        markets = get_markets(exchange_name, exchanges[exchange_name])
+        # The same schedules the cross-exchange scan uses, so both report the same net returns
+        fees = fee_model.get(exchange_name)
+        graph = self._graphs.get(exchange_name)
+        if graph is not None and graph.markets is markets and graph.fees is not fees:
+            graph.set_fees(fees)
+        if graph is None or graph.markets is not markets:
+            graph = MarketGraph(exchange_name, markets, fees)
+            with self._lock:
+                self._graphs[exchange_name] = graph
+                if not self._listening:
+                    self._listening = True
+                    self.service.add_listener(self._on_update)
+        return graph
+
+    def _on_update(self, channel: str, exchange_name: str, symbol: str, data: dict):
+        """Market data listener: streamed tickers update the graph between snapshots."""
+        graph = self._graphs.get(exchange_name)
+        if channel == "ticker" and graph is not None:
+            graph.update({symbol: data})
+
+    def refresh(self, exchange_name: str) -> MarketGraph:
+        """The exchange's graph, with a new bulk ticker snapshot applied if the last one is too old."""
+        graph = self.graph(exchange_name)
+        if time.time() - graph.refreshed_at > TRIANGULAR_TICKERS_TTL:
+            # All tickers in one request; large exchanges can take a few seconds to answer
+            tickers = request(exchange_name, 'fetch_tickers', (), timeout=15)
+            graph.update(tickers)
+            graph.refreshed_at = time.time()
+        return graph
+
+    def scan(self, exchange_name: str, min_return: float = 0.0, max_legs: int = 3, limit: int = 5) -> dict:
+        """
+        Find profitable trade cycles on one exchange.
+
+        Returns:
+            dict: cycles (from MarketGraph.find_cycles), currencies and markets (graph size), priced (markets with prices)
+        """
+        graph = self.refresh(exchange_name)
+        key = (exchange_name, min_return, max_legs, limit)
+        cached = self._results.get(key)
+        if cached is not None and cached[0] == graph.version and cached[1] is graph:
+            cycles = cached[2]
+        else:
+            version = graph.version
+            cycles = graph.find_cycles(min_return, max_legs, limit)
+            self._results[key] = (version, graph, cycles)
+        return {
+            'cycles': cycles,
+            'currencies': len(graph.currencies),
+            'markets': len(graph.symbols),
+            'priced': graph.priced_markets()
+        }
+
+# Shared scanner used by the agent's tools
+triangular_scanner = TriangularScanner()
@@ -0,0 +1,338 @@
+import asyncio
+import itertools
+import os
+import threading
+import time
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import numpy as np
+from dotenv import load_dotenv
+from graph.async_exchanges import gather_many, get_event_loop, request
+from graph.market_data import market_data
+from graph.request_scheduler import BACKGROUND
+
+# Load environment variables
+load_dotenv()
+
+# Seconds between REST polls of watched symbols that have no fresh streamed ticker
+WATCHLIST_POLL_INTERVAL = float(os.getenv("CEX_WATCHLIST_POLL_INTERVAL", "10"))
+
+# Alerts kept at once, in total and per owner (triggered alerts count until they are pruned)
+WATCHLIST_MAX_ALERTS = int(os.getenv("CEX_WATCHLIST_MAX_ALERTS", "1000"))
+WATCHLIST_MAX_ALERTS_PER_OWNER = int(os.getenv("CEX_WATCHLIST_MAX_ALERTS_PER_OWNER", "50"))
+
+# Seconds a triggered one-shot alert stays listed before it is deleted
+WATCHLIST_TRIGGERED_RETENTION = float(os.getenv("CEX_WATCHLIST_TRIGGERED_RETENTION", "3600"))
+
+# Condition kinds and the value they compare against
+CONDITIONS = {
+    'above': 'last price at or above value',
+    'below': 'last price at or below value',
+    'change_pct': 'last price moved value percent from the price when the alert was set (negative for a fall)',
+    'spread_pct': 'bid/ask spread at or above value percent of the mid price',
+}
+_KIND_CODES = {kind: code for code, kind in enumerate(CONDITIONS)}
+
+def evaluate(kinds: np.ndarray, values: np.ndarray, references: np.ndarray,
+             last: np.ndarray, bid: np.ndarray, ask: np.ndarray) -> np.ndarray:
+    """
+    Evaluate many conditions at once.
+
+    Args:
+        kinds (np.ndarray): Condition kind code per condition
+        values (np.ndarray): Threshold per condition
+        references (np.ndarray): Reference price per condition (used by change_pct)
+        last, bid, ask (np.ndarray): Market data per condition, NaN where unknown
+
+    Returns:
+        np.ndarray: Boolean mask of conditions that currently hold
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        change = (last / references - 1) * 100
+        mid = (bid + ask) / 2
+        spread = (ask - bid) / mid * 100
+        holds = np.select(
+            [kinds == _KIND_CODES['above'], kinds == _KIND_CODES['below'], kinds == _KIND_CODES['change_pct'],
+             kinds == _KIND_CODES['spread_pct']],
+            [last >= values, last <= values,
+             np.where(values >= 0, change >= values, change <= values), spread >= values],
+            default=False
+        )
+    return holds & ~np.isnan(np.where(kinds == _KIND_CODES['spread_pct'], spread, last))
+
+class Watchlist:
+    """
+    Price alerts evaluated against shared ticker updates.
+
+    Conditions live in parallel NumPy arrays. Ticker updates from the market data service (or
+    REST polls for symbols that are not streaming) only record the latest price per symbol;
+    one vectorized pass per loop iteration then evaluates every condition whose symbol changed.
+    Triggered alerts are pushed to listeners, e.g. the SSE endpoint in run.py. The number of
+    alerts is capped, and triggered one-shot alerts are deleted after a retention period.
+    """
+
+    def __init__(self, service=market_data, poll_interval: float = WATCHLIST_POLL_INTERVAL,
+                 max_alerts: int = WATCHLIST_MAX_ALERTS, max_alerts_per_owner: int = WATCHLIST_MAX_ALERTS_PER_OWNER,
+                 retention: float = WATCHLIST_TRIGGERED_RETENTION):
+        self.service = service
+        self.poll_interval = poll_interval
+        self.max_alerts = max_alerts
+        self.max_alerts_per_owner = max_alerts_per_owner
+        self.retention = retention
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        # Alert definitions by id; the arrays below are rebuilt from them when alerts change
+        self.alerts: Dict[int, dict] = {}
+        self._arrays: Optional[dict] = None
+        self._watched: set = set()
+        # Latest (last, bid, ask, received_at) per (exchange, symbol), and symbols updated since the last pass
+        self._prices: Dict[Tuple[str, str], Tuple[float, float, float, float]] = {}
+        self._dirty: set = set()
+        self._scheduled = False
+        self._queues: List[Tuple[Optional[str], asyncio.Queue]] = []
+        self._poller: Optional[asyncio.Task] = None
+        self._started = False
+
+    def start(self):
+        """Listen for ticker updates and start the REST poller. Idempotent and thread-safe."""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        self.service.add_listener(self._on_update)
+        get_event_loop().call_soon_threadsafe(self._start_poller)
+
+    def _start_poller(self):
+        self._poller = asyncio.get_running_loop().create_task(self._poll())
+
+    def add(self, exchange_name: str, symbol: str, condition: str, value: float, owner: Optional[str] = None,
+            repeat: bool = False, reference: Optional[float] = None, note: str = "") -> dict:
+        """
+        Add an alert.
+
+        Args:
+            exchange_name (str): Exchange to watch
+            symbol (str): Exchange symbol to watch
+            condition (str): One of CONDITIONS
+            value (float): Threshold for the condition
+            owner (str): Who receives the alert (e.g., a chat thread id); None broadcasts to everyone
+            repeat (bool): Fire again each time the condition becomes true after having been false
+            reference (float): Reference price for change_pct (default: the current price)
+            note (str): Free text returned with the alert
+
+        Returns:
+            dict: The stored alert
+
+        Raises:
+            ValueError: Unknown condition, or the owner or the watchlist already holds the maximum number of alerts
+        """
+        if condition not in CONDITIONS:
+            raise ValueError(f"Unknown condition '{condition}'. Choose one of: {', '.join(CONDITIONS)}")
+        self.start()
+        if condition == 'change_pct' and reference is None:
+            reference = self._current_price(exchange_name, symbol)
+        alert = {
+            'id': next(self._ids), 'exchange': exchange_name, 'symbol': symbol, 'condition': condition,
+            'value': float(value), 'reference': reference, 'owner': owner, 'repeat': repeat, 'note': note,
+            'created_at': time.time(), 'triggered_at': None, 'active': True, 'armed': True
+        }
+        with self._lock:
+            self._prune()
+            if len(self.alerts) >= self.max_alerts:
+                raise ValueError(f"Too many alerts ({self.max_alerts}); delete some first")
+            if sum(a['owner'] == owner for a in self.alerts.values()) >= self.max_alerts_per_owner:
+                raise ValueError(f"Too many alerts for this owner ({self.max_alerts_per_owner}); delete some first")
+            self.alerts[alert['id']] = alert
+            self._watched.add((exchange_name, symbol))
+            self._arrays = None
+        self.service.subscribe(exchange_name, symbol, "ticker")
+        return alert
+
+    def remove(self, alert_id: int, owner: Optional[str] = None) -> bool:
+        """Delete an alert; with an owner, only that owner's alerts can be deleted."""
+        with self._lock:
+            alert = self.alerts.get(alert_id)
+            if alert is None or (owner is not None and alert['owner'] != owner):
+                return False
+            del self.alerts[alert_id]
+            self._arrays = None
+        return True
+
+    def list(self, owner: Optional[str] = None) -> List[dict]:
+        """Alerts visible to an owner (their own and broadcast ones), or all alerts without an owner."""
+        with self._lock:
+            self._prune()
+            return [dict(a) for a in self.alerts.values() if owner is None or a['owner'] in (owner, None)]
+
+    def _prune(self):
+        """Delete one-shot alerts triggered longer than the retention period ago. Call with the lock held."""
+        cutoff = time.time() - self.retention
+        expired = [alert_id for alert_id, a in self.alerts.items() if not a['active'] and a['triggered_at'] <= cutoff]
+        for alert_id in expired:
+            del self.alerts[alert_id]
+
+    def _current_price(self, exchange_name: str, symbol: str) -> Optional[float]:
+        entry = self._prices.get((exchange_name, symbol))
+        if entry is not None:
+            return entry[0]
+        ticker = self.service.get_ticker(exchange_name, symbol)
+        if ticker is None:
+            ticker = request(exchange_name, 'fetch_ticker', (symbol,))
+        return ticker.get('last')
+
+    def _build_arrays(self) -> dict:
+        alerts = [a for a in self.alerts.values() if a['active']]
+        keys = sorted({(a['exchange'], a['symbol']) for a in alerts})
+        self._watched = set(keys)
+        key_index = {key: i for i, key in enumerate(keys)}
+        return {
+            'ids': np.array([a['id'] for a in alerts], dtype=np.int64),
+            'keys': keys,
+            'key_idx': np.array([key_index[(a['exchange'], a['symbol'])] for a in alerts], dtype=np.int64),
+            'kinds': np.array([_KIND_CODES[a['condition']] for a in alerts], dtype=np.int8),
+            'values': np.array([a['value'] for a in alerts], dtype=np.float64),
+            'references': np.array([a['reference'] or np.nan for a in alerts], dtype=np.float64),
+            # An alert fires when its condition becomes true while armed; repeating alerts re-arm once it is false again
+            'armed': np.array([a['armed'] for a in alerts], dtype=bool),
+        }
+
+    def _on_update(self, channel: str, exchange_name: str, symbol: str, data: dict):
+        """Market data listener; runs on the background loop for every update."""
+        if channel != "ticker":
+            return
+        self.record(exchange_name, symbol, data)
+
+    def record(self, exchange_name: str, symbol: str, ticker: dict):
+        """Store a ticker and schedule an evaluation pass. Must be called on the background loop."""
+        key = (exchange_name, symbol)
+        if key not in self._watched:
+            return
+        self._prices[key] = (
+            ticker.get('last') or np.nan, ticker.get('bid') or np.nan, ticker.get('ask') or np.nan, time.time()
+        )
+        self._dirty.add(key)
+        if not self._scheduled:
+            # Updates arriving in the same loop iteration share one evaluation pass
+            self._scheduled = True
+            asyncio.get_running_loop().call_soon(self.evaluate_pending)
+
+    def evaluate_pending(self) -> List[dict]:
+        """Evaluate every condition on symbols updated since the last pass and fire the ones that hold."""
+        self._scheduled = False
+        dirty, self._dirty = self._dirty, set()
+        with self._lock:
+            if self._arrays is None:
+                self._arrays = self._build_arrays()
+            arrays = self._arrays
+        if not len(arrays['ids']) or not dirty:
+            return []
+
+        keys = arrays['keys']
+        prices = np.array([self._prices.get(key, (np.nan, np.nan, np.nan, 0))[:3] for key in keys], dtype=np.float64)
+        updated = np.array([key in dirty for key in keys], dtype=bool)
+        key_idx = arrays['key_idx']
+        holds = evaluate(
+            arrays['kinds'], arrays['values'], arrays['references'],
+            prices[key_idx, 0], prices[key_idx, 1], prices[key_idx, 2]
+        ) & updated[key_idx]
+        fired = holds & arrays['armed']
+        armed = np.where(updated[key_idx], ~holds, arrays['armed'])
+        for position in np.flatnonzero(armed != arrays['armed']):
+            alert = self.alerts.get(int(arrays['ids'][position]))
+            if alert is not None:
+                alert['armed'] = bool(armed[position])
+        arrays['armed'] = armed
+
+        events = []
+        now = time.time()
+        for position in np.flatnonzero(fired):
+            alert = self.alerts.get(int(arrays['ids'][position]))
+            if alert is None or not alert['active']:
+                continue
+            last, bid, ask = prices[key_idx[position]]
+            alert['triggered_at'] = now
+            if not alert['repeat']:
+                alert['active'] = False
+            events.append({
+                'alert': dict(alert), 'last': None if np.isnan(last) else float(last),
+                'bid': None if np.isnan(bid) else float(bid), 'ask': None if np.isnan(ask) else float(ask),
+                'triggered_at': now
+            })
+        if any(not event['alert']['repeat'] for event in events):
+            # Fired one-shot alerts drop out of the arrays
+            with self._lock:
+                self._arrays = None
+        for event in events:
+            self._deliver(event)
+        return events
+
+    def _deliver(self, event: dict):
+        owner = event['alert']['owner']
+        for listener_owner, queue in list(self._queues):
+            if owner is None or listener_owner is None or listener_owner == owner:
+                queue.put_nowait(event)
+
+    async def _poll(self):
+        """Fetch tickers over REST for watched symbols whose streamed ticker is missing or stale."""
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            with self._lock:
+                self._prune()
+            keys = sorted({(a['exchange'], a['symbol']) for a in list(self.alerts.values()) if a['active']})
+            stale = []
+            for key in keys:
+                # Reading keeps the stream alive; nothing fresh means the exchange is not streaming it
+                if self.service.get_ticker(*key) is None:
+                    stale.append(key)
+                    self.service.subscribe(key[0], key[1], "ticker")
+            if not stale:
+                continue
+            try:
+                results = await gather_many([(name, 'fetch_ticker', (symbol,)) for name, symbol in stale], priority=BACKGROUND)
+            except Exception as e:
+                print(f"Error polling watchlist tickers: {str(e)}")
+                continue
+            for key, ticker in zip(stale, results):
+                if not isinstance(ticker, BaseException):
+                    self.record(key[0], key[1], ticker)
+
+    async def events(self, owner: Optional[str] = None) -> AsyncIterator[dict]:
+        """
+        Triggered alerts for an owner as they happen. Can be consumed from any event loop.
+
+        Args:
+            owner (str): Receive this owner's and broadcast alerts; None receives everything
+        """
+        self.start()
+        loop = get_event_loop()
+        queue: asyncio.Queue = await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(_new_queue(), loop))
+        entry = (owner, queue)
+        loop.call_soon_threadsafe(self._queues.append, entry)
+        try:
+            while True:
+                yield await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(queue.get(), loop))
+        finally:
+            loop.call_soon_threadsafe(self._remove_queue, entry)
+
+    def _remove_queue(self, entry):
+        if entry in self._queues:
+            self._queues.remove(entry)
+
+async def _new_queue() -> asyncio.Queue:
+    # Created on the background loop so producers there can use it without locking
+    return asyncio.Queue()
+
+def describe(alert: dict) -> str:
+    """One-line description of an alert."""
+    condition, value = alert['condition'], alert['value']
+    if condition == 'above':
+        text = f"last price >= {value:g}"
+    elif condition == 'below':
+        text = f"last price <= {value:g}"
+    elif condition == 'change_pct':
+        text = f"moves {value:+g}% from {alert['reference']:g}" if alert['reference'] else f"moves {value:+g}%"
+    else:
+        text = f"spread >= {value:g}%"
+    return f"#{alert['id']} {alert['symbol']} on {alert['exchange'].capitalize()}: {text}"
+
+# Shared watchlist used by the agent's tools and the alert endpoints
+watchlist = Watchlist()
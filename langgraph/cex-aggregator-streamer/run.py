@@ -1,8 +1,17 @@
+import json
 from fastapi import FastAPI, Request
 from fastapi.responses import StreamingResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from graph.cex_aggregator import stream_response, get_response
+from graph.async_exchanges import close_async_exchanges
+from graph.exchange_factory import exchanges, PREWARM_EXCHANGES
+from graph.market_data import market_data
+from graph.request_scheduler import scheduler
+from graph.exchange_health import health
+from graph.symbol_index import UnknownSymbol, symbol_index
+from graph.watchlist import watchlist
+from graph.tick_recorder import RECORDER_SYMBOLS, parse_streams, tick_recorder
 from dotenv import load_dotenv
 from typing import List, Dict, Any, Optional
 
@@ -15,10 +24,40 @@ app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # TODO: Make this more restrictive
     allow_credentials=True,
-    allow_methods=["POST"],
+    allow_methods=["GET", "POST", "DELETE"],
     allow_headers=["Content-Type", "Authorization"],
 )
 
+@app.on_event("startup")
+def prewarm_exchanges():
+    """Construct and warm the exchanges listed in CEX_PREWARM_EXCHANGES without blocking startup."""
+    if PREWARM_EXCHANGES:
+        exchanges.prewarm(PREWARM_EXCHANGES)
+
+@app.on_event("startup")
+def start_recorder():
+    """Record tickers and order books of the symbols listed in CEX_RECORDER_SYMBOLS."""
+    streams = parse_streams(RECORDER_SYMBOLS)
+    if streams:
+        tick_recorder.start(streams)
+
+@app.on_event("shutdown")
+def shutdown_exchanges():
+    """Write recorded market data, stop market data feeds and close the async exchange clients' sessions."""
+    if tick_recorder.streams:
+        tick_recorder.stop()
+    market_data.close()
+    close_async_exchanges()
+
+class AlertRequest(BaseModel):
+    exchange: str
+    symbol: str
+    condition: str
+    value: float
+    owner: Optional[str] = None
+    repeat: Optional[bool] = False
+    note: Optional[str] = ""
+
 class Message(BaseModel):
     role: str
     content: str
@@ -28,6 +67,54 @@ class ChatRequest(BaseModel):
     history: Optional[List[Message]] = []
     config: Optional[Dict[str, Any]] = {}
 
+@app.get("/exchanges")
+async def exchanges_endpoint():
+    """Report which exchange clients are configured, constructed and warmed, request scheduler counters and exchange health."""
+    return JSONResponse(content={
+        "configured": list(exchanges.keys()),
+        "loaded": exchanges.loaded(),
+        "warmed": exchanges.warmed(),
+        "scheduler": scheduler.stats(),
+        "health": health.stats()
+    })
+
+@app.post("/alerts")
+def create_alert_endpoint(request: AlertRequest):
+    """Add a price alert. The owner is normally the chat thread_id the alert should be delivered to."""
+    exchange_name = request.exchange.lower()
+    if exchange_name not in exchanges:
+        return JSONResponse(status_code=400, content={"error": f"Unknown exchange: {request.exchange}"})
+    try:
+        symbol = symbol_index.resolve(exchange_name, request.symbol)
+        alert = watchlist.add(exchange_name, symbol, request.condition, request.value,
+                              owner=request.owner, repeat=request.repeat, note=request.note)
+    except (ValueError, UnknownSymbol) as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+    return JSONResponse(content=alert)
+
+@app.get("/alerts")
+def list_alerts_endpoint(owner: Optional[str] = None):
+    """List an owner's alerts (and broadcast ones), or every alert without an owner."""
+    return JSONResponse(content={"alerts": watchlist.list(owner)})
+
+@app.delete("/alerts/{alert_id}")
+def delete_alert_endpoint(alert_id: int, owner: Optional[str] = None):
+    """Delete an alert; with an owner, only that owner's alert."""
+    if not watchlist.remove(alert_id, owner):
+        return JSONResponse(status_code=404, content={"error": f"Alert {alert_id} not found"})
+    return JSONResponse(content={"deleted": alert_id})
+
+@app.get("/alerts/stream")
+async def alert_stream_endpoint(owner: Optional[str] = None):
+    """Server-sent events, one per triggered alert for the owner (or every alert without an owner)."""
+    async def _events():
+        async for event in watchlist.events(owner):
+            yield f"data: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(_events(), media_type="text/event-stream")
+
 @app.post("/chat")
 async def chat_endpoint(request: ChatRequest):
     """
@@ -0,0 +1,83 @@
+import ccxt
+import numpy as np
+import pytest
+import graph.arbitrage as arbitrage
+import graph.async_exchanges as async_exchanges
+from graph.fee_model import FeeSchedule
+from graph.arbitrage import cross_spread_matrix, normalize_symbol, rank_opportunities, spot_symbols
+
+def test_cross_spread_matrix_nets_out_fees():
+    # One symbol on two exchanges: ask 100 on the first, bid 102 on the second
+    bids = np.array([[99.0, 102.0]])
+    asks = np.array([[100.0, 103.0]])
+    fees = np.array([0.001, 0.002])
+    returns = cross_spread_matrix(bids, asks, fees)
+    assert returns.shape == (1, 2, 2)
+    assert np.isnan(returns[0, 0, 0]) and np.isnan(returns[0, 1, 1])
+    assert returns[0, 0, 1] == pytest.approx(102.0 * 0.998 / (100.0 * 1.001) - 1)
+    assert returns[0, 1, 0] < 0
+
+def test_missing_prices_are_ignored():
+    bids = np.array([[np.nan, 102.0], [10.0, 11.0]])
+    asks = np.array([[100.0, np.nan], [10.5, 11.5]])
+    returns = cross_spread_matrix(bids, asks, np.zeros(2))
+    assert np.isnan(returns[0, 1, 0])
+    ranked = rank_opportunities(returns, 0.0, 10)
+    assert [(s, b, a) for s, b, a, _ in ranked] == [(1, 0, 1), (0, 0, 1)]
+    assert ranked[1][3] == pytest.approx(0.02)
+
+def test_rank_respects_limit_and_threshold():
+    returns = np.full((50, 3, 3), np.nan)
+    returns[:, 0, 1] = np.linspace(-0.01, 0.04, 50)
+    ranked = rank_opportunities(returns, 0.0, 5)
+    assert len(ranked) == 5
+    assert [r[0] for r in ranked] == [49, 48, 47, 46, 45]
+
+def test_spot_symbols_normalizes_usd_quotes():
+    markets = [
+        {'symbol': 'BTC/USDC', 'base': 'BTC', 'quote': 'USDC', 'type': 'spot', 'active': True},
+        {'symbol': 'BTC/USDT', 'base': 'BTC', 'quote': 'USDT', 'type': 'spot', 'active': True},
+        {'symbol': 'ETH/BTC', 'base': 'ETH', 'quote': 'BTC', 'type': 'spot', 'active': True},
+        {'symbol': 'BTC/USDT:USDT', 'base': 'BTC', 'quote': 'USDT', 'type': 'swap', 'spot': False},
+        {'symbol': 'DOGE/USDT', 'base': 'DOGE', 'quote': 'USDT', 'type': 'spot', 'active': False},
+    ]
+    assert spot_symbols('binance', markets) == {'BTC/USD': 'BTC/USDT', 'ETH/BTC': 'ETH/BTC'}
+    assert normalize_symbol('btc/usdc') == 'BTC/USD'
+    assert normalize_symbol('ETH') == 'ETH/USD'
+
+def test_scan_skips_unreachable_venues(monkeypatch):
+    class SyncClient:
+        has = {'fetchTickers': True}
+
+    class AsyncClient:
+        rateLimit = 1
+        markets = None
+        has = {'fetchTickers': True}
+
+        def __init__(self, ask):
+            self.ask = ask
+
+        async def fetch_tickers(self, symbols):
+            # Rejects symbol lists, so the scan has to fall back to single fetches
+            raise ccxt.BadRequest("symbols not supported")
+
+        async def fetch_ticker(self, symbol):
+            return {'symbol': symbol, 'bid': self.ask - 1, 'ask': self.ask}
+
+    markets = [{'symbol': s, 'base': s.split('/')[0], 'quote': 'USDT', 'spot': True} for s in ('BTC/USDT', 'ETH/USDT')]
+
+    def get_markets(exchange_name, client):
+        if exchange_name == 'down':
+            raise ccxt.NetworkError("timed out")
+        return markets
+    monkeypatch.setattr(arbitrage, 'get_markets', get_markets)
+    monkeypatch.setattr(arbitrage, 'exchanges', {name: SyncClient() for name in ('cheap', 'dear', 'down')})
+    monkeypatch.setattr(arbitrage.fee_model, 'get_many', lambda names: {n: FeeSchedule.fallback(n) for n in names})
+    monkeypatch.setitem(async_exchanges.async_exchanges, 'cheap', AsyncClient(100.0))
+    monkeypatch.setitem(async_exchanges.async_exchanges, 'dear', AsyncClient(110.0))
+
+    result = arbitrage.scan(['cheap', 'dear', 'down'])
+    assert result['exchanges'] == ['cheap', 'dear']
+    assert list(result['skipped']) == ['down'] and 'markets unavailable' in result['skipped']['down']
+    best = result['opportunities'][0]
+    assert (best['buy_exchange'], best['sell_exchange']) == ('cheap', 'dear')
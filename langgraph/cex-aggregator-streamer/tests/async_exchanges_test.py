@@ -0,0 +1,43 @@
+import asyncio
+import time
+import graph.async_exchanges as async_exchanges
+
+class SlowClient:
+    rateLimit = 1
+    markets = None
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.calls = []
+
+    async def fetch_ticker(self, symbol):
+        self.calls.append(symbol)
+        await asyncio.sleep(self.delay)
+        return {'symbol': symbol, 'last': self.delay}
+
+def test_fan_out_runs_exchanges_concurrently(monkeypatch):
+    clients = {f'fanout-ex{i}': SlowClient(0.3) for i in range(3)}
+    for name, client in clients.items():
+        monkeypatch.setitem(async_exchanges.async_exchanges, name, client)
+
+    started = time.monotonic()
+    result = async_exchanges.fan_out({name: ('fetch_ticker', ('BTC/USD',)) for name in clients}, timeout=5)
+    elapsed = time.monotonic() - started
+
+    # Bounded by the slowest exchange, not the sum of all three
+    assert elapsed < 0.8
+    assert all(result[name]['last'] == 0.3 for name in clients)
+
+def test_slow_exchange_misses_deadline_without_sinking_others(monkeypatch):
+    clients = {'deadline-fast1': SlowClient(0.05), 'deadline-fast2': SlowClient(0.05), 'deadline-slow': SlowClient(5)}
+    for name, client in clients.items():
+        monkeypatch.setitem(async_exchanges.async_exchanges, name, client)
+
+    started = time.monotonic()
+    result = async_exchanges.fetch_tickers_concurrently({name: 'BTC/USD' for name in clients}, timeout=10, deadline=0.5)
+    elapsed = time.monotonic() - started
+
+    assert elapsed < 2
+    assert result['deadline-fast1']['last'] == 0.05
+    assert result['deadline-fast2']['last'] == 0.05
+    assert isinstance(result['deadline-slow'], async_exchanges.DeadlineExceeded)
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+from graph.backtest import mean_reversion_positions, simulate, sweep, trend_following_positions
+
+def make_close(values):
+    return pd.Series(values, index=pd.date_range('2024-01-01', periods=len(values), freq='h', tz='UTC'), dtype='float64')
+
+def test_mean_reversion_enters_below_mean_and_exits_at_mean():
+    close = make_close([100, 100, 100, 100, 95, 96, 99, 101, 101])
+    positions = mean_reversion_positions(close, lookback=4, threshold=0.02)
+    assert list(positions) == [0, 0, 0, 0, 1, 1, 0, 0, 0]
+
+def test_simulate_applies_positions_on_the_next_candle():
+    close = make_close([100, 110, 121])
+    stats = simulate(close, pd.Series([0, 1, 1], index=close.index), fee=0.0, periods_per_year=8760)
+    # The signal on the second candle is filled at its close, so only the last move is captured
+    assert stats['total_return'] == pytest.approx(0.1)
+    assert stats['trades'] == 1
+    assert stats['buy_and_hold'] == pytest.approx(0.21)
+
+def test_fees_are_charged_on_position_changes():
+    close = make_close([100, 100, 100, 100])
+    stats = simulate(close, pd.Series([1, 0, 1, 0], index=close.index), fee=0.01)
+    assert stats['total_return'] == pytest.approx(0.99 ** 3 - 1)
+    assert stats['trades'] == 2
+
+def test_trend_following_is_flat_below_moving_average():
+    close = make_close(np.linspace(200, 100, 120))
+    positions = trend_following_positions(close, ma_period=20, rsi_period=14)
+    assert positions.sum() == 0
+
+def test_sweep_ranks_all_combinations_in_parallel():
+    rng = np.random.default_rng(7)
+    close = make_close(100 * np.exp(np.cumsum(rng.normal(0, 0.01, 2000))))
+    grid = {'lookback': [12, 24, 48, 96], 'threshold': [0.005, 0.01, 0.02]}
+    parallel = sweep(close, 'mean_reversion', grid, workers=2)
+    serial = sweep(close, 'mean_reversion', grid, workers=1)
+    assert len(parallel) == 12
+    assert [r['params'] for r in parallel] == [r['params'] for r in serial]
+    sharpes = [r['stats']['sharpe'] for r in parallel]
+    assert sharpes == sorted(sharpes, reverse=True)
+
+def test_sweep_rejects_stats_it_cannot_rank_by():
+    close = make_close(100 + np.arange(50, dtype=float))
+    for sort_by in ('sharpe_ratio', 'volatility'):
+        with pytest.raises(ValueError, match='Cannot rank'):
+            sweep(close, 'mean_reversion', {'lookback': [12], 'threshold': [0.01]}, sort_by=sort_by)
@@ -0,0 +1,58 @@
+import ccxt
+import graph.async_exchanges as async_exchanges
+
+class FakeClient:
+    rateLimit = 1
+    markets = None
+
+    def __init__(self, bulk: bool, bulk_error: bool = False, omit=()):
+        self.has = {'fetchTickers': bulk}
+        self.bulk_error = bulk_error
+        self.omit = omit
+        self.calls = []
+
+    async def fetch_tickers(self, symbols):
+        self.calls.append(('fetch_tickers', tuple(symbols)))
+        if self.bulk_error:
+            raise ccxt.BadRequest("symbols list not supported")
+        return {symbol: {'symbol': symbol, 'last': 1.0} for symbol in symbols if symbol not in self.omit}
+
+    async def fetch_ticker(self, symbol):
+        self.calls.append(('fetch_ticker', symbol))
+        if symbol == 'BAD/USD':
+            raise ccxt.BadSymbol(symbol)
+        return {'symbol': symbol, 'last': 2.0}
+
+def test_bulk_endpoint_used_once_with_single_fetch_fallbacks(monkeypatch):
+    bulk = FakeClient(bulk=True, omit=('SOL/USD',))
+    single = FakeClient(bulk=False)
+    rejecting = FakeClient(bulk=True, bulk_error=True)
+    for name, client in (('bulk-ex', bulk), ('single-ex', single), ('rejecting-ex', rejecting)):
+        monkeypatch.setitem(async_exchanges.async_exchanges, name, client)
+
+    symbols = ['BTC/USD', 'ETH/USD', 'SOL/USD']
+    result = async_exchanges.fetch_tickers_bulk({
+        'bulk-ex': symbols, 'single-ex': symbols[:2] + ['BAD/USD'], 'rejecting-ex': symbols[:2]
+    })
+
+    # One bulk request, plus a single fetch for the symbol the bulk answer left out
+    assert bulk.calls == [('fetch_tickers', tuple(symbols)), ('fetch_ticker', 'SOL/USD')]
+    assert [result['bulk-ex'][s]['last'] for s in symbols] == [1.0, 1.0, 2.0]
+    assert sorted(call[0] for call in single.calls) == ['fetch_ticker'] * 3
+    assert isinstance(result['single-ex']['BAD/USD'], ccxt.BadSymbol)
+    assert [result['rejecting-ex'][s]['last'] for s in symbols[:2]] == [2.0, 2.0]
+
+class RateLimitedClient(FakeClient):
+    async def fetch_tickers(self, symbols):
+        self.calls.append(('fetch_tickers', tuple(symbols)))
+        raise ccxt.RateLimitExceeded("429 Too Many Requests")
+
+def test_rate_limited_bulk_request_is_not_retried_per_symbol(monkeypatch):
+    client = RateLimitedClient(bulk=True)
+    monkeypatch.setitem(async_exchanges.async_exchanges, 'limited-ex', client)
+
+    symbols = ['BTC/USD', 'ETH/USD', 'SOL/USD']
+    result = async_exchanges.fetch_tickers_bulk({'limited-ex': symbols})
+
+    assert client.calls == [('fetch_tickers', tuple(symbols))]
+    assert all(isinstance(result['limited-ex'][s], ccxt.RateLimitExceeded) for s in symbols)
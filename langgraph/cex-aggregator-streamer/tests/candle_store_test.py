@@ -0,0 +1,87 @@
+import time
+import numpy as np
+from graph.candle_store import CandleStore
+
+HOUR = 3600 * 1000
+
+class FakeExchange:
+    """Serves hourly candles from a fixed start and counts fetch_ohlcv calls."""
+
+    def __init__(self, start, page_size=100):
+        self.start = start
+        self.page_size = page_size
+        self.calls = 0
+
+    def fetch_ohlcv(self, symbol, timeframe, since=None, limit=None):
+        self.calls += 1
+        first = max(since, self.start)
+        first = first + (-first) % HOUR
+        now = int(time.time() * 1000)
+        return [[t, 1.0, 2.0, 0.5, t / HOUR, 10.0] for t in range(first, min(first + self.page_size * HOUR, now), HOUR)]
+
+def test_update_downloads_only_missing_candles(tmp_path):
+    store = CandleStore(str(tmp_path))
+    now = int(time.time() * 1000)
+    exchange = FakeExchange(start=now - 1000 * HOUR)
+
+    added = store.update('binance', 'BTC/USDT', '1h', now - 300 * HOUR, exchange=exchange)
+    assert 299 <= added <= 300
+    calls = exchange.calls
+
+    # Nothing new has closed, so a second update makes no requests at all
+    assert store.update('binance', 'BTC/USDT', '1h', now - 300 * HOUR, exchange=exchange) == 0
+    assert exchange.calls == calls
+
+    columns = store.read('binance', 'BTC/USDT', '1h')
+    timestamps = np.asarray(columns['timestamp'])
+    assert isinstance(columns['close'], np.memmap)
+    assert np.all(np.diff(timestamps) == HOUR)
+    assert timestamps[-1] < now - now % HOUR
+
+def test_append_skips_existing_rows_and_backfill_extends_history(tmp_path):
+    store = CandleStore(str(tmp_path))
+    base = 1_700_000_000_000 - 1_700_000_000_000 % HOUR
+    rows = [[base + i * HOUR, 1, 1, 1, i, 1] for i in range(10)]
+    assert store.append('kraken', 'ETH/USD', '1h', rows) == 10
+    assert store.append('kraken', 'ETH/USD', '1h', rows[5:] + [[base + 10 * HOUR, 1, 1, 1, 10, 1]]) == 1
+
+    older = [[base - i * HOUR, 1, 1, 1, -i, 1] for i in range(1, 4)]
+    assert store._prepend('kraken', 'ETH/USD', '1h', older) == 3
+    closes = list(store.read('kraken', 'ETH/USD', '1h')['close'])
+    assert closes == list(range(-3, 11))
+    window = store.read('kraken', 'ETH/USD', '1h', since=base, until=base + 3 * HOUR)
+    assert list(window['close']) == [0, 1, 2]
+
+def test_torn_append_is_ignored(tmp_path):
+    store = CandleStore(str(tmp_path))
+    rows = [[i * HOUR, 1, 1, 1, i, 1] for i in range(5)]
+    store.append('okx', 'BTC/USDC', '1h', rows)
+    # Simulate a crash after only the timestamp column was extended
+    with open(tmp_path / 'okx' / 'BTC-USDC' / '1h' / 'timestamp.bin', 'ab') as f:
+        f.write(np.array([5 * HOUR], dtype='<i8').tobytes())
+    assert len(store.read('okx', 'BTC/USDC', '1h')['timestamp']) == 5
+    assert store.append('okx', 'BTC/USDC', '1h', [[5 * HOUR, 1, 1, 1, 5, 1]]) == 1
+    assert list(store.read('okx', 'BTC/USDC', '1h')['close']) == [0, 1, 2, 3, 4, 5]
+
+def test_interrupted_prepend_keeps_the_series_consistent(tmp_path, monkeypatch):
+    store = CandleStore(str(tmp_path))
+    store.append('okx', 'BTC/USDC', '1h', [[i * HOUR, 1, 1, 1, i, 1] for i in range(5, 10)])
+    older = [[i * HOUR, 1, 1, 1, i, 1] for i in range(5)]
+
+    def crash(directory, generation):
+        raise KeyboardInterrupt
+    # Killed after writing every new column file but before switching to them
+    monkeypatch.setattr(store, '_set_generation', crash)
+    try:
+        store._prepend('okx', 'BTC/USDC', '1h', older)
+    except KeyboardInterrupt:
+        pass
+    columns = store.read('okx', 'BTC/USDC', '1h')
+    assert list(columns['timestamp']) == [i * HOUR for i in range(5, 10)]
+    assert list(columns['close']) == list(range(5, 10))
+
+    monkeypatch.undo()
+    assert store._prepend('okx', 'BTC/USDC', '1h', older) == 5
+    columns = store.read('okx', 'BTC/USDC', '1h')
+    assert list(columns['timestamp']) == [i * HOUR for i in range(10)]
+    assert list(columns['close']) == list(range(10))
@@ -0,0 +1,78 @@
+import asyncio
+import time
+import ccxt
+import pytest
+from graph.cassette import Cassette, CassetteClient, CassetteMiss
+
+class FakeClient:
+    """Sync client with the attributes the tools read from a live ccxt client."""
+    rateLimit = 50
+    has = {'fetchTickers': True}
+
+    def __init__(self):
+        self.calls = 0
+        self.markets = {}
+
+    def set_markets(self, markets, currencies=None):
+        self.markets = {m['symbol']: m for m in markets}
+
+    def fetch_ticker(self, symbol):
+        self.calls += 1
+        if symbol == 'NOPE/USDT':
+            raise ccxt.BadSymbol(f"binance does not have market symbol {symbol}")
+        return {'symbol': symbol, 'last': 100.0 + self.calls}
+
+    def fetch_ohlcv(self, symbol, timeframe, since=None):
+        return [[since, 1, 2, 0.5, 1.5, 10]]
+
+class FakeAsyncClient(FakeClient):
+    async def fetch_order_book(self, symbol, limit=None):
+        await asyncio.sleep(0.01)
+        return {'bids': [[99.0, 1.0]], 'asks': [[101.0, 2.0]]}
+
+    async def watch_ticker(self, symbol):
+        raise AssertionError("replay must not open a stream")
+
+def test_record_then_replay(tmp_path):
+    path = str(tmp_path / "cassette.jsonl.gz")
+    recorder = CassetteClient(FakeClient(), 'binance', Cassette(path), mode="record")
+    assert recorder.fetch_ticker('BTC/USDT')['last'] == 101.0
+    assert recorder.fetch_ticker('BTC/USDT')['last'] == 102.0
+    with pytest.raises(ccxt.BadSymbol):
+        recorder.fetch_ticker('NOPE/USDT')
+    recorder._cassette.close()
+
+    live = FakeClient()
+    replayer = CassetteClient(live, 'binance', Cassette(path), mode="replay", latency=0)
+    # Repeated recordings are served in turn, then cycle
+    assert [replayer.fetch_ticker('BTC/USDT')['last'] for _ in range(3)] == [101.0, 102.0, 101.0]
+    with pytest.raises(ccxt.BadSymbol, match="NOPE/USDT"):
+        replayer.fetch_ticker('NOPE/USDT')
+    with pytest.raises(CassetteMiss):
+        replayer.fetch_ticker('ETH/USDT')
+    assert live.calls == 0
+    # Non-network attributes come from the wrapped client
+    assert replayer.rateLimit == 50 and replayer.has['fetchTickers']
+    replayer.enableRateLimit = False
+    assert live.enableRateLimit is False
+
+def test_replay_matches_symbol_when_arguments_drift(tmp_path):
+    path = str(tmp_path / "cassette.jsonl")
+    recorder = CassetteClient(FakeClient(), 'kraken', Cassette(path), mode="record")
+    recorder.fetch_ohlcv('BTC/USD', '1h', 1000)
+    recorder._cassette.close()
+    replayer = CassetteClient(FakeClient(), 'kraken', Cassette(path), latency=0)
+    assert replayer.fetch_ohlcv('BTC/USD', '1h', 5000) == [[1000, 1, 2, 0.5, 1.5, 10]]
+
+def test_async_replay_uses_latency(tmp_path):
+    path = str(tmp_path / "cassette.jsonl")
+    recorder = CassetteClient(FakeAsyncClient(), 'okx', Cassette(path), mode="record")
+    book = asyncio.run(recorder.fetch_order_book('BTC/USDC', 5))
+    recorder._cassette.close()
+
+    replayer = CassetteClient(FakeAsyncClient(), 'okx', Cassette(path), latency=0.05)
+    started = time.perf_counter()
+    assert asyncio.run(replayer.fetch_order_book('BTC/USDC', 5)) == book
+    assert time.perf_counter() - started >= 0.05
+    with pytest.raises(ccxt.NotSupported):
+        asyncio.run(replayer.watch_ticker('BTC/USDC'))
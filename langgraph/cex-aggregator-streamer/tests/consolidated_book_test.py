@@ -0,0 +1,57 @@
+import pytest
+import graph.consolidated_book as consolidated_book
+from graph.consolidated_book import ConsolidatedBook, get_consolidated_book
+
+BOOKS = {
+    'binance': {'bids': [[100.0, 1.0], [99.0, 2.0]], 'asks': [[101.0, 1.0], [103.0, 2.0]]},
+    'kraken': {'bids': [[100.5, 0.5], [98.0, 5.0]], 'asks': [[100.8, 0.5, 3], [102.0, 1.0, 1]]},
+    'okx': {'bids': [], 'asks': []},
+}
+
+def test_merged_sides_are_sorted_best_first():
+    book = ConsolidatedBook.from_books('BTC/USDT', BOOKS)
+    assert list(book.ask_prices) == [100.8, 101.0, 102.0, 103.0]
+    assert list(book.bid_prices) == [100.5, 100.0, 99.0, 98.0]
+    assert book.best_ask() == (100.8, 'kraken')
+    assert book.best_bid() == (100.5, 'kraken')
+
+def test_buy_fill_splits_across_venues():
+    book = ConsolidatedBook.from_books('BTC/USDT', BOOKS)
+    quote = book.fill('buy', 2.0)
+    # 0.5 @ 100.8 (kraken), 1.0 @ 101 (binance), 0.5 @ 102 (kraken)
+    assert quote['filled'] == pytest.approx(2.0)
+    assert quote['cost'] == pytest.approx(0.5 * 100.8 + 101.0 + 0.5 * 102.0)
+    assert quote['vwap'] == pytest.approx(quote['cost'] / 2.0)
+    assert quote['worst_price'] == 102.0
+    assert quote['per_venue']['kraken']['amount'] == pytest.approx(1.0)
+    assert quote['per_venue']['binance']['amount'] == pytest.approx(1.0)
+    assert 'okx' not in quote['per_venue']
+
+def test_sell_beyond_depth_reports_unfilled():
+    book = ConsolidatedBook.from_books('BTC/USDT', BOOKS)
+    quote = book.fill('sell', 10.0)
+    assert quote['filled'] == pytest.approx(8.5)
+    assert quote['unfilled'] == pytest.approx(1.5)
+    assert quote['worst_price'] == 98.0
+
+def test_invalid_side_raises():
+    book = ConsolidatedBook.from_books('BTC/USDT', BOOKS)
+    with pytest.raises(ValueError):
+        book.fill('hold', 1.0)
+
+def test_cached_book_keeps_reporting_failed_venues(monkeypatch):
+    fetches = []
+
+    def fan_out(calls, **kwargs):
+        fetches.append(list(calls))
+        return {'binance': {'bids': [[100.0, 1.0]], 'asks': [[101.0, 1.0]]}, 'kraken': TimeoutError('kraken timed out')}
+
+    monkeypatch.setattr(consolidated_book, '_cache', {})
+    monkeypatch.setattr(consolidated_book, 'fan_out', fan_out)
+    monkeypatch.setattr(consolidated_book, 'stream_order_book', lambda venue, symbol, depth: None)
+    monkeypatch.setattr(consolidated_book, 'keep_streaming', lambda venue, symbol, channel: None)
+    venues = {'binance': 'BTC/USDT', 'kraken': 'BTC/USD'}
+    first_book, first_errors = get_consolidated_book('BTC/USD', venues)
+    book, errors = get_consolidated_book('BTC/USD', venues)
+    assert book is first_book and len(fetches) == 1
+    assert list(errors) == list(first_errors) == ['kraken']
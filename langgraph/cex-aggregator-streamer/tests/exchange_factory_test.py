@@ -0,0 +1,62 @@
+import ccxt
+import pytest
+import graph.async_exchanges as async_exchanges
+import graph.market_cache as market_cache
+from graph.exchange_factory import ExchangeRegistry
+
+MARKETS = [{'id': 'BTCUSDT', 'symbol': 'BTC/USDT', 'base': 'BTC', 'quote': 'USDT'}]
+
+class FakeExchange:
+    instances = 0
+    downloads = 0
+
+    def __init__(self, config):
+        FakeExchange.instances += 1
+        self.markets = None
+        self.enableRateLimit = True
+
+    def fetch_markets(self):
+        FakeExchange.downloads += 1
+        return MARKETS
+
+    def set_markets(self, markets):
+        self.markets = {m['symbol']: m for m in markets}
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    monkeypatch.setattr(ccxt, 'fakeex', FakeExchange, raising=False)
+    monkeypatch.setattr(market_cache, 'CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(market_cache, '_memory', {})
+    FakeExchange.instances = FakeExchange.downloads = 0
+    return ExchangeRegistry({'fakeex': {}})
+
+def test_clients_are_constructed_on_first_access(registry):
+    assert len(registry) == 1 and 'fakeex' in registry and list(registry) == ['fakeex']
+    assert registry.loaded() == [] and FakeExchange.instances == 0
+
+    client = registry['fakeex']
+    assert registry['fakeex'] is client and FakeExchange.instances == 1
+    # A cold cache is not downloaded on access
+    assert registry.warmed() == [] and client.markets is None and FakeExchange.downloads == 0
+
+def test_warm_downloads_once_and_later_clients_warm_from_the_cache(registry):
+    assert registry.warm('fakeex').markets['BTC/USDT']['base'] == 'BTC'
+    registry.warm('fakeex')
+    assert FakeExchange.downloads == 1 and registry.warmed() == ['fakeex']
+
+    # A new registry (e.g. another worker) finds the snapshot and is warm on first access
+    market_cache._memory.clear()
+    other = ExchangeRegistry({'fakeex': {}})
+    assert other['fakeex'].markets and other.warmed() == ['fakeex']
+    assert FakeExchange.downloads == 1
+
+def test_prewarm_warms_async_clients(registry, monkeypatch):
+    monkeypatch.setattr(async_exchanges, 'async_exchanges', {})
+    monkeypatch.setattr(async_exchanges, '_markets_cached', set())
+    monkeypatch.setattr(async_exchanges, 'create_async_exchange', lambda name: FakeExchange({}))
+    assert registry.prewarm(['fakeex', 'unknown'], background=False) is None
+    assert registry.warmed() == ['fakeex']
+    async_client = async_exchanges.async_exchanges['fakeex']
+    # ccxt still prices each endpoint; the scheduler's bucket is charged instead of ccxt's throttle
+    assert async_client.markets and async_client.enableRateLimit and async_client.throttle.__name__ == 'throttle'
+    assert FakeExchange.downloads == 1
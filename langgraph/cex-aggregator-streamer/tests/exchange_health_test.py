@@ -0,0 +1,75 @@
+import asyncio
+import time
+import ccxt
+import pytest
+import graph.async_exchanges as async_exchanges
+from graph import exchange_health
+from graph.exchange_health import CLOSED, HALF_OPEN, OPEN, CircuitOpen, ExchangeHealth, HealthRegistry
+
+class SlowThenFastClient:
+    """Async client whose first fetch_ticker hangs and later ones answer at once."""
+    rateLimit = 1
+    markets = None
+
+    def __init__(self):
+        self.calls = 0
+
+    async def fetch_ticker(self, symbol):
+        self.calls += 1
+        await asyncio.sleep(2 if self.calls == 1 else 0.01)
+        return {'symbol': symbol, 'last': 100.0 + self.calls}
+
+def test_circuit_opens_after_consecutive_failures_and_probes_after_cooldown(monkeypatch):
+    monkeypatch.setattr(exchange_health, 'CIRCUIT_FAILURES', 3)
+    monkeypatch.setattr(exchange_health, 'CIRCUIT_COOLDOWN', 0.05)
+    registry = HealthRegistry()
+    for _ in range(2):
+        registry.record('kraken', 5.0, ccxt.RequestTimeout('slow'))
+    registry.record('kraken', 0.1, ccxt.BadSymbol('not an outage'))
+    assert registry.get('kraken').state == CLOSED
+    for _ in range(3):
+        registry.record('kraken', 5.0, ccxt.NetworkError('down'))
+    assert registry.get('kraken').state == OPEN
+    with pytest.raises(CircuitOpen):
+        registry.check('kraken')
+
+    time.sleep(0.06)
+    registry.check('kraken')  # The single probe goes through
+    assert registry.get('kraken').state == HALF_OPEN
+    with pytest.raises(CircuitOpen):
+        registry.check('kraken')
+    registry.record('kraken', 0.2)
+    assert registry.get('kraken').state == CLOSED
+    registry.check('kraken')
+
+def test_latency_percentiles_and_hedge_delay():
+    health = ExchangeHealth('binance')
+    for latency in [0.04] * 90 + [0.9] * 10:
+        health.record(latency)
+    assert health.latency_percentile(0.5) == 0.05
+    assert health.latency_percentile(0.95) == 1.0
+    assert health.hedge_delay() == 1.0
+    assert health.stats()['error_rate'] == 0
+
+def test_hedged_read_returns_the_faster_copy(monkeypatch):
+    client = SlowThenFastClient()
+    monkeypatch.setitem(async_exchanges.async_exchanges, 'hedge-test', client)
+    monkeypatch.setattr(exchange_health, 'HEDGE_DEFAULT_DELAY', 0.1)
+    started = time.monotonic()
+    ticker = async_exchanges.run_async(async_exchanges.call_exchange('hedge-test', 'fetch_ticker', ('BTC/USDT',), timeout=5, hedge=True))
+    assert time.monotonic() - started < 1
+    assert ticker['last'] == 102.0
+    assert exchange_health.health.get('hedge-test').hedges == 1
+
+def test_fan_out_deadline_returns_the_exchanges_that_answered(monkeypatch):
+    slow, fast = SlowThenFastClient(), SlowThenFastClient()
+    fast.calls = 1
+    monkeypatch.setitem(async_exchanges.async_exchanges, 'deadline-slow', slow)
+    monkeypatch.setitem(async_exchanges.async_exchanges, 'deadline-fast', fast)
+    started = time.monotonic()
+    results = async_exchanges.fan_out({name: ('fetch_ticker', ('BTC/USDT',)) for name in ('deadline-slow', 'deadline-fast')}, deadline=0.3)
+    assert time.monotonic() - started < 1
+    assert isinstance(results['deadline-slow'], async_exchanges.DeadlineExceeded)
+    assert results['deadline-fast']['last'] == 102.0
+    # The abandoned call counts against the slow exchange's health
+    assert exchange_health.health.get('deadline-slow').stats()['error_rate'] == 1.0
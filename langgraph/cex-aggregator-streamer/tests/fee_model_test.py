@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+import graph.fee_model as fee_model_module
+from graph.fee_model import FeeModel, FeeSchedule, _withdraw_fee, effective_buy_prices, effective_sell_prices
+
+MARKETS = [
+    {'symbol': 'BTC/USDT', 'taker': 0.001, 'maker': 0.0008},
+    {'symbol': 'ETH/USDT', 'taker': 0.002, 'maker': 0.001},
+    {'symbol': 'XRP/USDT', 'taker': 0.002},
+    {'symbol': 'DOGE/USDT'},
+]
+
+def test_from_markets_uses_market_fees_and_base_tier():
+    schedule = FeeSchedule.from_markets('binance', MARKETS, {'trading': {'taker': 0.0015, 'maker': 0.0005}})
+    assert schedule.taker_fee('ETH/USDT') == 0.002
+    assert schedule.taker_fee('DOGE/USDT') == 0.0015
+    assert schedule.maker_fee('XRP/USDT') == 0.0005
+    assert schedule.withdraw_fee('BTC') is None
+
+    # Without a base tier the median market fee applies
+    schedule = FeeSchedule.from_markets('binance', MARKETS)
+    assert schedule.taker_fee('DOGE/USDT') == 0.002
+    assert FeeSchedule.from_markets('binance', []).default_taker == fee_model_module.DEFAULT_TAKER_FEE
+
+def test_withdraw_fee_prefers_currency_fee_then_cheapest_network():
+    assert _withdraw_fee({'withdraw': {'fee': 0.0005}}) == 0.0005
+    assert _withdraw_fee({'fee': 1}) == 1.0
+    assert _withdraw_fee({'networks': {'ERC20': {'withdraw': {'fee': 5.0}}, 'TRC20': {'fee': 1.0}}}) == 1.0
+    assert _withdraw_fee({'withdraw': {'fee': None}, 'networks': {}}) is None
+
+def test_effective_prices():
+    asks = np.array([100.0, 100.0, 100.0])
+    taker = np.array([0.001, 0.002, 0.001])
+    assert effective_buy_prices(asks, taker) == pytest.approx([100.1, 100.2, 100.1])
+    assert effective_sell_prices(asks, taker) == pytest.approx([99.9, 99.8, 99.9])
+
+    # A withdrawal fee of 0.1 on 1 unit leaves 0.9 units for the same cost; unknown fees count as zero
+    withdraw = np.array([0.1, np.nan, 2.0])
+    prices = effective_buy_prices(asks, taker, withdraw, amount=1.0)
+    assert prices[0] == pytest.approx(100.1 / 0.9)
+    assert prices[1] == pytest.approx(100.2)
+    assert np.isinf(prices[2])
+
+def test_snapshot_round_trip(tmp_path, monkeypatch):
+    monkeypatch.setattr(fee_model_module, 'snapshot_path', lambda name: str(tmp_path / f"{name}.json.gz"))
+    schedule = FeeSchedule.from_markets('kraken', MARKETS)
+    schedule.withdraw['BTC'] = 0.0002
+    FeeModel()._write_snapshot(schedule)
+
+    loaded = FeeModel().cached('kraken')
+    assert loaded.to_dict() == schedule.to_dict()
+
+    # Expired snapshots are not used
+    assert FeeModel(ttl=-1).cached('kraken') is None
+
+class FakeClient:
+    def __init__(self, has=None):
+        self.has = has or {}
+        self.fees = {}
+
+def test_get_many_falls_back_and_refreshes_in_background(tmp_path, monkeypatch):
+    import threading
+    monkeypatch.setattr(fee_model_module, 'snapshot_path', lambda name: str(tmp_path / f"{name}.json.gz"))
+    monkeypatch.setattr(fee_model_module, 'exchanges', {'kraken': FakeClient({'fetchCurrencies': True}), 'okx': FakeClient()})
+    monkeypatch.setattr(fee_model_module, 'has_credentials', lambda name: False)
+
+    def get_markets(exchange_name, client):
+        if exchange_name == 'okx':
+            raise OSError("unreachable")
+        return MARKETS
+    monkeypatch.setattr(fee_model_module, 'get_markets', get_markets)
+    release = threading.Event()
+
+    def fan_out_many(calls, timeout, priority):
+        release.wait(5)
+        return [{'BTC': {'withdraw': {'fee': 0.0002}}}]
+    monkeypatch.setattr(fee_model_module, 'fan_out_many', fan_out_many)
+
+    model = FeeModel()
+    # Returns from market metadata without waiting for the withdrawal fee request
+    schedules = model.get_many(['kraken', 'okx'])
+    assert schedules['kraken'].taker_fee('ETH/USDT') == 0.002
+    assert schedules['kraken'].withdraw_fee('BTC') is None
+    # One venue failing its metadata does not fail the others
+    assert schedules['okx'].default_taker == fee_model_module.DEFAULT_TAKER_FEE
+    assert 'okx' not in model._schedules
+
+    release.set()
+    model._refresher.join(5)
+    assert model.get('kraken').withdraw_fee('BTC') == 0.0002
+    assert FeeModel().cached('kraken').sources['withdraw'] == 'currencies'
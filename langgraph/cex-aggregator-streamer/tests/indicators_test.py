@@ -0,0 +1,80 @@
+import time
+import numpy as np
+import pandas as pd
+import pytest
+from graph.backtest import rsi
+from graph.indicators import ATR, CandleIndicators, EMA, IndicatorTracker, SMA, Bollinger, RSI
+
+def make_candles(n, seed=7):
+    rng = np.random.default_rng(seed)
+    close = 30000 + np.cumsum(rng.normal(0, 50, n))
+    high = close + rng.uniform(0, 40, n)
+    low = close - rng.uniform(0, 40, n)
+    timestamp = np.arange(n, dtype=np.int64) * 3_600_000
+    return {'timestamp': timestamp, 'open': close, 'high': high, 'low': low, 'close': close, 'volume': np.ones(n)}
+
+def test_streaming_values_match_pandas():
+    close = make_candles(300)['close']
+    series = pd.Series(close)
+    sma, ema, strength, bands = SMA(50), EMA(20), RSI(14), Bollinger(20, 2.0)
+    for value in close:
+        sma.update(value)
+        ema.update(value)
+        strength.update(value)
+        bands.update(value)
+    assert sma.value == pytest.approx(series.rolling(50).mean().iloc[-1])
+    assert ema.value == pytest.approx(series.ewm(span=20, adjust=False).mean().iloc[-1])
+    assert strength.value == pytest.approx(rsi(series, 14).iloc[-1])
+    lower, middle, upper = bands.value
+    assert middle == pytest.approx(series.rolling(20).mean().iloc[-1])
+    assert upper - middle == pytest.approx(2 * series.rolling(20).std(ddof=0).iloc[-1])
+
+def test_seeded_state_continues_like_streamed_state():
+    candles = make_candles(400)
+    split = 237
+    seeded, streamed = CandleIndicators(), CandleIndicators()
+    seeded.seed({name: column[:split] for name, column in candles.items()})
+    for i in range(len(candles['close'])):
+        if i >= split:
+            seeded.update(candles['timestamp'][i], candles['high'][i], candles['low'][i], candles['close'][i])
+        streamed.update(candles['timestamp'][i], candles['high'][i], candles['low'][i], candles['close'][i])
+
+    for name, value in streamed.values().items():
+        assert seeded.values()[name] == pytest.approx(value), name
+
+def test_values_are_none_until_warmed_up():
+    atr = ATR(14)
+    for _ in range(13):
+        assert atr.update(101.0, 99.0, 100.0) is None
+    assert atr.update(101.0, 99.0, 100.0) == pytest.approx(2.0)
+    assert SMA(3).update(1.0) is None
+
+class FakeStore:
+    def __init__(self, candles):
+        self.candles = candles
+        self.visible = 0
+        self.reads = []
+
+    def update(self, exchange_name, symbol, timeframe, since, exchange=None):
+        return 0
+
+    def read(self, exchange_name, symbol, timeframe, since=None, until=None):
+        timestamps = self.candles['timestamp'][:self.visible]
+        start = int(np.searchsorted(timestamps, since)) if since is not None else 0
+        self.reads.append(self.visible - start)
+        return {name: column[start:self.visible] for name, column in self.candles.items()}
+
+def test_tracker_applies_only_new_candles(monkeypatch):
+    candles = make_candles(1000)
+    store = FakeStore(candles)
+    store.visible = 990
+    tracker = IndicatorTracker(store=store)
+    monkeypatch.setattr(time, 'time', lambda: 1000 * 3600)
+    first = tracker.get('binance', 'BTC/USDT', '1h', ma_period=20)
+    store.visible = 1000
+    second = tracker.get('binance', 'BTC/USDT', '1h', ma_period=20)
+
+    assert first is second
+    assert store.reads[-1] == 10
+    assert second.last_timestamp == candles['timestamp'][-1]
+    assert second.sma.value == pytest.approx(candles['close'][-20:].mean())
@@ -0,0 +1,76 @@
+import threading
+import time
+import pytest
+import graph.market_cache as market_cache
+
+MARKETS = [{'id': 'BTCUSDT', 'symbol': 'BTC/USDT'}]
+
+class FakeClient:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.downloads = 0
+        self.markets = None
+
+    def fetch_markets(self):
+        self.downloads += 1
+        time.sleep(self.delay)
+        return MARKETS
+
+    def set_markets(self, markets):
+        self.markets = {m['symbol']: m for m in markets}
+
+@pytest.fixture(autouse=True)
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(market_cache, 'CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(market_cache, '_memory', {})
+    monkeypatch.setattr(market_cache, '_primed_at', {})
+    monkeypatch.setattr(market_cache, 'MARKETS_TTL', 60)
+    monkeypatch.setattr(market_cache, 'MARKETS_DISK_TTL', 600)
+
+def test_warm_hits_do_not_download():
+    client = FakeClient()
+    assert market_cache.get_markets('ex', client) == MARKETS
+    assert market_cache.get_markets('ex', client) == MARKETS
+    assert client.downloads == 1
+
+def test_expired_memory_is_downloaded_again(monkeypatch):
+    client = FakeClient()
+    market_cache.get_markets('ex', client)
+    # Both tiers expire
+    monkeypatch.setattr(market_cache, 'MARKETS_TTL', -1)
+    monkeypatch.setattr(market_cache, 'MARKETS_DISK_TTL', -1)
+    market_cache.get_markets('ex', client)
+    assert client.downloads == 2
+
+def test_reload_bypasses_the_cache():
+    client = FakeClient()
+    market_cache.get_markets('ex', client)
+    market_cache.get_markets('ex', client, reload=True)
+    assert client.downloads == 2
+
+def test_cold_process_adopts_the_disk_snapshot():
+    market_cache.get_markets('ex', FakeClient())
+    market_cache.clear_cache()
+
+    client = FakeClient()
+    assert market_cache.prime_from_cache('ex', client)
+    assert market_cache.get_markets('ex', client) == MARKETS
+    assert client.downloads == 0 and client.markets['BTC/USDT']['id'] == 'BTCUSDT'
+    assert not market_cache.prime_from_cache('other', client)
+
+def test_expired_copy_only_adopts_a_fresher_snapshot(monkeypatch):
+    market_cache.store_markets('ex', MARKETS, fetched_at=time.time() - 120)
+    # The memory copy is stale and the snapshot on disk is the same one, so it is not adopted
+    assert market_cache.cached_markets('ex') is None
+    # Another worker refreshed the snapshot
+    market_cache._write_snapshot('ex', time.time(), MARKETS)
+    assert market_cache.cached_markets('ex')[1] == MARKETS
+
+def test_concurrent_cold_requests_download_once():
+    client = FakeClient(delay=0.05)
+    threads = [threading.Thread(target=market_cache.get_markets, args=('ex', client)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert client.downloads == 1
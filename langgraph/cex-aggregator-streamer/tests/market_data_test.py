@@ -0,0 +1,51 @@
+import time
+from graph.market_data import MarketDataService
+from graph.recorded_feed import RecordedFeed
+
+def make_feed(loop=True):
+    """Build a small recorded feed with ten ticker and order book updates for BTC/USDT on Binance."""
+    messages = []
+    for i in range(10):
+        messages.append({
+            "ts": 1000 + i * 0.01, "channel": "ticker", "exchange": "binance", "symbol": "BTC/USDT",
+            "data": {"symbol": "BTC/USDT", "last": 100 + i, "bid": 99 + i, "ask": 101 + i}
+        })
+        messages.append({
+            "ts": 1000 + i * 0.01, "channel": "book", "exchange": "binance", "symbol": "BTC/USDT",
+            "data": {"bids": [[99 + i, 1.0], [98, 2.0]], "asks": [[101 + i, 1.0], [102 + i, 3.0]], "timestamp": 1000 + i}
+        })
+    return RecordedFeed(messages, speed=1.0, loop=loop)
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+def test_replayed_feed_updates_tickers_and_books():
+    service = MarketDataService(client_factory=make_feed(loop=False).client)
+    updates = []
+    service.add_listener(lambda channel, exchange_name, symbol, data: updates.append(channel))
+    try:
+        service.subscribe("binance", "BTC/USDT", "ticker")
+        service.subscribe("binance", "BTC/USDT", "book")
+        assert wait_for(lambda: (service.get_ticker("binance", "BTC/USDT") or {}).get("last") == 109)
+        assert wait_for(lambda: (service.get_order_book("binance", "BTC/USDT") or {}).get("bids", [[0]])[0][0] == 108)
+        book = service.get_order_book("binance", "BTC/USDT", limit=1)
+        assert book["asks"] == [[110, 1.0]]
+        assert "ticker" in updates and "book" in updates
+    finally:
+        service.close()
+
+def test_stale_data_falls_back():
+    service = MarketDataService(client_factory=make_feed(loop=False).client, max_age=0.05)
+    try:
+        service.subscribe("binance", "BTC/USDT", "ticker")
+        assert wait_for(lambda: service.get_ticker("binance", "BTC/USDT") is not None)
+        # The recording is exhausted, so the feed goes quiet and the ticker becomes stale
+        assert wait_for(lambda: service.get_ticker("binance", "BTC/USDT") is None)
+        assert service.get_ticker("binance", "ETH/USDT") is None
+    finally:
+        service.close()
@@ -0,0 +1,88 @@
+import time
+import numpy as np
+import ccxt
+import pytest
+import graph.order_router as order_router
+from graph.consolidated_book import ConsolidatedBook
+from graph.order_router import PaperExchange, _min_amounts, allocate, parse_balances, plan, venue_book
+
+BOOKS = {
+    'binance': {'bids': [[100.0, 1.0], [99.0, 2.0]], 'asks': [[101.0, 1.0], [103.0, 2.0]]},
+    'kraken': {'bids': [[100.5, 0.5], [98.0, 5.0]], 'asks': [[100.8, 0.5], [102.0, 1.0]]},
+}
+
+def test_fees_change_the_cheapest_venue():
+    book = ConsolidatedBook.from_books('BTC/USDT', BOOKS)
+    # Kraken's 100.8 ask costs more than Binance's 101 once a 0.5% fee is added
+    route = plan(book, 'buy', 1.0, {'binance': 0.0, 'kraken': 0.005})
+    assert route.per_venue['binance']['amount'] == pytest.approx(1.0)
+    assert 'kraken' not in route.per_venue
+    assert route.total == pytest.approx(101.0)
+
+    route = plan(book, 'buy', 1.0, {'binance': 0.0, 'kraken': 0.0})
+    assert route.per_venue['kraken']['amount'] == pytest.approx(0.5)
+    assert route.total == pytest.approx(0.5 * 100.8 + 0.5 * 101.0)
+
+def test_balances_cap_each_venue():
+    book = ConsolidatedBook.from_books('BTC/USDT', BOOKS)
+    # Kraken can only spend 50.4, which buys 0.5 at 100.8 with no fee
+    route = plan(book, 'buy', 2.0, {'binance': 0.0, 'kraken': 0.0}, caps={'kraken': 50.4, 'binance': 1e9})
+    assert route.per_venue['kraken']['amount'] == pytest.approx(0.5)
+    assert route.per_venue['binance']['amount'] == pytest.approx(1.5)
+
+    route = plan(book, 'sell', 3.0, {'binance': 0.001, 'kraken': 0.001}, caps={'binance': 0.2, 'kraken': 10})
+    assert route.per_venue['binance']['amount'] == pytest.approx(0.2)
+    assert route.filled == pytest.approx(3.0)
+    assert route.total == pytest.approx(route.notional * 0.999)
+
+def test_minimum_order_size_drops_a_venue():
+    book = ConsolidatedBook.from_books('BTC/USDT', BOOKS)
+    route = plan(book, 'buy', 0.6, {}, min_amounts={'binance': 0.5})
+    assert 'binance' in route.excluded
+    assert route.per_venue['kraken']['amount'] == pytest.approx(0.6)
+    assert route.single_venue[0] == 'kraken'
+
+def test_allocation_is_optimal_on_random_books():
+    rng = np.random.default_rng(3)
+    books = {f"venue{i}": {'bids': [], 'asks': sorted(([100 + rng.uniform(0, 5), rng.uniform(0.1, 2)] for _ in range(200)))}
+             for i in range(6)}
+    book = ConsolidatedBook.from_books('BTC/USDT', books)
+    fees = np.array([0.001, 0.002, 0.0, 0.0005, 0.001, 0.003])
+    caps = np.array([5000.0, np.inf, 20000.0, 100.0, np.inf, np.inf])
+    started = time.perf_counter()
+    taken = allocate(book.ask_prices, book.ask_sizes, book.ask_venues, 'buy', 300.0, fees, caps)
+    assert time.perf_counter() - started < 0.05
+    assert taken.sum() == pytest.approx(300.0)
+    spent = np.bincount(book.ask_venues, weights=taken * book.ask_prices * (1 + fees[book.ask_venues]), minlength=6)
+    assert np.all(spent <= caps + 1e-6)
+    # Every unused level with capacity left is at least as expensive as the worst level used
+    effective = book.ask_prices * (1 + fees[book.ask_venues])
+    used = taken > 0
+    free = (taken < book.ask_sizes - 1e-9) & (spent[book.ask_venues] < caps[book.ask_venues] - 1e-6)
+    assert effective[free].min() >= effective[used].max() - 1e-9
+
+def test_paper_exchange_fills_and_updates_balances():
+    paper = PaperExchange('binance', parse_balances('USDT:150, BTC:0'), taker_fee=0.001)
+    paper.set_order_book('BTC/USDT', BOOKS['binance'])
+    order = paper.create_order('BTC/USDT', 'market', 'buy', 1.2)
+    assert order['filled'] == pytest.approx(1.2)
+    assert order['cost'] == pytest.approx(101.0 + 0.2 * 103.0)
+    assert paper.fetch_balance()['free']['BTC'] == pytest.approx(1.2)
+    assert paper.balances['USDT'] == pytest.approx(150 - order['cost'] * 1.001)
+    # The snapshot's liquidity is consumed
+    assert paper.fetch_order_book('BTC/USDT')['asks'][0] == [103.0, pytest.approx(1.8)]
+    with pytest.raises(ccxt.InsufficientFunds):
+        paper.create_order('BTC/USDT', 'market', 'buy', 1.0)
+
+def test_venue_book_splits_the_merged_book():
+    book = ConsolidatedBook.from_books('BTC/USDT', BOOKS)
+    assert venue_book(book, 'kraken') == {'bids': [[100.5, 0.5], [98.0, 5.0]], 'asks': [[100.8, 0.5], [102.0, 1.0]]}
+
+def test_min_amounts_skip_venues_without_metadata(monkeypatch):
+    def get_markets(venue, client):
+        if venue == 'kraken':
+            raise ccxt.NetworkError("timed out")
+        return [{'symbol': 'BTC/USDT', 'limits': {'amount': {'min': 0.001}}}]
+    monkeypatch.setattr(order_router, 'get_markets', get_markets)
+    monkeypatch.setattr(order_router, 'exchanges', {'binance': None, 'kraken': None})
+    assert _min_amounts({'binance': 'BTC/USDT', 'kraken': 'BTC/USD'}) == {'binance': 0.001}
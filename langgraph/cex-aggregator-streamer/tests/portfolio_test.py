@@ -0,0 +1,76 @@
+import pytest
+import graph.portfolio as portfolio
+
+@pytest.fixture
+def fake_exchanges(monkeypatch):
+    balances = {
+        'binance': {'total': {'BTC': 0.5, 'USDT': 1000.0, 'DUST': 3.0}, 'free': {'BTC': 0.5, 'USDT': 800.0}, 'used': {'USDT': 200.0}},
+        'kraken': {'total': {'BTC': 0.25, 'ETH': 2.0}, 'free': {'BTC': 0.25, 'ETH': 2.0}, 'used': {}},
+    }
+    markets = {
+        'binance': [{'symbol': 'BTC/USDT'}, {'symbol': 'ETH/USDT'}],
+        'kraken': [{'symbol': 'BTC/USD'}, {'symbol': 'ETH/USD'}],
+    }
+    prices = {('binance', 'BTC/USDT'): 60000.0, ('binance', 'ETH/USDT'): 3000.0, ('kraken', 'BTC/USD'): 60100.0,
+              ('kraken', 'ETH/USD'): 3010.0}
+    calls = []
+
+    def fan_out(requests):
+        calls.extend(requests)
+        return {name: balances[name] if name in balances else RuntimeError('down') for name in requests}
+
+    def fan_out_many(requests):
+        return [{'last': prices[(name, args[0])]} for name, _, args in requests]
+
+    monkeypatch.setattr(portfolio, 'fan_out', fan_out)
+    monkeypatch.setattr(portfolio, 'fan_out_many', fan_out_many)
+    monkeypatch.setattr(portfolio, 'get_markets', lambda name, exchange: markets[name])
+    monkeypatch.setattr(portfolio, 'exchanges', {'binance': None, 'kraken': None, 'okx': None})
+    monkeypatch.setattr(portfolio, 'stream_ticker', lambda exchange, symbol: None)
+    monkeypatch.setattr(portfolio, 'has_credentials', lambda name: name != 'okx')
+    monkeypatch.setattr(portfolio, '_balances', {})
+    monkeypatch.setattr(portfolio, '_prices', {})
+    return calls
+
+def test_aggregate_values_holdings_in_usd(fake_exchanges):
+    result = portfolio.aggregate(['binance', 'kraken', 'okx'])
+    rows = {row['currency']: row for row in result['holdings']}
+    assert rows['BTC']['amount'] == pytest.approx(0.75)
+    assert rows['BTC']['exchanges'] == {'binance': 0.5, 'kraken': 0.25}
+    # Each currency is priced on the first exchange holding it
+    assert rows['BTC']['value'] == pytest.approx(0.75 * 60000.0)
+    assert rows['ETH']['value'] == pytest.approx(2 * 3010.0)
+    assert rows['USDT']['price'] == 1.0 and rows['USDT']['used'] == 200.0
+    assert result['unpriced'] == ['DUST']
+    assert result['skipped'] == ['okx']
+    assert result['total_value'] == pytest.approx(45000.0 + 6020.0 + 1000.0)
+    assert [row['currency'] for row in result['holdings']][:3] == ['BTC', 'ETH', 'USDT']
+
+def test_aggregate_in_btc_and_reuses_balances(fake_exchanges):
+    portfolio.aggregate(['binance', 'kraken'])
+    result = portfolio.aggregate(['binance', 'kraken'], 'btc')
+    assert fake_exchanges == ['binance', 'kraken']
+    rows = {row['currency']: row for row in result['holdings']}
+    assert rows['BTC']['price'] == pytest.approx(1.0)
+    assert rows['USDT']['value'] == pytest.approx(1000.0 / 60000.0)
+
+def test_market_lists_load_once_and_only_where_needed(fake_exchanges, monkeypatch):
+    loaded = []
+
+    def get_markets(name, exchange):
+        loaded.append(name)
+        if name == 'kraken':
+            raise RuntimeError('timed out')
+        return [{'symbol': 'BTC/USDT'}, {'symbol': 'ETH/USDT'}] if name == 'binance' else [{'symbol': 'ETH/USD'}]
+
+    monkeypatch.setattr(portfolio, 'get_markets', get_markets)
+    prices = portfolio.usd_prices({
+        'BTC': ['binance', 'kraken', 'okx'], 'ETH': ['kraken', 'binance', 'okx'], 'XRP': ['kraken', 'okx'],
+    })
+    # The failing exchange is asked once for every currency; okx is only needed for XRP, which it does not list
+    assert sorted(loaded) == ['binance', 'kraken', 'okx']
+    assert prices == {'BTC': 60000.0, 'ETH': 3000.0}
+
+    loaded.clear()
+    portfolio.usd_prices({'BTC': ['binance', 'kraken', 'okx']})
+    assert loaded == ['binance']
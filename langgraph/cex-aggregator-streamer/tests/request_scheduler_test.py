@@ -0,0 +1,106 @@
+import asyncio
+import pytest
+from graph.request_scheduler import BACKGROUND, INTERACTIVE, RequestScheduler, TokenBucket
+
+def run(coro):
+    return asyncio.new_event_loop().run_until_complete(coro)
+
+def test_identical_requests_share_one_call():
+    scheduler = RequestScheduler(burst=1)
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {'last': 100.0}
+
+    async def main():
+        return await asyncio.gather(*(
+            scheduler.submit('binance', 'fetch_ticker', ('BTC/USDT',), fetch, timeout=1, rate_limit_ms=10)
+            for _ in range(5)
+        ))
+
+    results = run(main())
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert scheduler.stats()['binance']['coalesced'] == 4
+
+def test_writes_are_never_coalesced():
+    scheduler = RequestScheduler(burst=5)
+    calls = []
+
+    async def create():
+        calls.append(1)
+        return len(calls)
+
+    async def main():
+        return await asyncio.gather(*(
+            scheduler.submit('binance', 'create_order', ('BTC/USDT',), create, timeout=1, rate_limit_ms=1)
+            for _ in range(3)
+        ))
+
+    assert sorted(run(main())) == [1, 2, 3]
+
+def test_interactive_requests_are_served_before_background():
+    bucket = TokenBucket(rate=50, capacity=1)
+    order = []
+
+    async def take(name, priority):
+        await bucket.acquire(priority)
+        order.append(name)
+
+    async def main():
+        await bucket.acquire()  # Drain the initial token so the rest queue
+        await asyncio.gather(take('background-1', BACKGROUND), take('background-2', BACKGROUND),
+                             take('interactive', INTERACTIVE))
+
+    run(main())
+    assert order == ['interactive', 'background-1', 'background-2']
+
+def test_bucket_paces_requests():
+    bucket = TokenBucket(rate=100, capacity=1)
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        for _ in range(6):
+            await bucket.acquire()
+        return loop.time() - start
+
+    assert run(main()) >= 0.045
+
+def test_abandoned_request_is_cancelled():
+    scheduler = RequestScheduler(burst=1)
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return 1
+
+    async def main():
+        scheduler.bucket('kraken', 1000).tokens = 0
+        with pytest.raises(asyncio.TimeoutError):
+            await scheduler.submit('kraken', 'fetch_ticker', ('BTC/USD',), fetch, timeout=0.01)
+        await asyncio.sleep(0.02)
+        assert scheduler.stats()['kraken']['queued'] == 0
+
+    run(main())
+    assert calls == []
+
+def test_endpoint_cost_is_charged_to_the_bucket():
+    async def elapsed(cost):
+        scheduler = RequestScheduler(burst=1)
+        throttle = scheduler.throttler('binance', 10)
+
+        async def fetch():
+            await throttle(cost)
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await scheduler.submit('binance', 'fetch_tickers', (), fetch, timeout=2, rate_limit_ms=10)
+        await scheduler.submit('binance', 'fetch_ticker', ('BTC/USDT',), fetch, timeout=2, rate_limit_ms=10)
+        return loop.time() - start
+
+    # A plain call is paid by its admission token; a costly one leaves debt the next call waits out
+    assert run(elapsed(1)) < 0.04
+    assert run(elapsed(8)) >= 0.07
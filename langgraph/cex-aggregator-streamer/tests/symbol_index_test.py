@@ -0,0 +1,65 @@
+import pytest
+from graph.symbol_index import ExchangeSymbols, SymbolIndex, UnknownSymbol, normalize, prefix_search
+import graph.symbol_index as symbol_index_module
+
+MARKETS = {
+    'binance': [
+        {'symbol': 'BTC/USDT', 'id': 'BTCUSDT', 'base': 'BTC', 'quote': 'USDT', 'type': 'spot', 'spot': True},
+        {'symbol': 'BTC/USDC', 'id': 'BTCUSDC', 'base': 'BTC', 'quote': 'USDC', 'type': 'spot', 'spot': True},
+        {'symbol': 'ETH/BTC', 'id': 'ETHBTC', 'base': 'ETH', 'quote': 'BTC', 'type': 'spot', 'spot': True},
+        {'symbol': 'BTC/USDT:USDT', 'id': 'BTCUSDT', 'base': 'BTC', 'quote': 'USDT', 'type': 'swap', 'spot': False},
+        {'symbol': 'USDT/UDSC', 'id': 'USDTUDSC', 'base': 'USDT', 'quote': 'UDSC', 'type': 'spot', 'spot': True},
+        {'symbol': 'LUNA/USDT', 'id': 'LUNAUSDT', 'base': 'LUNA', 'quote': 'USDT', 'type': 'spot', 'active': False},
+    ],
+    'kraken': [
+        {'symbol': 'BTC/USD', 'id': 'XXBTZUSD', 'base': 'BTC', 'quote': 'USD', 'type': 'spot', 'spot': True},
+        {'symbol': 'BTC/EUR', 'id': 'XXBTZEUR', 'base': 'BTC', 'quote': 'EUR', 'type': 'spot', 'spot': True},
+        {'symbol': 'SOL/USD', 'id': 'SOLUSD', 'base': 'SOL', 'quote': 'USD', 'type': 'spot', 'spot': True},
+    ],
+}
+
+def test_resolves_common_spellings():
+    binance = ExchangeSymbols('binance', MARKETS['binance'])
+    assert binance.resolve('btc/usdt') == 'BTC/USDT'
+    assert binance.resolve('BTCUSDT') == 'BTC/USDT'
+    assert binance.resolve('btc-usdt') == 'BTC/USDT'
+    assert binance.resolve('BTC') == 'BTC/USDT'
+    assert binance.resolve('BTC/USDC') == 'BTC/USDC'
+    assert binance.resolve('BTC/USDT:USDT') == 'BTC/USDT:USDT'
+    assert binance.resolve('bitcoin/usdt') == 'BTC/USDT'
+
+def test_usd_equivalents_and_exchange_ids():
+    kraken = ExchangeSymbols('kraken', MARKETS['kraken'])
+    assert kraken.resolve('BTC/USDT') == 'BTC/USD'
+    assert kraken.resolve('XBT/USD') == 'BTC/USD'
+    assert kraken.resolve('XXBTZUSD') == 'BTC/USD'
+    assert kraken.resolve('BTC') == 'BTC/USD'
+    assert kraken.resolve('BTC/EUR') == 'BTC/EUR'
+
+def test_blacklisted_and_inactive_symbols_are_rejected():
+    binance = ExchangeSymbols('binance', MARKETS['binance'])
+    assert binance.resolve('USDT/UDSC') is None
+    assert binance.resolve('LUNA/USDT') is None
+    assert binance.resolve('DOGE/USDT') is None
+    assert binance.suggestions('BTC/EUR') == ['BTC/USDC', 'BTC/USDT']
+
+def test_prefix_search():
+    symbols = sorted(['BTC/USD', 'BTC/EUR', 'BCH/USD', 'ETH/BTC', 'SOL/USD'])
+    assert prefix_search(symbols, 'BT') == ['BTC/EUR', 'BTC/USD']
+    assert prefix_search(symbols, 'BTC/U') == ['BTC/USD']
+    assert prefix_search(symbols, 'X') == []
+    assert normalize(' sol_usd ') == 'SOL/USD'
+
+def test_index_resolves_across_exchanges(monkeypatch):
+    monkeypatch.setattr(symbol_index_module, 'get_markets', lambda name, exchange: MARKETS[name])
+    monkeypatch.setattr(symbol_index_module, 'exchanges', {'binance': None, 'kraken': None})
+    index = SymbolIndex()
+    resolved, missing = index.resolve_many(['binance', 'kraken'], 'SOL/USDT')
+    assert resolved == {'kraken': 'SOL/USD'}
+    assert isinstance(missing['binance'], UnknownSymbol)
+    with pytest.raises(UnknownSymbol, match="Did you mean: BTC/USDC, BTC/USDT"):
+        index.resolve('binance', 'BTC/EUR')
+    assert index.search('btc/', ['binance', 'kraken']) == [
+        ('BTC/EUR', ['kraken']), ('BTC/USD', ['kraken']), ('BTC/USDC', ['binance']),
+        ('BTC/USDT', ['binance']), ('BTC/USDT:USDT', ['binance'])
+    ]
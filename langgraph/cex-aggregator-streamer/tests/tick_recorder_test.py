@@ -0,0 +1,93 @@
+import asyncio
+import gzip
+import os
+from datetime import datetime, timezone
+from graph.tick_recorder import TickRecorder, TickStore, _StreamState, spread_history
+
+class FakeService:
+    def add_listener(self, callback):
+        pass
+
+    def remove_listener(self, callback):
+        pass
+
+    def subscribe(self, exchange_name, symbol, channel):
+        pass
+
+HOUR = datetime(2026, 1, 5, 10, tzinfo=timezone.utc).timestamp()
+
+def make_recorder(tmp_path, **kwargs):
+    recorder = TickRecorder(TickStore(str(tmp_path)), FakeService(), sample_interval=0, **kwargs)
+    recorder._state = {key: _StreamState() for key in [('ticker', 'binance', 'BTC/USDT'), ('book', 'binance', 'BTC/USDT')]}
+    return recorder
+
+def book(bids, asks):
+    return {'bids': [[p, a] for p, a in bids], 'asks': [[p, a] for p, a in asks]}
+
+def test_book_deltas_round_trip_across_partitions(tmp_path):
+    recorder = make_recorder(tmp_path, keyframe_interval=100)
+    snapshots = [
+        (HOUR + 10, book([(100, 1), (99, 2)], [(101, 1), (102, 3)])),
+        (HOUR + 20, book([(100, 1.5), (99, 2)], [(101, 1), (102, 3)])),
+        (HOUR + 30, book([(100, 1.5)], [(100.5, 4), (101, 1)])),
+        (HOUR + 3600 + 5, book([(98, 1)], [(99, 1)])),
+    ]
+    for ts, snapshot in snapshots:
+        recorder.record('book', 'binance', 'BTC/USDT', snapshot, ts=ts)
+    asyncio.run(recorder._flush())
+
+    store = recorder.store
+    first = store.partitions('binance', 'BTC/USDT', 'book', HOUR, HOUR + 60)
+    with gzip.open(first[0], 'rt') as f:
+        lines = f.read().splitlines()
+    # One keyframe, then only changed levels
+    assert '"key":true' in lines[0] and '"key"' not in lines[1]
+    assert lines[1].count('[') == 3  # one changed bid level
+
+    replayed = list(store.read('binance', 'BTC/USDT', 'book', HOUR + 15, HOUR + 7200))
+    assert [r['ts'] for r in replayed] == [HOUR + 20, HOUR + 30, HOUR + 3605]
+    for record, (_, snapshot) in zip(replayed, snapshots[1:]):
+        assert record['bids'] == snapshot['bids'] and record['asks'] == snapshot['asks']
+
+def test_finished_partitions_are_compacted(tmp_path):
+    recorder = make_recorder(tmp_path)
+    for i in range(5):
+        recorder.record('ticker', 'binance', 'BTC/USDT', {'bid': 100 + i, 'ask': 101 + i}, ts=HOUR + i)
+        asyncio.run(recorder._flush())
+    path = recorder.store.partition_path('binance', 'BTC/USDT', 'ticker', datetime.fromtimestamp(HOUR, timezone.utc))
+    appended_size = os.path.getsize(path)
+    recorder.record('ticker', 'binance', 'BTC/USDT', {'bid': 1, 'ask': 2}, ts=HOUR + 3600)
+    asyncio.run(recorder._flush())
+    assert os.path.getsize(path) < appended_size
+    assert len(list(recorder.store.read('binance', 'BTC/USDT', 'ticker', HOUR, HOUR + 3599))) == 5
+
+def test_spread_history_resamples_recorded_tickers(tmp_path):
+    recorder = make_recorder(tmp_path)
+    for minute in range(120):
+        recorder.record('ticker', 'binance', 'BTC/USDT', {'bid': 100.0, 'ask': 100.2 if minute < 60 else 100.4, 'last': 100.1},
+                        ts=HOUR + minute * 60)
+    asyncio.run(recorder._flush())
+    stats = spread_history('binance', 'BTC/USDT', HOUR, HOUR + 7200, "1h", store=recorder.store)
+    assert list(stats['samples']) == [60, 60]
+    assert round(stats['spread_mean'].iloc[0], 3) == 0.2
+    assert round(stats['spread_max'].iloc[1], 3) == 0.399
+
+def test_torn_member_does_not_hide_later_appends(tmp_path):
+    recorder = make_recorder(tmp_path)
+    path = recorder.store.partition_path('binance', 'BTC/USDT', 'ticker', datetime.fromtimestamp(HOUR, timezone.utc))
+    recorder.store.append(path, ['{"ts": %s, "bid": 1, "ask": 2}' % HOUR])
+    with open(path, 'ab') as f:
+        # An append interrupted halfway through its gzip member
+        f.write(gzip.compress(b'{"ts": 0, "bid": 0, "ask": 0}\n')[:15])
+    recorder.store.append(path, ['{"ts": %s, "bid": 3, "ask": 4}' % (HOUR + 1)])
+
+    assert [r['bid'] for r in recorder.store.read('binance', 'BTC/USDT', 'ticker', HOUR, HOUR + 10)] == [1, 3]
+    recorder.store.compact(path)
+    assert [r['bid'] for r in recorder.store.read('binance', 'BTC/USDT', 'ticker', HOUR, HOUR + 10)] == [1, 3]
+
+def test_recorded_streams_round_trip_symbols(tmp_path):
+    store = TickStore(str(tmp_path))
+    symbols = ['BTC/USDT:USDT', 'BTC-PERP', 'ETH_USD/USD']
+    for symbol in symbols:
+        store.append(store.partition_path('binance', symbol, 'ticker', datetime.fromtimestamp(HOUR, timezone.utc)), ['{}'])
+    assert sorted(symbol for _, symbol, _ in store.recorded_streams()) == sorted(symbols)
@@ -0,0 +1,99 @@
+import numpy as np
+from graph.fee_model import FeeSchedule
+from graph.triangular import MarketGraph, TriangularScanner
+
+def market(symbol, taker=0.0):
+    base, quote = symbol.split('/')
+    return {'symbol': symbol, 'base': base, 'quote': quote, 'type': 'spot', 'spot': True, 'active': True, 'taker': taker}
+
+def quote(price, half_spread=0.0):
+    return {'bid': price * (1 - half_spread), 'ask': price * (1 + half_spread)}
+
+def test_finds_triangle_with_legs_in_trading_order():
+    graph = MarketGraph('test', [market('BTC/USDT'), market('ETH/BTC'), market('ETH/USDT'), market('XRP/USDT')])
+    graph.update({'BTC/USDT': quote(100), 'ETH/BTC': quote(0.05), 'ETH/USDT': quote(5.2), 'XRP/USDT': quote(1, 0.01)})
+    cycles = graph.find_cycles()
+    assert len(cycles) == 1
+    assert cycles[0]['currencies'] == ['USDT', 'BTC', 'ETH', 'USDT']
+    assert [(leg['symbol'], leg['side']) for leg in cycles[0]['legs']] == [('BTC/USDT', 'buy'), ('ETH/BTC', 'buy'), ('ETH/USDT', 'sell')]
+    assert np.isclose(cycles[0]['net_return'], 0.04)
+
+def test_fees_and_price_updates_change_the_result():
+    markets = [market('BTC/USDT', 0.01), market('ETH/BTC', 0.01), market('ETH/USDT', 0.01)]
+    graph = MarketGraph('test', markets)
+    graph.update({'BTC/USDT': quote(100), 'ETH/BTC': quote(0.05), 'ETH/USDT': quote(5.1)})
+    # 2% gross is less than three 1% taker fees
+    assert graph.find_cycles() == []
+    version = graph.version
+    assert graph.update({'ETH/USDT': quote(5.1)}) == 0 and graph.version == version
+    graph.update({'ETH/USDT': quote(5.3)})
+    assert len(graph.find_cycles()) == 1
+
+def test_finds_planted_cycle_among_thousands_of_consistent_markets():
+    rng = np.random.default_rng(7)
+    currencies = [f'C{i}' for i in range(500)] + ['USDT']
+    value = {c: rng.uniform(0.1, 100) for c in currencies}
+    value['USDT'] = 1.0
+    markets, tickers = [], {}
+    for _ in range(3000):
+        base, quote_currency = rng.choice(currencies, 2, replace=False)
+        symbol = f'{base}/{quote_currency}'
+        if symbol not in tickers:
+            markets.append(market(symbol, 0.001))
+            tickers[symbol] = quote(value[base] / value[quote_currency], 0.0005)
+    # A 3.3% cycle through two currencies that appear nowhere else
+    for symbol, price in (('AAA/USDT', 10.0), ('BBB/AAA', 3.0), ('BBB/USDT', 31.0)):
+        markets.append(market(symbol, 0.001))
+        tickers[symbol] = quote(price)
+    graph = MarketGraph('test', markets)
+    graph.update(tickers)
+    cycles = graph.find_cycles(limit=3)
+    assert [cycle['currencies'] for cycle in cycles] == [['USDT', 'AAA', 'BBB', 'USDT']]
+
+def test_longer_cycles_do_not_hide_a_triangle_sharing_their_leg():
+    markets = [market(s) for s in ('BTC/USDT', 'ETH/BTC', 'ETH/USDT', 'X/BTC', 'Y/X', 'Y/USDT')]
+    graph = MarketGraph('test', markets)
+    # A 50% four-trade cycle whose most expensive leg, buying BTC, is also the first leg of a 1% triangle
+    graph.update({'BTC/USDT': quote(100), 'ETH/BTC': quote(0.05), 'ETH/USDT': quote(5.05),
+                  'X/BTC': quote(0.01), 'Y/X': quote(1), 'Y/USDT': quote(1.5)})
+    cycles = graph.find_cycles(max_legs=3)
+    assert [cycle['currencies'] for cycle in cycles] == [['USDT', 'BTC', 'ETH', 'USDT']]
+    assert np.isclose(cycles[0]['net_return'], 0.01)
+
+def account_fees(taker, per_symbol=None):
+    return FeeSchedule('test', 0.0, taker, taker, dict(per_symbol or {}), {}, {}, {'trading': 'account', 'withdraw': 'none'})
+
+def test_account_fee_schedule_overrides_market_fees():
+    markets = [market('BTC/USDT'), market('ETH/BTC'), market('ETH/USDT')]
+    tickers = {'BTC/USDT': quote(100), 'ETH/BTC': quote(0.05), 'ETH/USDT': quote(5.1)}
+    graph = MarketGraph('test', markets, account_fees(0.01))
+    graph.update(tickers)
+    # Free in the public metadata, but the account pays 1% per trade: 2% gross does not cover it
+    assert graph.find_cycles() == []
+    graph.set_fees(account_fees(0.01, {'ETH/BTC': 0.0, 'ETH/USDT': 0.0}))
+    assert np.isclose(graph.find_cycles()[0]['net_return'], 1.02 * 0.99 - 1)
+    # A schedule built without market metadata falls back to the markets' own taker fees
+    graph.set_fees(FeeSchedule.fallback('test'))
+    assert np.isclose(graph.find_cycles()[0]['net_return'], 0.02)
+
+class FakeService:
+    def add_listener(self, callback):
+        self.callback = callback
+
+def test_streamed_tickers_update_the_scanner_graph(monkeypatch):
+    service = FakeService()
+    scanner = TriangularScanner(service=service)
+    markets = [market('BTC/USDT'), market('ETH/BTC'), market('ETH/USDT')]
+    monkeypatch.setattr('graph.triangular.get_markets', lambda name, exchange: markets)
+    fetched = {'BTC/USDT': quote(100), 'ETH/BTC': quote(0.05), 'ETH/USDT': quote(5.0)}
+    monkeypatch.setattr('graph.triangular.request', lambda name, method, args, timeout=None: fetched)
+    monkeypatch.setattr('graph.triangular.exchanges', {'test': object()})
+    schedules = {'test': account_fees(0.0)}
+    monkeypatch.setattr('graph.triangular.fee_model', type('FakeFeeModel', (), {'get': lambda self, name: schedules[name]})())
+    assert scanner.scan('test')['cycles'] == []
+    service.callback('ticker', 'test', 'ETH/USDT', quote(5.5))
+    assert len(scanner.scan('test')['cycles']) == 1
+    # A new schedule (e.g. from the background fee refresh) re-weights the graph without rebuilding it
+    graph = scanner.graph('test')
+    schedules['test'] = account_fees(0.05)
+    assert scanner.scan('test')['cycles'] == [] and scanner.graph('test') is graph
@@ -0,0 +1,89 @@
+import asyncio
+import numpy as np
+import pytest
+from graph.watchlist import Watchlist, evaluate, _KIND_CODES
+
+class FakeService:
+    def __init__(self):
+        self.subscribed = []
+
+    def add_listener(self, callback):
+        pass
+
+    def subscribe(self, exchange_name, symbol, channel):
+        self.subscribed.append((exchange_name, symbol, channel))
+
+    def get_ticker(self, exchange_name, symbol):
+        return None
+
+def test_evaluate_all_condition_kinds():
+    kinds = np.array([_KIND_CODES[k] for k in ('above', 'below', 'change_pct', 'change_pct', 'spread_pct', 'above')])
+    values = np.array([70000, 60000, 5, -5, 0.1, 1])
+    references = np.array([np.nan, np.nan, 66000, 76000, np.nan, np.nan])
+    last = np.array([70000, 65000, 69300, 72000, 100, np.nan])
+    bid = np.array([np.nan, np.nan, np.nan, np.nan, 99.9, np.nan])
+    ask = np.array([np.nan, np.nan, np.nan, np.nan, 100.1, np.nan])
+    assert evaluate(kinds, values, references, last, bid, ask).tolist() == [True, False, True, True, True, False]
+
+def make_watchlist(**kwargs):
+    watchlist = Watchlist(service=FakeService(), **kwargs)
+    watchlist.start = lambda: None
+    return watchlist
+
+def test_one_shot_alert_fires_once_for_its_owner():
+    watchlist = make_watchlist()
+    above = watchlist.add('binance', 'BTC/USDT', 'above', 70000, owner='alice')
+    watchlist.add('binance', 'ETH/USDT', 'below', 3000, owner='bob')
+    assert watchlist.service.subscribed[0] == ('binance', 'BTC/USDT', 'ticker')
+
+    async def main():
+        queue = asyncio.Queue()
+        watchlist._queues.append(('alice', queue))
+        watchlist.record('binance', 'BTC/USDT', {'last': 69000})
+        watchlist.record('binance', 'SOL/USDT', {'last': 1})  # Not watched; ignored
+        await asyncio.sleep(0)
+        assert queue.empty()
+        watchlist.record('binance', 'BTC/USDT', {'last': 70500})
+        watchlist.record('binance', 'ETH/USDT', {'last': 2900})
+        await asyncio.sleep(0)
+        event = queue.get_nowait()
+        assert event['alert']['id'] == above['id'] and event['last'] == 70500
+        assert queue.empty()  # bob's alert fired too, but is not delivered to alice
+        watchlist.record('binance', 'BTC/USDT', {'last': 71000})
+        await asyncio.sleep(0)
+        assert queue.empty()
+
+    asyncio.run(main())
+    assert not watchlist.alerts[above['id']]['active']
+
+def test_repeating_alert_rearms_when_condition_clears():
+    watchlist = make_watchlist()
+    watchlist.add('kraken', 'BTC/USD', 'spread_pct', 0.5, repeat=True)
+    fired = []
+    for bid, ask in ((100, 101), (100, 101), (100, 100.1), (100, 102)):
+        # record() needs a running loop; store the price and run the pass directly
+        key = ('kraken', 'BTC/USD')
+        watchlist._prices[key] = (100.0, bid, ask, 0)
+        watchlist._dirty.add(key)
+        fired.append(len(watchlist.evaluate_pending()))
+    assert fired == [1, 0, 0, 1]
+
+def test_alert_limits_and_triggered_alert_retention():
+    watchlist = make_watchlist(max_alerts=3, max_alerts_per_owner=2, retention=60)
+    first = watchlist.add('binance', 'BTC/USDT', 'above', 70000, owner='alice')
+    watchlist.add('binance', 'ETH/USDT', 'above', 4000, owner='alice')
+    with pytest.raises(ValueError, match='this owner'):
+        watchlist.add('binance', 'SOL/USDT', 'above', 200, owner='alice')
+    watchlist.add('binance', 'SOL/USDT', 'above', 200, owner='bob')
+    with pytest.raises(ValueError, match='Too many alerts'):
+        watchlist.add('binance', 'XRP/USDT', 'above', 1, owner='carol')
+
+    # A one-shot alert that fired is still listed until the retention period has passed
+    key = ('binance', 'BTC/USDT')
+    watchlist._prices[key] = (71000.0, np.nan, np.nan, 0)
+    watchlist._dirty.add(key)
+    assert len(watchlist.evaluate_pending()) == 1
+    assert [a['id'] for a in watchlist.list('alice')][0] == first['id']
+    watchlist.alerts[first['id']]['triggered_at'] -= 61
+    assert first['id'] not in [a['id'] for a in watchlist.list('alice')]
+    assert watchlist.add('binance', 'XRP/USDT', 'above', 1, owner='alice')['owner'] == 'alice'
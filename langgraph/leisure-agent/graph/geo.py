@@ -0,0 +1,116 @@
+from typing import Tuple
+import numpy as np
+
+# Mean Earth radius used for great-circle distances
+EARTH_RADIUS_KM = 6371.0088
+
+def haversine_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """
+    Great-circle distance in kilometres between points given in degrees.
+
+    Arguments broadcast like NumPy arrays, so one call computes the distances of whole coordinate
+    columns (or of every point to one point); unknown coordinates (NaN) give NaN.
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(value, dtype=np.float64)) for value in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+def to_float(values) -> np.ndarray:
+    """Parse a column of OpenFlights numbers, with NaN for missing or malformed values."""
+    result = np.full(len(values), np.nan)
+    for i, value in enumerate(values):
+        try:
+            result[i] = float(value)
+        except ValueError:
+            pass
+    return result
+
+class GridIndex:
+    """
+    Points bucketed into an equal-angle latitude/longitude grid, for radius and nearest-neighbour queries.
+
+    Points are sorted by cell and `cell_start` holds where each cell's run begins (the CSR layout),
+    so a query only gathers the rows of cells its search cap overlaps and computes haversine
+    distances for those candidates in one vectorized call.
+    """
+
+    def __init__(self, latitude, longitude, cell_degrees: float = 1.0):
+        latitude, longitude = np.asarray(latitude, dtype=np.float64), np.asarray(longitude, dtype=np.float64)
+        self.cell_degrees = cell_degrees
+        self.rows, self.columns = int(np.ceil(180 / cell_degrees)), int(np.ceil(360 / cell_degrees))
+        valid = np.flatnonzero(np.isfinite(latitude) & np.isfinite(longitude) & (np.abs(latitude) <= 90))
+        cells = self._row(latitude[valid]) * self.columns + self._column(longitude[valid])
+        order = np.argsort(cells, kind="stable")
+        # Positions of the points in the arrays the index was built from, in cell order
+        self.ids = valid[order]
+        self.latitude, self.longitude = latitude[self.ids], longitude[self.ids]
+        self.cell_start = np.searchsorted(cells[order], np.arange(self.rows * self.columns + 1))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _row(self, latitude):
+        return np.clip(np.floor((np.asarray(latitude) + 90) / self.cell_degrees), 0, self.rows - 1).astype(np.int64)
+
+    def _column(self, longitude):
+        return (np.floor((np.asarray(longitude) + 180) / self.cell_degrees) % self.columns).astype(np.int64)
+
+    def _candidates(self, latitude: float, longitude: float, radius_km: float) -> np.ndarray:
+        """Sorted-array positions of the points in cells overlapping the cap of `radius_km` around a point."""
+        angle = radius_km / EARTH_RADIUS_KM
+        if angle >= np.pi:
+            return np.arange(len(self.ids))
+        delta_latitude = np.degrees(angle)
+        first_row, last_row = int(self._row(latitude - delta_latitude)), int(self._row(latitude + delta_latitude))
+
+        # Widest longitude difference inside the cap; the cap covers every longitude if it reaches a pole
+        if latitude - delta_latitude <= -90 or latitude + delta_latitude >= 90 or np.sin(angle) >= np.cos(np.radians(latitude)):
+            column_ranges = [(0, self.columns - 1)]
+        else:
+            delta_longitude = np.degrees(np.arcsin(np.sin(angle) / np.cos(np.radians(latitude))))
+            first_column = int(np.floor((longitude - delta_longitude + 180) / self.cell_degrees))
+            last_column = int(np.floor((longitude + delta_longitude + 180) / self.cell_degrees))
+            if last_column - first_column + 1 >= self.columns:
+                column_ranges = [(0, self.columns - 1)]
+            elif first_column < 0:
+                column_ranges = [(0, last_column), (first_column % self.columns, self.columns - 1)]
+            elif last_column >= self.columns:
+                column_ranges = [(first_column, self.columns - 1), (0, last_column % self.columns)]
+            else:
+                column_ranges = [(first_column, last_column)]
+
+        # Cells of one row and a column range are contiguous, so each is a single slice
+        slices = [(self.cell_start[row * self.columns + first], self.cell_start[row * self.columns + last + 1])
+                  for row in range(first_row, last_row + 1) for first, last in column_ranges]
+        return np.concatenate([np.arange(start, end) for start, end in slices if end > start] or [np.zeros(0, dtype=np.int64)])
+
+    def within(self, latitude: float, longitude: float, radius_km: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Points within `radius_km` of a point, nearest first.
+
+        Returns:
+            tuple: (positions in the indexed arrays, distances in km)
+        """
+        candidates = self._candidates(latitude, longitude, radius_km)
+        distances = haversine_km(latitude, longitude, self.latitude[candidates], self.longitude[candidates])
+        inside = distances <= radius_km
+        candidates, distances = candidates[inside], distances[inside]
+        order = np.argsort(distances, kind="stable")
+        return self.ids[candidates[order]], distances[order]
+
+    def nearest(self, latitude: float, longitude: float, k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The k points nearest to a point, nearest first.
+
+        Searches caps of doubling radius from one cell wide; once a cap holds k points, no point
+        outside it can be nearer than the k-th.
+
+        Returns:
+            tuple: (positions in the indexed arrays, distances in km)
+        """
+        radius_km = np.radians(self.cell_degrees) * EARTH_RADIUS_KM
+        while True:
+            ids, distances = self.within(latitude, longitude, radius_km)
+            if len(ids) >= k or radius_km >= np.pi * EARTH_RADIUS_KM:
+                return ids[:k], distances[:k]
+            radius_km *= 2
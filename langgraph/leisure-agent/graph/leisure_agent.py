@@ -8,10 +8,11 @@ from langgraph.graph.message import add_messages
 from dotenv import load_dotenv
 import os
 import requests
-import csv
-import io
 import json
+import math
 from typing import List, Dict, Any
+from graph.openflights import NULL, openflights
+from graph.route_graph import route_graph
 
 #https://github.com/langchain-ai/langgraph/blob/main/docs/docs/concepts/low_level.md
 # Load environment variables
@@ -22,83 +23,24 @@ class OpenFlightsState(TypedDict):
     messages: Annotated[list, add_messages]
     thread_id: Optional[str]
 
-# OpenFlights API base URLs
-OPENFLIGHTS_BASE_URL = "https://raw.githubusercontent.com/jpatokal/openflights/master/data"
-AIRPORTS_URL = f"{OPENFLIGHTS_BASE_URL}/airports.dat"
-AIRLINES_URL = f"{OPENFLIGHTS_BASE_URL}/airlines.dat"
-ROUTES_URL = f"{OPENFLIGHTS_BASE_URL}/routes.dat"
-
 # TripAdvisor API configuration
 TRIPADVISOR_API_KEY = os.getenv("TRIPADVISOR_API_KEY")
 TRIPADVISOR_BASE_URL = "https://api.content.tripadvisor.com/api/v1"
 
-def fetch_csv_data(url: str) -> List[List[str]]:
-    """Fetch CSV data from OpenFlights repository."""
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
-        
-        # Parse CSV data
-        csv_data = []
-        csv_reader = csv.reader(io.StringIO(response.text))
-        for row in csv_reader:
-            csv_data.append(row)
-        return csv_data
-    except Exception as e:
-        print(f"Error fetching data from {url}: {str(e)}")
-        return []
-
 @tool
 def search_airports(query: str, country: Optional[str] = None) -> str:
     """
-    Search for airports by name, IATA code, or ICAO code.
+    Search for airports by name, city, IATA code, or ICAO code. Results are ranked, exact codes first, and tolerate typos.
     Parameters:
-        query: Search term (airport name, IATA code, or ICAO code)
+        query: Search term (airport name, city, IATA code, or ICAO code)
         country: Optional country filter
     """
     try:
-        airports_data = fetch_csv_data(AIRPORTS_URL)
-        if not airports_data:
+        airports = openflights.airports()
+        if not airports:
             return "Error: Unable to fetch airports data."
         
-        # OpenFlights airports.dat format:
-        # 0: Airport ID, 1: Name, 2: City, 3: Country, 4: IATA, 5: ICAO, 6: Latitude, 7: Longitude, 8: Altitude, 9: Timezone, 10: DST, 11: Tz database time zone, 12: Type, 13: Source
-        
-        results = []
-        query_lower = query.lower()
-        
-        for airport in airports_data:
-            if len(airport) < 14:
-                continue
-                
-            airport_name = airport[1].lower()
-            iata_code = airport[4].lower()
-            icao_code = airport[5].lower()
-            country_name = airport[3].lower()
-            
-            # Check if query matches any field
-            if (query_lower in airport_name or 
-                query_lower in iata_code or 
-                query_lower in icao_code):
-                
-                # Apply country filter if provided
-                if country and country.lower() not in country_name:
-                    continue
-                    
-                results.append({
-                    'name': airport[1],
-                    'city': airport[2],
-                    'country': airport[3],
-                    'iata': airport[4],
-                    'icao': airport[5],
-                    'latitude': airport[6],
-                    'longitude': airport[7],
-                    'timezone': airport[9]
-                })
-                
-                # Limit results to avoid overwhelming response
-                if len(results) >= 10:
-                    break
+        results = airports.search(query, country, limit=10)
         
         if not results:
             return f"No airports found matching '{query}'"
@@ -106,10 +48,10 @@ def search_airports(query: str, country: Optional[str] = None) -> str:
         response = f"Found {len(results)} airport(s) matching '{query}':\n\n"
         for i, airport in enumerate(results, 1):
             response += (
-                f"{i}. {airport['name']} ({airport['iata']}/{airport['icao']})\n"
-                f"   City: {airport['city']}, {airport['country']}\n"
-                f"   Coordinates: {airport['latitude']}, {airport['longitude']}\n"
-                f"   Timezone: {airport['timezone']}\n\n"
+                f"{i}. {airport.name} ({airport.iata}/{airport.icao})\n"
+                f"   City: {airport.city}, {airport.country}\n"
+                f"   Coordinates: {airport.latitude}, {airport.longitude}\n"
+                f"   Timezone: {airport.timezone}\n\n"
             )
         
         return response
@@ -120,64 +62,28 @@ def search_airports(query: str, country: Optional[str] = None) -> str:
 @tool
 def search_airlines(query: str, country: Optional[str] = None) -> str:
     """
-    Search for airlines by name, IATA code, or ICAO code.
+    Search for airlines by name, alias, callsign, IATA code, or ICAO code. Results are ranked, exact codes first, and tolerate typos.
     Parameters:
-        query: Search term (airline name, IATA code, or ICAO code)
+        query: Search term (airline name, alias, callsign, IATA code, or ICAO code)
         country: Optional country filter
     """
     try:
-        airlines_data = fetch_csv_data(AIRLINES_URL)
-        if not airlines_data:
+        airlines = openflights.airlines()
+        if not airlines:
             return "Error: Unable to fetch airlines data."
         
-        # OpenFlights airlines.dat format:
-        # 0: Airline ID, 1: Name, 2: Alias, 3: IATA, 4: ICAO, 5: Callsign, 6: Country, 7: Active
-        
-        results = []
-        query_lower = query.lower()
-        
-        for airline in airlines_data:
-            if len(airline) < 8:
-                continue
-                
-            airline_name = airline[1].lower()
-            iata_code = airline[3].lower()
-            icao_code = airline[4].lower()
-            country_name = airline[6].lower()
-            
-            # Check if query matches any field
-            if (query_lower in airline_name or 
-                query_lower in iata_code or 
-                query_lower in icao_code):
-                
-                # Apply country filter if provided
-                if country and country.lower() not in country_name:
-                    continue
-                    
-                results.append({
-                    'name': airline[1],
-                    'alias': airline[2],
-                    'iata': airline[3],
-                    'icao': airline[4],
-                    'callsign': airline[5],
-                    'country': airline[6],
-                    'active': airline[7]
-                })
-                
-                # Limit results
-                if len(results) >= 10:
-                    break
+        results = airlines.search(query, country, limit=10)
         
         if not results:
             return f"No airlines found matching '{query}'"
         
         response = f"Found {len(results)} airline(s) matching '{query}':\n\n"
         for i, airline in enumerate(results, 1):
-            status = "Active" if airline['active'] == 'Y' else "Inactive"
+            status = "Active" if airline.active == 'Y' else "Inactive"
             response += (
-                f"{i}. {airline['name']} ({airline['iata']}/{airline['icao']})\n"
-                f"   Country: {airline['country']}\n"
-                f"   Callsign: {airline['callsign']}\n"
+                f"{i}. {airline.name} ({airline.iata}/{airline.icao})\n"
+                f"   Country: {airline.country}\n"
+                f"   Callsign: {airline.callsign}\n"
                 f"   Status: {status}\n\n"
             )
         
@@ -196,70 +102,39 @@ def find_routes(origin: str, destination: str, airline: Optional[str] = None) ->
         airline: Optional airline filter (IATA code, ICAO code, or name)
     """
     try:
-        routes_data = fetch_csv_data(ROUTES_URL)
-        if not routes_data:
+        routes = openflights.routes()
+        if not routes:
             return "Error: Unable to fetch routes data."
         
-        # OpenFlights routes.dat format:
-        # 0: Airline, 1: Airline ID, 2: Source airport, 3: Source airport ID, 4: Destination airport, 5: Destination airport ID, 6: Codeshare, 7: Stops, 8: Equipment
-        
-        # First, get airport data to resolve names to codes
-        airports_data = fetch_csv_data(AIRPORTS_URL)
-        airport_code_map = {}
-        
-        for airport in airports_data:
-            if len(airport) >= 6:
-                airport_code_map[airport[1].lower()] = airport[4]  # name to IATA
-                airport_code_map[airport[4].lower()] = airport[4]  # IATA to IATA
-                airport_code_map[airport[5].lower()] = airport[4]  # ICAO to IATA
-        
-        # Resolve origin and destination to IATA codes
-        origin_iata = airport_code_map.get(origin.lower(), origin.upper())
-        dest_iata = airport_code_map.get(destination.lower(), destination.upper())
+        # Resolve origin and destination (IATA code, ICAO code or name) to the IATA codes routes use
+        airports = openflights.airports()
+        origin_airport = airports.lookup(origin) if airports else None
+        dest_airport = airports.lookup(destination) if airports else None
+        origin_iata = origin_airport.iata if origin_airport and origin_airport.iata != NULL else origin.upper()
+        dest_iata = dest_airport.iata if dest_airport and dest_airport.iata != NULL else destination.upper()
         
         results = []
-        
-        for route in routes_data:
-            if len(route) < 9:
+        for route in routes.between(origin_iata, dest_iata):
+            # Apply airline filter if provided
+            if airline and airline.lower() not in route.airline.lower():
                 continue
-                
-            route_airline = route[0]
-            source_airport = route[2]
-            dest_airport = route[4]
-            stops = route[7]
-            equipment = route[8]
+            results.append(route)
             
-            # Check if route matches origin and destination
-            if (source_airport == origin_iata and dest_airport == dest_iata):
-                
-                # Apply airline filter if provided
-                if airline and airline.lower() not in route_airline.lower():
-                    continue
-                    
-                results.append({
-                    'airline': route_airline,
-                    'source': source_airport,
-                    'destination': dest_airport,
-                    'stops': stops,
-                    'equipment': equipment,
-                    'codeshare': route[6] if len(route) > 6 else 'N'
-                })
-                
-                # Limit results
-                if len(results) >= 15:
-                    break
+            # Limit results
+            if len(results) >= 15:
+                break
         
         if not results:
             return f"No routes found from {origin} to {destination}"
         
         response = f"Found {len(results)} route(s) from {origin} to {destination}:\n\n"
         for i, route in enumerate(results, 1):
-            codeshare = "Yes" if route['codeshare'] == 'Y' else "No"
+            codeshare = "Yes" if route.codeshare == 'Y' else "No"
             response += (
-                f"{i}. {route['airline']}\n"
-                f"   Route: {route['source']} → {route['destination']}\n"
-                f"   Stops: {route['stops']}\n"
-                f"   Equipment: {route['equipment']}\n"
+                f"{i}. {route.airline}\n"
+                f"   Route: {route.source} → {route.destination}\n"
+                f"   Stops: {route.stops}\n"
+                f"   Equipment: {route.equipment}\n"
                 f"   Codeshare: {codeshare}\n\n"
             )
         
@@ -268,6 +143,126 @@ def find_routes(origin: str, destination: str, airline: Optional[str] = None) ->
     except Exception as e:
         return f"Error finding routes: {str(e)}"
 
+@tool
+def find_itineraries(origin: str, destination: str, max_stops: int = 2, optimize: str = 'stops',
+                     airlines: Optional[str] = None, exclude_airlines: Optional[str] = None) -> str:
+    """
+    Find itineraries between airports, including connections through other airports.
+    Parameters:
+        origin: Origin airport (IATA code, ICAO code, or name)
+        destination: Destination airport (IATA code, ICAO code, or name)
+        max_stops: Maximum number of connections (0 to 4, default 2)
+        optimize: 'stops' for the fewest connections or 'distance' for the shortest flying distance
+        airlines: Optional comma-separated airline codes (IATA or ICAO) to fly with
+        exclude_airlines: Optional comma-separated airline codes (IATA or ICAO) to avoid
+    """
+    try:
+        graph = route_graph()
+        if graph is None:
+            return "Error: Unable to fetch routes data."
+        if optimize not in ('stops', 'distance'):
+            return "Error: optimize must be 'stops' or 'distance'."
+        
+        # Resolve origin and destination (IATA code, ICAO code or name) to airport codes
+        airports = openflights.airports()
+        codes = []
+        for query in (origin, destination):
+            airport = airports.lookup(query) if airports else None
+            if airport and airport.iata != NULL:
+                codes.append(airport.iata)
+            elif airport and airport.icao != NULL:
+                codes.append(airport.icao)
+            else:
+                codes.append(query.upper())
+        
+        def split_codes(value: Optional[str]) -> List[str]:
+            return [code.strip().upper() for code in value.split(',') if code.strip()] if value else []
+        
+        results = graph.itineraries(codes[0], codes[1], k=5, max_stops=max_stops, by=optimize,
+                                    airlines=split_codes(airlines), exclude_airlines=split_codes(exclude_airlines))
+        
+        if not results:
+            return f"No itineraries found from {origin} to {destination} with at most {max_stops} stop(s)"
+        
+        response = f"Found {len(results)} itinerary(ies) from {origin} to {destination}:\n\n"
+        for i, itinerary in enumerate(results, 1):
+            distance = "unknown" if math.isnan(itinerary.distance_km) else f"{itinerary.distance_km:,.0f} km"
+            response += (
+                f"{i}. {' → '.join(itinerary.airports)}\n"
+                f"   Stops: {itinerary.stops}\n"
+                f"   Distance: {distance}\n"
+            )
+            for leg in itinerary.legs:
+                response += f"   {leg.source} → {leg.destination}: {', '.join(leg.airlines)}\n"
+            response += "\n"
+        
+        return response
+        
+    except Exception as e:
+        return f"Error finding itineraries: {str(e)}"
+
+@tool
+def find_nearby_airports(location: str, radius_km: Optional[float] = None, limit: int = 10) -> str:
+    """
+    Find the airports nearest to a location, optionally only those within a radius.
+    Parameters:
+        location: Airport (IATA code, ICAO code, or name), city name, or coordinates as 'latitude,longitude'
+        radius_km: Optional search radius in kilometres; without it the nearest airports are returned
+        limit: Maximum number of airports to list (default 10)
+    """
+    try:
+        if limit < 1:
+            return "Error: limit must be at least 1."
+        airports = openflights.airports()
+        if not airports:
+            return "Error: Unable to fetch airports data."
+        
+        # Resolve the location to coordinates: explicit coordinates, an airport, or the first airport of a city
+        latitude = longitude = None
+        parts = location.split(',')
+        if len(parts) == 2:
+            try:
+                latitude, longitude = float(parts[0]), float(parts[1])
+                if abs(latitude) > 90 or abs(longitude) > 180:
+                    return f"Error: Coordinates out of range: '{location}'"
+            except ValueError:
+                latitude = longitude = None
+        if latitude is None:
+            airport = airports.lookup(location)
+            if airport is None:
+                city_airports = airports.in_city(location)
+                airport = city_airports[0] if city_airports else None
+            if airport is None:
+                return f"No airport, city or coordinates found matching '{location}'"
+            try:
+                latitude, longitude = float(airport.latitude), float(airport.longitude)
+            except ValueError:
+                return f"No coordinates available for {airport.name}"
+        
+        nearby = airports.near(latitude, longitude, radius_km, limit=None if radius_km is not None else limit)
+        
+        if not nearby:
+            if radius_km is None:
+                return f"No airports with coordinates found near {location}"
+            return f"No airports found within {radius_km:g} km of {location}"
+        
+        if radius_km is not None:
+            response = f"Found {len(nearby)} airport(s) within {radius_km:g} km of {location}"
+            response += f", showing the nearest {limit}:\n\n" if len(nearby) > limit else ":\n\n"
+        else:
+            response = f"The {len(nearby)} airport(s) nearest to {location}:\n\n"
+        for i, (airport, distance) in enumerate(nearby[:limit], 1):
+            response += (
+                f"{i}. {airport.name} ({airport.iata}/{airport.icao})\n"
+                f"   City: {airport.city}, {airport.country}\n"
+                f"   Distance: {distance:,.1f} km\n\n"
+            )
+        
+        return response
+        
+    except Exception as e:
+        return f"Error finding nearby airports: {str(e)}"
+
 @tool
 def get_airport_info(iata_code: str) -> str:
     """
@@ -276,32 +271,29 @@ def get_airport_info(iata_code: str) -> str:
         iata_code: The IATA code of the airport (e.g., 'JFK', 'LAX')
     """
     try:
-        airports_data = fetch_csv_data(AIRPORTS_URL)
-        if not airports_data:
+        airports = openflights.airports()
+        if not airports:
             return "Error: Unable to fetch airports data."
         
         iata_code_upper = iata_code.upper()
         
-        for airport in airports_data:
-            if len(airport) < 14:
-                continue
-                
-            if airport[4] == iata_code_upper:
-                return (
-                    f"Airport Information for {iata_code_upper}:\n\n"
-                    f"Name: {airport[1]}\n"
-                    f"City: {airport[2]}\n"
-                    f"Country: {airport[3]}\n"
-                    f"IATA Code: {airport[4]}\n"
-                    f"ICAO Code: {airport[5]}\n"
-                    f"Coordinates: {airport[6]}, {airport[7]}\n"
-                    f"Altitude: {airport[8]} feet\n"
-                    f"Timezone: {airport[9]}\n"
-                    f"DST: {airport[10]}\n"
-                    f"Tz Database: {airport[11]}\n"
-                    f"Type: {airport[12]}\n"
-                    f"Source: {airport[13]}"
-                )
+        airport = airports.by_iata_code(iata_code_upper)
+        if airport is not None:
+            return (
+                f"Airport Information for {iata_code_upper}:\n\n"
+                f"Name: {airport.name}\n"
+                f"City: {airport.city}\n"
+                f"Country: {airport.country}\n"
+                f"IATA Code: {airport.iata}\n"
+                f"ICAO Code: {airport.icao}\n"
+                f"Coordinates: {airport.latitude}, {airport.longitude}\n"
+                f"Altitude: {airport.altitude} feet\n"
+                f"Timezone: {airport.timezone}\n"
+                f"DST: {airport.dst}\n"
+                f"Tz Database: {airport.tz}\n"
+                f"Type: {airport.type}\n"
+                f"Source: {airport.source}"
+            )
         
         return f"No airport found with IATA code '{iata_code}'"
         
@@ -316,28 +308,25 @@ def get_airline_info(iata_code: str) -> str:
         iata_code: The IATA code of the airline (e.g., 'AA', 'UA')
     """
     try:
-        airlines_data = fetch_csv_data(AIRLINES_URL)
-        if not airlines_data:
+        airlines = openflights.airlines()
+        if not airlines:
             return "Error: Unable to fetch airlines data."
         
         iata_code_upper = iata_code.upper()
         
-        for airline in airlines_data:
-            if len(airline) < 8:
-                continue
-                
-            if airline[3] == iata_code_upper:
-                status = "Active" if airline[7] == 'Y' else "Inactive"
-                return (
-                    f"Airline Information for {iata_code_upper}:\n\n"
-                    f"Name: {airline[1]}\n"
-                    f"Alias: {airline[2]}\n"
-                    f"IATA Code: {airline[3]}\n"
-                    f"ICAO Code: {airline[4]}\n"
-                    f"Callsign: {airline[5]}\n"
-                    f"Country: {airline[6]}\n"
-                    f"Status: {status}"
-                )
+        airline = airlines.by_iata_code(iata_code_upper)
+        if airline is not None:
+            status = "Active" if airline.active == 'Y' else "Inactive"
+            return (
+                f"Airline Information for {iata_code_upper}:\n\n"
+                f"Name: {airline.name}\n"
+                f"Alias: {airline.alias}\n"
+                f"IATA Code: {airline.iata}\n"
+                f"ICAO Code: {airline.icao}\n"
+                f"Callsign: {airline.callsign}\n"
+                f"Country: {airline.country}\n"
+                f"Status: {status}"
+            )
         
         return f"No airline found with IATA code '{iata_code}'"
         
@@ -505,19 +494,21 @@ def get_restaurant_details(restaurant_id: str) -> str:
         return f"Error getting restaurant details: {str(e)}"
 
 # Initialize tools
-tools = [search_airports, search_airlines, find_routes, get_airport_info, get_airline_info, search_restaurants, get_restaurant_details]
+tools = [search_airports, search_airlines, find_routes, find_itineraries, find_nearby_airports, get_airport_info, get_airline_info, search_restaurants, get_restaurant_details]
 
 # Initialize the model with a specific prompt
 system_prompt = """You are a professional travel and dining information assistant powered by OpenFlights data and TripAdvisor API. Your task is to help users find information about airports, airlines, flight routes, and restaurants worldwide.
 
 You have access to the following tools:
-1. search_airports: Search for airports by name, IATA code, or ICAO code
-2. search_airlines: Search for airlines by name, IATA code, or ICAO code
+1. search_airports: Search for airports by name, city, IATA code, or ICAO code (ranked, typo-tolerant)
+2. search_airlines: Search for airlines by name, alias, callsign, IATA code, or ICAO code (ranked, typo-tolerant)
 3. find_routes: Find routes between airports
-4. get_airport_info: Get detailed information about a specific airport
-5. get_airline_info: Get detailed information about a specific airline
-6. search_restaurants: Search for restaurants in a specific location
-7. get_restaurant_details: Get detailed information about a specific restaurant
+4. find_itineraries: Find itineraries with connections between airports, by fewest stops or shortest distance, optionally with or without specific airlines
+5. find_nearby_airports: Find the airports nearest to an airport, city or coordinates, optionally within a radius in km
+6. get_airport_info: Get detailed information about a specific airport
+7. get_airline_info: Get detailed information about a specific airline
+8. search_restaurants: Search for restaurants in a specific location
+9. get_restaurant_details: Get detailed information about a specific restaurant
 
 When helping users:
 1. Always provide clear and accurate information
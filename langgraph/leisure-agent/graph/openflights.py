@@ -0,0 +1,471 @@
+import csv
+import io
+import os
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+import requests
+from dotenv import load_dotenv
+from graph.geo import GridIndex, to_float
+from graph.snapshot import read_snapshot, write_snapshot
+from graph.text_index import TextIndex
+
+# Load environment variables
+load_dotenv()
+
+# OpenFlights API base URLs
+OPENFLIGHTS_BASE_URL = "https://raw.githubusercontent.com/jpatokal/openflights/master/data"
+AIRPORTS_URL = f"{OPENFLIGHTS_BASE_URL}/airports.dat"
+AIRLINES_URL = f"{OPENFLIGHTS_BASE_URL}/airlines.dat"
+ROUTES_URL = f"{OPENFLIGHTS_BASE_URL}/routes.dat"
+
+# Directory of the local OpenFlights snapshots
+OPENFLIGHTS_DATA_DIR = os.getenv("OPENFLIGHTS_DATA_DIR", os.path.join(".cache", "openflights"))
+
+# Seconds between background checks for newer datasets (0 disables the refresher)
+OPENFLIGHTS_REFRESH_INTERVAL = float(os.getenv("OPENFLIGHTS_REFRESH_INTERVAL", "86400"))
+
+# Seconds a dataset download may take, and before a failed background check is retried
+DOWNLOAD_TIMEOUT = 30
+REFRESH_RETRY_DELAY = 300
+
+# OpenFlights writes missing values as \N
+NULL = "\\N"
+
+class Download(NamedTuple):
+    rows: Optional[List[List[str]]]  # None when the server reported the data as not modified
+    etag: Optional[str]
+    last_modified: Optional[str]
+
+def fetch_csv_data(url: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> Optional[Download]:
+    """
+    Fetch CSV data from OpenFlights repository, conditionally when a previous ETag or Last-Modified is given.
+
+    Returns:
+        Download: Parsed rows (None if not modified) and the response's validators, or None on failure
+    """
+    headers = {}
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+    try:
+        response = requests.get(url, headers=headers, timeout=DOWNLOAD_TIMEOUT)
+        if response.status_code == 304:
+            return Download(None, etag, last_modified)
+        response.raise_for_status()
+
+        # Parse CSV data
+        csv_data = []
+        csv_reader = csv.reader(io.StringIO(response.text))
+        for row in csv_reader:
+            csv_data.append(row)
+        return Download(csv_data, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+    except Exception as e:
+        print(f"Error fetching data from {url}: {str(e)}")
+        return None
+
+class Airport(NamedTuple):
+    # Same field order as airports.dat
+    id: str
+    name: str
+    city: str
+    country: str
+    iata: str
+    icao: str
+    latitude: str
+    longitude: str
+    altitude: str
+    timezone: str
+    dst: str
+    tz: str
+    type: str
+    source: str
+
+class Airline(NamedTuple):
+    # Same field order as airlines.dat
+    id: str
+    name: str
+    alias: str
+    iata: str
+    icao: str
+    callsign: str
+    country: str
+    active: str
+
+class Route(NamedTuple):
+    # Same field order as routes.dat
+    airline: str
+    airline_id: str
+    source: str
+    source_id: str
+    destination: str
+    destination_id: str
+    codeshare: str
+    stops: str
+    equipment: str
+
+def _present(values: Sequence[str]) -> List[str]:
+    """Column values with missing ones as empty strings."""
+    return ["" if value == NULL else value for value in values]
+
+def _index(values: Sequence[str], normalize: Callable[[str], str] = lambda v: v) -> Dict[str, List[int]]:
+    """Map each non-empty value to the positions holding it, in file order."""
+    index: Dict[str, List[int]] = {}
+    for position, value in enumerate(values):
+        if value and value != NULL:
+            index.setdefault(normalize(value), []).append(position)
+    return index
+
+class _Rows(Sequence):
+    """Rows of a table, built from its columns as they are read."""
+
+    def __init__(self, table: "Table"):
+        self._table = table
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        return self._table.row(i)
+
+class Table:
+    """
+    Columns of one OpenFlights dataset, either lists parsed from CSV or memory-mapped snapshot columns.
+
+    Rows are assembled on access, so a table mapped from a snapshot only decodes what is read.
+    """
+
+    row_type = None
+
+    def __init__(self, columns: Dict[str, Sequence[str]]):
+        self.columns = columns
+        self._length = len(columns[self.row_type._fields[0]])
+        self.rows = _Rows(self)
+
+    @classmethod
+    def from_rows(cls, rows: List[List[str]]):
+        """Build a table from CSV rows, skipping rows with missing fields."""
+        fields = cls.row_type._fields
+        complete = [row[:len(fields)] for row in rows if len(row) >= len(fields)]
+        values = list(zip(*complete)) if complete else [()] * len(fields)
+        return cls({field: list(column) for field, column in zip(fields, values)})
+
+    def __len__(self) -> int:
+        return self._length
+
+    def row(self, position: int):
+        return self.row_type(*(self.columns[field][position] for field in self.row_type._fields))
+
+class AirportTable(Table):
+    """Airports with hash indexes by ID, IATA code, ICAO code, lowercase name and city, and lazy text and spatial indexes."""
+
+    row_type = Airport
+
+    def __init__(self, columns: Dict[str, Sequence[str]]):
+        super().__init__(columns)
+        names, iata, icao = list(columns['name']), list(columns['iata']), list(columns['icao'])
+        self.by_id = _index(columns['id'])
+        self.by_iata = _index(iata, str.upper)
+        self.by_icao = _index(icao, str.upper)
+        self.by_name = _index(names, str.lower)
+        self.by_city = _index(columns['city'], str.lower)
+        self._spatial_index: Optional[GridIndex] = None
+        self._text_index: Optional[TextIndex] = None
+
+    def _first(self, index: Dict[str, List[int]], key: str) -> Optional[Airport]:
+        positions = index.get(key)
+        return self.row(positions[0]) if positions else None
+
+    def get(self, airport_id: str) -> Optional[Airport]:
+        return self._first(self.by_id, airport_id)
+
+    def by_iata_code(self, code: str) -> Optional[Airport]:
+        return self._first(self.by_iata, code.upper())
+
+    def lookup(self, query: str) -> Optional[Airport]:
+        """Airport by IATA code, ICAO code or exact name (case-insensitive)."""
+        return (self._first(self.by_iata, query.upper()) or self._first(self.by_icao, query.upper())
+                or self._first(self.by_name, query.lower()))
+
+    def in_city(self, city: str) -> List[Airport]:
+        """Airports of a city (case-insensitive), in file order."""
+        return [self.row(position) for position in self.by_city.get(city.lower(), [])]
+
+    def text_index(self) -> TextIndex:
+        """Search index over names, cities and codes, built on first use."""
+        if self._text_index is None:
+            columns = self.columns
+            self._text_index = TextIndex(list(zip(_present(columns['name']), _present(columns['city']))),
+                                         list(zip(_present(columns['iata']), _present(columns['icao']))),
+                                         groups=list(columns['country']))
+        return self._text_index
+
+    def search(self, query: str, country: Optional[str] = None, limit: int = 10) -> List[Airport]:
+        """
+        Airports best matching `query`: exact IATA/ICAO codes first, then exact names or cities, then
+        names and cities containing its words or, tolerating typos, most of its trigrams.
+
+        Args:
+            query (str): Airport name, city, IATA or ICAO code
+            country (str): Only airports whose country contains this text
+            limit (int): Maximum number of airports
+
+        Returns:
+            list: Airports, best match first
+        """
+        return [self.row(position) for position in self.text_index().search(query, limit, country)]
+
+    def spatial_index(self) -> GridIndex:
+        """Grid index over the airport coordinates, built on first use; a refreshed table builds its own."""
+        if self._spatial_index is None:
+            self._spatial_index = GridIndex(to_float(self.columns['latitude']), to_float(self.columns['longitude']))
+        return self._spatial_index
+
+    def near(self, latitude: float, longitude: float, radius_km: Optional[float] = None,
+             limit: Optional[int] = 10) -> List[Tuple[Airport, float]]:
+        """
+        Airports nearest to a point, with their great-circle distances, nearest first.
+
+        Args:
+            latitude (float): Latitude in degrees
+            longitude (float): Longitude in degrees
+            radius_km (float): Only airports within this distance; without it, the `limit` nearest
+            limit (int): Maximum number of airports (None for every airport within `radius_km`)
+
+        Returns:
+            list: (Airport, distance in km) tuples
+        """
+        index = self.spatial_index()
+        if radius_km is None:
+            positions, distances = index.nearest(latitude, longitude, limit)
+        else:
+            positions, distances = index.within(latitude, longitude, radius_km)
+        return [(self.row(position), distance) for position, distance in zip(positions[:limit].tolist(), distances[:limit].tolist())]
+
+class AirlineTable(Table):
+    """
+    Airlines with hash indexes by ID, IATA code and ICAO code, and a lazy text index.
+
+    IATA codes are reused, so lookups return the first airline in the file.
+    """
+
+    row_type = Airline
+
+    def __init__(self, columns: Dict[str, Sequence[str]]):
+        super().__init__(columns)
+        iata, icao = list(columns['iata']), list(columns['icao'])
+        self.by_id = _index(columns['id'])
+        self.by_iata = _index(iata, str.upper)
+        self.by_icao = _index(icao, str.upper)
+        self._text_index: Optional[TextIndex] = None
+
+    def get(self, airline_id: str) -> Optional[Airline]:
+        positions = self.by_id.get(airline_id)
+        return self.row(positions[0]) if positions else None
+
+    def by_iata_code(self, code: str) -> Optional[Airline]:
+        positions = self.by_iata.get(code.upper())
+        return self.row(positions[0]) if positions else None
+
+    def text_index(self) -> TextIndex:
+        """Search index over names, aliases, callsigns and codes, built on first use; active airlines break ties."""
+        if self._text_index is None:
+            columns = self.columns
+            self._text_index = TextIndex(
+                list(zip(_present(columns['name']), _present(columns['alias']), _present(columns['callsign']))),
+                list(zip(_present(columns['iata']), _present(columns['icao']))),
+                groups=list(columns['country']), priority=[active == 'Y' for active in columns['active']])
+        return self._text_index
+
+    def search(self, query: str, country: Optional[str] = None, limit: int = 10) -> List[Airline]:
+        """
+        Airlines best matching `query`: exact IATA/ICAO codes first, then exact names, aliases or
+        callsigns, then those containing its words or, tolerating typos, most of its trigrams.
+
+        Args:
+            query (str): Airline name, alias, callsign, IATA or ICAO code
+            country (str): Only airlines whose country contains this text
+            limit (int): Maximum number of airlines
+
+        Returns:
+            list: Airlines, best match first (active before inactive on ties)
+        """
+        return [self.row(position) for position in self.text_index().search(query, limit, country)]
+
+class RouteTable(Table):
+    """Routes indexed by (source, destination) airport code pair and by source airport."""
+
+    row_type = Route
+
+    def __init__(self, columns: Dict[str, Sequence[str]]):
+        super().__init__(columns)
+        sources = list(columns['source'])
+        self.by_pair: Dict[Tuple[str, str], List[int]] = {}
+        for position, pair in enumerate(zip(sources, columns['destination'])):
+            self.by_pair.setdefault(pair, []).append(position)
+        self.by_source = _index(sources)
+
+    def between(self, source: str, destination: str) -> List[Route]:
+        """Routes from one airport code to another, in file order."""
+        return [self.row(position) for position in self.by_pair.get((source, destination), [])]
+
+    def from_airport(self, source: str) -> List[Route]:
+        return [self.row(position) for position in self.by_source.get(source, [])]
+
+# Dataset name -> (source URL, table class)
+DATASETS = {
+    'airports': (AIRPORTS_URL, AirportTable),
+    'airlines': (AIRLINES_URL, AirlineTable),
+    'routes': (ROUTES_URL, RouteTable),
+}
+
+class OpenFlightsData:
+    """
+    OpenFlights airports, airlines and routes, loaded once per process and indexed in memory.
+
+    A dataset is read from its local snapshot when there is one, so starting up needs no network
+    and workers map the same file pages; otherwise it is downloaded and the snapshot written. A
+    background thread re-downloads datasets only when the server reports a change (ETag /
+    Last-Modified) and swaps the new table in atomically. Failed downloads are not cached.
+    """
+
+    def __init__(self, data_dir: Optional[str] = OPENFLIGHTS_DATA_DIR, fetch: Callable[..., Optional[Download]] = fetch_csv_data,
+                 refresh_interval: float = OPENFLIGHTS_REFRESH_INTERVAL):
+        self.data_dir = data_dir
+        self.refresh_interval = refresh_interval
+        self._fetch = fetch
+        self._tables: Dict[str, Table] = {}
+        self._meta: Dict[str, dict] = {}
+        self._next_check: Dict[str, float] = {}
+        self._locks = {name: threading.Lock() for name in DATASETS}
+        self._refresher: Optional[threading.Thread] = None
+        self._refresher_lock = threading.Lock()
+
+    def snapshot_path(self, name: str) -> Optional[str]:
+        return os.path.join(self.data_dir, f"{name}.bin") if self.data_dir else None
+
+    def _read_local(self, name: str) -> Optional[Table]:
+        path = self.snapshot_path(name)
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            snapshot = read_snapshot(path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Ignoring unreadable OpenFlights snapshot {path}: {str(e)}")
+            return None
+        self._meta[name] = snapshot.meta
+        # A snapshot last checked long ago (e.g. baked into an image) is checked again soon
+        self._next_check[name] = snapshot.meta.get('checked_at', 0) + self.refresh_interval
+        return DATASETS[name][1](snapshot.columns)
+
+    def _snapshot_is_newer(self, name: str) -> bool:
+        """Whether another process wrote a newer snapshot than the version in use."""
+        path = self.snapshot_path(name)
+        if not path or not os.path.exists(path):
+            return False
+        try:
+            fetched_at = read_snapshot(path).meta.get('fetched_at', 0)
+        except (OSError, ValueError, KeyError):
+            return False
+        return fetched_at > self._meta.get(name, {}).get('fetched_at', 0)
+
+    def _download(self, name: str, conditional: bool) -> Optional[Table]:
+        """Download a dataset; with `conditional`, only if it changed since the current version. Writes the snapshot."""
+        url, table_class = DATASETS[name]
+        meta = self._meta.get(name, {}) if conditional else {}
+        download = self._fetch(url, meta.get('etag'), meta.get('last_modified'))
+        if download is None or (download.rows is not None and not download.rows):
+            self._next_check[name] = time.time() + min(self.refresh_interval, REFRESH_RETRY_DELAY)
+            return None
+        self._next_check[name] = time.time() + self.refresh_interval
+        if download.rows is None:
+            self._meta[name] = dict(meta, checked_at=time.time())
+            return None
+        table = table_class.from_rows(download.rows)
+        self._meta[name] = {'url': url, 'etag': download.etag, 'last_modified': download.last_modified,
+                            'fetched_at': time.time(), 'checked_at': time.time(), 'rows': len(table)}
+        path = self.snapshot_path(name)
+        if path:
+            try:
+                write_snapshot(path, {field: list(column) for field, column in table.columns.items()}, self._meta[name])
+                # Serve from the mapped file so this process shares pages with the others
+                table = self._read_local(name) or table
+            except OSError as e:
+                print(f"Error writing OpenFlights snapshot {path}: {str(e)}")
+        return table
+
+    def _load(self, name: str) -> Optional[Table]:
+        table = self._tables.get(name)
+        if table is not None:
+            return table
+        with self._locks[name]:
+            table = self._tables.get(name)
+            if table is None:
+                table = self._read_local(name) or self._download(name, conditional=False)
+                if table is None:
+                    return None
+                self._tables[name] = table
+        self._start_refresher()
+        return table
+
+    def refresh(self, name: str, force: bool = False) -> bool:
+        """
+        Swap in a newer version of one dataset: a snapshot another process wrote, or else a download
+        when the check is due (or `force`) and the server reports a change.
+
+        Returns:
+            bool: True if a new version was swapped in
+        """
+        with self._locks[name]:
+            table = self._read_local(name) if self._snapshot_is_newer(name) else None
+            if table is None and (force or time.time() >= self._next_check.get(name, 0)):
+                table = self._download(name, conditional=name in self._meta)
+            if table is None:
+                return False
+            # Readers holding the previous table keep using it; new calls get this one
+            self._tables[name] = table
+            return True
+
+    def _start_refresher(self):
+        if self.refresh_interval <= 0 or self._refresher is not None:
+            return
+        with self._refresher_lock:
+            if self._refresher is None:
+                self._refresher = threading.Thread(target=self._refresh_loop, name="openflights-refresher", daemon=True)
+                self._refresher.start()
+
+    def _refresh_loop(self):
+        while True:
+            due = min((self._next_check.get(name, 0) for name in list(self._tables)), default=0)
+            time.sleep(min(max(due - time.time(), 1), self.refresh_interval))
+            for name in list(self._tables):
+                try:
+                    self.refresh(name)
+                except Exception as e:
+                    print(f"Error refreshing OpenFlights {name}: {str(e)}")
+
+    def airports(self) -> Optional[AirportTable]:
+        """The airports table, or None if it could not be loaded."""
+        return self._load('airports')
+
+    def airlines(self) -> Optional[AirlineTable]:
+        """The airlines table, or None if it could not be loaded."""
+        return self._load('airlines')
+
+    def routes(self) -> Optional[RouteTable]:
+        """The routes table, or None if it could not be loaded."""
+        return self._load('routes')
+
+# Shared data used by the agent's tools
+openflights = OpenFlightsData()
+
+if __name__ == "__main__":
+    # Build or update the local snapshots, e.g. while building an image: python -m graph.openflights
+    data = OpenFlightsData(refresh_interval=0)
+    for dataset in DATASETS:
+        updated = data.refresh(dataset, force=True) if data._load(dataset) is not None else False
+        meta = data._meta.get(dataset, {})
+        print(f"{dataset}: {meta.get('rows', 'unavailable')} rows{' (updated)' if updated else ''}")
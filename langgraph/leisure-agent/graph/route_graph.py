@@ -0,0 +1,232 @@
+import heapq
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional
+import numpy as np
+from graph.geo import haversine_km, to_float
+from graph.openflights import NULL, AirportTable, OpenFlightsData, RouteTable, openflights
+
+# Itineraries longer than this are never searched, whatever the caller asks for
+MAX_STOPS = 4
+
+class Leg(NamedTuple):
+    source: str
+    destination: str
+    distance_km: float  # NaN when an airport has no coordinates
+    airlines: List[str]
+
+class Itinerary(NamedTuple):
+    airports: List[str]
+    legs: List[Leg]
+    distance_km: float
+
+    @property
+    def stops(self) -> int:
+        return len(self.legs) - 1
+
+class RouteGraph:
+    """
+    Airports and routes as a directed graph in compressed sparse row (CSR) form.
+
+    Airports are numbered 0..n-1; the edges leaving airport `i` are `indptr[i]:indptr[i+1]`, one per
+    distinct (source, destination) pair with its great-circle distance, and the airlines flying
+    edge `e` are `edge_airlines[airline_indptr[e]:airline_indptr[e+1]]`. Everything is a flat NumPy
+    array, so airline filters and reachability are computed over all edges at once and a search
+    only touches the few airports that can still reach the destination.
+    """
+
+    def __init__(self, routes: RouteTable, airports: Optional[AirportTable] = None):
+        sources, destinations = list(routes.columns['source']), list(routes.columns['destination'])
+        carriers = list(routes.columns['airline'])
+        keep = [i for i, (source, destination) in enumerate(zip(sources, destinations))
+                if source != NULL and destination != NULL and source != destination]
+
+        self.codes = sorted({sources[i] for i in keep} | {destinations[i] for i in keep})
+        self.airline_codes = sorted({carriers[i] for i in keep})
+        node_of = {code: node for node, code in enumerate(self.codes)}
+        self._airline_ids = {code: airline for airline, code in enumerate(self.airline_codes)}
+        n, m = len(self.codes), max(len(self.airline_codes), 1)
+
+        # One sort of (source, destination, airline) keys yields the CSR order and removes duplicates
+        source = np.fromiter((node_of[sources[i]] for i in keep), dtype=np.int64, count=len(keep))
+        destination = np.fromiter((node_of[destinations[i]] for i in keep), dtype=np.int64, count=len(keep))
+        carrier = np.fromiter((self._airline_ids[carriers[i]] for i in keep), dtype=np.int64, count=len(keep))
+        keys = np.unique((source * n + destination) * m + carrier)
+        pairs, first = np.unique(keys // m, return_index=True)
+
+        self.edge_source = (pairs // n).astype(np.int32)
+        self.edge_target = (pairs % n).astype(np.int32)
+        self.indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.edge_source, minlength=n), out=self.indptr[1:])
+        self.edge_airlines = (keys % m).astype(np.int32)
+        self.airline_indptr = np.append(first, len(keys)).astype(np.int64)
+
+        # Coordinates of the airports the route codes (IATA, or ICAO when there is none) refer to
+        self.nodes: Dict[str, int] = dict(node_of)
+        self.latitude, self.longitude = np.full(n, np.nan), np.full(n, np.nan)
+        if airports:
+            latitudes, longitudes = to_float(airports.columns['latitude']), to_float(airports.columns['longitude'])
+            icao = airports.columns['icao']
+            for node, code in enumerate(self.codes):
+                positions = airports.by_iata.get(code) or airports.by_icao.get(code)
+                if positions:
+                    self.latitude[node], self.longitude[node] = latitudes[positions[0]], longitudes[positions[0]]
+                    # Also accept the ICAO code of airports the routes name by IATA code
+                    self.nodes.setdefault(icao[positions[0]].upper(), node)
+            self.nodes.pop(NULL, None)
+        self.edge_distance = haversine_km(self.latitude[self.edge_source], self.longitude[self.edge_source],
+                                          self.latitude[self.edge_target], self.longitude[self.edge_target])
+        # Lists for the search loop, where indexing NumPy scalars one at a time is slow
+        self._targets = self.edge_target.tolist()
+        self._costs = np.nan_to_num(self.edge_distance).tolist()
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def node(self, code: str) -> Optional[int]:
+        """Airport number of an IATA or ICAO code."""
+        return self.nodes.get(code.upper())
+
+    def _airline_mask(self, airlines: Optional[Iterable[str]], exclude_airlines: Optional[Iterable[str]]) -> Optional[np.ndarray]:
+        """Per (edge, airline) entry: whether the airline passes the filters; None without filters."""
+        if not airlines and not exclude_airlines:
+            return None
+        mask = np.ones(len(self.edge_airlines), dtype=bool)
+        if airlines:
+            ids = [self._airline_ids[code.upper()] for code in airlines if code.upper() in self._airline_ids]
+            mask &= np.isin(self.edge_airlines, ids)
+        if exclude_airlines:
+            ids = [self._airline_ids[code.upper()] for code in exclude_airlines if code.upper() in self._airline_ids]
+            mask &= ~np.isin(self.edge_airlines, ids)
+        return mask
+
+    def _hops_to(self, target: int, allowed: Optional[np.ndarray], max_legs: int) -> np.ndarray:
+        """Fewest legs from every airport to `target` (max_legs + 1 if more), by BFS over reversed edges."""
+        hops = np.full(len(self.codes), max_legs + 1, dtype=np.int16)
+        hops[target] = 0
+        frontier = np.zeros(len(self.codes), dtype=bool)
+        frontier[target] = True
+        for level in range(1, max_legs + 1):
+            into_frontier = frontier[self.edge_target]
+            if allowed is not None:
+                into_frontier &= allowed
+            reached = np.unique(self.edge_source[into_frontier])
+            reached = reached[hops[reached] > level]
+            if not len(reached):
+                break
+            hops[reached] = level
+            frontier[:] = False
+            frontier[reached] = True
+        return hops
+
+    def itineraries(self, origin: str, destination: str, k: int = 5, max_stops: int = 2, by: str = 'stops',
+                    airlines: Optional[Iterable[str]] = None,
+                    exclude_airlines: Optional[Iterable[str]] = None) -> List[Itinerary]:
+        """
+        The k best itineraries without repeated airports, best first.
+
+        Runs an A* search whose labels may settle each (airport, legs) state up to k times. Airports
+        that cannot reach the destination within the remaining legs are pruned by a reverse BFS,
+        and the great-circle distance to the destination is the A* heuristic. Ordered by distance,
+        itineraries never fly to or from an airport without coordinates.
+
+        Args:
+            origin (str): Origin airport IATA or ICAO code
+            destination (str): Destination airport IATA or ICAO code
+            k (int): Number of itineraries
+            max_stops (int): Maximum intermediate airports (capped at MAX_STOPS)
+            by (str): 'stops' (fewest legs, then shortest) or 'distance' (shortest, then fewest legs)
+            airlines (list): Only fly legs operated by one of these airline codes
+            exclude_airlines (list): Never fly legs operated only by these airline codes
+
+        Returns:
+            list: Itinerary tuples; empty if an airport is unknown or no itinerary exists
+        """
+        if by not in ('stops', 'distance'):
+            raise ValueError(f"Unknown itinerary order '{by}', expected 'stops' or 'distance'")
+        source, target = self.node(origin), self.node(destination)
+        if source is None or target is None or source == target or k <= 0:
+            return []
+        max_legs = min(max(max_stops, 0), MAX_STOPS) + 1
+
+        mask = self._airline_mask(airlines, exclude_airlines)
+        allowed = None
+        if mask is not None:
+            allowed = np.logical_or.reduceat(mask, self.airline_indptr[:-1]) if len(mask) else np.zeros(0, dtype=bool)
+        if by == 'distance':
+            # A leg to or from an airport without coordinates has no length to rank by
+            known = np.isfinite(self.edge_distance)
+            allowed = known if allowed is None else allowed & known
+        hops = self._hops_to(target, allowed, max_legs)
+        if hops[source] > max_legs:
+            return []
+        remaining = haversine_km(self.latitude, self.longitude, self.latitude[target], self.longitude[target])
+        if not np.isfinite(remaining[hops <= max_legs]).all():
+            # Such legs cost 0, which the great-circle heuristic could overestimate
+            remaining[:] = 0.0
+        remaining = remaining.tolist()
+        hop_list = hops.tolist()
+
+        def priority(legs: int, distance: float, node: int) -> tuple:
+            if by == 'stops':
+                return legs + hop_list[node], distance + remaining[node]
+            return distance + remaining[node], legs + hop_list[node]
+
+        # Entries: (priority, tie-breaker, airport, distance so far, airports visited, edges taken)
+        heap = [(priority(0, 0.0, source), 0, source, 0.0, (source,), ())]
+        settled: Dict[tuple, int] = {}
+        found, counter = [], 1
+        while heap and len(found) < k:
+            _, _, node, distance, path, edges = heapq.heappop(heap)
+            if node == target:
+                found.append(edges)
+                continue
+            legs = len(edges)
+            state = (node, legs)
+            if settled.get(state, 0) >= k:
+                continue
+            settled[state] = settled.get(state, 0) + 1
+
+            start, end = self.indptr[node], self.indptr[node + 1]
+            # Only follow edges that leave enough legs to reach the destination
+            candidates = hops[self.edge_target[start:end]] <= max_legs - legs - 1
+            if allowed is not None:
+                candidates &= allowed[start:end]
+            for edge in (np.flatnonzero(candidates) + start).tolist():
+                successor = self._targets[edge]
+                if successor in path:
+                    continue
+                total = distance + self._costs[edge]
+                heapq.heappush(heap, (priority(legs + 1, total, successor), counter, successor, total,
+                                      path + (successor,), edges + (edge,)))
+                counter += 1
+
+        return [self._itinerary(edges, mask) for edges in found]
+
+    def _itinerary(self, edges: tuple, mask: Optional[np.ndarray]) -> Itinerary:
+        legs = []
+        for edge in edges:
+            start, end = self.airline_indptr[edge], self.airline_indptr[edge + 1]
+            airline_ids = self.edge_airlines[start:end] if mask is None else self.edge_airlines[start:end][mask[start:end]]
+            legs.append(Leg(self.codes[self.edge_source[edge]], self.codes[self.edge_target[edge]],
+                            float(self.edge_distance[edge]), [self.airline_codes[i] for i in airline_ids]))
+        return Itinerary([legs[0].source] + [leg.destination for leg in legs], legs,
+                         float(sum(leg.distance_km for leg in legs)))
+
+_graph_lock = threading.Lock()
+_graph_cache: Optional[tuple] = None
+
+def route_graph(data: OpenFlightsData = openflights) -> Optional[RouteGraph]:
+    """
+    The route graph of the current OpenFlights tables, built once and rebuilt when a refresh swaps them.
+
+    Returns:
+        RouteGraph: The graph, or None if the routes could not be loaded
+    """
+    global _graph_cache
+    routes, airports = data.routes(), data.airports()
+    if not routes:
+        return None
+    with _graph_lock:
+        if _graph_cache is None or _graph_cache[0] is not routes or _graph_cache[1] is not airports:
+            _graph_cache = (routes, airports, RouteGraph(routes, airports))
+        return _graph_cache[2]
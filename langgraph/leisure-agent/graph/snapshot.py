@@ -0,0 +1,122 @@
+import json
+import os
+import struct
+import threading
+from typing import Dict, Iterator, List, NamedTuple, Sequence
+import numpy as np
+
+# File signature and format version
+MAGIC = b"OFSNAP1\0"
+
+# Columns start on 8-byte boundaries so offset arrays can be viewed in place
+ALIGNMENT = 8
+
+class StringColumn(Sequence):
+    """
+    Read-only column of strings stored as a uint32 offset array plus one UTF-8 blob.
+
+    Both live inside a memory-mapped file, so processes mapping the same snapshot share the
+    pages; a value is only decoded when it is read.
+    """
+
+    def __init__(self, offsets: np.ndarray, blob: np.ndarray):
+        self._offsets = offsets
+        self._blob = blob
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        return self._blob[start:end].tobytes().decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        # One pass over the blob instead of a bounds check and conversion per item
+        data = self._blob.tobytes()
+        offsets = self._offsets.tolist()
+        return (data[start:end].decode("utf-8") for start, end in zip(offsets[:-1], offsets[1:]))
+
+class Snapshot(NamedTuple):
+    columns: Dict[str, StringColumn]
+    meta: dict
+
+def _pad(length: int) -> bytes:
+    return b"\0" * (-length % ALIGNMENT)
+
+def write_snapshot(path: str, columns: Dict[str, List[str]], meta: dict):
+    """
+    Write string columns to a snapshot file, replacing any existing file atomically.
+
+    Layout: MAGIC, a little-endian uint32 header length, a JSON header (meta plus each column's
+    offset and blob positions), then per column an aligned uint32 offset array and its blob.
+
+    Args:
+        path (str): Snapshot file path
+        columns (dict): Column name -> list of strings, all of the same length
+        meta (dict): JSON-serializable metadata stored in the header (e.g. ETag, Last-Modified)
+    """
+    encoded = {}
+    for name, values in columns.items():
+        parts = [value.encode("utf-8") for value in values]
+        offsets = np.zeros(len(parts) + 1, dtype="<u4")
+        offsets[1:] = np.cumsum([len(part) for part in parts])
+        encoded[name] = (offsets.tobytes(), b"".join(parts))
+
+    # Positions are relative to the end of the header, so the header can be sized first
+    layout, position = {}, 0
+    for name, (offsets, blob) in encoded.items():
+        layout[name] = {'offsets': position, 'rows': len(offsets) // 4 - 1}
+        position += len(offsets) + len(_pad(len(offsets)))
+        layout[name]['blob'] = position
+        layout[name]['size'] = len(blob)
+        position += len(blob) + len(_pad(len(blob)))
+    header = json.dumps({'meta': meta, 'columns': layout}).encode("utf-8")
+    header += b" " * (-(len(MAGIC) + 4 + len(header)) % ALIGNMENT)
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # Write to a temporary file and rename so readers only ever map a complete snapshot;
+    # processes that mapped the previous file keep reading it until they reopen
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(MAGIC)
+            f.write(struct.pack("<I", len(header)))
+            f.write(header)
+            for offsets, blob in encoded.values():
+                f.write(offsets + _pad(len(offsets)))
+                f.write(blob + _pad(len(blob)))
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def read_snapshot(path: str) -> Snapshot:
+    """
+    Memory-map a snapshot file.
+
+    Raises:
+        OSError: The file cannot be read
+        ValueError: The file is not a complete snapshot
+    """
+    data = np.memmap(path, dtype=np.uint8, mode="r")
+    if data[:len(MAGIC)].tobytes() != MAGIC:
+        raise ValueError(f"{path} is not an OpenFlights snapshot")
+    (header_length,) = struct.unpack("<I", data[len(MAGIC):len(MAGIC) + 4].tobytes())
+    start = len(MAGIC) + 4
+    header = json.loads(data[start:start + header_length].tobytes().decode("utf-8"))
+    base = start + header_length
+
+    columns = {}
+    for name, column in header['columns'].items():
+        offsets_start = base + column['offsets']
+        offsets_end = offsets_start + (column['rows'] + 1) * 4
+        blob_start = base + column['blob']
+        if blob_start + column['size'] > len(data):
+            raise ValueError(f"{path} is truncated")
+        offsets = data[offsets_start:offsets_end].view("<u4")
+        columns[name] = StringColumn(offsets, data[blob_start:blob_start + column['size']])
+    return Snapshot(columns, header['meta'])
@@ -0,0 +1,159 @@
+import math
+import re
+import unicodedata
+from typing import Dict, List, Optional, Sequence, Set
+import numpy as np
+
+# Share of a query's trigrams a document must contain to be a candidate; lower tolerates more typos
+MIN_TRIGRAM_SHARE = 0.4
+
+# Score bonuses stacked on top of the trigram similarity (which is at most 1)
+EXACT_CODE_SCORE = 4.0
+EXACT_TEXT_SCORE = 2.0
+ALL_WORDS_SCORE = 1.0
+
+def normalize(text: str) -> str:
+    """Lowercase and strip accents, so 'Zürich' matches 'zurich'."""
+    if text.isascii():
+        return text.lower()
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+def words(text: str) -> List[str]:
+    return re.findall(r"\w+", normalize(text))
+
+def trigrams(text: str) -> Set[str]:
+    """Trigrams of each word padded like PostgreSQL's pg_trgm ('  ab', ' ab', 'ab ')."""
+    return _word_trigrams(words(text))
+
+def _word_trigrams(text_words: List[str]) -> Set[str]:
+    grams = set()
+    for word in text_words:
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(word) + 1))
+    return grams
+
+def _postings(index: Dict[str, List[int]]) -> Dict[str, np.ndarray]:
+    return {key: np.array(documents, dtype=np.int32) for key, documents in index.items()}
+
+class TextIndex:
+    """
+    Ranked full-text index over short records such as airport or airline names and codes.
+
+    Built once, it holds inverted postings (sorted document arrays) for trigrams, whole words,
+    whole field values and codes. A query counts its trigram hits per document with one bincount,
+    so cost depends on the postings it touches rather than a scan of every row. Documents rank by:
+
+    - an exact code match (e.g. IATA/ICAO), then
+    - an exact field value (e.g. the full name or city), then
+    - containing every query word,
+    - then trigram Jaccard similarity, which also finds misspelt queries,
+    - then `priority` and position.
+    """
+
+    def __init__(self, texts: Sequence[Sequence[str]], codes: Sequence[Sequence[str]],
+                 groups: Optional[Sequence[str]] = None, priority: Optional[Sequence[float]] = None):
+        """
+        Args:
+            texts: Per document, the text fields to search (e.g. name, city, alias); empty ones are skipped
+            codes: Per document, codes matched exactly and case-insensitively (e.g. IATA, ICAO); empty ones are skipped
+            groups: Per document, a value that can filter results by substring (e.g. country)
+            priority: Per document, a tie-breaker between equally relevant documents (higher first)
+        """
+        self.size = len(texts)
+        trigram_index: Dict[str, List[int]] = {}
+        word_index: Dict[str, List[int]] = {}
+        text_index: Dict[str, List[int]] = {}
+        code_index: Dict[str, List[int]] = {}
+        group_index: Dict[str, List[int]] = {}
+        self.trigram_counts = np.zeros(self.size, dtype=np.int32)
+
+        for document, (fields, document_codes) in enumerate(zip(texts, codes)):
+            fields = [field for field in fields if field]
+            document_codes = [code.lower() for code in document_codes if code]
+            field_words = [words(field) for field in fields]
+            document_words = {word for value_words in field_words for word in value_words} | set(document_codes)
+            grams = _word_trigrams(list(document_words))
+            for value_words in field_words:
+                text_index.setdefault(" ".join(value_words), []).append(document)
+            for code in set(document_codes):
+                code_index.setdefault(code, []).append(document)
+            for word in document_words:
+                word_index.setdefault(word, []).append(document)
+            for gram in grams:
+                trigram_index.setdefault(gram, []).append(document)
+            self.trigram_counts[document] = len(grams)
+            if groups is not None:
+                group_index.setdefault(normalize(groups[document]), []).append(document)
+
+        self.trigrams = _postings(trigram_index)
+        self.words = _postings(word_index)
+        self.texts = {key: set(documents) for key, documents in text_index.items()}
+        self.codes = {key: set(documents) for key, documents in code_index.items()}
+        self.groups = _postings(group_index)
+        self.priority = np.zeros(self.size) if priority is None else np.asarray(priority, dtype=np.float64)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _group_mask(self, group: str) -> np.ndarray:
+        """Documents whose group contains `group`; there are few distinct groups, so each is checked once."""
+        mask = np.zeros(self.size, dtype=bool)
+        group = normalize(group)
+        for value, documents in self.groups.items():
+            if group in value:
+                mask[documents] = True
+        return mask
+
+    def search(self, query: str, limit: int = 10, group: Optional[str] = None) -> List[int]:
+        """
+        Positions of the documents best matching `query`, best first.
+
+        Args:
+            query (str): Search text, code or misspelt name
+            limit (int): Maximum number of results
+            group (str): Only documents whose group (e.g. country) contains this text
+
+        Returns:
+            list: Document positions
+        """
+        query_grams = trigrams(query)
+        if not query_grams or limit <= 0:
+            return []
+        lists = [self.trigrams[gram] for gram in query_grams if gram in self.trigrams]
+        common = np.bincount(np.concatenate(lists), minlength=self.size) if lists else np.zeros(self.size, dtype=np.int64)
+
+        # Exact code and field matches are candidates even with few trigrams in common
+        key = " ".join(words(query))
+        exact_code = np.zeros(self.size, dtype=bool)
+        exact_code[list(self.codes.get(key, ()))] = True
+        exact_text = np.zeros(self.size, dtype=bool)
+        exact_text[list(self.texts.get(key, ()))] = True
+
+        candidates = (common >= max(1, math.ceil(MIN_TRIGRAM_SHARE * len(query_grams)))) | exact_code | exact_text
+        if group:
+            candidates &= self._group_mask(group)
+        candidates = np.flatnonzero(candidates)
+        if not len(candidates):
+            return []
+
+        query_words = set(words(query))
+        word_lists = [self.words.get(word) for word in query_words]
+        all_words = np.zeros(len(candidates), dtype=bool)
+        if all(postings is not None for postings in word_lists):
+            word_hits = np.bincount(np.concatenate(word_lists), minlength=self.size)
+            all_words = word_hits[candidates] == len(query_words)
+
+        shared = common[candidates]
+        similarity = shared / (len(query_grams) + self.trigram_counts[candidates] - shared)
+        score = (EXACT_CODE_SCORE * exact_code[candidates] + EXACT_TEXT_SCORE * exact_text[candidates]
+                 + ALL_WORDS_SCORE * all_words + similarity)
+
+        # Highest score first, then priority, then position
+        if len(candidates) > limit:
+            # Only sort the documents that can make the cut
+            cutoff = np.partition(score, len(score) - limit)[len(score) - limit]
+            keep = score >= cutoff
+            candidates, score = candidates[keep], score[keep]
+        order = np.lexsort((candidates, -self.priority[candidates], -score))
+        return candidates[order[:limit]].tolist()
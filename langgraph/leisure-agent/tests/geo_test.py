@@ -0,0 +1,28 @@
+import numpy as np
+from graph.geo import GridIndex, haversine_km, to_float
+
+def test_haversine_broadcasts():
+    # Tallinn to Helsinki airports is about 101 km
+    assert abs(float(haversine_km(59.41, 24.83, 60.32, 24.96)) - 101.4) < 1
+    distances = haversine_km(0.0, 0.0, np.array([0.0, 0.0, np.nan]), np.array([0.0, 180.0, 0.0]))
+    assert distances[0] == 0 and abs(distances[1] - np.pi * 6371.0088) < 1e-6 and np.isnan(distances[2])
+    assert np.isnan(to_float(["1.5", "\\N"])).tolist() == [False, True]
+
+def test_grid_matches_brute_force():
+    rng = np.random.default_rng(7)
+    latitude = np.degrees(np.arcsin(rng.uniform(-1, 1, 2000)))
+    longitude = rng.uniform(-180, 180, 2000)
+    # Crowd the antimeridian and the north pole, where the search cap wraps
+    longitude[:100], latitude[100:200] = rng.uniform(179, 180, 100), rng.uniform(88, 90, 100)
+    latitude[200] = np.nan
+    index = GridIndex(latitude, longitude)
+    assert len(index) == 1999
+    for query_latitude, query_longitude, radius in [(58.38, 26.72, 500), (10, 179.9, 300), (10, -179.9, 300),
+                                                    (89, 0, 400), (-45, 60, 3000), (0, 0, 25000)]:
+        distances = haversine_km(query_latitude, query_longitude, latitude, longitude)
+        expected = np.flatnonzero(distances <= radius)
+        ids, found = index.within(query_latitude, query_longitude, radius)
+        assert sorted(ids.tolist()) == expected.tolist()
+        assert np.all(np.diff(found) >= 0)
+        ids, found = index.nearest(query_latitude, query_longitude, 5)
+        assert np.allclose(found, np.sort(distances[np.isfinite(distances)])[:5])
@@ -0,0 +1,137 @@
+import os
+from graph.openflights import Download, OpenFlightsData
+from graph.snapshot import read_snapshot, write_snapshot
+
+AIRPORTS = [
+    ["3797", "John F Kennedy International Airport", "New York", "United States", "JFK", "KJFK", "40.63980103", "-73.77890015", "13", "-5", "A", "America/New_York", "airport", "OurAirports"],
+    ["3484", "Los Angeles International Airport", "Los Angeles", "United States", "LAX", "KLAX", "33.94250107", "-118.4079971", "125", "-8", "A", "America/Los_Angeles", "airport", "OurAirports"],
+    ["3697", "La Guardia Airport", "New York", "United States", "LGA", "KLGA", "40.77719879", "-73.87259674", "21", "-5", "A", "America/New_York", "airport", "OurAirports"],
+    ["9999", "Short row"],
+    ["5555", "Remote Airport Without Codes", "Nowhere", "Canada", "\\N", "\\N", "50.0", "-100.0", "0", "-6", "A", "America/Winnipeg", "airport", "OurAirports"],
+]
+AIRLINES = [
+    ["24", "American Airlines", "\\N", "AA", "AAL", "AMERICAN", "United States", "Y"],
+    ["25", "Defunct Airline", "\\N", "AA", "DFA", "DEFUNCT", "Canada", "N"],
+    ["5209", "United Airlines", "\\N", "UA", "UAL", "UNITED", "United States", "Y"],
+]
+ROUTES = [
+    ["AA", "24", "JFK", "3797", "LAX", "3484", "", "0", "32B 762"],
+    ["UA", "5209", "JFK", "3797", "LAX", "3484", "Y", "0", "757"],
+    ["AA", "24", "LAX", "3484", "JFK", "3797", "", "0", "32B"],
+    ["AA", "24", "LGA", "3697", "LAX", "3484", "", "0", "738"],
+]
+
+DATASETS = {'airports.dat': AIRPORTS, 'airlines.dat': AIRLINES, 'routes.dat': ROUTES}
+
+def make_data(data_dir=None, etag='"v1"'):
+    calls = []
+
+    def fetch(url, etag_sent=None, last_modified=None):
+        calls.append((url, etag_sent))
+        if etag_sent == etag:
+            return Download(None, etag_sent, last_modified)
+        return Download(DATASETS[url.rsplit('/', 1)[-1]], etag, None)
+    return OpenFlightsData(data_dir, fetch, refresh_interval=0), calls
+
+def test_datasets_are_downloaded_once():
+    data, calls = make_data()
+    assert data.airports() is data.airports()
+    data.routes()
+    data.routes()
+    assert len(calls) == 2
+
+def test_failed_download_is_retried():
+    attempts = []
+
+    def fetch(url, etag=None, last_modified=None):
+        attempts.append(url)
+        return None if len(attempts) == 1 else Download(AIRLINES, None, None)
+    data = OpenFlightsData(None, fetch, refresh_interval=0)
+    assert data.airlines() is None
+    assert data.airlines().by_iata_code('ua').name == "United Airlines"
+
+def test_airport_indexes():
+    airports = make_data()[0].airports()
+    assert len(airports.rows) == 4
+    assert airports.by_iata_code('jfk').icao == "KJFK"
+    assert airports.lookup('KLAX').iata == "LAX"
+    assert airports.lookup('la guardia airport').iata == "LGA"
+    assert airports.get('3484').name == "Los Angeles International Airport"
+    # Missing codes are not indexed
+    assert '\\N' not in airports.by_iata
+
+def test_search_ranks_and_filters():
+    data = make_data()[0]
+    airports = data.airports()
+    # Every name contains the word; shorter names are closer matches
+    assert [a.iata for a in airports.search('airport')] == ["LGA", "\\N", "LAX", "JFK"]
+    assert [a.iata for a in airports.search('airport', country='canada')] == ["\\N"]
+    # Exact codes rank first, then exact cities, and misspellings still match
+    assert airports.search('lax')[0].iata == "LAX"
+    assert airports.search('KLGA')[0].iata == "LGA"
+    assert [a.iata for a in airports.search('new york')] == ["LGA", "JFK"]
+    assert [a.iata for a in airports.search('Kenedy Internatonal', limit=1)] == ["JFK"]
+    assert airports.search('zzzz') == []
+    # IATA codes are reused; lookups keep the first airline in the file, search prefers active airlines
+    assert data.airlines().by_iata_code('AA').name == "American Airlines"
+    assert [a.name for a in data.airlines().search('aa')] == ["American Airlines", "Defunct Airline"]
+    assert [a.name for a in data.airlines().search('united', limit=1)] == ["United Airlines"]
+    assert [a.name for a in data.airlines().search('amercan airlnes', limit=1)] == ["American Airlines"]
+
+def test_routes_by_pair_and_source():
+    routes = make_data()[0].routes()
+    assert [r.airline for r in routes.between('JFK', 'LAX')] == ["AA", "UA"]
+    assert routes.between('LAX', 'LGA') == []
+    assert [r.destination for r in routes.from_airport('LAX')] == ["JFK"]
+
+def test_nearby_airports():
+    airports = make_data()[0].airports()
+    nearest = airports.near(40.7, -73.9, limit=2)
+    assert [(a.iata, round(d)) for a, d in nearest] == [("LGA", 9), ("JFK", 12)]
+    assert [a.iata for a, _ in airports.near(40.7, -73.9, radius_km=50)] == ["LGA", "JFK"]
+    assert len(airports.near(40.7, -73.9, radius_km=5000, limit=None)) == 4
+    assert [a.iata for a in airports.in_city('new york')] == ["JFK", "LGA"]
+
+def test_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / "table.bin")
+    write_snapshot(path, {'name': ["Zürich", "", "Oslo"], 'code': ["ZRH", "\\N", "OSL"]}, {'etag': '"abc"'})
+    snapshot = read_snapshot(path)
+    assert snapshot.meta == {'etag': '"abc"'}
+    assert list(snapshot.columns['name']) == ["Zürich", "", "Oslo"]
+    assert snapshot.columns['code'][-1] == "OSL"
+    assert len(snapshot.columns['code']) == 3
+
+def test_cold_start_reads_the_snapshot_without_network(tmp_path):
+    data, calls = make_data(str(tmp_path))
+    assert data.airports().by_iata_code('LAX').name == "Los Angeles International Airport"
+    assert os.path.exists(tmp_path / "airports.bin")
+
+    # A new process maps the snapshot instead of downloading
+    fresh, fresh_calls = make_data(str(tmp_path))
+    airports = fresh.airports()
+    assert fresh_calls == []
+    assert airports.lookup('KJFK').city == "New York"
+    assert [a.iata for a in airports.search('kennedy', limit=2)] == ["JFK"]
+
+def test_refresh_is_conditional_and_swaps_tables(tmp_path):
+    data, calls = make_data(str(tmp_path))
+    before = data.routes()
+    # Same ETag: the server answers 304 and the table is kept
+    assert not data.refresh('routes', force=True)
+    assert calls[-1][1] == '"v1"'
+    assert data.routes() is before
+
+    # A new version is downloaded, written and swapped in
+    ROUTES.append(["UA", "5209", "LAX", "3484", "LGA", "3697", "", "0", "757"])
+    try:
+        changed, _ = make_data(str(tmp_path), etag='"v2"')
+        changed._meta, changed._tables = data._meta, data._tables
+        assert changed.refresh('routes', force=True)
+        assert [r.airline for r in changed.routes().between('LAX', 'LGA')] == ["UA"]
+        assert before.between('LAX', 'LGA') == []
+
+        # Another process picks up the newer snapshot without downloading
+        assert data.refresh('routes')
+        assert len(data.routes()) == 5
+    finally:
+        ROUTES.pop()
@@ -0,0 +1,76 @@
+import math
+from graph.openflights import AirportTable, RouteTable
+from graph.route_graph import RouteGraph
+
+def airport(airport_id, iata, icao, latitude, longitude):
+    return [airport_id, f"{iata} Airport", "City", "Country", iata, icao, str(latitude), str(longitude),
+            "0", "0", "A", "Etc/UTC", "airport", "OurAirports"]
+
+AIRPORTS = [
+    airport("1", "TLL", "EETN", 59.41, 24.83),
+    airport("2", "HEL", "EFHK", 60.32, 24.96),
+    airport("3", "FRA", "EDDF", 50.03, 8.57),
+    airport("4", "SFO", "KSFO", 37.62, -122.37),
+    airport("5", "LHR", "EGLL", 51.47, -0.46),
+    airport("6", "JFK", "KJFK", 40.64, -73.78),
+]
+
+def route(airline, source, destination):
+    return [airline, "1", source, "1", destination, "2", "", "0", "320"]
+
+ROUTES = [
+    route("AY", "TLL", "HEL"), route("LH", "TLL", "FRA"), route("BT", "TLL", "FRA"),
+    route("AY", "HEL", "SFO"), route("LH", "FRA", "SFO"), route("UA", "FRA", "SFO"),
+    route("BA", "TLL", "LHR"), route("BA", "LHR", "JFK"), route("B6", "JFK", "SFO"),
+    route("AY", "HEL", "TLL"), route("LH", "TLL", "FRA"),
+]
+
+def make_graph():
+    return RouteGraph(RouteTable.from_rows(ROUTES), AirportTable.from_rows(AIRPORTS))
+
+def test_csr_layout():
+    graph = make_graph()
+    tll = graph.node('TLL')
+    targets = [graph.codes[t] for t in graph.edge_target[graph.indptr[tll]:graph.indptr[tll + 1]]]
+    assert targets == ["FRA", "HEL", "LHR"]
+    # Duplicate routes are merged; each edge keeps its airlines
+    frankfurt = graph.indptr[tll]
+    airlines = graph.edge_airlines[graph.airline_indptr[frankfurt]:graph.airline_indptr[frankfurt + 1]]
+    assert [graph.airline_codes[a] for a in airlines] == ["BT", "LH"]
+    assert graph.node('eetn') == tll
+
+def test_fewest_stops_then_shortest():
+    itineraries = make_graph().itineraries('TLL', 'SFO', k=3)
+    assert [i.airports for i in itineraries] == [["TLL", "HEL", "SFO"], ["TLL", "FRA", "SFO"], ["TLL", "LHR", "JFK", "SFO"]]
+    assert [i.stops for i in itineraries] == [1, 1, 2]
+    assert itineraries[1].legs[1].airlines == ["LH", "UA"]
+    assert math.isclose(itineraries[0].distance_km, sum(leg.distance_km for leg in itineraries[0].legs))
+
+def test_shortest_distance_and_stop_limit():
+    graph = make_graph()
+    by_distance = graph.itineraries('TLL', 'SFO', by='distance')
+    assert [i.distance_km for i in by_distance] == sorted(i.distance_km for i in by_distance)
+    assert by_distance[0].airports == ["TLL", "HEL", "SFO"]
+    assert len(graph.itineraries('TLL', 'SFO', max_stops=1)) == 2
+    assert graph.itineraries('TLL', 'SFO', max_stops=0) == []
+    assert graph.itineraries('TLL', 'XXX') == []
+
+def test_airline_filters():
+    graph = make_graph()
+    assert [i.airports for i in graph.itineraries('TLL', 'SFO', airlines=['lh', 'ua'])] == [["TLL", "FRA", "SFO"]]
+    # Legs only list the airlines that pass the filter
+    assert graph.itineraries('TLL', 'SFO', airlines=['LH'])[0].legs[1].airlines == ["LH"]
+    excluded = graph.itineraries('TLL', 'SFO', exclude_airlines=['AY', 'LH'])
+    assert [i.airports for i in excluded] == [["TLL", "FRA", "SFO"], ["TLL", "LHR", "JFK", "SFO"]]
+    assert excluded[0].legs[0].airlines == ["BT"]
+
+def test_distance_order_skips_airports_without_coordinates():
+    # XXX has no coordinates, so TLL-XXX-SFO has no known length and must not rank first
+    graph = RouteGraph(RouteTable.from_rows(ROUTES + [route("ZZ", "TLL", "XXX"), route("ZZ", "XXX", "SFO")]),
+                       AirportTable.from_rows(AIRPORTS))
+    by_distance = graph.itineraries('TLL', 'SFO', by='distance')
+    assert by_distance[0].airports == ["TLL", "HEL", "SFO"]
+    assert all("XXX" not in i.airports for i in by_distance)
+    assert [i.distance_km for i in by_distance] == sorted(i.distance_km for i in by_distance)
+    # Ordered by stops it is still a one-stop itinerary
+    assert ["TLL", "XXX", "SFO"] in [i.airports for i in graph.itineraries('TLL', 'SFO', k=5)]
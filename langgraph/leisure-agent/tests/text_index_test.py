@@ -0,0 +1,29 @@
+from graph.text_index import TextIndex, trigrams
+
+def make_index():
+    return TextIndex(
+        texts=[("Zürich Airport", "Zurich"), ("Tallinn Airport", "Tallinn"), ("Tartu Airport", "Tartu"),
+               ("Helsinki Vantaa Airport", "Helsinki"), ("Zurich Heliport", "")],
+        codes=[("ZRH", "LSZH"), ("TLL", "EETN"), ("TAY", "EETU"), ("HEL", "EFHK"), ("", "")],
+        groups=["Switzerland", "Estonia", "Estonia", "Finland", "Switzerland"],
+        priority=[0, 0, 0, 0, 1])
+
+def test_trigrams_are_padded_per_word():
+    assert trigrams("Ab c") == {"  a", " ab", "ab ", "  c", " c "}
+    assert trigrams("Zürich") == trigrams("zurich")
+
+def test_ranking():
+    index = make_index()
+    assert index.search("eetu")[0] == 2
+    assert index.search("tallinn") == [1]
+    # Typos and prefixes
+    assert index.search("Helsnki", limit=1) == [3]
+    assert index.search("talin", limit=1) == [1]
+    # The exact city outranks another name with the same word
+    assert index.search("zurich") == [0, 4]
+    assert index.search("airport", group="esto") == [2, 1]
+    assert index.search("") == [] and index.search("qqq") == []
+
+def test_priority_breaks_ties():
+    index = TextIndex(texts=[("Air One",), ("Air One",)], codes=[("A1",), ("A1",)], priority=[0, 1])
+    assert index.search("a1") == [1, 0]